@@ -51,8 +51,8 @@ from bigml.api import FINISHED
 from bigml.api import get_status, get_api_connection, get_anomaly_id
 from bigml.basemodel import get_resource_dict
 from bigml.modelfields import ModelFields, NUMERIC
-from bigml.util import cast, use_cache, load, get_data_format, \
-    get_formatted_data, format_data, get_data_transformations
+from bigml.util import use_cache, load, get_data_format, \
+    add_data_columns, get_data_transformations
 from bigml.constants import OUT_NEW_HEADERS, INTERNAL, DECIMALS
 
 
@@ -288,9 +288,8 @@ class Anomaly(ModelFields):
         if self.sample_size == 1 and self.normalization_factor is None:
             return 1
         # Checks and cleans input_data leaving the fields used in the model
-        norm_input_data = self.filter_input_data(input_data)
-        # Strips affixes for numeric values and casts to the final field type
-        cast(norm_input_data, self.fields)
+        # and casts to the final field type
+        norm_input_data = self.normalize_input_data(input_data)
 
         depth_sum = 0
 
@@ -368,11 +367,12 @@ class Anomaly(ModelFields):
         considered to allow changing the header associated to that new field.
 
         :param input_data_list: List of input data to be predicted
-        :type input_data_list: list or Panda's dataframe
+        :type input_data_list: list, Panda's dataframe or Arrow table
         :param dict outputs: properties that define the headers and fields to
                              be added to the input data
         :return: the list of input data plus the predicted values
-        :rtype: list or Panda's dataframe depending on the input type in
+        :rtype: list, Panda's dataframe or Arrow table depending on the
+                input type in
                 input_data_list
 
         """
@@ -380,11 +380,12 @@ class Anomaly(ModelFields):
             outputs = {}
         new_headers = outputs.get(OUT_NEW_HEADERS, DFT_OUTPUTS)
         data_format = get_data_format(input_data_list)
-        inner_data_list = get_formatted_data(input_data_list, INTERNAL)
+        inner_data_list = self.batch_input_rows(input_data_list)
         for input_data in inner_data_list:
             prediction = {"score": self.anomaly_score(input_data, **kwargs)}
             for index, key in enumerate(DFT_OUTPUTS):
                 input_data[new_headers[index]] = prediction[key]
         if data_format != INTERNAL:
-            return format_data(inner_data_list, out_format=data_format)
+            return add_data_columns(input_data_list, inner_data_list,
+                                    new_headers)
         return inner_data_list
@@ -35,12 +35,12 @@ api.pprint(prediction)
 import sys
 import pprint
 import os
-import json
 
 
 from bigml.bigmlconnection import BigMLConnection
 from bigml.domain import BIGML_PROTOCOL
-from bigml.constants import STORAGE, ALL_FIELDS, TINY_RESOURCE, TASKS_QS
+from bigml.constants import STORAGE, ALL_FIELDS, TINY_RESOURCE, TASKS_QS, \
+    EXCLUDE_FIELDS_QS
 from bigml.util import is_in_progress, is_image
 from bigml.api_handlers.resourcehandler import ResourceHandlerMixin
 from bigml.api_handlers.sourcehandler import SourceHandlerMixin
@@ -298,7 +298,9 @@ class BigML(BigMLConnection,ExternalConnectorHandlerMixin,
     """
     def __init__(self, username=None, api_key=None,
                  debug=False, set_locale=False, storage=None, domain=None,
-                 project=None, organization=None, short_debug=False):
+                 project=None, organization=None, short_debug=False,
+                 storage_format=None, metrics_hooks=None,
+                 storage_memo_bytes=None):
         """Initializes the BigML API.
 
         If left unspecified, `username` and `api_key` will default to the
@@ -311,6 +313,14 @@ class BigML(BigMLConnection,ExternalConnectorHandlerMixin,
         If storage is set to a directory name, the resources obtained in
         CRU operations will be stored in the given directory.
 
+        If storage_format is set, the stored resources use that format
+        (e.g. `msgpack.gz`) instead of plain JSON files. See the
+        resourcestore module for the available formats.
+
+        If storage_memo_bytes is set, it limits the size in bytes of the
+        uncompressed stored files that the connection keeps in memory
+        (256MB by default).
+
         If domain is set, the api will point to the specified domain. Default
         will be the one in the environment variable `BIGML_DOMAIN` or
         `bigml.io` if missing. The expected domain argument is a string or a
@@ -328,6 +338,9 @@ class BigML(BigMLConnection,ExternalConnectorHandlerMixin,
         projects of the organization and permissions need to be previously
         given by the organization administrator.
 
+        If metrics_hooks is set to a list of hooks, they receive the metrics
+        of every request. See the httpmetrics module for details.
+
         """
         # first BigMLConnection needs to exist
         super().__init__(username=username, api_key=api_key,
@@ -335,7 +348,10 @@ class BigML(BigMLConnection,ExternalConnectorHandlerMixin,
                          set_locale=set_locale, storage=storage,
                          domain=domain, project=project,
                          organization=organization,
-                         short_debug=short_debug)
+                         short_debug=short_debug,
+                         storage_format=storage_format,
+                         metrics_hooks=metrics_hooks,
+                         storage_memo_bytes=storage_memo_bytes)
         # adding mixins properties
         ResourceHandlerMixin.__init__(self)
         SourceHandlerMixin.__init__(self)
@@ -702,18 +718,21 @@ class BigML(BigMLConnection,ExternalConnectorHandlerMixin,
         if query_string is None:
             query_string = ''
         if self.storage is not None:
+            store = self.resource_store()
             try:
-                stored_resource = os.path.join(self.storage,
-                                               resource_id.replace("/", "_"))
-                with open(stored_resource) as resource_file:
-                    resource = json.loads(resource_file.read())
+                # the fields structures are not read when they are excluded
+                # from the query, as remote resources would not have them
+                resource = store.read( \
+                    resource_id,
+                    fields=EXCLUDE_FIELDS_QS not in query_string)
                 # we check that the stored resource has the information
                 # needed (for instance, input_fields for predicting)
-                if check_local_fn is None or check_local_fn(resource):
+                if resource is not None and (check_local_fn is None or
+                                             check_local_fn(resource)):
                     return resource
             except ValueError:
                 raise ValueError("The file %s contains no JSON" %
-                    stored_resource)
+                    store.find(resource_id)[0])
             except IOError:
                 pass
         if self.auth == '?username=;api_key=;':
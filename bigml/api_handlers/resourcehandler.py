@@ -38,6 +38,8 @@ from bigml.bigmlconnection import HTTP_OK, HTTP_ACCEPTED, HTTP_CREATED, \
 from bigml.constants import WAITING, QUEUED, STARTED, IN_PROGRESS, \
     SUMMARIZED, FINISHED, UPLOADING, FAULTY, UNKNOWN, RUNNABLE
 from bigml.exceptions import FaultyResourceError
+from bigml.httpmetrics import report_sleep, report_retry, CHECK_RESOURCE, \
+    TRANSIENT_ERROR
 
 # Minimum query string to get model fields
 TINY_RESOURCE = "full=false"
@@ -550,6 +552,7 @@ def check_resource(resource, get_method=None, query_string='', wait_time=1,
             elapsed = 0
         if debug:
             print("Sleeping %s" % _wait_time)
+        report_sleep(api, CHECK_RESOURCE, _wait_time)
         time.sleep(_wait_time)
         elapsed += _wait_time
         # retries for the finished status use a query string that gets the
@@ -693,6 +696,9 @@ class ResourceHandlerMixin(metaclass=abc.ABCMeta):
             if new_resource.get('error', {}).get(
                     'status', {}).get('type') == c.TRANSIENT \
                     and error_retries is not None and error_retries > 0:
+                report_retry(self, "GET", get_resource_type(resource),
+                             TRANSIENT_ERROR)
+                report_sleep(self, TRANSIENT_ERROR, wait_time)
                 time.sleep(wait_time)
                 return self.ok(resource, query_string, wait_time,
                                max_requests, raise_on_error, retries,
@@ -41,13 +41,7 @@ try:
 except ImportError:
     import json
 
-try:
-    from pandas import DataFrame
-    from io import StringIO
-    PANDAS_READY = True
-except ImportError:
-    PANDAS_READY = False
-
+from io import StringIO
 from zipfile import ZipFile
 
 import mimetypes
@@ -56,7 +50,7 @@ import requests
 from requests_toolbelt import MultipartEncoder
 
 from bigml.util import is_url, maybe_save, filter_by_extension, \
-    infer_field_type
+    infer_field_type, is_instance_of
 from bigml.bigmlconnection import (
     HTTP_CREATED, HTTP_BAD_REQUEST,
     HTTP_UNAUTHORIZED, HTTP_PAYMENT_REQUIRED, HTTP_NOT_FOUND,
@@ -191,6 +185,8 @@ class SourceHandlerMixin(ResourceHandlerMixin):
         qs_params = self._add_credentials({})
         qs_str = "?%s" % parse.urlencode(qs_params) if qs_params else ""
         create_args = self._add_project(create_args, True)
+        start = self._request_start()
+        multipart = None
         if GAE_ENABLED:
             try:
                 req_options = {
@@ -203,10 +199,12 @@ class SourceHandlerMixin(ResourceHandlerMixin):
                 }
                 response = urlfetch.fetch(**req_options)
             except urlfetch.Error as exception:
+                self._report_request(start, "POST", self.source_url)
                 LOGGER.error("HTTP request error: %s",
                              str(exception))
                 return maybe_save(resource_id, self.storage, code,
-                                  location, resource, error)
+                                  location, resource, error,
+                                  storage_format=self.storage_format)
         else:
             try:
                 files = {"file": (name,
@@ -222,10 +220,15 @@ class SourceHandlerMixin(ResourceHandlerMixin):
             except (requests.ConnectionError,
                     requests.Timeout,
                     requests.RequestException) as exc:
+                self._report_request(start, "POST", self.source_url,
+                                     body=multipart)
                 LOGGER.error("HTTP request error: %s", str(exc))
                 code = HTTP_INTERNAL_SERVER_ERROR
                 return maybe_save(resource_id, self.storage, code,
-                                  location, resource, error)
+                                  location, resource, error,
+                                  storage_format=self.storage_format)
+        self._report_request(start, "POST", self.source_url, response,
+                             body=multipart)
         try:
             code = response.status_code
             if code == HTTP_CREATED:
@@ -247,7 +250,8 @@ class SourceHandlerMixin(ResourceHandlerMixin):
             LOGGER.error("Malformed response")
 
         return maybe_save(resource_id, self.storage, code,
-                          location, resource, error)
+                          location, resource, error,
+                          storage_format=self.storage_format)
 
     def clone_source(self, source,
                      args=None, wait_time=3, retries=10):
@@ -309,7 +313,7 @@ class SourceHandlerMixin(ResourceHandlerMixin):
         if path is None:
             raise Exception('A local path or a valid URL must be provided.')
 
-        if PANDAS_READY and isinstance(path, DataFrame):
+        if is_instance_of(path, "pandas", "DataFrame"):
             buffer = StringIO(path.to_csv(index=False))
             return self._create_local_source(file_name=buffer, args=args)
         if is_url(path):
@@ -513,19 +513,16 @@ class Association(ModelFields):
 
         """
         self_vars = vars(self).copy()
-        for index, elem in enumerate(self_vars["items"]):
-            self_vars["items"][index] = vars(elem)
-        for index, elem in enumerate(self_vars["rules"]):
-            self_vars["rules"][index] = vars(elem)
-        dump(self_vars, output=output, cache_set=cache_set)
+        self_vars["items"] = [vars(elem) for elem in self_vars["items"]]
+        self_vars["rules"] = [vars(elem) for elem in self_vars["rules"]]
+        dump(self_vars, output=output, cache_set=cache_set,
+             runtime_attrs=self.RUNTIME_ATTRS)
 
     def dumps(self):
         """Uses msgpack to serialize the resource object to a string
 
         """
         self_vars = vars(self).copy()
-        for index, elem in enumerate(self_vars["items"]):
-            self_vars["items"][index] = vars(elem)
-        for index, elem in enumerate(self_vars["rules"]):
-            self_vars["rules"][index] = vars(elem)
-        dumps(self_vars)
+        self_vars["items"] = [vars(elem) for elem in self_vars["items"]]
+        self_vars["rules"] = [vars(elem) for elem in self_vars["rules"]]
+        dumps(self_vars, runtime_attrs=self.RUNTIME_ATTRS)
@@ -202,7 +202,7 @@ class BaseModel(ModelFields):
     """
 
     def __init__(self, model, api=None, fields=None, checked=True,
-                 operation_settings=None):
+                 operation_settings=None, fields_pool=None):
 
         check_fn = check_local_but_fields if fields is not None else \
             check_local_info
@@ -232,6 +232,9 @@ class BaseModel(ModelFields):
             status = get_status(model)
             if 'code' in status and status['code'] == FINISHED:
                 model_fields = None
+                if fields is None:
+                    # only the fields given by the caller are shared
+                    fields_pool = None
                 if (fields is None and ('model_fields' in model['model'] or
                                         'fields' in model['model'])):
                     # models might use less fields that provided
@@ -261,7 +264,7 @@ class BaseModel(ModelFields):
                         objective_field),
                         missing_tokens=missing_tokens,
                         operation_settings=operation_settings,
-                        model_fields=model_fields)
+                        model_fields=model_fields, fields_pool=fields_pool)
                 self.description = model['description']
                 self.field_importance = model['model'].get('importance',
                                                            None)
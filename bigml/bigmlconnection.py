@@ -43,6 +43,9 @@ except ImportError:
 import bigml.constants as c
 
 from bigml.util import check_dir, maybe_save, get_exponential_wait
+from bigml.resourcestore import check_storage_format, ResourceStore
+from bigml.httpmetrics import url_resource_type, content_length, \
+    report_sleep, report_retry, DOWNLOAD
 from bigml.util import DEFAULT_LOCALE
 from bigml.domain import Domain
 from bigml.domain import DEFAULT_DOMAIN
@@ -169,7 +172,9 @@ class BigMLConnection():
     """
     def __init__(self, username=None, api_key=None,
                  debug=False, set_locale=False, storage=None, domain=None,
-                 project=None, organization=None, short_debug=False):
+                 project=None, organization=None, short_debug=False,
+                 storage_format=None, metrics_hooks=None,
+                 storage_memo_bytes=None):
         """Initializes the BigML API.
 
         If left unspecified, `username` and `api_key` will default to the
@@ -184,6 +189,15 @@ class BigMLConnection():
         If storage is set to a directory name, the resources obtained in
         CRU operations will be stored in the given directory.
 
+        If storage_format is set, the stored resources use that format
+        (e.g. `msgpack.gz`) instead of plain JSON files. See the
+        resourcestore module for the available formats.
+
+        If storage_memo_bytes is set, it limits the size in bytes of the
+        uncompressed stored files that the connection keeps in memory
+        (256MB by default for the storage formats other than JSON, where no
+        files are kept in memory by default).
+
         If domain is set, the api will point to the specified domain. Default
         will be the one in the environment variable `BIGML_DOMAIN` or
         `bigml.io` if missing. The expected domain argument is a string or a
@@ -201,6 +215,11 @@ class BigMLConnection():
         projects of the organization and permissions need to be previously
         given by the organization administrator.
 
+        If metrics_hooks is set to a list of hooks, they receive the metrics
+        of every request: latency, bytes sent and received, retries,
+        throttling and waiting time. See the httpmetrics module for the
+        methods the hooks implement.
+
         """
 
 
@@ -258,6 +277,57 @@ class BigMLConnection():
         if set_locale:
             locale.setlocale(locale.LC_ALL, DEFAULT_LOCALE)
         self.storage = assign_dir(storage)
+        self.storage_format = check_storage_format(storage_format)
+        self.storage_memo_bytes = storage_memo_bytes
+        self._resource_store = None
+        self.metrics_hooks = list(metrics_hooks or [])
+
+    def resource_store(self):
+        """Returns the store of the resources in the storage directory. The
+        store is kept while the storage settings don't change, so that the
+        files it keeps in memory are reused by all the retrievals.
+
+        """
+        store = self._resource_store
+        if store is None or store.directory != self.storage or \
+                store.storage_format != (self.storage_format or "json"):
+            store = ResourceStore(self.storage, self.storage_format,
+                                  max_memo_bytes=self.storage_memo_bytes)
+            self._resource_store = store
+        return store
+
+    def add_metrics_hook(self, hook):
+        """Adds a hook that receives the metrics of the requests """
+        self.metrics_hooks.append(hook)
+
+    def _request_start(self):
+        """Returns the time when a request starts, or None if there are no
+        hooks to report the metrics to.
+
+        """
+        return time.perf_counter() if self.metrics_hooks else None
+
+    def _report_request(self, start, method, url, response=None, body=None,
+                        bytes_received=None):
+        """Reports the metrics of a request to the hooks. `response` is
+        None when the request failed with no response.
+
+        """
+        if start is None:
+            return
+        latency = time.perf_counter() - start
+        resource_type = url_resource_type(url, [self.url,
+                                                self.prediction_base_url])
+        status_code = getattr(response, "status_code", None)
+        if bytes_received is None:
+            bytes_received = content_length(getattr(response, "content",
+                                                    None))
+        bytes_sent = content_length(body)
+        for hook in self.metrics_hooks:
+            hook.on_request(method, resource_type, status_code, latency,
+                            bytes_sent, bytes_received)
+            if status_code == HTTP_TOO_MANY_REQUESTS:
+                hook.on_throttled(method, resource_type)
 
     def _set_api_urls(self, domain=None):
         """Sets the urls that point to the REST api methods for each resource
@@ -358,6 +428,7 @@ class BigMLConnection():
         qs_str = "?%s" % parse.urlencode(qs_params) if qs_params else ""
         body = self._add_project(body, not organization)
         while code == HTTP_ACCEPTED:
+            start = self._request_start()
             if GAE_ENABLED:
                 try:
                     req_options = {
@@ -369,11 +440,13 @@ class BigMLConnection():
                     }
                     response = urlfetch.fetch(**req_options)
                 except urlfetch.Error as exception:
+                    self._report_request(start, "POST", url, body=body)
                     LOGGER.error("HTTP request error: %s",
                                  str(exception))
                     error["status"]["type"] = c.TRANSIENT
                     return maybe_save(resource_id, self.storage, code,
-                                      location, resource, error)
+                                      location, resource, error,
+                                      storage_format=self.storage_format)
             else:
                 try:
                     response = requests.post(url,
@@ -383,11 +456,14 @@ class BigMLConnection():
                 except (requests.ConnectionError,
                         requests.Timeout,
                         requests.RequestException) as exc:
+                    self._report_request(start, "POST", url, body=body)
                     LOGGER.error("HTTP request error: %s", str(exc))
                     code = HTTP_INTERNAL_SERVER_ERROR
                     error["status"]["type"] = c.TRANSIENT
                     return maybe_save(resource_id, self.storage, code,
-                                      location, resource, error)
+                                      location, resource, error,
+                                      storage_format=self.storage_format)
+            self._report_request(start, "POST", url, response, body=body)
             try:
                 code = response.status_code
                 if code in [HTTP_CREATED, HTTP_OK]:
@@ -410,9 +486,13 @@ class BigMLConnection():
             except ValueError as exc:
                 LOGGER.error("Malformed response: %s", str(exc))
                 code = HTTP_INTERNAL_SERVER_ERROR
+            if code == HTTP_ACCEPTED:
+                report_retry(self, "POST", url_resource_type( \
+                    url, [self.url, self.prediction_base_url]), "accepted")
 
         return maybe_save(resource_id, self.storage, code,
-                          location, resource, error)
+                          location, resource, error,
+                          storage_format=self.storage_format)
 
     def _get(self, url, query_string='',
              shared_username=None, shared_api_key=None, organization=None,
@@ -447,6 +527,7 @@ class BigMLConnection():
             qs_params.update({"shared_ref": shared_ref})
         qs_params.update(dict(parse.parse_qsl(query_string)))
         qs_str = "?%s" % parse.urlencode(qs_params) if qs_params else ""
+        start = self._request_start()
         if GAE_ENABLED:
             try:
                 req_options = {
@@ -457,11 +538,13 @@ class BigMLConnection():
                 }
                 response = urlfetch.fetch(**req_options)
             except urlfetch.Error as exception:
+                self._report_request(start, "GET", url)
                 LOGGER.error("HTTP request error: %s",
                              str(exception))
                 error["status"]["type"] = c.TRANSIENT
                 return maybe_save(resource_id, self.storage, code,
-                                  location, resource, error)
+                                  location, resource, error,
+                                  storage_format=self.storage_format)
         else:
             try:
                 response = requests.get(url, params = qs_params,
@@ -470,10 +553,13 @@ class BigMLConnection():
             except (requests.ConnectionError,
                     requests.Timeout,
                     requests.RequestException) as exc:
+                self._report_request(start, "GET", url)
                 LOGGER.error("HTTP request error: %s", str(exc))
                 error["status"]["type"] = c.TRANSIENT
                 return maybe_save(resource_id, self.storage, code,
-                                  location, resource, error)
+                                  location, resource, error,
+                                  storage_format=self.storage_format)
+        self._report_request(start, "GET", url, response)
         try:
             code = response.status_code
             if code == HTTP_OK:
@@ -498,7 +584,8 @@ class BigMLConnection():
             LOGGER.error("Malformed response: %s", str(exc))
 
         return maybe_save(resource_id, self.storage, code,
-                          location, resource, error)
+                          location, resource, error,
+                          storage_format=self.storage_format)
 
     def _list(self, url, query_string='', organization=None):
         """Lists all existing remote resources.
@@ -534,6 +621,7 @@ class BigMLConnection():
         qs_params = self._add_credentials({}, organization=organization)
         qs_params.update(dict(parse.parse_qsl(query_string)))
         qs_str = "?%s" % parse.urlencode(qs_params) if qs_params else ""
+        start = self._request_start()
         if GAE_ENABLED:
             try:
                 req_options = {
@@ -544,6 +632,7 @@ class BigMLConnection():
                 }
                 response = urlfetch.fetch(**req_options)
             except urlfetch.Error as exception:
+                self._report_request(start, "GET", url)
                 LOGGER.error("HTTP request error: %s",
                              str(exception))
                 error["status"]["type"] = c.TRANSIENT
@@ -560,6 +649,7 @@ class BigMLConnection():
             except (requests.ConnectionError,
                     requests.Timeout,
                     requests.RequestException) as exc:
+                self._report_request(start, "GET", url)
                 LOGGER.error("HTTP request error: %s", str(exc))
                 error["status"]["type"] = c.TRANSIENT
                 return {
@@ -567,6 +657,7 @@ class BigMLConnection():
                     'meta': meta,
                     'objects': resources,
                     'error': error}
+        self._report_request(start, "GET", url, response)
         try:
             code = response.status_code
 
@@ -618,6 +709,7 @@ class BigMLConnection():
         qs_params = self._add_credentials({}, organization=organization)
         qs_str = "?%s" % parse.urlencode(qs_params) if qs_params else ""
         body = self._add_project(body, not organization)
+        start = self._request_start()
         if GAE_ENABLED:
             try:
                 req_options = {
@@ -629,11 +721,13 @@ class BigMLConnection():
                 }
                 response = urlfetch.fetch(**req_options)
             except urlfetch.Error as exception:
+                self._report_request(start, "PUT", url, body=body)
                 LOGGER.error("HTTP request error: %s",
                              str(exception))
                 error["status"]["type"] = c.TRANSIENT
                 return maybe_save(resource_id, self.storage, code,
-                                  location, resource, error)
+                                  location, resource, error,
+                                  storage_format=self.storage_format)
         else:
             try:
                 response = requests.put(url,
@@ -643,10 +737,13 @@ class BigMLConnection():
             except (requests.ConnectionError,
                     requests.Timeout,
                     requests.RequestException) as exc:
+                self._report_request(start, "PUT", url, body=body)
                 LOGGER.error("HTTP request error: %s", str(exc))
                 error["status"]["type"] = c.TRANSIENT
                 return maybe_save(resource_id, self.storage, code,
-                                  location, resource, error)
+                                  location, resource, error,
+                                  storage_format=self.storage_format)
+        self._report_request(start, "PUT", url, response, body=body)
         try:
             code = response.status_code
             if code == HTTP_ACCEPTED:
@@ -667,7 +764,8 @@ class BigMLConnection():
             LOGGER.error("Malformed response")
 
         return maybe_save(resource_id, self.storage, code,
-                          location, resource, error)
+                          location, resource, error,
+                          storage_format=self.storage_format)
 
     def _delete(self, url, query_string='', organization=None,
                 resource_id=None):
@@ -686,6 +784,7 @@ class BigMLConnection():
         qs_params = self._add_credentials({}, organization=organization)
         qs_params.update(dict(parse.parse_qsl(query_string)))
         qs_str = "?%s" % parse.urlencode(qs_params) if qs_params else ""
+        start = self._request_start()
         if GAE_ENABLED:
             try:
                 req_options = {
@@ -695,6 +794,7 @@ class BigMLConnection():
                 }
                 response = urlfetch.fetch(**req_options)
             except urlfetch.Error as exception:
+                self._report_request(start, "DELETE", url)
                 LOGGER.error("HTTP request error: %s",
                              str(exception))
                 error["status"]["type"] = c.TRANSIENT
@@ -709,12 +809,14 @@ class BigMLConnection():
             except (requests.ConnectionError,
                     requests.Timeout,
                     requests.RequestException) as exc:
+                self._report_request(start, "DELETE", url)
                 LOGGER.error("HTTP request error: %s", str(exc))
                 error["status"]["type"] = c.TRANSIENT
                 return {
                     'code': code,
                     'resource': resource_id,
                     'error': error}
+        self._report_request(start, "DELETE", url, response)
         try:
             code = response.status_code
 
@@ -754,6 +856,7 @@ class BigMLConnection():
             return file_object
         qs_params = self._add_credentials({})
         qs_str = "?%s" % parse.urlencode(qs_params) if qs_params else ""
+        start = self._request_start()
         if GAE_ENABLED:
             try:
                 req_options = {
@@ -763,6 +866,7 @@ class BigMLConnection():
                 }
                 response = urlfetch.fetch(**req_options)
             except urlfetch.Error as exception:
+                self._report_request(start, "GET", url)
                 LOGGER.error("HTTP request error: %s",
                              str(exception))
                 return file_object
@@ -774,8 +878,17 @@ class BigMLConnection():
             except (requests.ConnectionError,
                     requests.Timeout,
                     requests.RequestException) as exc:
+                self._report_request(start, "GET", url)
                 LOGGER.error("HTTP request error: %s", str(exc))
                 return file_object
+        if start is not None:
+            # the response is a stream, so its size is taken from the headers
+            try:
+                bytes_received = int(response.headers.get("content-length"))
+            except (TypeError, ValueError):
+                bytes_received = 0
+            self._report_request(start, "GET", url, response,
+                                 bytes_received=bytes_received)
         try:
             code = response.status_code
             if code == HTTP_OK:
@@ -787,8 +900,9 @@ class BigMLConnection():
                             if download_status and isinstance(download_status,
                                                               dict):
                                 if download_status['status']['code'] != 5:
-                                    time.sleep(get_exponential_wait(wait_time,
-                                                                    counter))
+                                    self._download_wait(url, wait_time,
+                                                        counter,
+                                                        "not_finished")
                                     counter += 1
                                     return self._download(url,
                                                           filename=filename,
@@ -838,8 +952,8 @@ class BigMLConnection():
                             LOGGER.error("Error downloading: "
                                          "total size=%s, %s downloaded",
                                          total_size, file_size)
-                            time.sleep(get_exponential_wait(wait_time,
-                                                            counter))
+                            self._download_wait(url, wait_time, counter,
+                                                "incomplete_download")
                             return self._download(url, filename=filename,
                                                   wait_time=wait_time,
                                                   retries=retries,
@@ -858,6 +972,17 @@ class BigMLConnection():
 
         return file_object
 
+    def _download_wait(self, url, wait_time, counter, reason):
+        """Waits before retrying a download, reporting the wait and the
+        retry to the metrics hooks.
+
+        """
+        wait = get_exponential_wait(wait_time, counter)
+        report_sleep(self, DOWNLOAD, wait)
+        report_retry(self, "GET", url_resource_type( \
+            url, [self.url, self.prediction_base_url]), reason)
+        time.sleep(wait)
+
     def _status(self, url, query_string='', organization=None):
         """Returns the status of the account.
 
@@ -873,6 +998,7 @@ class BigMLConnection():
         qs_params.update(dict(parse.parse_qsl(query_string)))
         qs_str = "?%s" % parse.urlencode(qs_params) if qs_params else ""
 
+        start = self._request_start()
         if GAE_ENABLED:
             try:
                 req_options = {
@@ -883,6 +1009,7 @@ class BigMLConnection():
                 }
                 response = urlfetch.fetch(**req_options)
             except urlfetch.Error as exception:
+                self._report_request(start, "GET", url)
                 LOGGER.error("HTTP request error: %s",
                              str(exception))
                 return {
@@ -897,12 +1024,14 @@ class BigMLConnection():
             except (requests.ConnectionError,
                     requests.Timeout,
                     requests.RequestException) as exc:
+                self._report_request(start, "GET", url)
                 LOGGER.error("HTTP request error: %s", str(exc))
                 error["status"]["type"] = c.TRANSIENT
                 return {
                     'code': code,
                     'object': resources,
                     'error': error}
+        self._report_request(start, "GET", url, response)
         try:
             code = response.status_code
 
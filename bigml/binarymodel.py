@@ -0,0 +1,407 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Binary memory-mapped format for local models.
+
+A local model is stored in a single file that contains:
+
+- a fixed size header with the magic bytes, the format version and the
+  lengths of the two next sections.
+- the table of numeric arrays: dtype, shape, offset and number of bytes of
+  each of them.
+- the msgpack encoded attributes of the model, where numpy arrays are
+  replaced by references to the table and nested objects (like the models in
+  an ensemble) are stored together with their class.
+- the raw little-endian contents of the arrays, aligned to 64 bytes.
+
+Loading the file maps it in memory and the arrays are read-only numpy views
+of the mapped pages, so they are neither parsed nor copied and processes that
+load the same file share their memory.
+
+Only numpy arrays are mapped. The trees of Models are stored as CompactTree
+objects, whose attributes are arrays, even if the model keeps them as nested
+lists. Other structures, like the coefficients of linear and logistic
+regressions, the centroids of clusters or the trees of anomaly detectors,
+are plain lists that are decoded from msgpack when loading.
+
+Local models can also be packed in a single msgpack blob (`dumps_packed`),
+where the arrays are extension types that wrap their raw little-endian
+contents. This is the format used by `Ensemble.dump(packed=True)` to store
+the ensemble and all its models under a single key of a cache.
+
+"""
+import os
+import mmap
+import struct
+
+from collections import OrderedDict
+
+import msgpack
+import numpy as np
+
+from bigml.api import get_api_connection
+from bigml.bigmlconnection import BigMLConnection
+from bigml.compacttree import CompactTree
+from bigml.util import serializable_attrs, import_class
+
+MAGIC = b"BMLMODEL"
+VERSION = 2
+HEADER = struct.Struct("<8sIIQQ")
+ALIGNMENT = 64
+
+# msgpack extension types
+ARRAY_EXT = 1
+OBJECT_EXT = 2
+ORDERED_DICT_EXT = 3
+SET_EXT = 4
+CONNECTION_EXT = 5
+OBJECT_ARRAY_EXT = 6
+INLINE_ARRAY_EXT = 7
+REFERENCE_EXT = 8
+
+# msgpack first bytes of the extension formats and position of their type
+EXT_TYPE_POSITIONS = {0xd4: 1, 0xd5: 1, 0xd6: 1, 0xd7: 1, 0xd8: 1,
+                      0xc7: 2, 0xc8: 3, 0xc9: 5}
+
+# classes whose objects can be stored. Decoding never imports or creates
+# objects of any other class, so loading untrusted contents cannot run
+# arbitrary code.
+ALLOWED_CLASSES = frozenset([
+    "bigml.anomaly.Anomaly",
+    "bigml.association.Association",
+    "bigml.associationrule.AssociationRule",
+    "bigml.centroid.Centroid",
+    "bigml.cluster.Cluster",
+    "bigml.compacttree.Column",
+    "bigml.compacttree.CompactNode",
+    "bigml.compacttree.CompactTree",
+    "bigml.compacttree.DistributionColumn",
+    "bigml.deepnet.Deepnet",
+    "bigml.ensemble.Ensemble",
+    "bigml.fusion.Fusion",
+    "bigml.item.Item",
+    "bigml.linear.LinearRegression",
+    "bigml.local_model.LocalModel",
+    "bigml.logistic.LogisticRegression",
+    "bigml.model.Model",
+    "bigml.modelcache.ModelCache",
+    "bigml.multimodel.MultiModel",
+    "bigml.pca.PCA",
+    "bigml.supervised.SupervisedModel",
+    "bigml.timeseries.TimeSeries",
+    "bigml.topicmodel.TopicModel"])
+
+
+def aligned(offset):
+    """Returns the first offset multiple of the alignment """
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+class BinaryEncoder():
+    """Encodes the attributes of a local model, collecting its numeric
+    arrays apart.
+
+    """
+
+    def __init__(self, inline=False, compact_trees=True):
+        """
+        :param inline: if True, the contents of the arrays are stored in
+                       the encoded attributes instead of apart
+        :param compact_trees: if True, the nested lists trees of Models are
+                              stored as CompactTree objects
+        """
+        self.inline = inline
+        self.compact_trees = compact_trees
+        # compact trees already built, by the id of their nested lists
+        self.trees = {}
+        self.arrays = []
+        self.table = []
+        self.offset = 0
+        # objects already encoded, that are referenced by their position
+        self.objects = []
+        self.positions = {}
+
+    def add_array(self, array):
+        """Stores a numeric array and returns its index in the table """
+        array = np.ascontiguousarray( \
+            array, dtype=array.dtype.newbyteorder("<"))
+        self.table.append([array.dtype.str, list(array.shape),
+                           self.offset, array.nbytes])
+        self.arrays.append(array)
+        self.offset = aligned(self.offset + array.nbytes)
+        return len(self.table) - 1
+
+    def default(self, obj):
+        """Encodes the objects that msgpack does not handle natively """
+        if isinstance(obj, np.ndarray):
+            if obj.dtype.kind in "biuf" and self.inline:
+                array = np.ascontiguousarray( \
+                    obj, dtype=obj.dtype.newbyteorder("<"))
+                return msgpack.ExtType(INLINE_ARRAY_EXT, self.packb( \
+                    [array.dtype.str, list(array.shape), array.tobytes()]))
+            if obj.dtype.kind in "biuf":
+                return msgpack.ExtType(ARRAY_EXT,
+                                       self.packb(self.add_array(obj)))
+            return msgpack.ExtType(OBJECT_ARRAY_EXT,
+                                   self.packb(obj.tolist()))
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, BigMLConnection):
+            return msgpack.ExtType(CONNECTION_EXT, b"")
+        if isinstance(obj, OrderedDict):
+            return msgpack.ExtType(ORDERED_DICT_EXT,
+                                   self.packb(list(obj.items())))
+        if isinstance(obj, (set, frozenset)):
+            return msgpack.ExtType(SET_EXT, self.packb(list(obj)))
+        if isinstance(obj, dict):
+            return dict(obj)
+        if isinstance(obj, (list, tuple)):
+            return list(obj)
+        if isinstance(obj, (str, int, float)):
+            return str(obj) if isinstance(obj, str) else \
+                float(obj) if isinstance(obj, float) else int(obj)
+        if id(obj) in self.positions:
+            # objects shared by several attributes are stored once
+            return msgpack.ExtType(REFERENCE_EXT,
+                                   self.packb(self.positions[id(obj)]))
+        if hasattr(obj, "__slots__") and not hasattr(obj, "__dict__"):
+            return self.encode_object( \
+                obj, {slot: getattr(obj, slot) for slot in obj.__slots__})
+        if hasattr(obj, "__dict__") and not callable(obj):
+            # the runtime attributes are reset, but the ones that hold the
+            # contained models are kept
+            attrs = serializable_attrs( \
+                vars(obj), getattr(obj, "RUNTIME_ATTRS", ()),
+                getattr(obj, "PACKED_ATTRS", ()))
+            if self.compact_trees:
+                attrs = self.compact_tree_attrs(attrs)
+            return self.encode_object(obj, attrs)
+        raise TypeError("Failed to store %s objects in the binary model"
+                        " format." % type(obj).__name__)
+
+    def compact_tree_attrs(self, attrs):
+        """Replaces the nested lists tree of a Model (or of the objects
+        that share its attributes) by the root of a CompactTree.
+
+        """
+        tree = attrs.get("tree")
+        if not isinstance(tree, list) or "compact_tree" not in attrs or \
+                not isinstance(attrs.get("offsets"), dict):
+            return attrs
+        if id(tree) not in self.trees:
+            self.trees[id(tree)] = (tree, CompactTree( \
+                tree, attrs["offsets"]).root())
+        attrs = dict(attrs)
+        attrs["tree"] = self.trees[id(tree)][1]
+        attrs["compact_tree"] = True
+        return attrs
+
+    def encode_object(self, obj, attrs):
+        """Encodes an object together with its class """
+        cls = obj.__class__
+        class_name = "%s.%s" % (cls.__module__, cls.__qualname__)
+        if class_name not in ALLOWED_CLASSES:
+            raise TypeError("Failed to store %s objects in the binary model"
+                            " format." % cls.__name__)
+        self.positions[id(obj)] = len(self.objects)
+        self.objects.append(obj)
+        return msgpack.ExtType(OBJECT_EXT, self.packb([class_name, attrs]))
+
+    def packb(self, obj):
+        """Encodes an object with msgpack """
+        return msgpack.packb(obj, default=self.default, strict_types=True)
+
+
+class BinaryDecoder():
+    """Rebuilds the attributes of a local model whose arrays are views of
+    the given buffer.
+
+    """
+
+    def __init__(self, buffer=None, table=None, data_offset=0, api=None):
+        self.buffer = buffer
+        self.table = table
+        self.data_offset = data_offset
+        self.api = api
+        self.objects = []
+
+    def get_array(self, index):
+        """Returns the numpy view of the array stored in the table """
+        dtype, shape, offset, nbytes = self.table[index]
+        dtype = np.dtype(dtype)
+        array = np.frombuffer(self.buffer, dtype=dtype,
+                              count=nbytes // dtype.itemsize,
+                              offset=self.data_offset + offset)
+        return array.reshape(shape)
+
+    def ext_hook(self, code, data):
+        """Decodes the msgpack extension types """
+        if code == ARRAY_EXT:
+            return self.get_array(self.unpackb(data))
+        if code == INLINE_ARRAY_EXT:
+            dtype, shape, contents = self.unpackb(data)
+            return np.frombuffer(contents, dtype=np.dtype(dtype)).reshape( \
+                shape)
+        if code == OBJECT_ARRAY_EXT:
+            return np.array(self.unpackb(data), dtype=object)
+        if code == CONNECTION_EXT:
+            if self.api is None:
+                self.api = get_api_connection(None)
+            return self.api
+        if code == ORDERED_DICT_EXT:
+            return OrderedDict(self.unpackb(data))
+        if code == SET_EXT:
+            return set(self.unpackb(data))
+        if code == REFERENCE_EXT:
+            return self.objects[self.unpackb(data)]
+        if code == OBJECT_EXT:
+            # the object is created before decoding its attributes, so that
+            # they can refer to it
+            unpacker = msgpack.Unpacker(ext_hook=self.ext_hook,
+                                        strict_map_key=False,
+                                        max_buffer_size=len(data))
+            unpacker.feed(data)
+            unpacker.read_array_header()
+            class_name = unpacker.unpack()
+            if class_name not in ALLOWED_CLASSES:
+                raise ValueError("Failed to load the model: %s objects are"
+                                 " not allowed in the binary model format." %
+                                 class_name)
+            cls = import_class(class_name)
+            obj = cls.__new__(cls)
+            self.objects.append(obj)
+            attrs = unpacker.unpack()
+            if hasattr(obj, "__dict__"):
+                obj.__dict__.update(attrs)
+            else:
+                for slot, value in attrs.items():
+                    setattr(obj, slot, value)
+            return obj
+        return msgpack.ExtType(code, data)
+
+    def unpackb(self, data):
+        """Decodes msgpack contents """
+        return msgpack.unpackb(data, ext_hook=self.ext_hook,
+                               strict_map_key=False)
+
+
+def dump_binary(local_model, output, compact_trees=True):
+    """Stores the local model in the binary format.
+
+    :param local_model: local model object (Model, Ensemble, Deepnet, etc.)
+    :param output: path of the file to be created or file-like object
+                   opened in binary mode
+    :param compact_trees: if True, the trees of Models are stored as
+                          CompactTree objects, so that they are mapped too
+    """
+    encoder = BinaryEncoder(compact_trees=compact_trees)
+    model_bytes = encoder.packb(local_model)
+    table_bytes = msgpack.packb(encoder.table)
+    header = HEADER.pack(MAGIC, VERSION, 0, len(table_bytes),
+                         len(model_bytes))
+    if isinstance(output, (str, os.PathLike)):
+        with open(output, "wb") as handler:
+            _write_binary(handler, header, table_bytes, model_bytes,
+                          encoder)
+    else:
+        _write_binary(output, header, table_bytes, model_bytes, encoder)
+
+
+def _write_binary(handler, header, table_bytes, model_bytes, encoder):
+    """Writes the sections of the binary format """
+    position = len(header) + len(table_bytes) + len(model_bytes)
+    handler.write(header)
+    handler.write(table_bytes)
+    handler.write(model_bytes)
+    handler.write(b"\0" * (aligned(position) - position))
+    for (_, _, offset, nbytes), array in zip(encoder.table, encoder.arrays):
+        handler.write(array.data)
+        handler.write(b"\0" * (aligned(offset + nbytes) - offset - nbytes))
+
+
+def loads_binary(buffer, api=None):
+    """Rebuilds a local model from a buffer (bytes, mmap, memoryview) that
+    holds the binary format. Its arrays are views of the buffer.
+
+    :param buffer: object supporting the buffer protocol
+    :param api: connection object. If None, the default connection is used
+                for the local models that need it.
+    """
+    magic, version, _, table_length, model_length = HEADER.unpack_from( \
+        buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("The contents do not correspond to a binary local"
+                         " model.")
+    if version > VERSION:
+        raise ValueError("Binary local model version %s is not supported."
+                         " Please, upgrade the bindings." % version)
+    view = memoryview(buffer)
+    start = HEADER.size
+    table = msgpack.unpackb(view[start: start + table_length])
+    start += table_length
+    data_offset = aligned(start + model_length)
+    decoder = BinaryDecoder(buffer, table, data_offset, api=api)
+    return decoder.unpackb(view[start: start + model_length])
+
+
+def load_binary(path, api=None):
+    """Maps the file that stores a local model in the binary format and
+    rebuilds the model. Its numeric arrays are read-only views of the mapped
+    file, so the memory pages are shared by the processes that load it.
+
+    :param path: path to the file created by `dump_binary`
+    :param api: connection object. If None, the default connection is used
+                for the local models that need it.
+    """
+    with open(path, "rb") as handler:
+        buffer = mmap.mmap(handler.fileno(), 0, access=mmap.ACCESS_READ)
+    return loads_binary(buffer, api=api)
+
+
+def dumps_packed(local_model, compact_trees=True):
+    """Packs the local model and the objects it contains in a single msgpack
+    blob. Numeric arrays are stored as their raw little-endian contents.
+
+    :param local_model: local model object (Model, Ensemble, Deepnet, etc.)
+    :param compact_trees: if True, the trees of Models are stored as
+                          CompactTree objects, that are read without being
+                          parsed
+    """
+    return BinaryEncoder(inline=True,
+                         compact_trees=compact_trees).packb(local_model)
+
+
+def is_packed(contents):
+    """Checks whether the contents are a local model packed by
+    `dumps_packed`
+
+    """
+    if not isinstance(contents, (bytes, bytearray, memoryview)) or \
+            len(contents) < 6:
+        return False
+    position = EXT_TYPE_POSITIONS.get(contents[0])
+    return position is not None and contents[position] == OBJECT_EXT
+
+
+def loads_packed(contents, api=None):
+    """Rebuilds a local model packed by `dumps_packed`. Its arrays are
+    read-only views of the unpacked contents.
+
+    :param contents: bytes created by `dumps_packed`
+    :param api: connection object. If None, the default connection is used
+                for the local models that need it.
+    """
+    return BinaryDecoder(api=api).unpackb(contents)
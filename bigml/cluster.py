@@ -48,8 +48,9 @@ import codecs
 
 from bigml.api import FINISHED
 from bigml.api import get_status, get_api_connection, get_cluster_id
-from bigml.util import cast, utf8, NUMERIC, use_cache, load, dump, dumps, \
-    get_data_format, get_formatted_data, format_data, get_data_transformations
+from bigml.util import utf8, NUMERIC, use_cache, load, dump, dumps, \
+    get_data_format, add_data_columns, \
+    get_data_transformations
 from bigml.centroid import Centroid
 from bigml.basemodel import get_resource_dict
 from bigml.generators.model import print_distribution
@@ -374,11 +375,10 @@ class Cluster(ModelFields):
         """Prepares the fields to be able to compute the distance2
 
         """
-        # Checks and cleans input_data leaving the fields used in the model
-        # and adding default numeric values if set
-        norm_input_data = self.filter_input_data(input_data)
-        # Strips affixes for numeric values and casts to the final field type
-        cast(norm_input_data, self.fields)
+        # Checks and cleans input_data leaving the fields used in the model,
+        # adding default numeric values if set and casting to the final
+        # field type
+        norm_input_data = self.normalize_input_data(input_data)
 
         unique_terms = self.get_unique_terms(norm_input_data)
 
@@ -652,7 +652,7 @@ class Cluster(ModelFields):
         """
         centroid = self.centroid(input_data)
         if not full:
-            return {"centroid_name": centroid["name"]}
+            return {"centroid_name": centroid["centroid_name"]}
         return centroid
 
     def batch_predict(self, input_data_list, outputs=None, **kwargs):
@@ -667,11 +667,12 @@ class Cluster(ModelFields):
         to "output_fields" list, by default).
 
         :param input_data_list: List of input data to be predicted
-        :type input_data_list: list or Panda's dataframe
+        :type input_data_list: list, Panda's dataframe or Arrow table
         :param dict outputs: properties that define the headers and fields to
                              be added to the input data
         :return: the list of input data plus the predicted values
-        :rtype: list or Panda's dataframe depending on the input type in
+        :rtype: list, Panda's dataframe or Arrow table depending on the
+                input type in
                 input_data_list
 
         """
@@ -684,13 +685,14 @@ class Cluster(ModelFields):
         else:
             new_headers = new_headers[0: len(new_fields)]
         data_format = get_data_format(input_data_list)
-        inner_data_list = get_formatted_data(input_data_list, INTERNAL)
+        inner_data_list = self.batch_input_rows(input_data_list)
         for input_data in inner_data_list:
             prediction = self.centroid(input_data, **kwargs)
             for index, key in enumerate(new_fields):
                 input_data[new_headers[index]] = prediction[key]
         if data_format != INTERNAL:
-            return format_data(inner_data_list, out_format=data_format)
+            return add_data_columns(input_data_list, inner_data_list,
+                                    new_headers)
         return inner_data_list
 
     def data_transformations(self):
@@ -705,20 +707,21 @@ class Cluster(ModelFields):
         If cache_set is filled with a cache set method, the method is called
 
         """
-        self_vars = vars(self)
-        for index, centroid in enumerate(self_vars["centroids"]):
-            self_vars["centroids"][index] = vars(centroid)
+        self_vars = vars(self).copy()
+        self_vars["centroids"] = [vars(centroid) for centroid
+                                  in self_vars["centroids"]]
         self_vars["cluster_global"] = vars(self_vars["cluster_global"])
         del self_vars["api"]
-        dump(self_vars, output=output, cache_set=cache_set)
+        dump(self_vars, output=output, cache_set=cache_set,
+             runtime_attrs=self.RUNTIME_ATTRS)
 
     def dumps(self):
         """Uses msgpack to serialize the resource object to a string
 
         """
-        self_vars = vars(self)
-        for index, centroid in enumerate(self_vars["centroids"]):
-            self_vars["centroids"][index] = vars(centroid)
+        self_vars = vars(self).copy()
+        self_vars["centroids"] = [vars(centroid) for centroid
+                                  in self_vars["centroids"]]
         self_vars["cluster_global"] = vars(self_vars["cluster_global"])
         del self_vars["api"]
-        dumps(self_vars)
+        dumps(self_vars, runtime_attrs=self.RUNTIME_ATTRS)
@@ -0,0 +1,469 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Compact storage for the trees of local Models.
+
+The trees built by `build_classification_tree`, `build_regression_tree` and
+`build_boosting_tree` are nested lists that store, for every node, its
+packed predicate, its attributes and the list of its children. The
+CompactTree stores the same information in columns:
+
+- numeric attributes (ids, counts, confidences, etc.) as typed numpy arrays.
+- distributions as a pair of shared buffers (values and counts) and the
+  position of every node's distribution in them.
+- predicate operators, fields, values and terms, as well as any other
+  non-numeric attribute, as small integer codes that refer to a table of
+  unique values.
+
+Nodes are read through CompactNode objects that behave like the original
+lists when indexed or sliced, so the functions that traverse the tree
+(predictions, rules, code generators) work for both representations.
+
+The CompactTree is serialized with `to_dict`, that keeps the arrays as
+binary buffers, and rebuilt with `CompactTree.from_dict` without going
+through the nested lists format.
+
+"""
+from itertools import accumulate, chain, repeat
+from operator import is_, itemgetter
+
+import numpy as np
+
+from bigml.predict_utils.common import get_node, get_predicate, \
+    PREDICATE_INFO_LENGTH
+
+
+INT = "int"
+FLOAT = "float"
+TABLE = "table"
+
+CHILDREN_NUMBER = "children#"
+CHILDREN = "children"
+DISTRIBUTIONS = ["distribution", "wdistribution"]
+MAX_INT = 2 ** 63
+# Python integers that floats represent exactly
+MAX_EXACT_INT = 2 ** 53
+NONE_TYPE = type(None)
+
+
+def intern_key(value):
+    """Key used to find equal values in a table. The type is part of the
+    key, so that 1, 1.0 and True are kept apart.
+
+    """
+    try:
+        hash(value)
+        return value.__class__, value
+    except TypeError:
+        return value.__class__, repr(value)
+
+
+def codes_array(codes, size):
+    """Array of codes using the smallest unsigned type for the table size """
+    return np.array(codes, dtype=np.min_scalar_type(max(size - 1, 0)))
+
+
+def int_array(values):
+    """Array of integers using the smallest type for their range """
+    dtype = np.int64
+    if values:
+        dtype = np.result_type(np.min_scalar_type(min(values)),
+                               np.min_scalar_type(max(values)))
+        if dtype.kind not in "iu":
+            # the range needs both signed and 64 bits unsigned integers
+            dtype = np.int64
+    return np.array(values, dtype=dtype)
+
+
+def array_to_dict(array):
+    """Serializable version of a numeric array: its type and contents """
+    if array is None:
+        return None
+    return {"dtype": array.dtype.str, "buffer": array.tobytes()}
+
+
+def array_from_dict(array_dict):
+    """Rebuilds the array serialized by `array_to_dict`. The array is a
+    read-only view of the buffer.
+
+    """
+    if array_dict is None:
+        return None
+    return np.frombuffer(array_dict["buffer"],
+                         dtype=np.dtype(array_dict["dtype"]))
+
+
+def column_kind(values):
+    """Returns the kind of column that stores the values: integers of the
+    int64 range, floats that can also include None and integers that
+    floats represent exactly, or a table for any other values. Booleans
+    are always stored in tables.
+
+    """
+    types = set(map(type, values))
+    if types <= {int}:
+        if not values or -MAX_INT <= min(values) and max(values) < MAX_INT:
+            return INT
+    elif types <= {int, float, NONE_TYPE}:
+        if int not in types:
+            return FLOAT
+        ints = [value for value in values if value.__class__ is int]
+        if -MAX_EXACT_INT <= min(ints) and max(ints) <= MAX_EXACT_INT:
+            return FLOAT
+    return TABLE
+
+
+class Column():
+    """Values of one attribute for all the nodes. They are stored in a typed
+    array when they are numbers and as codes of a table of unique values
+    otherwise.
+
+    """
+
+    def __init__(self, values, table=False):
+        """
+        :param values: list of values
+        :param table: forces the use of a table of unique values
+        """
+        self.ints = None
+        self.nones = None
+        self.table = None
+        self.kind = TABLE if table else column_kind(values)
+        if self.kind == INT:
+            self.data = int_array(values)
+        elif self.kind == FLOAT:
+            # None values are stored as NaN
+            self.data = np.array(values, dtype=np.float64)
+            # masks are only kept when needed to restore the original types
+            types = set(map(type, values))
+            if int in types:
+                self.ints = np.array(list(map(isinstance, values,
+                                              repeat(int))), dtype=bool)
+            if NONE_TYPE in types:
+                self.nones = np.array(list(map(is_, values, repeat(None))),
+                                      dtype=bool)
+        else:
+            try:
+                keys = list(zip(map(type, values), values))
+                hash(tuple(keys))
+            except TypeError:
+                # some values cannot be hashed
+                keys = list(map(intern_key, values))
+            # position of the first occurrence of every value
+            firsts = sorted(dict(zip(reversed(keys),
+                                     reversed(range(len(keys))))).values())
+            self.table = [values[first] for first in firsts]
+            positions = {keys[first]: code for code, first
+                         in enumerate(firsts)}
+            self.data = codes_array(list(map(positions.__getitem__, keys)),
+                                    len(self.table))
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, index):
+        """Returns the value stored at the given position """
+        if self.table is not None:
+            return self.table[self.data.item(index)]
+        if self.kind == INT:
+            return self.data.item(index)
+        if self.nones is not None and self.nones.item(index):
+            return None
+        if self.ints is not None and self.ints.item(index):
+            return int(self.data.item(index))
+        return self.data.item(index)
+
+    def slice(self, start, stop):
+        """Returns the list of values stored between two positions """
+        return [self.get(index) for index in range(start, stop)]
+
+    def to_dict(self):
+        """Serializable version of the column """
+        return {"kind": self.kind,
+                "data": array_to_dict(self.data),
+                "table": self.table,
+                "ints": array_to_dict(self.ints),
+                "nones": array_to_dict(self.nones)}
+
+    @classmethod
+    def from_dict(cls, column_dict):
+        """Rebuilds the column serialized by `to_dict` """
+        column = cls.__new__(cls)
+        column.kind = column_dict["kind"]
+        column.table = column_dict["table"]
+        for attr in ["data", "ints", "nones"]:
+            setattr(column, attr, array_from_dict(column_dict[attr]))
+        return column
+
+
+class DistributionColumn():
+    """Distributions of all the nodes, stored as two shared buffers of values
+    and counts and the offsets of each node in them.
+
+    """
+
+    def __init__(self, distributions):
+        pairs = list(chain.from_iterable(distributions))
+        self.starts = int_array([0] + list(accumulate(map(len,
+                                                          distributions))))
+        self.values = Column(list(map(itemgetter(0), pairs)))
+        self.counts = Column(list(map(itemgetter(1), pairs)))
+
+    def get(self, index):
+        """Returns the distribution of the node as a list of pairs """
+        start, stop = self.starts.item(index), self.starts.item(index + 1)
+        return [[value, count] for value, count in
+                zip(self.values.slice(start, stop),
+                    self.counts.slice(start, stop))]
+
+    def to_dict(self):
+        """Serializable version of the column """
+        return {"starts": array_to_dict(self.starts),
+                "values": self.values.to_dict(),
+                "counts": self.counts.to_dict()}
+
+    @classmethod
+    def from_dict(cls, column_dict):
+        """Rebuilds the column serialized by `to_dict` """
+        column = cls.__new__(cls)
+        column.starts = array_from_dict(column_dict["starts"])
+        column.values = Column.from_dict(column_dict["values"])
+        column.counts = Column.from_dict(column_dict["counts"])
+        return column
+
+
+def is_distribution(values):
+    """Checks whether all the values are lists of pairs """
+    if not set(map(type, values)) <= {list}:
+        return False
+    pairs = list(chain.from_iterable(values))
+    return set(map(type, pairs)) <= {list} and set(map(len, pairs)) <= {2}
+
+
+class CompactTree():
+    """Tree whose nodes are stored in columns. Nodes are numbered
+    breadth-first, so the children of every node are consecutive.
+
+    """
+
+    def __init__(self, tree, offsets):
+        """
+        :param tree: nested lists tree as built by the tree builders
+        :param offsets: positions of the attributes in the nodes (OFFSETS)
+        """
+        self.offsets = offsets
+        self.attributes = sorted([attr for attr in offsets
+                                  if attr not in [CHILDREN_NUMBER, CHILDREN]],
+                                 key=offsets.get)
+        # only the root can have a True predicate
+        self.root_predicate = get_predicate(tree) is True
+        root = get_node(tree)
+        # attributes are read by position to avoid copying every node
+        shift = len(tree) - len(root)
+        nodes = [tree]
+        first_child = []
+        children_number = []
+        position = 0
+        while position < len(nodes):
+            node = nodes[position]
+            number = node[shift + offsets[CHILDREN_NUMBER]]
+            first_child.append(len(nodes))
+            children_number.append(number)
+            if number > 0:
+                nodes.extend(node[shift + offsets[CHILDREN]])
+            shift = PREDICATE_INFO_LENGTH
+            position += 1
+        self.first_child = int_array(first_child)
+        self.children_number = int_array(children_number)
+        children = nodes[1:]
+        predicate_nodes = children if self.root_predicate else nodes
+        self.predicates = [Column(list(map(itemgetter(index),
+                                           predicate_nodes)), table=True)
+                           for index in range(PREDICATE_INFO_LENGTH)]
+        self.columns = {}
+        for attr in self.attributes:
+            values = [root[offsets[attr]]] + list(map( \
+                itemgetter(PREDICATE_INFO_LENGTH + offsets[attr]), children))
+            if attr in DISTRIBUTIONS and is_distribution(values):
+                self.columns[attr] = DistributionColumn(values)
+            else:
+                self.columns[attr] = Column(values)
+        self.set_node_columns()
+
+    def set_node_columns(self):
+        """Stores the column of every position of the nodes attributes """
+        self.node_columns = [None] * self.offsets[CHILDREN_NUMBER]
+        for attr in self.attributes:
+            self.node_columns[self.offsets[attr]] = self.columns[attr]
+
+    def __len__(self):
+        return len(self.first_child)
+
+    def root(self):
+        """Returns the root node """
+        return CompactNode(self, 0)
+
+    def predicate_length(self, index):
+        """Number of elements that store the predicate of the node """
+        return 1 if index == 0 and self.root_predicate else \
+            PREDICATE_INFO_LENGTH
+
+    def node_length(self, index):
+        """Number of elements of the node in the nested lists format """
+        return self.predicate_length(index) + self.offsets[CHILDREN] + \
+            (1 if self.children_number.item(index) > 0 else 0)
+
+    def children(self, index):
+        """Returns the children of the node """
+        first = self.first_child.item(index)
+        return [CompactNode(self, child) for child in
+                range(first, first + self.children_number.item(index))]
+
+    def predicate(self, index):
+        """Returns the predicate of the node """
+        if index == 0 and self.root_predicate:
+            return True
+        if self.root_predicate:
+            index -= 1
+        return [column.get(index) for column in self.predicates]
+
+    def element(self, index, position):
+        """Returns the element of the node at the given position of the
+        nested lists format
+
+        """
+        if index == 0 and self.root_predicate:
+            if position == 0:
+                return True
+            position -= 1
+        elif position < PREDICATE_INFO_LENGTH:
+            return self.predicates[position].get( \
+                index - 1 if self.root_predicate else index)
+        else:
+            position -= PREDICATE_INFO_LENGTH
+        if position < len(self.node_columns):
+            column = self.node_columns[position]
+            if column is not None:
+                return column.get(index)
+        elif position == self.offsets[CHILDREN_NUMBER]:
+            return self.children_number.item(index)
+        elif position == self.offsets[CHILDREN] and \
+                self.children_number.item(index) > 0:
+            return self.children(index)
+        raise IndexError("Node index out of range")
+
+    def to_list(self, index=0):
+        """Rebuilds the nested lists tree from the given node """
+        node = [self.element(index, position) for position
+                in range(self.node_length(index))]
+        if self.children_number.item(index) > 0:
+            node[-1] = [self.to_list(child.index)
+                        for child in self.children(index)]
+        return node
+
+    def to_dict(self):
+        """Serializable version of the tree. Arrays are stored as binary
+        buffers, so that the tree is rebuilt without being traversed.
+
+        """
+        return {"offsets": self.offsets,
+                "attributes": self.attributes,
+                "first_child": array_to_dict(self.first_child),
+                "children_number": array_to_dict(self.children_number),
+                "root_predicate": self.root_predicate,
+                "predicates": [column.to_dict() for column
+                               in self.predicates],
+                "columns": {attr: column.to_dict() for attr, column
+                            in self.columns.items()},
+                "distributions": [attr for attr, column
+                                  in self.columns.items()
+                                  if isinstance(column, DistributionColumn)]}
+
+    @classmethod
+    def from_dict(cls, tree_dict):
+        """Rebuilds the tree serialized by `to_dict` """
+        tree = cls.__new__(cls)
+        tree.offsets = tree_dict["offsets"]
+        tree.attributes = tree_dict["attributes"]
+        tree.first_child = array_from_dict(tree_dict["first_child"])
+        tree.children_number = array_from_dict(tree_dict["children_number"])
+        tree.root_predicate = tree_dict["root_predicate"]
+        tree.predicates = [Column.from_dict(column) for column
+                           in tree_dict["predicates"]]
+        tree.columns = {}
+        for attr, column in tree_dict["columns"].items():
+            column_class = DistributionColumn if attr in \
+                tree_dict["distributions"] else Column
+            tree.columns[attr] = column_class.from_dict(column)
+        tree.set_node_columns()
+        return tree
+
+
+class CompactNode():
+    """View of a node of a CompactTree that behaves like the list that
+    represents the node in the nested lists format. Slices that reach the
+    end of the node are also views.
+
+    """
+
+    __slots__ = ["tree", "index", "start"]
+
+    def __init__(self, tree, index, start=0):
+        self.tree = tree
+        self.index = index
+        self.start = start
+
+    def __len__(self):
+        return self.tree.node_length(self.index) - self.start
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            if key < 0:
+                key += len(self)
+                if key < 0:
+                    raise IndexError("Node index out of range")
+            return self.tree.element(self.index, self.start + key)
+        if key.step is None and key.stop is None and (key.start or 0) >= 0:
+            # slices that reach the end of the node are views
+            return CompactNode(self.tree, self.index,
+                               self.start + (key.start or 0))
+        if self.start == 0 and not key.start and key.step is None and \
+                key.stop == PREDICATE_INFO_LENGTH and \
+                not (self.index == 0 and self.tree.root_predicate):
+            # predicates are read as a whole
+            return self.tree.predicate(self.index)
+        start, stop, step = key.indices(len(self))
+        if key.stop is None and step == 1:
+            return CompactNode(self.tree, self.index, self.start + start)
+        return [self.tree.element(self.index, self.start + position)
+                for position in range(start, stop, step)]
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+    def __eq__(self, other):
+        if isinstance(other, CompactNode):
+            return self.tree is other.tree and self.index == other.index \
+                and self.start == other.start
+        return list(self) == other
+
+    def __hash__(self):
+        return hash((id(self.tree), self.index, self.start))
+
+    def to_list(self):
+        """Returns the node and its descendants as nested lists """
+        return self.tree.to_list(self.index)[self.start:]
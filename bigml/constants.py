@@ -262,6 +262,9 @@ RUNNABLE = -3
 # Minimum query string to get model status
 TINY_RESOURCE = "full=false"
 
+# Query string that excludes the fields structures from the resource
+EXCLUDE_FIELDS_QS = "exclude=fields"
+
 # Filtering only tasks status info
 TASKS_QS = "include=subscription,tasks"
 
@@ -300,7 +303,7 @@ FIELDS_PARENT = { \
     "sample": "sample",
     "pca": "pca",
     "fusion": "fusion",
-    "timeseries": "timeseries",
+    "timeseries": "time_series",
     "statisticaltest": "statistical_tests",
     "dataset": None}
 ALL_FIELDS = "limit=-1"
@@ -338,6 +341,7 @@ OUT_NEW_HEADERS = "output_headers"
 # input data allowed formats in batch predictions
 NUMPY = "numpy"
 DATAFRAME = "dataframe"
+ARROW = "arrow_table"
 INTERNAL = "list_of_dicts"
 
 CATEGORICAL = "categorical"
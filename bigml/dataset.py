@@ -21,30 +21,54 @@ Class to store Dataset transformations based on the Dataset API response
 import os
 import subprocess
 
+from functools import lru_cache
+
 from bigml.fields import Fields, sorted_headers, get_new_fields
 from bigml.api import get_api_connection, get_dataset_id, get_status
 from bigml.basemodel import get_resource_dict
 from bigml.util import DEFAULT_LOCALE, use_cache, cast, load, dump, dumps, \
     sensenet_logging
 from bigml.constants import FINISHED
-from bigml.flatline import Flatline
 from bigml.featurizer import Featurizer
+from bigml.exceptions import UnsupportedFlatline
+
 
-process = subprocess.Popen(['node -v'], stdout=subprocess.PIPE, shell=True)
-out = process.stdout.read()
-FLATLINE_READY = out.startswith(b"v")
-if FLATLINE_READY:
-    from bigml.flatline import Flatline
+@lru_cache(maxsize=None)
+def flatline_ready():
+    """Checks whether Node.js is available to run the Flatline
+    transformations. The check is only done the first time it is needed.
 
+    """
+    process = subprocess.Popen(['node -v'], stdout=subprocess.PIPE,
+                               shell=True)
+    out = process.stdout.read()
+    return out.startswith(b"v")
 
-#pylint: disable=locally-disabled,bare-except,ungrouped-imports
-try:
-    # bigml-sensenet should be installed for image processing
-    sensenet_logging()
-    import sensenet
-    from bigml.images.featurizers import ImageFeaturizer as Featurizer
-except:
-    pass
+
+@lru_cache(maxsize=None)
+def get_featurizer_class():
+    """Returns the class used to generate the features of the dataset. When
+    bigml-sensenet is installed, image fields can also be handled. Sensenet is
+    slow to import, so it is only loaded the first time a featurizer is
+    needed.
+
+    """
+    #pylint: disable=locally-disabled,bare-except,import-outside-toplevel
+    try:
+        # bigml-sensenet should be installed for image processing
+        sensenet_logging()
+        import sensenet
+        from bigml.images.featurizers import ImageFeaturizer
+        return ImageFeaturizer
+    except:
+        return Featurizer
+
+
+def __getattr__(name):
+    """The FLATLINE_READY flag is computed when first used """
+    if name == "FLATLINE_READY":
+        return flatline_ready()
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
 
 class Dataset:
@@ -52,6 +76,8 @@ class Dataset:
     data whose fields are a subset of the ones defined in the fields
     attribute.
     """
+    # the compiled transformations are rebuilt when first used
+    RUNTIME_ATTRS = ("flatline_plan",)
 
     def __init__(self, dataset, api=None, cache_get=None):
         if use_cache(cache_get):
@@ -60,8 +86,10 @@ class Dataset:
             if self.origin_dataset is not None:
                 self.origin_dataset = Dataset(self.origin_dataset,
                     api=api, cache_get=cache_get)
-                self.featurizer = Featurizer(self.in_fields,
+                self.featurizer = get_featurizer_class()(self.in_fields,
                     self.input_fields, preferred_only=False)
+            self.flatline_plan = None
+            self._check_transformations()
             return
 
         self.resource_id = None
@@ -81,6 +109,7 @@ class Dataset:
         self.cache_get = cache_get
         self.featurizer = None
         self.transformations = None
+        self.flatline_plan = None
 
         # retrieving dataset information from
         self.resource_id, dataset = get_resource_dict( \
@@ -115,13 +144,14 @@ class Dataset:
                 elif dataset.get("source"):
                     self.parent_id = dataset.get("source")
                     self.in_fields = out_fields_obj.fields
-                    self.featurizer = Featurizer(self.in_fields,
+                    self.featurizer = get_featurizer_class()(self.in_fields,
                         self.input_fields,
                         self.in_fields,
                         preferred_only=False)
                 self.fields_obj = Fields(self.in_fields)
                 self.in_header_names, self.in_header_ids = sorted_headers(
                     Fields(self.in_fields))
+                self._check_transformations()
 
     def add_transformations(self, origin_dataset, new_fields):
         """Adds a new transformation where the new fields provided are
@@ -150,16 +180,21 @@ class Dataset:
             return []
         return self.origin_dataset.get_sample(rows_number=rows_number)
 
-    def _input_array(self, input_data):
-        """Transform the dict-like input data into a row """
-
-        # new_input_data = self.filter_input_data(input_data)
+    def _input_ids(self, input_data):
+        """Uses field IDs as keys in the dict-like input data """
         new_input_data = {}
         for key, value in input_data.items():
             if key not in self.in_fields:
                 key = self.fields_obj.fields_by_name.get(key, key)
             new_input_data.update({key: value})
-        if self.featurizer is not None:
+        return new_input_data
+
+    def _input_array(self, input_data, featurize=True):
+        """Transform the dict-like input data into a row """
+
+        # new_input_data = self.filter_input_data(input_data)
+        new_input_data = self._input_ids(input_data)
+        if self.featurizer is not None and featurize:
             new_input_data = self.featurizer.extend_input(new_input_data)
         cast(new_input_data, self.in_fields)
         row = []
@@ -168,40 +203,88 @@ class Dataset:
                 new_input_data[f_id])
         return row
 
-    def _transform(self, input_arrays):
-        """Given a list of inputs that match the origin dataset structure,
-        apply the Flatline transformations used in the dataset
+    def _check_transformations(self):
+        """Validates the Flatline transformations when the dataset is built.
+        The ones that need Node.js are checked the first time they are
+        applied if it is not available.
 
         """
-        new_input_arrays = []
-        out_headers = []
+        if not self.transformations:
+            return
+        try:
+            self._compile_transformations()
+        except ImportError:
+            pass
+
+    def _compile_transformations(self):
+        """Checks and compiles the Flatline transformations used in the
+        dataset, so that they are parsed only once and can be applied
+        together to each batch of inputs. Expressions are evaluated
+        natively when possible and the rest are compiled in the Node.js
+        interpreter. The plan is not set if Node.js is needed but not
+        available.
+
+        """
+        #pylint: disable=locally-disabled,import-outside-toplevel
+        from bigml.flatlinecompiler import compile_lisp
         fields = {"fields": self.in_fields}
-        out_arrays = []
+        fields_hash = None
+        out_headers = []
+        steps = []
         for transformation in self.transformations:
             expr = transformation.get("field")
             names = transformation.get("names", [])
             out_headers.extend(names)
-            # evaluating first to raise an alert if the expression is failing
-            check = Flatline.check_lisp(expr, fields)
-            if "error" in check:
-                raise ValueError(check["error"])
             if expr == '(all)':
-                new_input_arrays = input_arrays.copy()
+                # the original values replace the ones previously generated
+                steps = [None]
                 continue
-            new_input = Flatline.apply_lisp(expr, input_arrays, self)
-            for index, _ in enumerate(new_input):
-                try:
-                    new_input_arrays[index]
-                except IndexError:
-                    new_input_arrays.append([])
-                new_input_arrays[index].extend(new_input[index])
-        for index, input_array in enumerate(new_input_arrays):
             try:
-                out_arrays[index]
-            except IndexError:
-                out_arrays.append([])
-            out_arrays[index].extend(input_array)
-        return [out_headers, out_arrays]
+                steps.append(compile_lisp(expr, self.in_fields))
+                continue
+            except UnsupportedFlatline:
+                pass
+            if not flatline_ready():
+                return
+            from bigml.flatline import Flatline
+            if fields_hash is None:
+                fields_hash = Flatline.fields_hash(fields)
+            compiled = Flatline.compile_lisp(expr, fields,
+                                             fields_hash=fields_hash)
+            if "error" in compiled:
+                raise ValueError(compiled["error"])
+            steps.append((compiled["id"], len(names)))
+        self.flatline_plan = (out_headers, steps)
+
+    def _transform(self, input_arrays):
+        """Given a list of inputs that match the origin dataset structure,
+        apply the Flatline transformations used in the dataset
+
+        """
+        out_headers, steps = self.flatline_plan
+        if not input_arrays:
+            return [out_headers, []]
+        columns = [list(column) for column in zip(*input_arrays)]
+        node_steps = [step for step in steps if isinstance(step, tuple)]
+        if node_steps:
+            # all the expressions that need Node.js are applied at once
+            #pylint: disable=locally-disabled,import-outside-toplevel
+            from bigml.flatline import Flatline
+            node_columns = [list(column) for column in zip(
+                *Flatline.apply_compiled(
+                    [form_id for form_id, _ in node_steps], input_arrays))]
+        offset = 0
+        out_columns = []
+        for step in steps:
+            if step is None:
+                out_columns = list(columns)
+            elif isinstance(step, tuple):
+                _, width = step
+                out_columns.extend(node_columns[offset: offset + width])
+                offset += width
+            else:
+                out_columns.extend(step.evaluate(columns, len(input_arrays)))
+        return [out_headers, [list(row) for row in zip(*out_columns)]]
 
 
     def transform(self, input_data_list):
@@ -212,10 +295,17 @@ class Dataset:
         """
         if self.transformations is None and self.featurizer is None:
             return input_data_list
-        rows = [self._input_array(input_data) for input_data in
-            input_data_list]
+        if self.featurizer is not None:
+            # the featurizer can extend the whole list at once
+            input_data_list = self.featurizer.extend_inputs(
+                [self._input_ids(input_data) for input_data in
+                 input_data_list])
+        rows = [self._input_array(input_data, featurize=False)
+                for input_data in input_data_list]
         if self.transformations:
-            if not FLATLINE_READY:
+            if self.flatline_plan is None:
+                self._compile_transformations()
+            if self.flatline_plan is None:
                 raise ValueError("Nodejs should be installed to handle this"
                                  " dataset's transformations. Please, check"
                                  " the bindings documentation for details.")
@@ -240,7 +330,8 @@ class Dataset:
         self_vars["origin_dataset"] = self_vars["origin_dataset"].resource_id
         del self_vars["featurizer"]
         del self_vars["fields_obj"]
-        dump(self_vars, output=output, cache_set=cache_set)
+        dump(self_vars, output=output, cache_set=cache_set,
+             runtime_attrs=self.RUNTIME_ATTRS)
 
     def dumps(self):
         """Uses msgpack to serialize the resource object to a string
@@ -252,4 +343,4 @@ class Dataset:
         self_vars["origin_dataset"] = self_vars["origin_dataset"].resource_id
         del self_vars["featurizer"]
         del self_vars["fields_obj"]
-        return dumps(self_vars)
+        return dumps(self_vars, runtime_attrs=self.RUNTIME_ATTRS)
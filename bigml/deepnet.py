@@ -42,35 +42,82 @@ deepnet.predict({"petal length": 3, "petal width": 1})
 """
 import os
 import warnings
+import importlib.util
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from functools import cmp_to_key
 
 from bigml.api import FINISHED
 from bigml.api import get_status, get_api_connection, get_deepnet_id
-from bigml.util import cast, use_cache, load, get_data_transformations, \
-    PRECISION, sensenet_logging
+from bigml.util import use_cache, load, get_data_transformations, \
+    PRECISION, sensenet_logging, get_data_format, \
+    add_data_columns, is_image
 from bigml.basemodel import get_resource_dict, extract_objective
 from bigml.modelfields import ModelFields
 from bigml.laminar.constants import NUMERIC
 from bigml.model import parse_operating_point, sort_categories
+from bigml.profiling import stopwatch, EXPANSION, EVALUATION, \
+    OUTPUT_FORMATTING
 from bigml.constants import REGIONS, REGIONS_OPERATION_SETTINGS, \
     DEFAULT_OPERATION_SETTINGS, REGION_SCORE_ALIAS, REGION_SCORE_THRESHOLD, \
-    IMAGE, DECIMALS, IOU_REMOTE_SETTINGS
+    IMAGE, DECIMALS, IOU_REMOTE_SETTINGS, OUT_NEW_FIELDS, OUT_NEW_HEADERS, \
+    INTERNAL
 
 import bigml.laminar.numpy_ops as net
 import bigml.laminar.preprocess_np as pp
 
-try:
-    sensenet_logging()
-    from sensenet.models.wrappers import create_model
-    from bigml.images.utils import to_relative_coordinates
-    LAMINAR_VERSION = False
-except Exception:
-    LAMINAR_VERSION = True
+# sensenet (and tensorflow) are slow to import, so they are only loaded
+# when a deepnet is built with them
+LAMINAR_VERSION = importlib.util.find_spec("sensenet") is None
 
 
 MEAN = "mean"
 STANDARD_DEVIATION = "stdev"
+DFT_OUTPUTS = ["prediction", "probability"]
+# number of rows or images sent together to the sensenet model
+DEFAULT_BATCH_SIZE = 32
+
+
+def sensenet_create_model(deepnet, settings=None):
+    """Imports sensenet and creates the model used to predict
+
+    """
+    sensenet_logging()
+    #pylint: disable=locally-disabled,import-outside-toplevel
+    from sensenet.models.wrappers import create_model
+    return create_model(deepnet, settings=settings)
+
+
+def image_files_list(image_files):
+    """Expands the folders in a list of image files to the images they
+    contain, sorted by name
+
+    """
+    files_list = []
+    for image_file in image_files:
+        if os.path.isdir(image_file):
+            files_list.extend(sorted(
+                os.path.join(image_file, filename) for filename in
+                os.listdir(image_file) if is_image(filename)))
+        else:
+            files_list.append(image_file)
+    return files_list
+
+
+def prefetch_image(image_file):
+    """Reads an image file, so that it is already cached when the model
+    opens it, and returns its original size, needed to compute relative
+    coordinates for the regions
+
+    """
+    #pylint: disable=locally-disabled,import-outside-toplevel
+    from io import BytesIO
+    from PIL import Image
+    with open(image_file, "rb") as image_handler:
+        contents = image_handler.read()
+    with Image.open(BytesIO(contents)) as image:
+        return image.size
 
 
 def moments(amap):
@@ -205,7 +252,7 @@ class Deepnet(ModelFields):
                 #pylint: disable=locally-disabled,broad-except
                 if not self.using_laminar:
                     try:
-                        self.deepnet = create_model(deepnet,
+                        self.deepnet = sensenet_create_model(deepnet,
                             settings=settings)
                     except Exception:
                         # Windows systems can fail to have some libraries
@@ -335,18 +382,17 @@ class Deepnet(ModelFields):
             # Only a single image file is allowed as input.
             # Sensenet predictions are using absolute coordinates, so we need
             # to change it to relative and set the decimal precision
+            #pylint: disable=locally-disabled,import-outside-toplevel
+            from bigml.images.utils import to_relative_coordinates
             prediction = to_relative_coordinates(input_data,
                                                  self.deepnet(input_data))
             return {"prediction": prediction}
 
-        norm_input_data = self.filter_input_data( \
+        norm_input_data = self.normalize_input_data( \
             input_data, add_unused_fields=full)
         if full:
             norm_input_data, unused_fields = norm_input_data
 
-        # Strips affixes for numeric values and casts to the final field type
-        cast(norm_input_data, self.fields)
-
         # When operating_point is used, we need the probabilities
         # of all possible classes to decide, so se use
         # the `predict_probability` method
@@ -369,8 +415,11 @@ class Deepnet(ModelFields):
                 norm_input_data, operating_kind=operating_kind)
 
         # Computes text and categorical field expansion
+        watch = stopwatch(self)
         unique_terms = self.get_unique_terms(norm_input_data)
         input_array = self.fill_array(norm_input_data, unique_terms)
+        if watch:
+            watch.lap(EXPANSION)
         if self.deepnet is not None:
             prediction = list(self.deepnet(input_array)[0])
             # prediction is now a numpy array of probabilities for classification
@@ -382,18 +431,161 @@ class Deepnet(ModelFields):
                 prediction = self.predict_list(input_array)
             else:
                 prediction = self.predict_single(input_array)
+        if watch:
+            watch.lap(EVALUATION)
+        prediction = self._format_prediction(prediction, full, unused_fields)
+        if watch:
+            watch.lap(OUTPUT_FORMATTING)
+        return prediction
+
+    @staticmethod
+    def _format_prediction(prediction, full=False, unused_fields=None):
+        """Formats the prediction as returned by the `predict` method """
         if full:
             if not isinstance(prediction, dict):
                 prediction = {"prediction": round(prediction, DECIMALS)}
-            prediction.update({"unused_fields": unused_fields})
+            prediction.update({"unused_fields": unused_fields or []})
             if "probability" in prediction:
                 prediction["confidence"] = prediction.get("probability")
         else:
             if isinstance(prediction, dict):
                 prediction = prediction["prediction"]
-
         return prediction
 
+    def batch_predict(self, input_data_list, outputs=None, all_fields=True,
+                      batch_size=DEFAULT_BATCH_SIZE, max_workers=None,
+                      **kwargs):
+        """Creates a batch prediction for a list of inputs using the local
+        deepnet. Allows to define some output settings to
+        decide the fields to be added to the input_data (prediction,
+        probability, etc.) and the name that we want to assign to these new
+        fields. The outputs argument accepts a dictionary with keys
+        "output_fields", to contain a list of the prediction properties to add
+        (["prediction", "probability"] by default) and "output_headers", to
+        contain a list of the headers to be used when adding them (identical
+        to "output_fields" list, by default).
+
+        When the deepnet is predicted using sensenet, the inputs are sent to
+        the model in groups of `batch_size` rows. For deepnets that predict
+        regions, the input_data_list is a list of image files or folders that
+        contain them. The images are loaded and preprocessed by a pool of
+        up to `max_workers` threads while the model detects the regions in
+        the previous ones, and the image file is added to each prediction
+        as "image_file" when all_fields is set.
+
+        :param input_data_list: List of input data to be predicted
+        :type input_data_list: list, Panda's dataframe or Arrow table
+        :param dict outputs: properties that define the headers and fields to
+                             be added to the input data
+        :param boolean all_fields: whether all the fields in the input data
+                                   should be part of the response
+        :param integer batch_size: maximum number of inputs sent together
+                                   to the sensenet model
+        :param integer max_workers: maximum number of threads used to load
+                                    images when predicting regions
+        :return: the list of input data plus the predicted values
+        :rtype: list, Panda's dataframe or Arrow table depending on the
+                input type in
+                input_data_list
+        """
+        if outputs is None:
+            outputs = {}
+        new_fields = outputs.get(OUT_NEW_FIELDS, DFT_OUTPUTS)
+        new_headers = outputs.get(OUT_NEW_HEADERS, new_fields)
+        if len(new_fields) > len(new_headers):
+            new_headers.extend(new_fields[len(new_headers):])
+        else:
+            new_headers = new_headers[0: len(new_fields)]
+        if self.regions:
+            inner_data_list = image_files_list(input_data_list)
+            predictions = self._batch_regions(inner_data_list,
+                                              max_workers=max_workers)
+            data_format = INTERNAL
+        else:
+            data_format = get_data_format(input_data_list)
+            inner_data_list = self.batch_input_rows(input_data_list)
+            predictions = self._batch_predictions(
+                inner_data_list, batch_size=batch_size, **kwargs)
+        predictions_list = []
+        for input_data, prediction in zip(inner_data_list, predictions):
+            prediction_data = {}
+            if all_fields and data_format == INTERNAL:
+                if self.regions:
+                    prediction_data.update({"image_file": input_data})
+                else:
+                    prediction_data.update(input_data)
+            for index, key in enumerate(new_fields):
+                try:
+                    prediction_data[new_headers[index]] = prediction[key]
+                except KeyError:
+                    pass
+            predictions_list.append(prediction_data)
+        if data_format != INTERNAL:
+            return add_data_columns(input_data_list, predictions_list,
+                                    new_headers, all_fields=all_fields)
+        return predictions_list
+
+    def _batch_predictions(self, input_data_list,
+                           batch_size=DEFAULT_BATCH_SIZE,
+                           operating_point=None, operating_kind=None):
+        """Computes the full predictions for a list of inputs. When using
+        sensenet, the rows are sent to the model in mini-batches.
+
+        """
+        if operating_point is None and self.operation_settings is not None:
+            operating_point = self.operation_settings.get("operating_point")
+        if operating_kind is None and self.operation_settings is not None:
+            operating_kind = self.operation_settings.get("operating_kind")
+        if self.deepnet is None or operating_point or operating_kind:
+            return [self.predict(input_data, operating_point=operating_point,
+                                 operating_kind=operating_kind, full=True)
+                    for input_data in input_data_list]
+        input_arrays = []
+        unused_fields_list = []
+        for input_data in input_data_list:
+            norm_input_data, unused_fields = self.normalize_input_data( \
+                input_data, add_unused_fields=True)
+            unique_terms = self.get_unique_terms(norm_input_data)
+            input_arrays.append(self.fill_array(norm_input_data,
+                                                unique_terms))
+            unused_fields_list.append(unused_fields)
+        batch_size = max(1, batch_size or len(input_arrays))
+        predictions = []
+        for start in range(0, len(input_arrays), batch_size):
+            y_outs = self.deepnet(input_arrays[start: start + batch_size])
+            predictions.extend(
+                self._format_prediction(self.to_prediction(list(y_out)),
+                                        full=True,
+                                        unused_fields=unused_fields)
+                for y_out, unused_fields in zip(
+                    y_outs, unused_fields_list[start: start + batch_size]))
+        return predictions
+
+    def _batch_regions(self, image_files, max_workers=None):
+        """Predicts the regions in a list of image files. The images are
+        read in a pool of threads while the model is applied to the ones
+        already read. The model gets the image files, as in `predict`.
+
+        """
+        #pylint: disable=locally-disabled,import-outside-toplevel
+        from bigml.images.utils import to_relative_coordinates
+        predictions = []
+        if max_workers is None:
+            max_workers = min(32, (os.cpu_count() or 1) + 4)
+        # only a limited number of images is kept in memory ahead of the model
+        prefetch = 2 * max_workers
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            loading = deque(executor.submit(prefetch_image, image_file)
+                            for image_file in image_files[0: prefetch])
+            for index, image_file in enumerate(image_files):
+                size = loading.popleft().result()
+                if index + prefetch < len(image_files):
+                    loading.append(executor.submit(
+                        prefetch_image, image_files[index + prefetch]))
+                predictions.append({"prediction": to_relative_coordinates(
+                    image_file, self.deepnet(image_file), image_size=size)})
+        return predictions
+
     def predict_single(self, input_array):
         """Makes a prediction with a single network
         """
@@ -46,26 +46,37 @@ import os
 from functools import cmp_to_key
 from copy import deepcopy
 
+import msgpack
+
 from bigml.exceptions import NoRootDecisionTree
 from bigml.api import get_ensemble_id, get_model_id, get_api_connection
 from bigml.model import Model, parse_operating_point, sort_categories
 from bigml.generators.model import print_distribution
 from bigml.basemodel import retrieve_resource, ONLY_MODEL, EXCLUDE_FIELDS
 from bigml.model import LAST_PREDICTION
-from bigml.multivote import MultiVote
+from bigml.multivote import MultiVote, VoteTotals, get_numpy
 from bigml.multivote import PLURALITY_CODE, PROBABILITY_CODE, CONFIDENCE_CODE
 from bigml.multimodel import MultiModel
+from bigml.modelcache import ModelCache
 from bigml.basemodel import BaseModel, print_importance, check_local_but_fields
-from bigml.modelfields import ModelFields, NUMERIC
+from bigml.modelfields import ModelFields, FieldsPool, NUMERIC
 from bigml.multivotelist import MultiVoteList
 from bigml.tree_utils import add_distribution
-from bigml.util import cast, use_cache, load, dump, dumps, \
-    get_data_transformations
-from bigml.constants import DECIMALS
+from bigml.profiling import stopwatch, EVALUATION, VOTE_COMBINATION, \
+    OUTPUT_FORMATTING
+from bigml.util import use_cache, dump, dumps, \
+    get_data_transformations, get_data_format, \
+    add_data_columns, PRECISION
+from bigml.constants import DECIMALS, OUT_NEW_FIELDS, OUT_NEW_HEADERS, \
+    INTERNAL
 
 BOOSTING = 1
 LOGGER = logging.getLogger('BigML')
 OPERATING_POINT_KINDS = ["probability", "confidence", "votes"]
+KIND_METHODS = {"probability": PROBABILITY_CODE,
+                "confidence": CONFIDENCE_CODE,
+                "votes": PLURALITY_CODE}
+DFT_OUTPUTS = ["prediction", "probability"]
 
 
 def boosted_list_error(boosting):
@@ -86,10 +97,15 @@ class Ensemble(ModelFields):
        The expected arguments are:
 
     """
+    # the fields pool and the models cache are built at runtime, but the
+    # packed format keeps the cached models
+    RUNTIME_ATTRS = ModelFields.RUNTIME_ATTRS + ("_fields_pool",
+                                                 "models_cache")
+    PACKED_ATTRS = ("models_cache",)
 
     #pylint: disable=locally-disabled,broad-except,access-member-before-definition
     def __init__(self, ensemble, api=None, max_models=None, cache_get=None,
-                 operation_settings=None):
+                 operation_settings=None, max_bytes=None, compact_tree=False):
         """
         :param ensemble: ensemble object or id, list of ensemble model
                         objects or ids or list of ensemble obj and local model
@@ -105,18 +121,39 @@ class Ensemble(ModelFields):
                           Ensemble object. Can be used to read these objects
                           from a cache storage.
         :param operation_settings: Dict object that contains operating options
+        :param max_bytes: integer that limits the memory (in bytes) used to
+                          keep the models instantiated when max_models is
+                          set. The models are then reused across predictions
+                          and the least recently used ones are discarded when
+                          the limit is exceeded. If None, models are
+                          instantiated again for every prediction.
+        :param compact_tree: If True, the trees of the models are kept in
+                             CompactTree objects, that use less memory.
 
         """
         self.model_splits = []
         self.multi_model = None
+        self.models_cache = None
         self.api = get_api_connection(api)
         self.fields = None
         self.class_names = None
         self.default_numeric_value = None
         if use_cache(cache_get):
             # using a cache to store the model attributes
-            self.__dict__ = load(get_ensemble_id(ensemble), cache_get)
+            contents = cache_get(get_ensemble_id(ensemble))
+            # the binary format uses numpy, so it is imported only when the
+            # cache is used
+            #pylint: disable=locally-disabled,import-outside-toplevel
+            from bigml.binarymodel import loads_packed, is_packed
+            if is_packed(contents):
+                # the ensemble and its models were packed together
+                self.__dict__ = vars(loads_packed(contents, api=self.api))
+                self.operation_settings = self._add_operation_settings(
+                    operation_settings)
+                return
+            self.__dict__ = msgpack.loads(contents)
             self.api = get_api_connection(api)
+            self.compact_tree = compact_tree
             self.operation_settings = self._add_operation_settings(
                 operation_settings)
             if len(self.models_splits) == 1:
@@ -137,6 +174,8 @@ class Ensemble(ModelFields):
                     class_names=self.class_names,
                     cache_get=cache_get,
                     operation_settings=operation_settings)
+            elif max_bytes is not None:
+                self.models_cache = ModelCache(max_bytes)
             return
 
         self.resource_id = None
@@ -151,6 +190,7 @@ class Ensemble(ModelFields):
         self.cache_get = None
         self.regression = False
         self.importance = {}
+        self.compact_tree = compact_tree
         query_string = ONLY_MODEL
         no_check_fields = False
         self.input_fields = []
@@ -172,7 +212,8 @@ class Ensemble(ModelFields):
                                          " match the ensemble list of models.")
                     try:
                         models = [Model(
-                            model, operation_settings=operation_settings)
+                            model, operation_settings=operation_settings,
+                            compact_tree=compact_tree)
                             for model in model_list]
                     except Exception:
                         models = model_list
@@ -240,6 +281,8 @@ class Ensemble(ModelFields):
         else:
             self.models_splits = [models[index:(index + max_models)] for index
                                   in range(0, number_of_models, max_models)]
+            if max_bytes is not None:
+                self.models_cache = ModelCache(max_bytes)
         if len(self.models_splits) == 1:
             if not isinstance(models[0], Model):
                 if use_cache(cache_get):
@@ -339,6 +382,8 @@ class Ensemble(ModelFields):
                 models,
                 self.api,
                 fields=self.fields,
+                fields_pool=self.fields_pool(),
+                compact_tree=self.compact_tree,
                 class_names=self.class_names,
                 operation_settings=operation_settings)
             for index, model in enumerate(self.multi_model.models):
@@ -506,6 +551,61 @@ class Ensemble(ModelFields):
 
         return output
 
+    def predict_probability_confidence(self, input_data,
+                                       missing_strategy=LAST_PREDICTION):
+        """Computes the probabilities and the confidences for the input data
+        evaluating each model in the ensemble only once. The result is a
+        tuple that contains the same outputs as
+        `predict_probability(compact=True)` and
+        `predict_confidence(compact=False)`.
+
+        :param input_data: Input data to be predicted
+        :param missing_strategy: LAST_PREDICTION|PROPORTIONAL missing strategy
+                                 for missing fields
+        """
+        if self.boosting is not None and not self.regression:
+            # boosting probabilities are used as confidences also
+            probabilities = self.predict_probability( \
+                input_data, missing_strategy=missing_strategy)
+            return [probability['probability']
+                    for probability in probabilities], probabilities
+        if self.regression:
+            if self.operation_settings:
+                # operation settings may change the combiners
+                return self.predict_probability( \
+                    input_data, missing_strategy=missing_strategy,
+                    compact=True), self.predict_confidence( \
+                    input_data, missing_strategy=missing_strategy)
+            norm_input_data, unused_fields = self.normalize_input_data( \
+                input_data, add_unused_fields=True)
+            votes = self._generate_votes(norm_input_data,
+                                         missing_strategy=missing_strategy,
+                                         unused_fields=unused_fields)
+            probability = votes.combine(method=PROBABILITY_CODE)
+            confidence_method = PROBABILITY_CODE if self.boosting \
+                else CONFIDENCE_CODE
+            confidence = self._full_result( \
+                votes.combine(method=confidence_method, full=True),
+                norm_input_data, unused_fields)
+            return [probability], confidence
+
+        probability_votes = MultiVoteList([])
+        confidence_votes = MultiVoteList([])
+        for multi_model in self._multi_models():
+            probabilities, confidences = \
+                multi_model.generate_probability_confidence_votes( \
+                    input_data, missing_strategy=missing_strategy)
+            probability_votes.extend(probabilities)
+            confidence_votes.extend(confidences)
+        probabilities = probability_votes.combine_to_distribution( \
+            normalize=False)
+        confidences = confidence_votes.combine_to_distribution( \
+            normalize=False)
+        return probabilities, [{'category': class_name,
+                                'confidence': confidence}
+                               for class_name, confidence in
+                               zip(self.class_names, confidences)]
+
     def predict_votes(self, input_data,
                       missing_strategy=LAST_PREDICTION,
                       compact=False):
@@ -552,63 +652,143 @@ class Ensemble(ModelFields):
 
         return output
 
-    def _combine_distributions(self, input_data, missing_strategy,
-                               method=PROBABILITY_CODE):
-        """Computes the predicted distributions and combines them to give the
-        final predicted distribution. Depending on the method parameter
-        probability, votes or the confidence are used to weight the models.
+    def _multi_models(self):
+        """Yields the MultiModel objects that contain each group of models.
+        When the ensemble is split in several chunks, their models are
+        loaded sequentially.
 
         """
-
         if len(self.models_splits) > 1:
-            # If there's more than one chunk of models, they must be
-            # sequentially used to generate the votes for the prediction
-            votes = MultiVoteList([])
-
             for models_split in self.models_splits:
                 models = self._get_models(models_split)
                 multi_model = MultiModel(models,
                                          api=self.api,
                                          fields=self.fields,
+                                         fields_pool=self.fields_pool(),
+                                         compact_tree=self.compact_tree,
                                          class_names=self.class_names)
                 for index, _ in enumerate(multi_model.models):
                     multi_model.models[index].term_forms = self.term_forms
-
-                votes_split = multi_model.generate_votes_distribution( \
-                    input_data,
-                    missing_strategy=missing_strategy,
-                    method=method)
-                votes.extend(votes_split)
+                yield multi_model
         else:
             # When only one group of models is found you use the
             # corresponding multimodel to predict
-            votes = self.multi_model.generate_votes_distribution( \
-                input_data,
-                missing_strategy=missing_strategy, method=method)
+            yield self.multi_model
+
+    def _generate_votes(self, norm_input_data,
+                        missing_strategy=LAST_PREDICTION,
+                        unused_fields=None, median=False):
+        """Generates the MultiVote object that contains the predictions
+        made by every model in the ensemble for normalized input data.
+
+        """
+        votes = MultiVote([], boosting_offsets=self.boosting_offsets)
+        for multi_model in self._multi_models():
+            votes_split = multi_model._generate_votes(
+                norm_input_data,
+                missing_strategy=missing_strategy,
+                unused_fields=unused_fields)
+            if median:
+                for prediction in votes_split.predictions:
+                    prediction['prediction'] = prediction['median']
+            votes.extend(votes_split.predictions)
+        return votes
+
+    @staticmethod
+    def _full_result(result, norm_input_data, unused_fields=None):
+        """Adds the attributes in the full prediction format to the
+        combined votes. `unused_fields` is the list of unused fields that
+        every vote reports.
+
+        """
+        unused_fields = set(norm_input_data.keys()).intersection( \
+            set(unused_fields or []))
+        if not isinstance(result, dict):
+            result = {"prediction": round(result, DECIMALS)}
+        if "probability" in result and "confidence" not in result:
+            result["confidence"] = result["probability"]
+        result['unused_fields'] = list(unused_fields)
+        return result
+
+    def _combine_distributions(self, input_data, missing_strategy,
+                               method=PROBABILITY_CODE):
+        """Computes the predicted distributions and combines them to give the
+        final predicted distribution. Depending on the method parameter
+        probability, votes or the confidence are used to weight the models.
 
-        return votes.combine_to_distribution(normalize=False)
+        """
+        watch = stopwatch(self)
+        votes = MultiVoteList([])
+        for multi_model in self._multi_models():
+            votes.extend(multi_model.generate_votes_distribution( \
+                input_data,
+                missing_strategy=missing_strategy,
+                method=method))
+        if watch:
+            watch.lap(EVALUATION)
+        distribution = votes.combine_to_distribution(normalize=False)
+        if watch:
+            watch.lap(VOTE_COMBINATION)
+        return distribution
 
     def _get_models(self, models_split):
-        if not isinstance(models_split[0], Model):
-            if self.cache_get is not None and \
-                    hasattr(self.cache_get, '__call__'):
-                # retrieve the models from a cache get function
-                try:
-                    models = [self.cache_get(model_id) for model_id
-                              in models_split]
-                except Exception as exc:
-                    raise Exception('Error while calling the '
-                                    'user-given'
-                                    ' function %s: %s' %
-                                    (self.cache_get.__name__,
-                                     str(exc)))
-            else:
-                models = [retrieve_resource(self.api, model_id,
-                                            query_string=ONLY_MODEL)
-                          for model_id in models_split]
+        if isinstance(models_split[0], Model):
+            return models_split
+        if self.models_cache is not None:
+            # models are built once and kept while the memory allows it
+            models = [self.models_cache.get(model_id, self._build_model)
+                      for model_id in models_split]
+            return [model for model in models if model is not None]
+        return self._retrieve_models(models_split)
+
+    def _retrieve_models(self, models_split):
+        """Retrieves the information of the models in the split, either
+        using the cache_get function or the connection
+
+        """
+        if self.cache_get is not None and \
+                hasattr(self.cache_get, '__call__'):
+            # retrieve the models from a cache get function
+            try:
+                models = [self.cache_get(model_id) for model_id
+                          in models_split]
+            except Exception as exc:
+                raise Exception('Error while calling the '
+                                'user-given'
+                                ' function %s: %s' %
+                                (self.cache_get.__name__,
+                                 str(exc)))
+        else:
+            models = [retrieve_resource(self.api, model_id,
+                                        query_string=ONLY_MODEL)
+                      for model_id in models_split]
 
         return models
 
+    def _build_model(self, model_id):
+        """Builds the local model for one of the models in the ensemble.
+        Returns None for models that have no root info.
+
+        """
+        model = self._retrieve_models([model_id])[0]
+        if isinstance(model, Model):
+            return model
+        try:
+            return Model(model, api=self.api, fields=self.fields,
+                         fields_pool=self.fields_pool(),
+                         compact_tree=self.compact_tree)
+        except NoRootDecisionTree:
+            return None
+
+    def fields_pool(self):
+        """Returns the pool that shares the fields structures among the
+        models of the ensemble, creating it the first time it is needed.
+
+        """
+        if getattr(self, "_fields_pool", None) is None:
+            self._fields_pool = FieldsPool()
+        return self._fields_pool
+
     #pylint: disable=locally-disabled,invalid-name
     def _sort_predictions(self, a, b, criteria):
         """Sorts the categories in the predicted node according to the
@@ -635,30 +815,37 @@ class Ensemble(ModelFields):
 
             predictions = predict_method(input_data,
                                          missing_strategy, False)
-            position = self.class_names.index(positive_class)
         except KeyError:
             raise ValueError("The operating point needs to contain a valid"
                              " positive class, kind and a threshold.")
 
         if self.regression:
-            prediction = predictions
+            return predictions
+        return self._operating_point_prediction(predictions, kind,
+                                                threshold, positive_class)
+
+    def _operating_point_prediction(self, predictions, kind, threshold,
+                                    positive_class):
+        """Chooses the predicted class from the list of per class
+        probabilities, confidences or votes according to the operating point
+
+        """
+        position = self.class_names.index(positive_class)
+        if predictions[position][kind] > threshold:
+            prediction = predictions[position]
         else:
-            position = self.class_names.index(positive_class)
-            if predictions[position][kind] > threshold:
-                prediction = predictions[position]
+            # if the threshold is not met, the alternative class with
+            # highest probability or confidence is returned
+            predictions.sort( \
+                key=cmp_to_key( \
+                lambda a, b: self._sort_predictions(a, b, kind)))
+            prediction = predictions[0: 2]
+            if prediction[0]["category"] == positive_class:
+                prediction = prediction[1]
             else:
-                # if the threshold is not met, the alternative class with
-                # highest probability or confidence is returned
-                predictions.sort( \
-                    key=cmp_to_key( \
-                    lambda a, b: self._sort_predictions(a, b, kind)))
-                prediction = predictions[0: 2]
-                if prediction[0]["category"] == positive_class:
-                    prediction = prediction[1]
-                else:
-                    prediction = prediction[0]
-            prediction["prediction"] = prediction["category"]
-            del prediction["category"]
+                prediction = prediction[0]
+        prediction["prediction"] = prediction["category"]
+        del prediction["category"]
         return prediction
 
     def predict_operating_kind(self, input_data,
@@ -688,14 +875,23 @@ class Ensemble(ModelFields):
                              " property.")
 
         if self.regression:
-            prediction = predictions
-        else:
-            predictions.sort( \
-                key=cmp_to_key( \
-                lambda a, b: self._sort_predictions(a, b, kind)))
-            prediction = predictions[0]
-            prediction["prediction"] = prediction["category"]
-            del prediction["category"]
+            return predictions
+        return self._operating_kind_prediction(predictions, kind)
+
+    def _operating_kind_prediction(self, predictions, kind):
+        """Chooses the class with the highest probability, confidence or
+        votes from the list of per class values
+
+        """
+        watch = stopwatch(self)
+        predictions.sort( \
+            key=cmp_to_key( \
+            lambda a, b: self._sort_predictions(a, b, kind)))
+        prediction = predictions[0]
+        prediction["prediction"] = prediction["category"]
+        del prediction["category"]
+        if watch:
+            watch.lap(OUTPUT_FORMATTING)
         return prediction
 
     #pylint: disable=locally-disabled,protected-access
@@ -761,16 +957,14 @@ class Ensemble(ModelFields):
         """
 
         # Checks and cleans input_data leaving the fields used in the model
-        norm_input_data = self.filter_input_data( \
+        # and casts to the final field type
+        norm_input_data = self.normalize_input_data( \
             input_data,
             add_unused_fields=full)
         unused_fields = None
         if full:
             norm_input_data, unused_fields = norm_input_data
 
-        # Strips affixes for numeric values and casts to the final field type
-        cast(norm_input_data, self.fields)
-
         if median and method is None:
             # predictions with median are only available with old combiners
             method = PLURALITY_CODE
@@ -812,58 +1006,262 @@ class Ensemble(ModelFields):
                 operating_kind=operating_kind)
             return prediction
 
-        if len(self.models_splits) > 1:
-            # If there's more than one chunk of models, they must be
-            # sequentially used to generate the votes for the prediction
-            votes = MultiVote([], boosting_offsets=self.boosting_offsets)
+        watch = stopwatch(self)
+        votes = self._generate_votes(norm_input_data,
+                                     missing_strategy=missing_strategy,
+                                     unused_fields=unused_fields,
+                                     median=median)
+        if self.boosting is not None and not self.regression:
+            categories = [ \
+                d[0] for d in
+                self.fields[self.objective_id]["summary"]["categories"]]
+            options = {"categories": categories}
+        if watch:
+            watch.lap(EVALUATION)
+        result = votes.combine(method=method, options=options, full=full)
+        if watch:
+            watch.lap(VOTE_COMBINATION)
+        if full:
+            result = self._full_result(result, norm_input_data,
+                                       unused_fields)
+        if watch:
+            watch.lap(OUTPUT_FORMATTING)
+        return result
 
-            for models_split in self.models_splits:
-                models = self._get_models(models_split)
-                multi_model = MultiModel(models,
-                                         api=self.api,
-                                         fields=self.fields)
-                for index, _ in enumerate(multi_model.models):
-                    multi_model.models[index].term_forms = self.term_forms
+    def batch_predict(self, input_data_list, outputs=None, all_fields=True,
+                      missing_strategy=LAST_PREDICTION, operating_point=None,
+                      operating_kind=None, **kwargs):
+        """Creates a batch prediction for a list of inputs using the local
+        ensemble. Allows to define some output settings to
+        decide the fields to be added to the input_data (prediction,
+        probability, etc.) and the name that we want to assign to these new
+        fields. The outputs argument accepts a dictionary with keys
+        "output_fields", to contain a list of the prediction properties to add
+        (["prediction", "probability"] by default) and "output_headers", to
+        contain a list of the headers to be used when adding them (identical
+        to "output_fields" list, by default).
+
+        When the ensemble has been built using `max_models`, every group of
+        models is loaded only once for the whole batch: all the inputs are
+        scored with one group of models before moving to the next one and
+        their votes are added to the totals that the combination method
+        needs, so the votes themselves are not kept.
+
+        :param input_data_list: List of input data to be predicted
+        :type input_data_list: list, Panda's dataframe or Arrow table
+        :param dict outputs: properties that define the headers and fields to
+                             be added to the input data
+        :param boolean all_fields: whether all the fields in the input data
+                                   should be part of the response
+        :param missing_strategy: numeric key for the individual model's
+                                 prediction method.
+        :param operating_point: operating point to be used in predictions
+                                (see the `predict` method)
+        :param operating_kind: operating kind to be used in predictions
+                               (see the `predict` method)
+        :return: the list of input data plus the predicted values
+        :rtype: list, Panda's dataframe or Arrow table depending on the
+                input type in
+                input_data_list
+        """
+        if outputs is None:
+            outputs = {}
+        new_fields = outputs.get(OUT_NEW_FIELDS, DFT_OUTPUTS)
+        new_headers = outputs.get(OUT_NEW_HEADERS, new_fields)
+        if len(new_fields) > len(new_headers):
+            new_headers.extend(new_fields[len(new_headers):])
+        else:
+            new_headers = new_headers[0: len(new_fields)]
+        data_format = get_data_format(input_data_list)
+        inner_data_list = self.batch_input_rows(input_data_list)
+        predictions = self._batch_predictions( \
+            inner_data_list, missing_strategy=missing_strategy,
+            operating_point=operating_point, operating_kind=operating_kind,
+            **kwargs)
+        predictions_list = []
+        for input_data, prediction in zip(inner_data_list, predictions):
+            prediction_data = {}
+            if all_fields and data_format == INTERNAL:
+                prediction_data.update(input_data)
+            for index, key in enumerate(new_fields):
+                try:
+                    prediction_data[new_headers[index]] = prediction[key]
+                except KeyError:
+                    pass
+            predictions_list.append(prediction_data)
+        if data_format != INTERNAL:
+            return add_data_columns(input_data_list, predictions_list,
+                                    new_headers, all_fields=all_fields)
+        return predictions_list
+
+    def _batch_predictions(self, input_data_list,
+                           missing_strategy=LAST_PREDICTION,
+                           operating_point=None, operating_kind=None,
+                           **kwargs):
+        """Computes the full predictions for a list of inputs. When models
+        are split in groups, each group is used to score all the inputs
+        before loading the next one.
 
-                votes_split = multi_model._generate_votes(
-                    norm_input_data,
-                    missing_strategy=missing_strategy,
-                    unused_fields=unused_fields)
-                if median:
-                    for prediction in votes_split.predictions:
-                        prediction['prediction'] = prediction['median']
-                votes.extend(votes_split.predictions)
+        """
+        if len(self.models_splits) == 1:
+            return [self.predict(input_data, missing_strategy=missing_strategy,
+                                 operating_point=operating_point,
+                                 operating_kind=operating_kind, full=True,
+                                 **kwargs)
+                    for input_data in input_data_list]
+
+        # the combiner is chosen as in the predict method
+        method = kwargs.get("method")
+        options = kwargs.get("options")
+        median = kwargs.get("median", False)
+        if median and method is None:
+            # predictions with median are only available with old combiners
+            method = PLURALITY_CODE
+        if operating_point is None and self.operation_settings is not None:
+            operating_point = self.operation_settings.get("operating_point")
+        if operating_kind is None and self.operation_settings is not None:
+            operating_kind = self.operation_settings.get("operating_kind")
+        if method is None and operating_point is None and \
+                operating_kind is None and not median:
+            operating_kind = "probability"
+
+        if operating_point:
+            if self.regression:
+                raise ValueError("The operating_point argument can only be"
+                                 " used in classifications.")
+            kind, threshold, positive_class = parse_operating_point( \
+                operating_point, OPERATING_POINT_KINDS,
+                self.class_names, self.operation_settings)
+        elif operating_kind and self.regression:
+            # for regressions, operating_kind defaults to the old
+            # combiners
+            method = 1 if operating_kind == "confidence" else 0
+            median = False
+        elif operating_kind:
+            kind = operating_kind.lower()
+            if self.boosting and kind != "probability":
+                raise ValueError("Only probability is allowed as operating"
+                                 " kind for boosted ensembles.")
+            if kind not in OPERATING_POINT_KINDS:
+                raise ValueError("Allowed operating kinds are %s. %s found." %
+                                 (", ".join(OPERATING_POINT_KINDS), kind))
+
+        if self.regression or not (operating_point or operating_kind):
+            return self._split_combination( \
+                input_data_list, missing_strategy=missing_strategy,
+                method=method, options=options, median=median)
+
+        if self.boosting is not None:
+            if kind == "votes":
+                raise ValueError("Votes cannot be computed for boosted"
+                                 " ensembles.")
+            # boosting probabilities are used as confidences also
+            rows_predictions = []
+            for prediction in self._split_combination( \
+                    input_data_list, missing_strategy=missing_strategy,
+                    method=PLURALITY_CODE):
+                probabilities = prediction["probabilities"]
+                probabilities.sort(key=lambda x: x['category'])
+                rows_predictions.append(probabilities)
         else:
-            # When only one group of models is found you use the
-            # corresponding multimodel to predict
-            votes_split = self.multi_model._generate_votes(
-                norm_input_data, missing_strategy=missing_strategy,
-                unused_fields=unused_fields)
+            norm_data_list = []
+            for input_data in input_data_list:
+                # Checks and cleans input_data leaving the fields used in the
+                # model and casts to the final field type
+                norm_input_data = self.normalize_input_data(input_data)
+                norm_data_list.append(norm_input_data)
+            votes, counts = self._split_votes( \
+                norm_data_list, missing_strategy=missing_strategy,
+                method=KIND_METHODS[kind])
+            rows_predictions = [[{"category": class_name,
+                                  kind: round(value / count, PRECISION)}
+                                 for class_name, value in
+                                 zip(self.class_names, row_votes)]
+                                for row_votes, count in
+                                zip(votes.tolist(), counts.tolist())]
+        predictions = []
+        for row_predictions in rows_predictions:
+            if operating_point:
+                predictions.append(self._operating_point_prediction( \
+                    row_predictions, kind, threshold, positive_class))
+            else:
+                predictions.append(self._operating_kind_prediction( \
+                    row_predictions, kind))
+        return predictions
 
-            votes = MultiVote(votes_split.predictions,
-                              boosting_offsets=self.boosting_offsets)
-            if median:
-                for prediction in votes.predictions:
-                    prediction['prediction'] = prediction['median']
+    def _split_votes(self, input_data_list, missing_strategy=LAST_PREDICTION,
+                     method=PROBABILITY_CODE):
+        """Scores all the inputs with each group of models before moving to
+        the next group, so that models are loaded only once. The votes
+        for each class are accumulated in an array, together with the
+        number of votes per input.
 
+        """
+        np = get_numpy()
+        votes = np.zeros((len(input_data_list), len(self.class_names)))
+        counts = np.zeros(len(input_data_list))
+        for multi_model in self._multi_models():
+            for row, input_data in enumerate(input_data_list):
+                votes_split = multi_model.generate_votes_distribution( \
+                    input_data,
+                    missing_strategy=missing_strategy,
+                    method=method)
+                for vote in votes_split.predictions:
+                    votes[row] += vote
+                    counts[row] += 1
+        return votes, counts
+
+    #pylint: disable=locally-disabled,protected-access
+    def _split_combination(self, input_data_list,
+                           missing_strategy=LAST_PREDICTION, method=None,
+                           options=None, median=False):
+        """Scores all the inputs with each group of models before moving to
+        the next group and returns their full predictions, combined as in
+        the `predict` method. The votes are not stored: each group adds
+        them to the totals that the combination method needs.
+
+        """
+        norm_data_list = []
+        unused_fields_list = []
+        for input_data in input_data_list:
+            norm_input_data, unused_fields = self.normalize_input_data( \
+                input_data, add_unused_fields=True)
+            norm_data_list.append(norm_input_data)
+            unused_fields_list.append(unused_fields)
         if self.boosting is not None and not self.regression:
             categories = [ \
                 d[0] for d in
                 self.fields[self.objective_id]["summary"]["categories"]]
             options = {"categories": categories}
-        result = votes.combine(method=method, options=options, full=full)
-        if full:
-            unused_fields = set(norm_input_data.keys())
-            for prediction in votes.predictions:
-                unused_fields = unused_fields.intersection( \
-                    set(prediction.get("unused_fields", [])))
-            if not isinstance(result, dict):
-                result = {"prediction": round(result, DECIMALS)}
-            if "probability" in result and "confidence" not in result:
-                result["confidence"] = result["probability"]
-            result['unused_fields'] = list(unused_fields)
-
-        return result
+        totals = VoteTotals(len(norm_data_list), method=method,
+                            options=options, regression=self.regression,
+                            boosting_offsets=self.boosting_offsets,
+                            categories=self.class_names)
+        for multi_model in self._multi_models():
+            for row, norm_input_data in enumerate(norm_data_list):
+                votes_split = multi_model._generate_votes( \
+                    norm_input_data,
+                    missing_strategy=missing_strategy,
+                    unused_fields=unused_fields_list[row])
+                if median:
+                    for prediction in votes_split.predictions:
+                        prediction['prediction'] = prediction['median']
+                totals.add(row, votes_split.predictions)
+        predictions = []
+        for row, norm_input_data in enumerate(norm_data_list):
+            if row in totals.non_numeric:
+                # votes with no numeric prediction (e.g. models with no
+                # median) change the combination, so the input is predicted
+                # again with all its votes
+                predictions.append(self.predict( \
+                    input_data_list[row], method=method, options=options,
+                    missing_strategy=missing_strategy, median=median,
+                    full=True))
+                continue
+            predictions.append(self._full_result( \
+                totals.combine(row, full=True), norm_input_data,
+                unused_fields_list[row]))
+        return predictions
 
     def field_importance_data(self):
         """Computes field importance based on the field importance information
@@ -1022,25 +1420,45 @@ class Ensemble(ModelFields):
         """
         return get_data_transformations(self.resource_id, self.parent_id)
 
-    def dump(self, output=None, cache_set=None):
+    def dump(self, output=None, cache_set=None, packed=False):
         """Uses msgpack to serialize the resource object
         If cache_set is filled with a cache set method, the method is called
 
+        :param packed: if True, the ensemble and its models are stored
+                       together in a single msgpack blob, where numeric
+                       arrays (like the ones in compact trees) keep their
+                       raw contents. Otherwise, every model is stored apart.
         """
+        if packed:
+            #pylint: disable=locally-disabled,import-outside-toplevel
+            from bigml.binarymodel import dumps_packed
+            contents = dumps_packed(self)
+            if use_cache(cache_set):
+                cache_set(self.resource_id, contents)
+            else:
+                output.write(contents)
+            return
         self_vars = vars(self).copy()
         del self_vars["api"]
         if "multi_model" in self_vars:
             for model in self_vars["multi_model"].models:
                 model.dump(output=output, cache_set=cache_set)
             del self_vars["multi_model"]
-        dump(self_vars, output=output, cache_set=cache_set)
+        dump(self_vars, output=output, cache_set=cache_set,
+             runtime_attrs=self.RUNTIME_ATTRS)
 
-    def dumps(self):
+    def dumps(self, packed=False):
         """Uses msgpack to serialize the resource object to a string
 
+        :param packed: if True, the ensemble and its models are packed
+                       together (see `dump`)
         """
+        if packed:
+            #pylint: disable=locally-disabled,import-outside-toplevel
+            from bigml.binarymodel import dumps_packed
+            return dumps_packed(self)
         self_vars = vars(self).copy()
         del self_vars["api"]
         if "multi_model" in self_vars:
             del self_vars["multi_model"]
-        dumps(self_vars)
+        return dumps(self_vars, runtime_attrs=self.RUNTIME_ATTRS)
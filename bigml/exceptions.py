@@ -31,3 +31,10 @@ class NoRootDecisionTree(ResourceException):
 
 class FaultyResourceError(Exception):
     """Exception to be raised when retrieving a Faulty resource """
+
+
+class UnsupportedFlatline(Exception):
+    """The Flatline expression cannot be evaluated by the native Python
+    compiler and needs the Node.js interpreter
+
+    """
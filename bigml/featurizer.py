@@ -117,3 +117,8 @@ class Featurizer:
             else:
                 extended[f_id] = value
         return extended
+
+    def extend_inputs(self, input_data_list):
+        """Extends each of the input data in a list """
+        return [self.extend_input(input_data) for input_data in
+                input_data_list]
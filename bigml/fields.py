@@ -45,16 +45,9 @@ import sys
 import json
 import csv
 import random
-import numpy as np
 
-try:
-    from pandas import DataFrame
-    PANDAS_READY = True
-except ImportError:
-    PANDAS_READY = False
-
-
-from bigml.util import invert_dictionary, python_map_type, find_locale
+from bigml.util import invert_dictionary, python_map_type, find_locale, \
+    is_instance_of
 from bigml.util import DEFAULT_LOCALE
 from bigml.api_handlers.resourcehandler import get_resource_type, get_fields
 from bigml.constants import (
@@ -200,6 +193,25 @@ def get_new_fields(output_fields):
     return new_fields
 
 
+def one_hot_column(values, field):
+    """Translating into codes the list of values of a categorical field.
+    The codes are the index of the value in the list of categories read from
+    the fields summary."""
+    try:
+        categories = [cat[0] for cat in field["summary"]["categories"]]
+    except KeyError:
+        raise KeyError("Failed to find the categories list. Check the field"
+                       " information.")
+    codes = {}
+    for code, category in enumerate(categories):
+        codes.setdefault(category, code)
+    try:
+        return [codes[value] for value in values]
+    except KeyError as exc:
+        raise ValueError("The '%s' value is not found in the categories "
+                         "list: %s" % (exc.args[0], categories))
+
+
 def one_hot_code(value, field, decode=False):
     """Translating into codes categorical values. The codes are the index
     of the value in the list of categories read from the fields summary.
@@ -538,28 +550,33 @@ class Fields():
         """Transforming input data to numpy syntax. Fields are sorted
         in the dataset order and categorical fields are one-hot encoded.
         If objective set to False, the objective field will not be included"""
-        if PANDAS_READY and isinstance(input_data_list, DataFrame):
-            inner_data_list = input_data_list.to_dict('records')
-        else:
-            inner_data_list = input_data_list
-        field_ids = self.sorted_field_ids(objective=objective)
+        #pylint: disable=locally-disabled,import-outside-toplevel
+        import numpy as np
+        field_ids = list(self.sorted_field_ids(objective=objective))
         np_input_list = np.empty(shape=(len(input_data_list),
                                         len(field_ids)))
-        for index, input_data in enumerate(inner_data_list):
-            np_input = np.array([])
-            for field_id in field_ids:
-                field_input = input_data.get(field_id,
-                    input_data.get(self.field_name(field_id)))
-                field = self.fields[field_id]
-                if field["optype"] == CATEGORICAL:
-                    field_input = one_hot_code(field_input, field)
-                np_input = np.append(np_input, field_input)
-            np_input_list[index] = np_input
+        # the array is filled column by column
+        for index, field_id in enumerate(field_ids):
+            field_name = self.field_name(field_id)
+            if is_instance_of(input_data_list, "pandas", "DataFrame"):
+                key = field_id if field_id in input_data_list else field_name
+                field_inputs = input_data_list[key].tolist() if key in \
+                    input_data_list else [None] * len(input_data_list)
+            else:
+                field_inputs = [input_data.get(field_id,
+                                               input_data.get(field_name))
+                                for input_data in input_data_list]
+            field = self.fields[field_id]
+            if field["optype"] == CATEGORICAL:
+                field_inputs = one_hot_column(field_inputs, field)
+            np_input_list[:, index] = field_inputs
         return np_input_list
 
     def from_numpy(self, np_data_list, objective=False, by_name=True):
         """Transforming input data from numpy syntax. Fields are sorted
         in the dataset order and categorical fields are one-hot encoded."""
+        #pylint: disable=locally-disabled,import-outside-toplevel
+        import numpy as np
         input_data_list = []
         field_ids = self.sorted_field_ids(objective=objective)
         for np_data in np_data_list:
@@ -18,6 +18,10 @@
 Flatline: Class that encapsulates the Flatline expressions interpreter
 """
 
+import hashlib
+import json
+import threading
+
 from javascript import require
 
 
@@ -33,10 +37,19 @@ class Flatline:
       Flatline.check_lisp('(+ 1 2)')
       Flatline.check_json(["f", 0], dataset=dataset)
 
+    Expressions that are applied repeatedly can be compiled once with
+    `compile_lisp` and then applied together to each batch of rows with
+    `apply_compiled`, which needs a single round trip to Node.js.
+
     """
 
     __FLATLINEJS = require('./flatline/flatline-node.js')
     interpreter = __FLATLINEJS.bigml.dixie.flatline
+    __SESSION = require('./flatline/session.js')
+    # compiled form IDs in the Node.js session per (sexp, fields hash)
+    compiled_forms = {}
+    # the session can be used from the threads that run pipeline steps
+    session_lock = threading.Lock()
 
     #pylint: disable=locally-disabled,invalid-name
     @staticmethod
@@ -152,6 +165,50 @@ class Flatline:
             Flatline._dataset(dataset, rows),
             rows)
 
+    @staticmethod
+    def fields_hash(fields):
+        """Digest of a fields structure, used to identify the context
+        where an expression was compiled.
+
+        """
+        return hashlib.sha1(json.dumps(
+            fields, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def compile_lisp(sexp, fields=None, fields_hash=None):
+        """Compiles the given Lisp sexp in the context of the fields
+        structure and keeps the result in the Node.js session.
+
+        Returns a dictionary with either the `id` of the compiled form,
+        to be used in `apply_compiled`, or the `error` found while checking
+        the expression. Compiled forms are cached per expression and
+        fields, so each expression is parsed only once per process.
+
+        """
+        if fields_hash is None:
+            fields_hash = Flatline.fields_hash(fields)
+        key = (sexp, fields_hash)
+        form_id = Flatline.compiled_forms.get(key)
+        if form_id is not None:
+            return {"id": form_id}
+        with Flatline.session_lock:
+            result = Flatline.__SESSION.compile(sexp, fields).valueOf()
+        if "error" not in result:
+            Flatline.compiled_forms[key] = result["id"]
+        return result
+
+    @staticmethod
+    def apply_compiled(form_ids, rows):
+        """Applies a list of compiled forms to a set of input rows.
+
+        The outputs of all the forms are concatenated for each row, in
+        the order given by `form_ids`. A `None` ID stands for the identity
+        transformation that keeps the input row values.
+
+        """
+        with Flatline.session_lock:
+            return Flatline.__SESSION.apply(form_ids, rows).valueOf()
+
     @staticmethod
     def apply_json(json_sexp, rows, dataset=None):
         """Applies the given JSON sexp to a set of input rows.
@@ -0,0 +1,51 @@
+/*
+ * Copyright 2025 BigML
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License"); you may
+ * not use this file except in compliance with the License. You may obtain
+ * a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+ * WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+ * License for the specific language governing permissions and limitations
+ * under the License.
+ */
+
+/*
+ * Keeps the Flatline expressions compiled by the Python bindings in the
+ * Node.js process, so that they are parsed only once and a list of them can
+ * be applied to a batch of rows in a single call.
+ */
+
+const flatline = require('./flatline-node.js').bigml.dixie.flatline;
+
+const forms = [];
+
+/*
+ * Compiles the Lisp expression in the context of the given fields. Returns
+ * either {id: <form index>} or {error: <error description>}.
+ */
+function compile(sexp, fields) {
+  const form = flatline.evaluate_sexp(sexp, fields, true);
+  if (form.error) {
+    return {error: form.error};
+  }
+  forms.push(form);
+  return {id: forms.length - 1};
+}
+
+/*
+ * Applies the compiled forms to the rows and concatenates their outputs per
+ * row. A null id stands for the identity transformation (all).
+ */
+function apply(ids, rows) {
+  const outputs = ids.map(
+    (id) => (id === null ? rows : flatline.apply_form(forms[id], rows)));
+  return rows.map(
+    (_, index) => [].concat(...outputs.map((output) => output[index])));
+}
+
+module.exports = {compile, apply};
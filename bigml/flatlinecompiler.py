@@ -0,0 +1,741 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Native Python evaluation for a subset of the Flatline language.
+
+Most of the derived fields used in datasets are simple expressions:
+arithmetic, comparisons, conditionals, missing values checks, math
+functions, normalizations and windows over numeric fields. The
+`compile_lisp` function translates them into functions that are evaluated
+with numpy over whole columns of values, so no Node.js interpreter is
+needed to apply them.
+
+The results match the ones of the Flatline interpreter: missing values
+propagate through numeric operations, non-finite results are missing and
+booleans are returned as the "true" and "false" strings. Only the
+trigonometric, hyperbolic and logarithmic functions may differ in the last
+digit, as the math libraries used by numpy and Node.js are not the same.
+Expressions that use any other primitive, or whose types cannot be
+checked, raise an UnsupportedFlatline exception and must be
+evaluated with the `bigml.flatline.Flatline` bridge instead.
+
+Example:
+
+    expression = compile_lisp('(/ (f "a") (f "b"))', fields)
+    expression.apply([[1, 2], [3, None]])
+    # [[0.5], [None]]
+
+"""
+import json
+import math
+import re
+
+import numpy as np
+
+from bigml.exceptions import UnsupportedFlatline
+
+
+NUMERIC = "numeric"
+STRING = "string"
+BOOLEAN = "boolean"
+
+OPTYPE_TYPES = {"numeric": NUMERIC, "categorical": STRING, "text": STRING}
+
+# Python integers that floats represent exactly
+MAX_EXACT_INT = 2 ** 53
+
+TOKENS_RE = re.compile(
+    r'\s*(?:;[^\n]*|(\()|(\))|("(?:\\.|[^"\\])*")|([^\s()";]+))')
+
+UNARY_FUNCTIONS = {
+    "abs": np.abs,
+    "sqrt": np.sqrt,
+    "ln": np.log,
+    "log": np.log,
+    "log2": np.log2,
+    "log10": np.log10,
+    "exp": np.exp,
+    "floor": np.floor,
+    "ceil": np.ceil,
+    "round": lambda values: np.floor(values + 0.5),
+    "integer": np.trunc,
+    "real": lambda values: values,
+    "square": np.square,
+    "sin": np.sin,
+    "cos": np.cos,
+    "tan": np.tan,
+    "asin": np.arcsin,
+    "acos": np.arccos,
+    "atan": np.arctan,
+    "sinh": np.sinh,
+    "cosh": np.cosh,
+    "tanh": np.tanh,
+    "to-degrees": np.degrees,
+    "to-radians": np.radians}
+
+BINARY_FUNCTIONS = {
+    "pow": lambda left, right: np.array(
+        [power(base, exponent) for base, exponent in zip(left, right)],
+        dtype=float),
+    # same sign as the divisor, computed as the interpreter does
+    "mod": lambda left, right: np.fmod(np.fmod(left, right) + right, right),
+    "div": lambda left, right: np.trunc(left / right)}
+
+FOLDED_FUNCTIONS = {
+    "+": (np.add, 0),
+    "*": (np.multiply, 1),
+    "-": (np.subtract, None),
+    "/": (np.divide, None),
+    "max": (np.maximum, None),
+    "min": (np.minimum, None)}
+
+COMPARISONS = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "=": np.equal}
+
+SUMMARY_FUNCTIONS = {
+    "mean": "mean",
+    "maximum": "maximum",
+    "minimum": "minimum",
+    "median": "median",
+    "standard-deviation": "standard_deviation",
+    "variance": "variance",
+    "population": "population",
+    "missing-count": "missing_count",
+    "sum": "sum",
+    "sum-squares": "sum_squares"}
+
+WINDOW_FUNCTIONS = {
+    "window-mean": lambda window: np.mean(window, axis=0),
+    "avg-window": lambda window: np.mean(window, axis=0),
+    "window-sum": lambda window: np.sum(window, axis=0),
+    "sum-window": lambda window: np.sum(window, axis=0),
+    "window-max": lambda window: np.max(window, axis=0),
+    "window-min": lambda window: np.min(window, axis=0)}
+
+
+def power(base, exponent):
+    """C library power, as used by the interpreter. numpy uses its own
+    algorithms for some exponents, which can differ in the last digit.
+
+    """
+    try:
+        return math.pow(base, exponent)
+    except (ValueError, OverflowError):
+        return np.nan
+
+
+class Symbol(str):
+    """Symbols in a Flatline expression, as opposed to string literals """
+
+
+def parse_lisp(sexp):
+    """Parses a Lisp s-expression into nested lists of symbols and
+    literal values.
+
+    """
+    stack = [[]]
+    position = 0
+    sexp = sexp.strip()
+    while position < len(sexp):
+        match = TOKENS_RE.match(sexp, position)
+        if match is None or match.end() == position:
+            raise UnsupportedFlatline("Cannot parse %s" % sexp)
+        position = match.end()
+        opening, closing, string, atom = match.groups()
+        if opening:
+            stack.append([])
+        elif closing:
+            if len(stack) < 2:
+                raise UnsupportedFlatline("Unbalanced parenthesis in %s" %
+                                          sexp)
+            form = stack.pop()
+            stack[-1].append(form)
+        elif string:
+            try:
+                stack[-1].append(json.loads(string))
+            except ValueError:
+                raise UnsupportedFlatline("Cannot parse string %s" % string)
+        elif atom:
+            stack[-1].append(parse_atom(atom))
+    if len(stack) != 1 or len(stack[0]) != 1:
+        raise UnsupportedFlatline("Cannot parse %s" % sexp)
+    return stack[0][0]
+
+
+def parse_atom(atom):
+    """Numbers, booleans or symbols in an expression """
+    if atom in ["true", "false"]:
+        return atom == "true"
+    for number_type in [int, float]:
+        try:
+            return number_type(atom)
+        except ValueError:
+            pass
+    if atom[0] in "[]{}#'`~@^\\":
+        raise UnsupportedFlatline("Unsupported literal %s" % atom)
+    return Symbol(atom)
+
+
+def numeric_column(column):
+    """Float array and missings mask for the values of a numeric field """
+    try:
+        values = np.array(column, dtype=float)
+    except (TypeError, ValueError):
+        values = np.array([to_float(value) for value in column], dtype=float)
+    return values, np.isnan(values)
+
+
+def to_float(value):
+    """Casts a value to float. Values that are not numbers are missing """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def string_column(column):
+    """Object array and missings mask for the values of a string field """
+    values = np.empty(len(column), dtype=object)
+    values[:] = column
+    return values, np.array([value is None for value in column], dtype=bool)
+
+
+def shift_column(values, missing, shift):
+    """Moves the values of a column so that every row gets the value of the
+    row `shift` positions away. Rows out of the column are missing.
+
+    """
+    if shift == 0:
+        return values, missing
+    size = len(values)
+    shifted = np.full(size, np.nan if values.dtype == float else None,
+                      dtype=values.dtype)
+    shifted_missing = np.ones(size, dtype=bool)
+    if abs(shift) < size:
+        if shift > 0:
+            shifted[:size - shift] = values[shift:]
+            shifted_missing[:size - shift] = missing[shift:]
+        else:
+            shifted[-shift:] = values[:size + shift]
+            shifted_missing[-shift:] = missing[:size + shift]
+    return shifted, shifted_missing
+
+
+def checked(values, missing):
+    """Non-finite numeric results are missing """
+    return values, missing | ~np.isfinite(values)
+
+
+def to_python(values, missing, value_type):
+    """Native Python values for a column, as they are returned by the
+    Flatline interpreter.
+
+    """
+    result = []
+    if value_type == NUMERIC:
+        for value, is_missing in zip(values.tolist(), missing.tolist()):
+            if is_missing:
+                result.append(None)
+            elif value.is_integer() and abs(value) < MAX_EXACT_INT:
+                result.append(int(value))
+            else:
+                result.append(value)
+    elif value_type == BOOLEAN:
+        for value, is_missing in zip(values.tolist(), missing.tolist()):
+            result.append(None if is_missing else
+                          ("true" if value else "false"))
+    else:
+        for value, is_missing in zip(values.tolist(), missing.tolist()):
+            result.append(None if is_missing else value)
+    return result
+
+
+class Frame():
+    """Columns of values the expressions are evaluated on. The arrays for
+    every field are built once per evaluation.
+
+    """
+
+    def __init__(self, columns, size):
+        self.columns = columns
+        self.size = size
+        self.arrays = {}
+
+    def column(self, index, value_type):
+        """Array of values and missings for the field in the index
+        position
+
+        """
+        key = (index, value_type)
+        if key not in self.arrays:
+            column = self.columns[index]
+            self.arrays[key] = numeric_column(column) \
+                if value_type == NUMERIC else string_column(column)
+        return self.arrays[key]
+
+    def constant(self, value, value_type):
+        """Array filled with a constant value """
+        dtype = {NUMERIC: float, BOOLEAN: bool}.get(value_type, object)
+        return np.full(self.size, value, dtype=dtype), \
+            np.zeros(self.size, dtype=bool)
+
+
+class Term():
+    """A compiled subexpression: the type of its values and the function
+    that computes them for a Frame, as a pair of values and missings arrays.
+
+    """
+    __slots__ = ["value_type", "evaluate"]
+
+    def __init__(self, value_type, evaluate):
+        self.value_type = value_type
+        self.evaluate = evaluate
+
+
+class FlatlineCompiler():
+    """Translates parsed Flatline expressions into Terms, using the
+    fields structure to resolve the field references.
+
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        # the values of the fields in input rows are sorted by column number
+        sorted_ids = sorted(fields,
+                            key=lambda field_id: fields[field_id].get(
+                                "column_number", 0))
+        self.indices = {field_id: index for index, field_id in
+                        enumerate(sorted_ids)}
+        self.names = {}
+        self.columns = {}
+        for field_id in sorted_ids:
+            field = fields[field_id]
+            self.names.setdefault(field.get("name"), field_id)
+            self.columns[field.get("column_number")] = field_id
+
+    def field_id(self, designator):
+        """Field ID for a name, ID or column number """
+        if isinstance(designator, bool):
+            raise UnsupportedFlatline("Wrong field designator %s" %
+                                      designator)
+        if isinstance(designator, int):
+            field_id = self.columns.get(designator)
+        elif isinstance(designator, str) and \
+                not isinstance(designator, Symbol):
+            field_id = designator if designator in self.fields else \
+                self.names.get(designator)
+        else:
+            field_id = None
+        if field_id is None:
+            raise UnsupportedFlatline("Unknown field %s" % designator)
+        return field_id
+
+    def field_type(self, field_id):
+        """Type of the values of the field """
+        value_type = OPTYPE_TYPES.get(self.fields[field_id].get("optype"))
+        if value_type is None:
+            raise UnsupportedFlatline("Unsupported field type for %s" %
+                                      field_id)
+        return value_type
+
+    def summary_value(self, designator, key):
+        """Statistic stored in the summary of a numeric field """
+        field_id = self.field_id(designator)
+        if self.field_type(field_id) != NUMERIC:
+            raise UnsupportedFlatline("Non-numeric field %s" % field_id)
+        value = self.fields[field_id].get("summary", {}).get(key)
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise UnsupportedFlatline("No %s available for %s" %
+                                      (key, field_id))
+        return float(value)
+
+    def field_term(self, designator, shift=0):
+        """Values of a field, optionally shifted some rows """
+        field_id = self.field_id(designator)
+        value_type = self.field_type(field_id)
+        index = self.indices[field_id]
+        if not isinstance(shift, int) or isinstance(shift, bool):
+            raise UnsupportedFlatline("Wrong shift %s" % shift)
+
+        def evaluate(frame):
+            values, missing = frame.column(index, value_type)
+            return shift_column(values, missing, shift)
+        return Term(value_type, evaluate)
+
+    def window_terms(self, designator, start, end):
+        """Shifted values of a numeric field, one for each row in the
+        window
+
+        """
+        if not all(isinstance(limit, int) and not isinstance(limit, bool)
+                   for limit in [start, end]) or start > end:
+            raise UnsupportedFlatline("Wrong window limits")
+        terms = [self.field_term(designator, shift) for shift in
+                 range(start, end + 1)]
+        if terms[0].value_type != NUMERIC:
+            raise UnsupportedFlatline("Non-numeric window")
+        return terms
+
+    def compile_outputs(self, form):
+        """Terms for each of the values generated by the top level
+        expression
+
+        """
+        if isinstance(form, list) and form and isinstance(form[0], Symbol):
+            operator, args = form[0], form[1:]
+            if operator == "fields" and args:
+                return [self.field_term(arg) for arg in args]
+            if operator == "window" and len(args) == 3:
+                return self.window_terms(*args)
+            if operator == "diff-window" and len(args) == 3:
+                return self.differences_terms(self.window_terms(*args))
+        return [self.compile(form)]
+
+    @staticmethod
+    def differences_terms(terms):
+        """Differences between the consecutive values of a window """
+
+        def difference(previous, current):
+            def evaluate(frame):
+                previous_values, previous_missing = previous.evaluate(frame)
+                values, missing = current.evaluate(frame)
+                return values - previous_values, missing | previous_missing
+            return Term(NUMERIC, evaluate)
+        return [difference(previous, current) for previous, current in
+                zip(terms[:-1], terms[1:])]
+
+    def compile(self, form):
+        """Term for a single-valued expression """
+        if isinstance(form, bool):
+            return Term(BOOLEAN,
+                        lambda frame: frame.constant(form, BOOLEAN))
+        if isinstance(form, (int, float)):
+            value = float(form)
+            return Term(NUMERIC,
+                        lambda frame: frame.constant(value, NUMERIC))
+        if isinstance(form, Symbol) or not isinstance(form, (str, list)):
+            raise UnsupportedFlatline("Unsupported symbol %s" % form)
+        if isinstance(form, str):
+            return Term(STRING,
+                        lambda frame: frame.constant(form, STRING))
+        if not form or not isinstance(form[0], Symbol):
+            raise UnsupportedFlatline("Unsupported form %s" % form)
+        operator, args = form[0], form[1:]
+        if operator in ["f", "field"] and len(args) in [1, 2]:
+            return self.field_term(*args)
+        if operator in ["missing?", "missing"] and len(args) == 1:
+            return self.missing_term(args[0])
+        if operator in FOLDED_FUNCTIONS:
+            return self.folded_term(operator, args)
+        if operator in UNARY_FUNCTIONS and len(args) == 1:
+            return self.function_term(UNARY_FUNCTIONS[operator], args)
+        if operator in BINARY_FUNCTIONS and len(args) == 2:
+            return self.function_term(BINARY_FUNCTIONS[operator], args)
+        if operator in COMPARISONS and len(args) > 1:
+            return self.comparison_term(COMPARISONS[operator], args)
+        if operator == "!=" and len(args) > 1:
+            return self.not_term(self.comparison_term(np.equal, args))
+        if operator == "not" and len(args) == 1:
+            return self.not_term(self.boolean(args[0]))
+        if operator == "and" and args:
+            return self.and_term(args)
+        if operator == "or" and args:
+            return self.or_term(args)
+        if operator == "if" and len(args) in [2, 3]:
+            return self.if_term(*args)
+        if operator == "cond" and len(args) > 1:
+            return self.cond_term(args)
+        if operator in SUMMARY_FUNCTIONS and len(args) == 1:
+            value = self.summary_value(args[0], SUMMARY_FUNCTIONS[operator])
+            return Term(NUMERIC,
+                        lambda frame: frame.constant(value, NUMERIC))
+        if operator == "normalize" and len(args) in [1, 3]:
+            return self.normalize_term(*args)
+        if operator == "z-score" and len(args) == 1:
+            return self.z_score_term(args[0])
+        if operator in WINDOW_FUNCTIONS and len(args) == 3:
+            return self.window_function_term(WINDOW_FUNCTIONS[operator],
+                                             args)
+        if operator == "row-number" and not args:
+            return Term(NUMERIC, lambda frame: (
+                np.arange(frame.size, dtype=float),
+                np.zeros(frame.size, dtype=bool)))
+        raise UnsupportedFlatline("Unsupported operator %s" % operator)
+
+    def numeric(self, form):
+        """Compiles an expression that must have numeric values """
+        term = self.compile(form)
+        if term.value_type != NUMERIC:
+            raise UnsupportedFlatline("Numeric expression expected")
+        return term
+
+    def boolean(self, form):
+        """Compiles an expression that must have boolean values """
+        term = self.compile(form)
+        if term.value_type != BOOLEAN:
+            raise UnsupportedFlatline("Boolean expression expected")
+        return term
+
+    def missing_term(self, designator):
+        """Checks whether the field values are missing """
+        field_term = self.field_term(designator)
+
+        def evaluate(frame):
+            _, missing = field_term.evaluate(frame)
+            return missing, np.zeros(frame.size, dtype=bool)
+        return Term(BOOLEAN, evaluate)
+
+    def folded_term(self, operator, args):
+        """Arithmetic operations on any number of arguments """
+        function, identity = FOLDED_FUNCTIONS[operator]
+        terms = [self.numeric(arg) for arg in args]
+        if not terms:
+            if identity is None:
+                raise UnsupportedFlatline("Arguments expected for %s" %
+                                          operator)
+            return Term(NUMERIC,
+                        lambda frame: frame.constant(identity, NUMERIC))
+        if len(terms) == 1 and operator in ["-", "/"]:
+            terms.insert(0, self.numeric(0 if operator == "-" else 1))
+
+        def evaluate(frame):
+            values, missing = terms[0].evaluate(frame)
+            with np.errstate(all="ignore"):
+                for term in terms[1:]:
+                    term_values, term_missing = term.evaluate(frame)
+                    values = function(values, term_values)
+                    missing = missing | term_missing
+            return checked(values, missing)
+        return Term(NUMERIC, evaluate)
+
+    def function_term(self, function, args):
+        """Math functions of numeric arguments """
+        terms = [self.numeric(arg) for arg in args]
+
+        def evaluate(frame):
+            results = [term.evaluate(frame) for term in terms]
+            missing = np.logical_or.reduce([term_missing for _, term_missing
+                                            in results])
+            with np.errstate(all="ignore"):
+                values = function(*[values for values, _ in results])
+            return checked(values, missing)
+        return Term(NUMERIC, evaluate)
+
+    def comparison_term(self, function, args):
+        """Chained comparisons between numbers or between strings. Only
+        equality can be checked for strings.
+
+        """
+        terms = [self.compile(arg) for arg in args]
+        value_type = terms[0].value_type
+        if any(term.value_type != value_type for term in terms) or \
+                value_type == BOOLEAN or \
+                (value_type == STRING and function is not np.equal):
+            raise UnsupportedFlatline("Wrong comparison types")
+
+        def evaluate(frame):
+            results = [term.evaluate(frame) for term in terms]
+            values = np.ones(frame.size, dtype=bool)
+            missing = np.zeros(frame.size, dtype=bool)
+            for (left, left_missing), (right, right_missing) in zip(
+                    results[:-1], results[1:]):
+                values &= function(left, right).astype(bool)
+                missing |= left_missing | right_missing
+            return values, missing
+        return Term(BOOLEAN, evaluate)
+
+    @staticmethod
+    def not_term(term):
+        """Negation. Missing values are negated to true """
+
+        def evaluate(frame):
+            values, missing = term.evaluate(frame)
+            return ~values | missing, np.zeros(frame.size, dtype=bool)
+        return Term(BOOLEAN, evaluate)
+
+    def and_term(self, args):
+        """Conjunction. The first argument that is false or missing decides
+        the result.
+
+        """
+        terms = [self.boolean(arg) for arg in args]
+
+        def evaluate(frame):
+            missing = np.zeros(frame.size, dtype=bool)
+            pending = np.ones(frame.size, dtype=bool)
+            for term in terms:
+                term_values, term_missing = term.evaluate(frame)
+                missing |= pending & term_missing
+                pending &= term_values & ~term_missing
+            return pending, missing
+        return Term(BOOLEAN, evaluate)
+
+    def or_term(self, args):
+        """Disjunction. Missing values count as false """
+        terms = [self.boolean(arg) for arg in args]
+
+        def evaluate(frame):
+            values = np.zeros(frame.size, dtype=bool)
+            for term in terms:
+                term_values, term_missing = term.evaluate(frame)
+                values |= term_values & ~term_missing
+            return values, np.zeros(frame.size, dtype=bool)
+        return Term(BOOLEAN, evaluate)
+
+    def if_term(self, condition, then_form, else_form=None):
+        """Conditional. Missing conditions give missing results """
+        condition_term = self.boolean(condition)
+        then_term = self.compile(then_form)
+        value_type = then_term.value_type
+        else_term = None
+        if else_form is not None:
+            else_term = self.compile(else_form)
+            if else_term.value_type != value_type:
+                raise UnsupportedFlatline("Branches of different types")
+        return self.choice_term(condition_term, then_term, else_term)
+
+    def cond_term(self, args):
+        """Chained conditionals, with an optional default value """
+        if len(args) < 4:
+            return self.if_term(*args)
+        return self.choice_term(self.boolean(args[0]),
+                                self.compile(args[1]),
+                                self.cond_term(args[2:]))
+
+    @staticmethod
+    def choice_term(condition_term, then_term, else_term):
+        """Values from one term or the other depending on a condition """
+        value_type = then_term.value_type
+        if else_term is not None and else_term.value_type != value_type:
+            raise UnsupportedFlatline("Branches of different types")
+
+        def evaluate(frame):
+            condition, condition_missing = condition_term.evaluate(frame)
+            values, missing = then_term.evaluate(frame)
+            if else_term is None:
+                else_values, else_missing = frame.constant(
+                    None if value_type == STRING else 0, value_type)
+                else_missing = ~else_missing
+            else:
+                else_values, else_missing = else_term.evaluate(frame)
+            values = np.where(condition, values, else_values)
+            missing = np.where(condition, missing, else_missing)
+            return values, missing | condition_missing
+        return Term(value_type, evaluate)
+
+    def normalize_term(self, designator, lower=0, upper=1):
+        """Linear transformation of the field values from their range
+        into [lower, upper]
+
+        """
+        if not all(isinstance(limit, (int, float)) and
+                   not isinstance(limit, bool) for limit in [lower, upper]):
+            raise UnsupportedFlatline("Wrong normalization limits")
+        minimum = self.summary_value(designator, "minimum")
+        maximum = self.summary_value(designator, "maximum")
+        field_term = self.field_term(designator)
+
+        def evaluate(frame):
+            values, missing = field_term.evaluate(frame)
+            with np.errstate(all="ignore"):
+                values = (values - minimum) / (maximum - minimum) * \
+                    (upper - lower) + lower
+            return checked(values, missing)
+        return Term(NUMERIC, evaluate)
+
+    def z_score_term(self, designator):
+        """Standardized field values """
+        mean = self.summary_value(designator, "mean")
+        deviation = self.summary_value(designator, "standard_deviation")
+        field_term = self.field_term(designator)
+
+        def evaluate(frame):
+            values, missing = field_term.evaluate(frame)
+            with np.errstate(all="ignore"):
+                values = (values - mean) / deviation
+            return checked(values, missing)
+        return Term(NUMERIC, evaluate)
+
+    def window_function_term(self, function, args):
+        """Aggregation of the values in a window of rows. Any missing value
+        in the window makes the result missing.
+
+        """
+        terms = self.window_terms(*args)
+
+        def evaluate(frame):
+            results = [term.evaluate(frame) for term in terms]
+            window = np.array([values for values, _ in results])
+            missing = np.logical_or.reduce([term_missing for _, term_missing
+                                            in results])
+            with np.errstate(all="ignore"):
+                values = function(window)
+            return checked(values, missing)
+        return Term(NUMERIC, evaluate)
+
+
+class FlatlineExpression():
+    """A Flatline expression compiled to be evaluated natively on columns
+    of values.
+
+    """
+
+    def __init__(self, sexp, fields):
+        self.sexp = sexp
+        self.terms = FlatlineCompiler(fields).compile_outputs(
+            parse_lisp(sexp))
+
+    def evaluate(self, columns, size):
+        """Computes the values generated by the expression given the
+        columns of input values, sorted as the fields by column number.
+        Returns one list of values per output.
+
+        """
+        frame = Frame(columns, size)
+        return [to_python(*term.evaluate(frame), term.value_type)
+                for term in self.terms]
+
+    def apply(self, rows):
+        """Applies the expression to a list of input rows and returns the
+        list of values generated for each row, like
+        `Flatline.apply_lisp` does.
+
+        """
+        if not rows:
+            return []
+        columns = [list(column) for column in zip(*rows)]
+        return [list(row) for row in zip(*self.evaluate(columns, len(rows)))]
+
+
+def compile_lisp(sexp, fields):
+    """Compiles a Lisp Flatline expression for the given fields structure.
+    Raises UnsupportedFlatline if it cannot be evaluated natively.
+
+    """
+    return FlatlineExpression(sexp, fields)
+
+
+def supported(sexp, fields):
+    """Checks whether the expression can be evaluated natively """
+    try:
+        compile_lisp(sexp, fields)
+        return True
+    except UnsupportedFlatline:
+        return False
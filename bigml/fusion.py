@@ -49,11 +49,12 @@ from bigml.model import parse_operating_point, sort_categories
 from bigml.model import LAST_PREDICTION
 from bigml.basemodel import get_resource_dict
 from bigml.multivotelist import MultiVoteList
-from bigml.util import cast, check_no_missing_numerics, use_cache, load, \
+from bigml.util import check_no_missing_numerics, use_cache, load, \
     dump, dumps, NUMERIC
 from bigml.constants import DECIMALS
 from bigml.supervised import SupervisedModel
 from bigml.modelfields import ModelFields
+from bigml.modelcache import ModelCache
 from bigml.tree_utils import add_distribution
 
 
@@ -111,6 +112,46 @@ def get_models_weight(models_info):
         raise ValueError("Failed to find the models in the fusion info.")
 
 
+def component_prediction(model, input_data,
+                         missing_strategy=LAST_PREDICTION, confidence=True):
+    """Evaluates one of the models in the fusion and returns both the compact
+    list of probabilities and the list of confidences (or None when
+    the model provides no confidence). The model is evaluated only once
+    whenever both outputs can be derived from the same prediction.
+
+    """
+    model_type = get_resource_type(model.resource_id)
+    local_model = getattr(model, "local_model", model)
+    if model_type in ["logisticregression", "deepnet"]:
+        # their confidences are the probabilities
+        prediction = local_model.predict_probability(input_data,
+                                                     compact=False)
+        if not isinstance(prediction, list):
+            # regression deepnets
+            return [prediction["prediction"]], prediction
+        return [category["probability"] for category in prediction], \
+            [{"category": category["category"],
+              "confidence": category["probability"]}
+             for category in prediction]
+    if confidence and model_type in ["model", "ensemble", "fusion"]:
+        return local_model.predict_probability_confidence( \
+            input_data, missing_strategy=missing_strategy)
+    kwargs = {"compact": True}
+    if model_type in ["model", "ensemble", "fusion"]:
+        kwargs.update({"missing_strategy": missing_strategy})
+    probability = local_model.predict_probability(input_data, **kwargs)
+    model_confidence = None
+    if confidence:
+        kwargs.update({"compact": False})
+        try:
+            model_confidence = local_model.predict_confidence( \
+                input_data, **kwargs)
+        except Exception:
+            # Linear Regressions and boosted models have no confidence
+            pass
+    return probability, model_confidence
+
+
 class Fusion(ModelFields):
     """A local predictive Fusion.
 
@@ -129,16 +170,27 @@ class Fusion(ModelFields):
                   information describing the model or the corresponding
                   Model object. Can be used to read these objects from a
                   cache storage.
+       max_bytes: integer that limits the memory (in bytes) used to keep
+                  the models instantiated when max_models is set. The models
+                  are then reused across predictions and the least recently
+                  used ones are discarded when the limit is exceeded.
     """
+    # the models cache is built at runtime, but the packed format keeps the
+    # cached models
+    RUNTIME_ATTRS = ModelFields.RUNTIME_ATTRS + ("models_cache",)
+    PACKED_ATTRS = ("models_cache",)
 
     def __init__(self, fusion, api=None, max_models=None, cache_get=None,
-                 operation_settings=None):
+                 operation_settings=None, max_bytes=None):
 
         if use_cache(cache_get):
             # using a cache to store the model attributes
             self.__dict__ = load(get_fusion_id(fusion), cache_get)
             self.api = get_api_connection(api)
             self.operation_settings = operation_settings
+            self.models_cache = None
+            if len(self.models_splits) == 1 or max_bytes is not None:
+                self.models_cache = ModelCache(max_bytes)
             return
 
         self.resource_id = None
@@ -153,6 +205,7 @@ class Fusion(ModelFields):
         self.fields = None
         self.class_names = None
         self.importance = {}
+        self.models_cache = None
         self.api = get_api_connection(api)
 
         self.resource_id, fusion = get_resource_dict( \
@@ -213,6 +266,10 @@ class Fusion(ModelFields):
             self.models_splits = [self.model_ids[index:(index + max_models)]
                                   for index
                                   in range(0, number_of_models, max_models)]
+        if max_models is None or max_bytes is not None:
+            # models are instantiated once and kept in memory (while the
+            # max_bytes limit allows it)
+            self.models_cache = ModelCache(max_bytes)
 
 
         ModelFields.__init__( \
@@ -243,56 +300,58 @@ class Fusion(ModelFields):
         """
         return self.model_ids
 
-    def predict_probability(self, input_data,
-                            missing_strategy=LAST_PREDICTION,
-                            compact=False):
+    def _build_model(self, model_id):
+        """Builds the local model for one of the models in the fusion """
+        if get_resource_type(model_id) == "fusion":
+            return Fusion(model_id, api=self.api)
+        return SupervisedModel(model_id, api=self.api)
 
-        """For classification models, Predicts a probability for
-        each possible output class, based on input values.  The input
-        fields must be a dictionary keyed by field name or field ID.
+    def _get_model(self, model_id):
+        """Returns the local model for one of the models in the fusion,
+        reusing the ones kept in the models cache.
 
-        For regressions, the output is a single element
-        containing the prediction.
+        """
+        if self.models_cache is None:
+            return self._build_model(model_id)
+        return self.models_cache.get(model_id, self._build_model)
+
+    def _component_predictions(self, input_data,
+                               missing_strategy=LAST_PREDICTION,
+                               confidence=True):
+        """Evaluates each of the models in the fusion only once and
+        returns the weighted compact probabilities and the confidences
+        that they produce, together with the weights of the models that
+        contributed to each of them.
 
-        :param input_data: Input data to be predicted
-        :param missing_strategy: LAST_PREDICTION|PROPORTIONAL missing strategy
-                                 for missing fields
-        :param compact: If False, prediction is returned as a list of maps, one
-                        per class, with the keys "prediction" and "probability"
-                        mapped to the name of the class and it's probability,
-                        respectively.  If True, returns a list of probabilities
-                        ordered by the sorted order of the class names.
         """
-        votes = MultiVoteList([])
         if not self.missing_numerics:
             check_no_missing_numerics(input_data, self.model_fields)
 
+        votes = MultiVoteList([])
         weights = []
+        confidences = []
+        confidence_weights = []
         for models_split in self.models_splits:
-            models = []
-            for model in models_split:
-                model_type = get_resource_type(model)
-                if model_type == "fusion":
-                    models.append(Fusion(model, api=self.api))
-                else:
-                    models.append(SupervisedModel(model, api=self.api))
+            models = [self._get_model(model_id) for model_id in models_split]
             votes_split = []
             for model in models:
                 try:
-                    kwargs = {"compact": True}
-                    if model_type in ["model", "ensemble", "fusion"]:
-                        kwargs.update({"missing_strategy": missing_strategy})
-                    prediction = model.predict_probability( \
-                        input_data, **kwargs)
+                    prediction, model_confidence = component_prediction( \
+                        model, input_data, missing_strategy=missing_strategy,
+                        confidence=confidence)
                 except ValueError:
                     # logistic regressions can raise this error if they
                     # have missing_numerics=False and some numeric missings
                     # are found
                     continue
+                weight = self.weights[self.model_ids.index(
+                    model.resource_id)]
+                if model_confidence is not None:
+                    confidences.append(model_confidence)
+                    confidence_weights.append(weight)
                 if self.regression:
                     prediction = prediction[0]
-                weights.append(self.weights[self.model_ids.index(
-                    model.resource_id)])
+                weights.append(weight)
                 prediction = self.weigh(prediction, model.resource_id)
                 # we need to check that all classes in the fusion
                 # are also in the composing model
@@ -308,10 +367,38 @@ class Fusion(ModelFields):
                         pass
                 votes_split.append(prediction)
             votes.extend(votes_split)
+        return votes, weights, confidences, confidence_weights
+
+    def predict_probability(self, input_data,
+                            missing_strategy=LAST_PREDICTION,
+                            compact=False):
+
+        """For classification models, Predicts a probability for
+        each possible output class, based on input values.  The input
+        fields must be a dictionary keyed by field name or field ID.
+
+        For regressions, the output is a single element
+        containing the prediction.
+
+        :param input_data: Input data to be predicted
+        :param missing_strategy: LAST_PREDICTION|PROPORTIONAL missing strategy
+                                 for missing fields
+        :param compact: If False, prediction is returned as a list of maps, one
+                        per class, with the keys "prediction" and "probability"
+                        mapped to the name of the class and it's probability,
+                        respectively.  If True, returns a list of probabilities
+                        ordered by the sorted order of the class names.
+        """
+        votes, weights, _, _ = self._component_predictions( \
+            input_data, missing_strategy=missing_strategy, confidence=False)
+        return self._combine_probabilities(votes, weights, compact=compact)
+
+    def _combine_probabilities(self, votes, weights, compact=False):
+        """Combining the weighted probabilities of the models"""
         if self.regression:
             prediction = 0
             total_weight = sum(weights)
-            for index, pred in enumerate(votes.predictions):
+            for pred in votes.predictions.tolist():
                 prediction += pred # the weight is already considered in pred
             if total_weight > 0:
                 prediction /= float(total_weight)
@@ -353,37 +440,14 @@ class Fusion(ModelFields):
                         respectively.  If True, returns a list of confidences
                         ordered by the sorted order of the class names.
         """
-        if not self.missing_numerics:
-            check_no_missing_numerics(input_data, self.model_fields)
-
-        predictions = []
-        weights = []
-        for models_split in self.models_splits:
-            models = []
-            for model in models_split:
-                model_type = get_resource_type(model)
-                if model_type == "fusion":
-                    models.append(Fusion(model, api=self.api))
-                else:
-                    models.append(SupervisedModel(model, api=self.api))
-            votes_split = []
-            for model in models:
-                try:
-                    kwargs = {"compact": False}
-                    if model_type in ["model", "ensemble", "fusion"]:
-                        kwargs.update({"missing_strategy": missing_strategy})
-                    prediction = model.predict_confidence( \
-                        input_data, **kwargs)
-                except Exception as exc:
-                    # logistic regressions can raise this error if they
-                    # have missing_numerics=False and some numeric missings
-                    # are found and Linear Regressions have no confidence
-                    continue
-                predictions.append(prediction)
-                weights.append(self.weights[self.model_ids.index(
-                    model.resource_id)])
-                if self.regression:
-                    prediction = prediction["prediction"]
+        _, _, predictions, weights = self._component_predictions( \
+            input_data, missing_strategy=missing_strategy)
+        return self._combine_predicted_confidences(predictions, weights,
+                                                   compact=compact)
+
+    def _combine_predicted_confidences(self, predictions, weights,
+                                       compact=False):
+        """Combining the confidences of the models"""
         if self.regression:
             prediction = 0
             confidence = 0
@@ -421,6 +485,31 @@ class Fusion(ModelFields):
             output.append(round(confidence / count, DECIMALS))
         return output
 
+    def predict_probability_confidence(self, input_data,
+                                       missing_strategy=LAST_PREDICTION):
+        """Computes the probabilities and the confidences for the input data
+        evaluating each model in the fusion only once. The result is a tuple
+        that contains the same outputs as `predict_probability(compact=True)`
+        and `predict_confidence(compact=False)`. Confidences are None when
+        no model in the fusion provides them.
+
+        :param input_data: Input data to be predicted
+        :param missing_strategy: LAST_PREDICTION|PROPORTIONAL missing strategy
+                                 for missing fields
+        """
+        votes, weights, predictions, confidence_weights = \
+            self._component_predictions( \
+            input_data, missing_strategy=missing_strategy)
+        probabilities = self._combine_probabilities(votes, weights,
+                                                    compact=True)
+        try:
+            confidences = self._combine_predicted_confidences( \
+                predictions, confidence_weights)
+        except (TypeError, ZeroDivisionError):
+            # no model in the fusion has an associated confidence
+            confidences = None
+        return probabilities, confidences
+
     def weigh(self, prediction, model_id):
         """Weighs the prediction according to the weight associated to the
         current model in the fusion.
@@ -470,7 +559,7 @@ class Fusion(ModelFields):
 
         # Checks and cleans input_data leaving the fields used in the model
         unused_fields = []
-        new_data = self.filter_input_data( \
+        new_data = self.normalize_input_data( \
             input_data,
             add_unused_fields=full)
         if full:
@@ -481,9 +570,6 @@ class Fusion(ModelFields):
         if not self.missing_numerics:
             check_no_missing_numerics(input_data, self.model_fields)
 
-        # Strips affixes for numeric values and casts to the final field type
-        cast(input_data, self.fields)
-
         full_prediction = self._predict( \
             input_data, missing_strategy=missing_strategy,
             operating_point=operating_point,
@@ -516,26 +602,28 @@ class Fusion(ModelFields):
                 missing_strategy=missing_strategy,
                 operating_point=operating_point)
             return prediction
-        result = self.predict_probability( \
-            input_data,
-            missing_strategy=missing_strategy,
-            compact=False)
-        confidence_result = self.predict_confidence( \
-            input_data,
-            missing_strategy=missing_strategy,
-            compact=False)
+        # each model is evaluated once to compute both the probabilities
+        # and the confidences
+        votes, weights, predictions, confidence_weights = \
+            self._component_predictions( \
+            input_data, missing_strategy=missing_strategy)
+        result = self._combine_probabilities(votes, weights)
 
         if not self.regression:
             try:
+                confidence_result = self._combine_predicted_confidences( \
+                    predictions, confidence_weights)
                 for index, value in enumerate(result):
                     result[index].update(
                         {"confidence": confidence_result[index]["confidence"]})
-            except Exception as exc:
+            except Exception:
                 pass
             result = sorted(result, key=lambda x: - x["probability"])[0]
             result["prediction"] = result["category"]
             del result["category"]
         else:
+            confidence_result = self._combine_predicted_confidences( \
+                predictions, confidence_weights)
             result.update(
                 {"confidence": confidence_result["confidence"]})
 
@@ -559,8 +647,10 @@ class Fusion(ModelFields):
         kind, threshold, positive_class = parse_operating_point( \
             operating_point, OPERATING_POINT_KINDS, self.class_names,
             self.operation_settings)
-        predictions = self.predict_probability(input_data,
-                                               missing_strategy, False)
+        # confidences are not needed to decide using probabilities
+        votes, weights, _, _ = self._component_predictions( \
+            input_data, missing_strategy=missing_strategy, confidence=False)
+        predictions = self._combine_probabilities(votes, weights)
 
         position = self.class_names.index(positive_class)
         if predictions[position][kind] > threshold:
@@ -595,14 +685,15 @@ class Fusion(ModelFields):
         If cache_set is filled with a cache set method, the method is called
 
         """
-        self_vars = vars(self)
+        self_vars = vars(self).copy()
         del self_vars["api"]
-        dump(self_vars, output=output, cache_set=cache_set)
+        dump(self_vars, output=output, cache_set=cache_set,
+             runtime_attrs=self.RUNTIME_ATTRS)
 
     def dumps(self):
         """Uses msgpack to serialize the resource object to a string
 
         """
-        self_vars = vars(self)
+        self_vars = vars(self).copy()
         del self_vars["api"]
-        dumps(self_vars)
+        dumps(self_vars, runtime_attrs=self.RUNTIME_ATTRS)
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Metrics of the HTTP requests sent to BigML.
+
+The connection reports every request it sends, the retries, the throttling
+(429) responses and the time spent waiting between requests to the hooks
+registered in it. Throttled requests are only counted: they are neither
+retried nor delayed. Hooks are objects that implement the methods of the
+RequestHook class, so they can feed any monitoring system. The
+RequestMetrics hook aggregates the metrics in memory:
+
+from bigml.api import BigML
+from bigml.httpmetrics import RequestMetrics
+
+metrics = RequestMetrics()
+api = BigML(metrics_hooks=[metrics])
+model = api.create_model("dataset/5143a51a37203f2cf7000972")
+api.ok(model)
+print(metrics.stats())
+
+"""
+import threading
+
+from urllib import parse
+
+from bigml.profiling import Histogram
+
+HTTP_TOO_MANY_REQUESTS = 429
+
+# sources of the waiting time between requests
+CHECK_RESOURCE = "check_resource"
+DOWNLOAD = "download"
+TRANSIENT_ERROR = "transient_error"
+
+
+def url_resource_type(url, base_urls=None):
+    """Returns the type of resource that the URL refers to: the first
+    segment of the path after the base URL (e.g. `model`).
+
+    """
+    path = url
+    for base_url in base_urls or []:
+        if base_url and url.startswith(base_url):
+            path = url[len(base_url):]
+            break
+    else:
+        path = parse.urlparse(url).path
+    segments = [segment for segment in path.split("/") if segment]
+    return segments[0] if segments else None
+
+
+def content_length(contents):
+    """Number of bytes of the body of a request or response """
+    if contents is None:
+        return 0
+    if isinstance(contents, str):
+        return len(contents.encode("utf-8"))
+    if isinstance(contents, (bytes, bytearray)):
+        return len(contents)
+    # streaming encoders, like the multipart one, know their length
+    return getattr(contents, "len", 0)
+
+
+class RequestHook():
+    """Interface of the hooks that receive the metrics of the requests.
+    All the methods do nothing, so subclasses only need to implement the
+    ones they use.
+
+    """
+
+    def on_request(self, method, resource_type, status_code, latency,
+                   bytes_sent, bytes_received):
+        """Called after every request.
+
+        :param method: HTTP method (GET, POST, PUT, DELETE)
+        :param resource_type: type of the resource in the URL, like `model`
+        :param status_code: HTTP status code of the response, or None if
+                            the request failed with no response
+        :param latency: seconds until the response was received
+        :param bytes_sent: size of the request body
+        :param bytes_received: size of the response body
+        """
+
+    def on_retry(self, method, resource_type, reason):
+        """Called when a request is repeated.
+
+        :param method: HTTP method
+        :param resource_type: type of the resource in the URL
+        :param reason: cause of the retry: `accepted` (a 202 answer to a
+                       create request), `not_finished` or
+                       `incomplete_download` (downloads) or
+                       `transient_error`
+        """
+
+    def on_throttled(self, method, resource_type):
+        """Called when the API answers with a 429 (Too Many Requests)
+        status code. The connection does not retry throttled requests nor
+        wait after them: the error is returned to the caller, so no retry
+        or sleep is reported for them.
+
+        """
+
+    def on_sleep(self, source, seconds):
+        """Called when the client waits before the next request.
+
+        :param source: what the client is waiting for: `check_resource`,
+                       `download` or `transient_error`
+        :param seconds: time to wait
+        """
+
+
+class RequestMetrics(RequestHook):
+    """Hook that aggregates the request metrics in memory """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Removes all the recorded metrics """
+        with self.lock:
+            self.latencies = {}
+            self.status_codes = {}
+            self.bytes_sent = 0
+            self.bytes_received = 0
+            self.retries = {}
+            self.throttled = 0
+            self.sleeps = {}
+
+    def on_request(self, method, resource_type, status_code, latency,
+                   bytes_sent, bytes_received):
+        key = "%s %s" % (method, resource_type)
+        with self.lock:
+            histogram = self.latencies.get(key)
+            if histogram is None:
+                histogram = Histogram()
+                self.latencies[key] = histogram
+            histogram.add(latency)
+            self.status_codes[status_code] = \
+                self.status_codes.get(status_code, 0) + 1
+            self.bytes_sent += bytes_sent
+            self.bytes_received += bytes_received
+
+    def on_retry(self, method, resource_type, reason):
+        key = "%s %s" % (method, resource_type)
+        with self.lock:
+            self.retries[key] = self.retries.get(key, 0) + 1
+
+    def on_throttled(self, method, resource_type):
+        with self.lock:
+            self.throttled += 1
+
+    def on_sleep(self, source, seconds):
+        with self.lock:
+            count, total = self.sleeps.get(source, (0, 0.0))
+            self.sleeps[source] = (count + 1, total + seconds)
+
+    def stats(self):
+        """Returns the summary of the metrics: the latency histograms keyed
+        by method and resource type, the number of responses per status code,
+        the bytes sent and received, the retries, the number of throttled
+        requests and the count and total time of the waits per source.
+
+        """
+        with self.lock:
+            return {
+                "latency": {key: histogram.to_dict() for key, histogram
+                            in sorted(self.latencies.items())},
+                "status_codes": dict(self.status_codes),
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "retries": dict(self.retries),
+                "throttled": self.throttled,
+                "sleep": {source: {"count": count, "total": total}
+                          for source, (count, total)
+                          in self.sleeps.items()}}
+
+
+def report_sleep(api, source, seconds):
+    """Reports a wait to the hooks of the connection, if any """
+    for hook in getattr(api, "metrics_hooks", None) or []:
+        hook.on_sleep(source, seconds)
+
+
+def report_retry(api, method, resource_type, reason):
+    """Reports a retry to the hooks of the connection, if any """
+    for hook in getattr(api, "metrics_hooks", None) or []:
+        hook.on_retry(method, resource_type, reason)
@@ -22,10 +22,16 @@ images in BigML. They are used in Modefields to extend the original input
 data provided for local predictions.
 
 """
+import io
 import os
 import math
+import json
+import threading
 import numpy as np
 
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+
 
 from PIL import Image
 from sensenet.models.wrappers import create_image_feature_extractor
@@ -43,6 +49,13 @@ DECOMPS = ["horizontal", "diagonal", "vertical"]
 PRETRAINED = "pretrained_cnn"
 WAVELET = "wavelet_subbands"
 
+# pretrained CNN feature extractors shared by all the featurizers in the
+# process, keyed by CNN name and settings
+PRETRAINED_EXTRACTORS = {}
+PRETRAINED_LOCK = threading.Lock()
+# rows whose images are decoded at once when extending lists of inputs
+IMAGES_CHUNK_SIZE = 64
+
 def resize_to(image, top_size=TOP_SIZE):
     """Resizing the image to a maximum width or height """
     width, height = image.size
@@ -58,6 +71,143 @@ def resize_to(image, top_size=TOP_SIZE):
     return image
 
 
+class DecodedImage():
+    """An image decoded once for all the extractors of an image field.
+    The image can be given as a file path, the bytes of an encoded image, a
+    PIL Image or an array of pixels. The resized image, its pixels and
+    its luminance are computed the first time an extractor needs them.
+
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.cnn_features = {}
+
+    @cached_property
+    def image(self):
+        """Decoded PIL Image """
+        if isinstance(self.source, Image.Image):
+            return self.source
+        if isinstance(self.source, (bytes, bytearray)):
+            return Image.open(io.BytesIO(self.source))
+        if isinstance(self.source, np.ndarray):
+            return Image.fromarray(self.source)
+        return Image.open(self.source)
+
+    @cached_property
+    def file_size(self):
+        """Size of the encoded image. None for decoded images """
+        if isinstance(self.source, (bytes, bytearray)):
+            return len(self.source)
+        if isinstance(self.source, (str, os.PathLike)):
+            return os.stat(self.source).st_size
+        return None
+
+    @cached_property
+    def pixels(self):
+        """Array of pixels of the resized image, in its original mode """
+        return np.array(resize_to(self.image))
+
+    @cached_property
+    def rgb_pixels(self):
+        """Array of pixels of the resized image, converted to RGB """
+        if self.image.mode == "RGB":
+            return self.pixels
+        return np.array(resize_to(self.image.convert('RGB')))
+
+    @cached_property
+    def luminance(self):
+        """Luminance of the resized RGB image """
+        return get_luminance(self.rgb_pixels)
+
+    @cached_property
+    def cnn_input(self):
+        """Input for the pretrained CNN feature extractors: the file path or
+        the array of RGB pixels for in-memory images
+
+        """
+        if isinstance(self.source, (str, os.PathLike)):
+            return self.source
+        return np.array(self.image.convert('RGB'))
+
+    def close(self):
+        """Closes the decoded image and drops the arrays computed from it.
+        The features extracted by pretrained CNNs are kept.
+
+        """
+        image = self.__dict__.pop("image", None)
+        if image is not None and image is not self.source:
+            image.close()
+        for attr in ["pixels", "rgb_pixels", "luminance", "cnn_input"]:
+            self.__dict__.pop(attr, None)
+
+
+def decoded(image_file):
+    """Returns the DecodedImage for a file path or in-memory image """
+    if isinstance(image_file, DecodedImage):
+        return image_file
+    return DecodedImage(image_file)
+
+
+def get_pretrained_extractor(cnn_name, settings=None):
+    """Returns the feature extractor for the pretrained CNN. It is created
+    only once per process for each CNN name and settings.
+
+    """
+    key = (cnn_name, json.dumps(settings, sort_keys=True))
+    with PRETRAINED_LOCK:
+        if key not in PRETRAINED_EXTRACTORS:
+            PRETRAINED_EXTRACTORS[key] = create_image_feature_extractor(
+                cnn_name, settings)
+        return PRETRAINED_EXTRACTORS[key]
+
+
+def pretrained_features(images, cnn_name, settings=None):
+    """Computes the features that the pretrained CNN extracts from a list
+    of images. The images that were not previously featurized are sent to
+    the extractor in a single batch and the features are stored in
+    each DecodedImage.
+
+    """
+    images = [decoded(image) for image in images]
+    pending = [image for image in images
+               if cnn_name not in image.cnn_features]
+    if pending:
+        extractor = get_pretrained_extractor(cnn_name, settings)
+        features = None
+        if len(pending) > 1:
+            try:
+                features = list(extractor(
+                    [image.cnn_input for image in pending]))
+            except (TypeError, ValueError):
+                features = None
+            if features is not None and len(features) != len(pending):
+                features = None
+        if features is None:
+            # extracting image by image
+            features = [list(extractor(image.cnn_input))[0]
+                        for image in pending]
+        for image, image_features in zip(pending, features):
+            image.cnn_features[cnn_name] = list(image_features)
+    return [image.cnn_features[cnn_name] for image in images]
+
+
+def pretrained_extractor(image_file, cnn_name, settings=None):
+    """Pretrained CNN feature extractor """
+    return pretrained_features([image_file], cnn_name, settings)[0]
+
+
+def get_pretrained_cnns(res_object, field_id):
+    """Returns the names of the pretrained CNNs used to extract features from
+    an image field
+
+    """
+    extracted_features = res_object.fields[field_id].get(
+        "image_analysis", {}).get("extracted_features") or []
+    return [feature[1] for feature in extracted_features
+            if isinstance(feature, list) and feature[0] == PRETRAINED]
+
+
 def grid_coords(image_a, grid_size):
     """ getting the start and end positions for each grid """
     try:
@@ -82,20 +232,18 @@ def dimensions_extractor(image_file):
     """Returns the features related to the image dimensions:
        file size, width, height, aspect ratio
     """
-    file_size = os.stat(image_file).st_size
-    image = Image.open(image_file)
-    width, height = image.size
+    image = decoded(image_file)
+    file_size = image.file_size
+    width, height = image.image.size
     aspect_ratio = width / float(height)
     return [file_size, width, height, aspect_ratio]
 
 
 def average_pixels_extractor(image_file):
     """ Averaging pixels for the entire image, 3x3 and 4x4 grids
-    The image passed as argument should already be resized to 512 max
+    The image is resized to 512 max
     """
-    image = Image.open(image_file)
-    image = resize_to(image)
-    image_a = np.array(image)
+    image_a = decoded(image_file).pixels
     avg_pixels =  [np.average(image_a[:, :, n]) for n in range(0, 3)]
     coords = grid_coords(image_a, 3)
     coords.extend(grid_coords(image_a, 4))
@@ -123,58 +271,42 @@ def get_luminance(image_a):
 
 def level_histogram_extractor(image_file):
     """Level histogram feature extractor."""
-    image = Image.open(image_file)
-    image = resize_to(image)
-    image_a = np.array(image)
+    image_a = decoded(image_file).pixels
     height, width, _ = image_a.shape
     pixels_per_channel = width * height
-    output = [0] * 3 * N_BINS
+    output = []
     for c in range(0, 3):
-        offset = N_BINS * c
-        for h in range(0, height):
-            for w in range(0, width):
-                bin_index = get_bin(image_a[h][w][c], BIN_WIDTH)
-                output[bin_index + offset] += 1
-    for index, _ in enumerate(output):
-        output[index] /= pixels_per_channel
-
+        bins = np.floor(image_a[:, :, c] / BIN_WIDTH).astype(int)
+        counts = np.bincount(bins.ravel(), minlength=N_BINS)
+        output.extend((counts / pixels_per_channel).tolist())
     return output
 
 
-def HOG_transform(image_a):
-    """Histogram of Gradients transformation."""
-    image_l = get_luminance(image_a)
+def HOG_transform(image_a, image_l=None):
+    """Histogram of Gradients transformation. The luminance of the image
+    can be provided if it was previously computed."""
+    if image_l is None:
+        image_l = get_luminance(image_a)
     height, width = image_l.shape
     if height > 2 and width > 2:
+        x_edge = image_l[1: -1, : -2] - image_l[1: -1, 2:]
+        y_edge = image_l[: -2, 1: -1] - image_l[2:, 1: -1]
         trans_image = np.empty(((height - 2), (width - 2), 2))
-        trans_image.astype('d')
-        for y in range(0, (height - 2)):
-            for x in range(0, (width - 2)):
-                py = y + 1
-                px = x + 1
-                x_edge = image_l[py][x] - image_l[py][px + 1]
-                y_edge = image_l[y][px] - image_l[py + 1][px]
-
-                trans_image[y][x][0] = math.sqrt(
-                    x_edge * x_edge + y_edge * y_edge)
-
-                # Convert to zero - pi radians
-                if x_edge == 0:
-                    if y_edge > 0:
-                        trans_image[y][x][1] = np.pi
-                    elif y_edge < 0:
-                        trans_image[y][x][1] = 0
-                    else:
-                        trans_image[y][x][1] = np.nan
-                else:
-                    trans_image[y][x][1] = math.atan(
-                        y_edge / x_edge) + (np.pi / 2)
+        trans_image[:, :, 0] = np.sqrt(x_edge * x_edge + y_edge * y_edge)
+
+        # Convert to zero - pi radians
+        angles = np.where(y_edge > 0, np.pi, np.where(y_edge < 0, 0, np.nan))
+        non_zero = x_edge != 0
+        ratios = y_edge[non_zero] / x_edge[non_zero]
+        # math.atan is used as numpy's arctan can differ in the last digit
+        angles[non_zero] = np.fromiter(map(math.atan, ratios.tolist()),
+                                       dtype=float,
+                                       count=len(ratios)) + (np.pi / 2)
+        trans_image[:, :, 1] = angles
     else:
         trans_image = np.empty((height, width, 2))
-        for y in range(0, height):
-            for x in range(0, width):
-                trans_image[y][x][0] = 0
-                trans_image[y][x][1] = np.nan
+        trans_image[:, :, 0] = 0
+        trans_image[:, :, 1] = np.nan
 
     return trans_image
 
@@ -187,25 +319,23 @@ def HOG_aggregate(trans_image, grid_size):
     bounds = grid_coords(trans_image, grid_size)
     for index, bound in enumerate(bounds):
         h_start, w_start, h_end, w_end = bound
-        for y in range(h_start, h_end):
-            for x in range(w_start, w_end):
-                mag = trans_image[y][x][0]
-                angle = trans_image[y][x][1]
-
-                if mag > 0:
-                    if angle >= np.pi:
-                        low = HOG_BINS - 1
-                    else:
-                        low = get_bin(angle, HOG_BIN_WIDTH)
-                    high = (low + 1) % HOG_BINS
-
-                    high_weight = (
-                        angle - low * HOG_BIN_WIDTH) / HOG_BIN_WIDTH
-                    low_weight = 1 - high_weight
-
-                    # Split vote between adjacent bins
-                    features[index][low] += mag * low_weight
-                    features[index][high] += mag * high_weight
+        cell = trans_image[h_start: h_end, w_start: w_end].reshape(-1, 2)
+        cell = cell[cell[:, 0] > 0]
+        mag = cell[:, 0]
+        angle = cell[:, 1]
+        low = np.where(angle >= np.pi, HOG_BINS - 1,
+                       np.floor(angle / HOG_BIN_WIDTH)).astype(int)
+        high = (low + 1) % HOG_BINS
+
+        high_weight = (angle - low * HOG_BIN_WIDTH) / HOG_BIN_WIDTH
+        low_weight = 1 - high_weight
+
+        # Split vote between adjacent bins. Votes are interleaved to be
+        # accumulated in the same order as pixels are traversed.
+        np.add.at(features[index],
+                  np.stack([low, high], axis=1).ravel(),
+                  np.stack([mag * low_weight, mag * high_weight],
+                           axis=1).ravel())
         norm = np.linalg.norm(features[index])
         features[index] = features[index] / norm
     return features
@@ -213,11 +343,8 @@ def HOG_aggregate(trans_image, grid_size):
 
 def HOG_extractor(image_file):
     """Histogram of Gradients Feature extractor"""
-    image = Image.open(image_file)
-    image = image.convert('RGB')
-    image = resize_to(image)
-    image_a = np.array(image)
-    transform = HOG_transform(image_a)
+    image = decoded(image_file)
+    transform = HOG_transform(image.rgb_pixels, image.luminance)
     features = HOG_aggregate(transform, 1)
     features3x3 = HOG_aggregate(transform, 3)
     features4x4 = HOG_aggregate(transform, 4)
@@ -236,33 +363,29 @@ def energy_parameters(values, coords):
     sum_sq = 0
     h_start, w_start, h_end, w_end = coords
 
-    for y in range(h_start, h_end):
-        for x in range(w_start, w_end):
-            new_value = values[y][x]
-            count += 1
-            delta1 = new_value - mean
-            mean += delta1 / count
-            delta2 = new_value - mean
-            sum_sq += delta1 * delta2
+    # Welford's running updates are kept, instead of numpy's mean and
+    # variance, so that the results are identical to the remote ones. The
+    # cell values are read as Python floats, which is much faster than
+    # indexing the array.
+    for new_value in values[h_start: h_end, w_start: w_end].ravel().tolist():
+        count += 1
+        delta1 = new_value - mean
+        mean += delta1 / count
+        delta2 = new_value - mean
+        sum_sq += delta1 * delta2
 
-    return np.array([mean, sum_sq / (count - 1)])
+    return np.array([mean, np.float64(sum_sq) / (count - 1)])
 
 
 def haar1Ds(signal):
     """1-dimensional Haard components."""
-    output = np.empty((2, max([1, int(len(signal) / 2)])))
-
+    signal = np.asarray(signal)
     if len(signal) > 1:
-        for i in range(0, len(signal) - 1, 2):
-            index = int(i / 2)
-            output[0][index] = (signal[i] + signal[i + 1]) / 2
-            output[1][index] = abs(signal[i] - signal[i + 1])
-
-    else:
-        output[0][0] = signal[0]
-        output[1][0] = 0
-
-    return output
+        pairs = int(len(signal) / 2) * 2
+        even = signal[0: pairs: 2]
+        odd = signal[1: pairs: 2]
+        return np.array([(even + odd) / 2, np.abs(even - odd)], dtype='d')
+    return np.array([[signal[0]], [0]], dtype='d')
 
 
 def haar1D(image, vertical):
@@ -270,12 +393,13 @@ def haar1D(image, vertical):
     if vertical:
         image = image.transpose()
 
-    output = np.empty((2, len(image), max([1, int(len(image[0]) / 2)])))
-
-    for i, cell in enumerate(image):
-        row_decomp = haar1Ds(cell)
-        output[0][i] = row_decomp[0]
-        output[1][i] = row_decomp[1]
+    if len(image[0]) > 1:
+        pairs = int(len(image[0]) / 2) * 2
+        even = image[:, 0: pairs: 2]
+        odd = image[:, 1: pairs: 2]
+        output = np.array([(even + odd) / 2, np.abs(even - odd)], dtype='d')
+    else:
+        output = np.array([image, np.zeros(image.shape)], dtype='d')
 
     if vertical:
         output = np.array([output[0].transpose(),
@@ -315,9 +439,11 @@ def wavelet_subbands_aggregate(trans_image, grid_size):
     return features
 
 
-def wavelet_subbands_transform(image_a, levels):
-    """Haard Wavelet subbands transformation."""
-    image_l = get_luminance(image_a)
+def wavelet_subbands_transform(image_a, levels, image_l=None):
+    """Haard Wavelet subbands transformation. The luminance of the image
+    can be provided if it was previously computed."""
+    if image_l is None:
+        image_l = get_luminance(image_a)
 
     output = []
 
@@ -336,11 +462,9 @@ def wavelet_subbands_transform(image_a, levels):
 
 def wavelet_subbands_extractor(image_file, levels):
     """Wavelet subbands feature extractor."""
-    image = Image.open(image_file)
-    image = image.convert('RGB')
-    image = resize_to(image)
-    image_a = np.array(image)
-    transform = wavelet_subbands_transform(image_a, levels)
+    image = decoded(image_file)
+    transform = wavelet_subbands_transform(image.rgb_pixels, levels,
+                                           image.luminance)
     features = wavelet_subbands_aggregate(transform, 1)
     features2x2 = wavelet_subbands_aggregate(transform, 2)
     features_list = list(features.reshape(-1))
@@ -368,8 +492,8 @@ def get_image_extractors(res_object, field_id):
         for feature in extracted_features:
             if isinstance(feature, list) and feature[0] == PRETRAINED:
                 _, cnn_name = feature[:]
-                extractors.append(lambda x, param=cnn_name: list(
-                    create_image_feature_extractor(param, None)(x))[0])
+                extractors.append(lambda x, param=cnn_name:
+                    pretrained_extractor(x, param))
             elif isinstance(feature, list) and feature[0] == WAVELET:
                 _, levels = feature[:]
                 extractors.append(lambda x, param=levels:
@@ -384,14 +508,19 @@ def get_image_extractors(res_object, field_id):
 
 def expand_image(res_object, parent_id, image_file):
     """ Retrieves all the values of the subfields generated from
-    a parent image field
+    a parent image field. The image is decoded and resized only once for
+    all the extractors.
 
     """
     expanded = {}
     keys = res_object.fields[parent_id]["child_ids"]
     values = []
-    for generator in res_object.generators[parent_id]:
-        values.extend(generator(image_file))
+    image = decoded(image_file)
+    try:
+        for generator in res_object.generators[parent_id]:
+            values.extend(generator(image))
+    finally:
+        image.close()
     expanded = dict(zip(keys, values))
     return expanded
 
@@ -400,12 +529,13 @@ class ImageFeaturizer(Featurizer):
     """This class provides methods for image Feature extraction."""
 
     def __init__(self, fields, input_fields, selected_fields=None,
-                 preferred_only=True):
+                 preferred_only=True, max_workers=None):
         self.fields = fields
         self.input_fields = input_fields
         self.subfields = {}
         self.generators = {}
         self.preferred_only = preferred_only
+        self.max_workers = max_workers
         self.selected_fields = self.add_subfields(selected_fields,
             preferred_only=preferred_only)
         super().__init__(fields, input_fields, selected_fields, preferred_only)
@@ -448,20 +578,71 @@ class ImageFeaturizer(Featurizer):
 
         return self.selected_fields
 
-    def extend_input(self, input_data):
+    def extend_input(self, input_data, images=None):
         """Computing the values for the generated subfields and adding them
         to the original input data. Parent fields will be removed.
+        The images previously decoded for the image fields can be provided
+        in the `images` dict.
         """
         extended = {}
+        images = images or {}
         for f_id, value in list(input_data.items()):
             if f_id in self.generators.keys():
                 if not self.preferred_only:
                     extended[f_id] = value
                 if self.fields[f_id]["optype"] == IMAGE:
-                    extended.update(expand_image(self, f_id, input_data[f_id]))
+                    extended.update(expand_image(
+                        self, f_id, images.get(f_id, input_data[f_id])))
                 else:
                     extended.update(
                         self.generators[f_id][0](self, f_id, input_data[f_id]))
             else:
                 extended[f_id] = value
         return extended
+
+    def extend_inputs(self, input_data_list):
+        """Extends a list of input data. The images are decoded in chunks of
+        IMAGES_CHUNK_SIZE rows. The features extracted by pretrained CNNs are
+        computed for all the images in a chunk in a single batch and the
+        rest of extractors are applied concurrently using a pool of up to
+        `max_workers` threads. Images are closed once their row is extended.
+        """
+        if len(input_data_list) < 2:
+            return super().extend_inputs(input_data_list)
+        if self.max_workers == 1:
+            return [extended for start in
+                    range(0, len(input_data_list), IMAGES_CHUNK_SIZE)
+                    for extended in self._extend_chunk( \
+                        input_data_list[start: start + IMAGES_CHUNK_SIZE])]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return [extended for start in
+                    range(0, len(input_data_list), IMAGES_CHUNK_SIZE)
+                    for extended in self._extend_chunk( \
+                        input_data_list[start: start + IMAGES_CHUNK_SIZE],
+                        executor)]
+
+    def _extend_chunk(self, input_data_list, executor=None):
+        """Extends a chunk of input data, decoding their images once """
+        images_list = [{f_id: DecodedImage(value) for f_id, value in
+                        input_data.items() if f_id in self.generators and
+                        self.fields[f_id]["optype"] == IMAGE}
+                       for input_data in input_data_list]
+        try:
+            for f_id in self.generators:
+                if self.fields[f_id]["optype"] != IMAGE:
+                    continue
+                images = [decoded_images[f_id] for decoded_images
+                          in images_list if f_id in decoded_images]
+                for cnn_name in get_pretrained_cnns(self, f_id):
+                    pretrained_features(images, cnn_name)
+            if executor is None:
+                return [self.extend_input(input_data, images) for
+                        input_data, images in zip(input_data_list,
+                                                  images_list)]
+            return list(executor.map(self.extend_input, input_data_list,
+                                     images_list))
+        finally:
+            # images are already closed for the rows that were extended
+            for images in images_list:
+                for image in images.values():
+                    image.close()
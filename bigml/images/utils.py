@@ -40,14 +40,17 @@ def resize_to(image, top_size=TOP_SIZE):
     return image
 
 
-def to_relative_coordinates(image_file, regions_list):
+def to_relative_coordinates(image_file, regions_list, image_size=None):
     """Transforms predictions with regions having absolute pixels regions
     to the relative format used remotely and rounds to the same precision.
+    The (width, height) size of the image can be provided if it is known.
     """
 
     if regions_list:
-        image_obj = Image.open(image_file)
-        width, height = image_obj.size
+        if image_size is None:
+            image_obj = Image.open(image_file)
+            image_size = image_obj.size
+        width, height = image_size
         for index, region in enumerate(regions_list):
             [xmin, ymin, xmax, ymax] = region["box"]
             region["box"] = [round(xmin / width, DECIMALS),
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Precompiled input normalization for local models.
+
+The checks and transformations applied to the input data before predicting
+(mapping field names to IDs, removing missing tokens, filling numeric
+defaults, stripping affixes and casting values to the field type) only
+depend on the model fields. The InputPlan class computes them once per model
+so that each input only needs a single pass over its values. The result is
+the same obtained with `ModelFields.filter_input_data` followed by
+`util.cast`.
+
+The columns of DataFrames and Arrow tables are normalized at once, and their
+rows are NormalizedInput dictionaries that the models using the same plan
+predict with no further normalization.
+
+"""
+import ast
+import locale
+
+from bigml.util import strip_affixes, DECIMAL_DIGITS
+from bigml.profiling import stopwatch, INPUT_NORMALIZATION, CASTING
+
+NUMERIC = "numeric"
+CATEGORICAL = "categorical"
+
+
+def numeric_converter(field):
+    """Returns the function that casts the input values of a numeric field
+
+    """
+    def convert(value):
+        if isinstance(value, str):
+            value = strip_affixes(value, field)
+            try:
+                return locale.atof(value)
+            except ValueError:
+                raise ValueError("Mismatch input data type in field "
+                                 "\"%s\" for value %s." %
+                                 (field['name'], value))
+        if isinstance(value, bool):
+            raise ValueError("Mismatch input data type in field "
+                             "\"%s\" for value %s. Numeric expected." %
+                             (field['name'], value))
+        if isinstance(value, float):
+            return round(value, DECIMAL_DIGITS)
+        return value
+    return convert
+
+
+def boolean_categories(field):
+    """Returns the categories of a two-valued categorical field that
+    correspond to the `True` and `False` booleans, or None if they cannot
+    be matched.
+
+    """
+    booleans = {}
+    try:
+        for category, _ in field['summary']['categories']:
+            bool_key = 'True' if ast.literal_eval( \
+                category.capitalize()) else 'False'
+            booleans[bool_key] = category
+    except (ValueError, SyntaxError):
+        return None
+    return booleans
+
+
+def string_converter(field):
+    """Returns the function that casts the input values of non-numeric
+    fields. Booleans are mapped to the categories that represent them in
+    two-valued categorical fields.
+
+    """
+    booleans = None
+    if field['optype'] == CATEGORICAL and \
+            len(field['summary']['categories']) == 2:
+        booleans = boolean_categories(field)
+        if booleans is None:
+            booleans = {}
+
+    def convert(value):
+        if booleans is not None and isinstance(value, bool):
+            if not booleans:
+                raise ValueError("Mismatch input data type in field "
+                                 "\"%s\" for value %s. String expected" %
+                                 (field['name'], value))
+            return booleans[str(value)]
+        if not isinstance(value, str):
+            return str(value)
+        return value
+    return convert
+
+
+class NormalizedInput(dict):
+    """Input data normalized by an InputPlan: keyed by field ID, restricted
+    to the fields used in the model and cast to their types. The input keys
+    that are not used by the model are kept in `unused_fields`.
+
+    """
+
+    def __init__(self, plan):
+        super().__init__()
+        self.plan = plan
+        self.unused_fields = []
+
+
+class InputPlan():
+    """Normalization steps for the input data of a local model, computed
+    once from its fields.
+
+    """
+
+    def __init__(self, local_model):
+        """
+        :param local_model: ModelFields-based local model whose inputs are
+                            normalized.
+        """
+        fields = local_model.fields
+        # name used to report the profiling timings
+        self.model_name = type(local_model).__name__
+        objective_id = getattr(local_model, "objective_id", None)
+        # field names and IDs are both accepted as input keys
+        self.ids = dict(getattr(local_model, "inverted_fields", {}))
+        self.ids.update({field_id: field_id for field_id in fields})
+        self.used_fields = {field_id for field_id in local_model.model_fields
+                            if objective_id is None or
+                            field_id != objective_id}
+        self.converters = {}
+        for field_id, field in fields.items():
+            self.converters[field_id] = numeric_converter(field) \
+                if field['optype'] == NUMERIC else string_converter(field)
+        self.missing_tokens = getattr(local_model, "missing_tokens", None)
+        if self.missing_tokens is None:
+            self.missing_tokens = []
+        try:
+            self.missing_set = frozenset(self.missing_tokens)
+        except TypeError:
+            self.missing_set = None
+        self.defaults = []
+        default_numeric_value = getattr( \
+            local_model, "default_numeric_value", None)
+        if default_numeric_value is not None:
+            for field_id, field in fields.items():
+                if field_id in self.used_fields and \
+                        field["optype"] == NUMERIC:
+                    self.defaults.append( \
+                        (field_id,
+                         field["summary"].get(default_numeric_value, 0)))
+
+    def is_missing(self, value):
+        """Checks whether the value is None or one of the missing tokens """
+        if value is None:
+            return True
+        if self.missing_set is not None:
+            try:
+                return value in self.missing_set
+            except TypeError:
+                pass
+        return value in self.missing_tokens
+
+    def convert(self, normalized):
+        """Casts the values in the normalized input to their field types """
+        for field_id, value in normalized.items():
+            if value is not None and field_id in self.converters:
+                normalized[field_id] = self.converters[field_id](value)
+        return normalized
+
+    def normalize(self, input_data, add_unused_fields=False):
+        """Returns the input data keyed by field ID, restricted to the
+        fields used in the model and cast to their types. If
+        `add_unused_fields` is set, the list of the input keys that are not
+        used is also returned.
+
+        """
+        watch = stopwatch(self.model_name)
+        normalized = {}
+        unused_fields = []
+        for key, value in input_data.items():
+            if self.is_missing(value):
+                continue
+            key = self.ids.get(key, key)
+            if key in self.used_fields:
+                normalized[key] = value
+            else:
+                unused_fields.append(key)
+        for field_id, default in self.defaults:
+            if normalized.get(field_id) is None:
+                normalized[field_id] = default
+        if watch:
+            watch.lap(INPUT_NORMALIZATION)
+        normalized = self.convert(normalized)
+        if watch:
+            watch.lap(CASTING)
+        return (normalized, unused_fields) if add_unused_fields \
+            else normalized
+
+    def normalize_columns(self, columns):
+        """Columnar version of `normalize`. Expects a dictionary of
+        input keys and their lists of values (one per row) and returns the
+        list of NormalizedInput rows. Names are mapped to field IDs once per
+        column.
+
+        """
+        watch = stopwatch(self.model_name)
+        rows_number = max((len(values) for values in columns.values()),
+                          default=0)
+        normalized_rows = [NormalizedInput(self) for _ in range(rows_number)]
+        for key, values in columns.items():
+            field_id = self.ids.get(key, key)
+            used = field_id in self.used_fields
+            for normalized, value in zip(normalized_rows, values):
+                if self.is_missing(value):
+                    continue
+                if used:
+                    normalized[field_id] = value
+                else:
+                    normalized.unused_fields.append(field_id)
+        for normalized in normalized_rows:
+            for field_id, default in self.defaults:
+                if normalized.get(field_id) is None:
+                    normalized[field_id] = default
+        if watch:
+            watch.lap(INPUT_NORMALIZATION)
+        for normalized in normalized_rows:
+            self.convert(normalized)
+        if watch:
+            watch.lap(CASTING)
+        return normalized_rows
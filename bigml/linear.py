@@ -41,18 +41,19 @@ linear_regression.predict({"petal length": 3, "petal width": 1,
 """
 import logging
 import math
+import importlib.util
 
 try:
     import numpy as np
-    from scipy.stats import t as student_t
-    STATS = True
+    # scipy is slow to import, so it is only loaded when the stats are used
+    STATS = importlib.util.find_spec("scipy") is not None
 except ImportError:
     STATS = False
 
 
 from bigml.api import FINISHED
 from bigml.api import get_status, get_api_connection, get_linear_regression_id
-from bigml.util import cast, check_no_training_missings, flatten, \
+from bigml.util import check_no_training_missings, flatten, \
     use_cache, load, dump, dumps, get_data_transformations, NUMERIC
 from bigml.basemodel import get_resource_dict, extract_objective
 from bigml.modelfields import ModelFields
@@ -199,6 +200,8 @@ class LinearRegression(ModelFields):
                     self.mean_squared_error = stats["mean_squared_error"]
                     self.number_of_samples = stats["number_of_samples"]
                     # to be used in predictions
+                    #pylint: disable=locally-disabled,import-outside-toplevel
+                    from scipy.stats import t as student_t
                     self.t_crit = student_t.interval( \
                         CONFIDENCE,
                         self.number_of_samples - self.number_of_parameters)[1]
@@ -304,16 +307,14 @@ class LinearRegression(ModelFields):
         """
 
         # Checks and cleans input_data leaving the fields used in the model
+        # and casts to the final field type
         unused_fields = []
-        norm_input_data = self.filter_input_data( \
+        norm_input_data = self.normalize_input_data( \
             input_data,
             add_unused_fields=full)
         if full:
             norm_input_data, unused_fields = norm_input_data
 
-        # Strips affixes for numeric values and casts to the final field type
-        cast(norm_input_data, self.fields)
-
         # In case that the training data has no missings, input data shouldn't
         check_no_training_missings(norm_input_data, self.model_fields,
                                    self.weight_field,
@@ -412,7 +413,8 @@ class LinearRegression(ModelFields):
         xtx = self_vars["xtx_inverse"]
         for index, elem in enumerate(xtx):
             self_vars["xtx_inverse"][index] = list(elem)
-        dump(self_vars, output=output, cache_set=cache_set)
+        dump(self_vars, output=output, cache_set=cache_set,
+             runtime_attrs=self.RUNTIME_ATTRS)
 
     def dumps(self):
         """Uses msgpack to serialize the resource object to a string
@@ -422,4 +424,4 @@ class LinearRegression(ModelFields):
         xtx = self_vars["xtx_inverse"]
         for index, elem in enumerate(xtx):
             self_vars["xtx_inverse"][index] = list(elem)
-        dumps(self_vars)
+        dumps(self_vars, runtime_attrs=self.RUNTIME_ATTRS)
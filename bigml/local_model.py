@@ -43,52 +43,43 @@ model.predict({"petal length": 3, "petal width": 1,
 
 import json
 import os
+import importlib.util
 
 
 from bigml.api import get_resource_id, get_resource_type, \
     get_api_connection, get_ensemble_id
 from bigml.basemodel import BaseModel
-from bigml.model import Model
-from bigml.ensemble import Ensemble
-from bigml.logistic import LogisticRegression
-from bigml.deepnet import Deepnet
-from bigml.linear import LinearRegression
-from bigml.fusion import Fusion
-from bigml.cluster import Cluster
-from bigml.anomaly import Anomaly
-from bigml.association import Association
-from bigml.timeseries import TimeSeries
-try:
-    from bigml.topicmodel import TopicModel
-    TOPIC_ENABLED = True
-except ImportError:
-    TOPIC_ENABLED = False
-from bigml.pca import PCA
 from bigml.constants import OUT_NEW_FIELDS, OUT_NEW_HEADERS, INTERNAL
-from bigml.util import get_data_format, get_formatted_data, format_data
+from bigml.util import get_data_format, \
+    add_data_columns, LazyClasses
 
+# the TopicModel class needs the pystemmer library
+TOPIC_ENABLED = importlib.util.find_spec("Stemmer") is not None
 
-SUPERVISED_CLASSES = {
-    "model": Model,
-    "ensemble": Ensemble,
-    "logisticregression": LogisticRegression,
-    "deepnet": Deepnet,
-    "linearregression": LinearRegression,
-    "fusion": Fusion}
+# the modules of the local model classes are imported only when used
+SUPERVISED_CLASS_PATHS = {
+    "model": "bigml.model.Model",
+    "ensemble": "bigml.ensemble.Ensemble",
+    "logisticregression": "bigml.logistic.LogisticRegression",
+    "deepnet": "bigml.deepnet.Deepnet",
+    "linearregression": "bigml.linear.LinearRegression",
+    "fusion": "bigml.fusion.Fusion"}
+SUPERVISED_CLASSES = LazyClasses(SUPERVISED_CLASS_PATHS)
 
 
 DFT_OUTPUTS = ["prediction", "probability"]
 
 
-MODEL_CLASSES = {
-    "cluster": Cluster,
-    "anomaly": Anomaly,
-    "association": Association,
-    "pca": PCA,
-    "timeseries": TimeSeries}
-MODEL_CLASSES.update(SUPERVISED_CLASSES)
+MODEL_CLASS_PATHS = {
+    "cluster": "bigml.cluster.Cluster",
+    "anomaly": "bigml.anomaly.Anomaly",
+    "association": "bigml.association.Association",
+    "pca": "bigml.pca.PCA",
+    "timeseries": "bigml.timeseries.TimeSeries"}
+MODEL_CLASS_PATHS.update(SUPERVISED_CLASS_PATHS)
 if TOPIC_ENABLED:
-    MODEL_CLASSES.update({"topicmodel": TopicModel})
+    MODEL_CLASS_PATHS.update({"topicmodel": "bigml.topicmodel.TopicModel"})
+MODEL_CLASSES = LazyClasses(MODEL_CLASS_PATHS)
 
 
 def extract_id(model, api):
@@ -170,6 +161,19 @@ class LocalModel(BaseModel):
         self.name = self.local_model.name
         self.description = self.local_model.description
 
+    # the attributes of the local model are copied, so the ones built at
+    # runtime are the ones declared by its class
+    #pylint: disable=locally-disabled,invalid-name
+    @property
+    def RUNTIME_ATTRS(self):
+        """Runtime attributes of the local model """
+        return getattr(self.local_model, "RUNTIME_ATTRS", ())
+
+    @property
+    def PACKED_ATTRS(self):
+        """Runtime attributes kept by the packed format """
+        return getattr(self.local_model, "PACKED_ATTRS", ())
+
     def predict(self, *args, **kwargs):
         """Delegating method to local model object"""
         return self.local_model.predict(*args, **kwargs)
@@ -192,14 +196,16 @@ class LocalModel(BaseModel):
         to "output_fields" list, by default).
 
         :param input_data_list: List of input data to be predicted
-        :type input_data_list: list or Panda's dataframe
+        :type input_data_list: list, Panda's dataframe or Arrow table
         :param dict outputs: properties that define the headers and fields to
                              be added to the input data
         :return: the list of input data plus the predicted values
-        :rtype: list or Panda's dataframe depending on the input type in
+        :rtype: list, Panda's dataframe or Arrow table depending on the
+                input type in
                 input_data_list
         """
-        if isinstance(self.local_model, (Association, TimeSeries)):
+        if get_resource_type(self.local_model.resource_id) in \
+                ["association", "timeseries"]:
             raise ValueError("The method is not available for Associations or "
                   "TimeSeries.")
         if self.supervised:
@@ -212,7 +218,8 @@ class LocalModel(BaseModel):
             else:
                 new_headers = new_headers[0: len(new_fields)]
             data_format = get_data_format(input_data_list)
-            inner_data_list = get_formatted_data(input_data_list, INTERNAL)
+            inner_data_list = self.local_model.batch_input_rows( \
+                input_data_list)
             kwargs.update({"full": True})
             for input_data in inner_data_list:
                 prediction = self.predict(input_data, **kwargs)
@@ -222,7 +229,8 @@ class LocalModel(BaseModel):
                     except KeyError:
                         pass
             if data_format != INTERNAL:
-                return format_data(inner_data_list, out_format=data_format)
+                return add_data_columns(input_data_list,
+                                        inner_data_list, new_headers)
             return inner_data_list
         return self.local_model.batch_predict(input_data_list,
             outputs=outputs, **kwargs)
@@ -48,7 +48,7 @@ from functools import cmp_to_key
 from bigml.api import FINISHED
 from bigml.api import get_status, get_api_connection, \
     get_logistic_regression_id
-from bigml.util import cast, check_no_missing_numerics, use_cache, load, \
+from bigml.util import check_no_missing_numerics, use_cache, load, \
     get_data_transformations, PRECISION, NUMERIC
 from bigml.basemodel import get_resource_dict, extract_objective
 from bigml.model import parse_operating_point, sort_categories
@@ -361,16 +361,14 @@ class LogisticRegression(ModelFields):
         """
 
         # Checks and cleans input_data leaving the fields used in the model
+        # and casts to the final field type
         unused_fields = []
-        norm_input_data = self.filter_input_data( \
+        norm_input_data = self.normalize_input_data( \
             input_data,
             add_unused_fields=full)
         if full:
             norm_input_data, unused_fields = norm_input_data
 
-        # Strips affixes for numeric values and casts to the final field type
-        cast(norm_input_data, self.fields)
-
         # When operating_point is used, we need the probabilities
         # of all possible classes to decide, so se use
         # the `predict_probability` method
@@ -62,13 +62,14 @@ from bigml.exceptions import NoRootDecisionTree
 
 from bigml.api import FINISHED, STATUSES
 from bigml.api import get_status, get_api_connection, get_model_id
-from bigml.util import find_locale, cast, use_cache, load, \
-    get_data_transformations
+from bigml.util import find_locale, use_cache, load, dump, dumps, \
+    get_data_transformations, is_instance_of
 from bigml.util import DEFAULT_LOCALE, PRECISION, NUMERIC
 from bigml.constants import LAST_PREDICTION, PROPORTIONAL, DECIMALS
 from bigml.basemodel import BaseModel, get_resource_dict
 from bigml.multivote import ws_confidence
 from bigml.prediction import Prediction
+from bigml.profiling import stopwatch, EVALUATION, OUTPUT_FORMATTING
 
 
 LOGGER = logging.getLogger('BigML')
@@ -306,6 +307,26 @@ def tree_predict(tree, tree_type, weighted, fields,
     return b.boosting_last_predict(tree, fields, input_data)
 
 
+def compact_tree_root(tree, offsets):
+    """Stores the tree in a CompactTree and returns its root node. The
+    module uses numpy, so it is only imported when trees are compacted.
+
+    """
+    #pylint: disable=locally-disabled,import-outside-toplevel
+    from bigml.compacttree import CompactTree
+    return CompactTree(tree, offsets).root()
+
+
+def load_compact_tree_root(tree_dict):
+    """Rebuilds the CompactTree serialized as a dict and returns its root
+    node.
+
+    """
+    #pylint: disable=locally-disabled,import-outside-toplevel
+    from bigml.compacttree import CompactTree
+    return CompactTree.from_dict(tree_dict).root()
+
+
 def laplacian_term(root_dist, weighted):
     """Correction term based on the training dataset distribution
 
@@ -329,7 +350,8 @@ class Model(BaseModel):
     """
 
     def __init__(self, model, api=None, fields=None, cache_get=None,
-                 operation_settings=None):
+                 operation_settings=None, fields_pool=None,
+                 compact_tree=False):
         """The Model constructor can be given as first argument:
             - a model structure
             - a model id
@@ -340,6 +362,12 @@ class Model(BaseModel):
                     info if not locally available
         :param cache_get: Get function that handles memory-cached objects
         :param operation_settings: Dict object that contains operating options
+        :param fields_pool: FieldsPool object that shares the fields
+                            structures among the models built using the same
+                            `fields` argument
+        :param compact_tree: If True, the tree is kept in a CompactTree,
+                             that stores the nodes information in typed
+                             arrays and uses less memory
 
         The operation_settings will depend on the type of ML problem:
          - regressions: no operation_settings allowed
@@ -350,6 +378,8 @@ class Model(BaseModel):
         if use_cache(cache_get):
             # using a cache to store the model attributes
             self.__dict__ = load(get_model_id(model), cache_get)
+            if self.__dict__.get("compact_tree"):
+                self.tree = load_compact_tree_root(self.tree)
             return
 
         self.resource_id = None
@@ -387,7 +417,8 @@ class Model(BaseModel):
                 self.default_numeric_value = model.get('default_numeric_value')
                 self.input_fields = model["input_fields"]
                 BaseModel.__init__(self, model, api=api, fields=fields,
-                    operation_settings=operation_settings)
+                    operation_settings=operation_settings,
+                    fields_pool=fields_pool)
 
                 try:
                     root = model['model']['root']
@@ -450,6 +481,9 @@ class Model(BaseModel):
                 else:
                     self.tree_type = CLASSIFICATION
                     self.offsets = c.OFFSETS[str(self.weighted)]
+                self.compact_tree = compact_tree
+                if compact_tree:
+                    self.tree = compact_tree_root(self.tree, self.offsets)
             else:
                 raise Exception("Cannot create the Model instance."
                                 " Only correctly finished models can be"
@@ -509,21 +543,27 @@ class Model(BaseModel):
             raise AttributeError("This method is available for non-boosting"
                                  " models only.")
 
-        root_dist = self.root_distribution
-        category_map = {category[0]: 0.0 for category in root_dist}
         prediction = self.predict(input_data,
                                   missing_strategy=missing_strategy,
                                   full=True)
+        category_map = self._confidences(prediction['distribution'],
+                                         prediction['count'])
 
-        distribution = prediction['distribution']
-        population = prediction['count']
+        return self._to_output(category_map, compact, "confidence")
+
+    def _confidences(self, distribution, population):
+        """Computes the one-vs.-rest confidence for each class in the
+        distribution.
+
+        """
+        root_dist = self.root_distribution
+        category_map = {category[0]: 0.0 for category in root_dist}
 
         for class_info in distribution:
             name = class_info[0]
             category_map[name] = ws_confidence(name, distribution,
                                                ws_n=population)
-
-        return self._to_output(category_map, compact, "confidence")
+        return category_map
 
     def _probabilities(self, distribution):
         """Computes the probability of a distribution using a Laplacian
@@ -580,6 +620,37 @@ class Model(BaseModel):
 
         return output
 
+    def predict_probability_confidence(self, input_data,
+                                       missing_strategy=LAST_PREDICTION):
+        """Computes the probabilities and the confidences for the input data
+        with a single evaluation of the tree. The result is a tuple that
+        contains the same outputs as `predict_probability(compact=True)` and
+        `predict_confidence(compact=False)`. Confidences are None for
+        boosted trees.
+
+        :param input_data: Input data to be predicted
+        :param missing_strategy: LAST_PREDICTION|PROPORTIONAL missing strategy
+                                 for missing fields
+        """
+        if self.boosting:
+            return [self.predict(input_data,
+                                 missing_strategy=missing_strategy)], None
+
+        prediction = self.predict(input_data,
+                                  missing_strategy=missing_strategy,
+                                  full=True)
+        if self.regression:
+            return [prediction['prediction']], cast_prediction( \
+                prediction, to=DICTIONARY, confidence=True)
+
+        distribution = prediction['distribution']
+        probabilities = self._to_output( \
+            self._probabilities(distribution), True, "probability")
+        confidences = self._to_output( \
+            self._confidences(distribution, prediction['count']),
+            False, "confidence")
+        return probabilities, confidences
+
     def predict_operating(self, input_data,
                           missing_strategy=LAST_PREDICTION,
                           operating_point=None):
@@ -700,32 +771,37 @@ class Model(BaseModel):
         """
 
         # Checks and cleans input_data leaving the fields used in the model
+        # and casts to the final field type
         unused_fields = []
-        norm_input_data = self.filter_input_data( \
+        norm_input_data = self.normalize_input_data( \
             input_data,
             add_unused_fields=full)
         if full:
             norm_input_data, unused_fields = norm_input_data
 
-        # Strips affixes for numeric values and casts to the final field type
-        cast(norm_input_data, self.fields)
-
         if operating_point is None and self.operation_settings is not None:
             operating_point = self.operation_settings.get("operating_point")
         if operating_kind is None and self.operation_settings is not None:
             operating_kind = self.operation_settings.get("operating_kind")
 
+        watch = stopwatch(self)
         full_prediction = self._predict( \
             norm_input_data, missing_strategy=missing_strategy,
             operating_point=operating_point, operating_kind=operating_kind,
             unused_fields=unused_fields)
+        if watch:
+            watch.lap(EVALUATION)
         if self.regression:
             full_prediction['prediction'] = round(
                 full_prediction['prediction'], DECIMALS)
         if full:
-            return dict((key, value) for key, value in \
+            full_prediction = dict((key, value) for key, value in \
                 full_prediction.items() if value is not None)
-        return full_prediction['prediction']
+        else:
+            full_prediction = full_prediction['prediction']
+        if watch:
+            watch.lap(OUTPUT_FORMATTING)
+        return full_prediction
 
     def _predict(self, input_data, missing_strategy=LAST_PREDICTION,
                  operating_point=None, operating_kind=None,
@@ -794,6 +870,33 @@ class Model(BaseModel):
 
         return result
 
+    def _serializable_vars(self):
+        """Attributes to be serialized. Compact trees are stored as the
+        buffers of their arrays, that are used again when loaded.
+
+        """
+        self_vars = vars(self)
+        if is_instance_of(self_vars.get("tree"), "bigml.compacttree",
+                          "CompactNode"):
+            self_vars = self_vars.copy()
+            self_vars["tree"] = self.tree.tree.to_dict()
+        return self_vars
+
+    def dump(self, output=None, cache_set=None):
+        """Uses msgpack to serialize the resource object
+        If cache_set is filled with a cache set method, the method is called
+
+        """
+        dump(self._serializable_vars(), output=output, cache_set=cache_set,
+             runtime_attrs=self.RUNTIME_ATTRS)
+
+    def dumps(self):
+        """Uses msgpack to serialize the resource object to a string
+
+        """
+        return dumps(self._serializable_vars(),
+                     runtime_attrs=self.RUNTIME_ATTRS)
+
     def data_transformations(self):
         """Returns the pipeline transformations previous to the modeling
         step as a pipeline, so that they can be used in local predictions.
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Bounded in-memory cache for local models.
+
+Composed local models (ensembles, fusions) use it to keep the local models
+built for their components, so that they are reused across predictions
+instead of being rebuilt every time. The memory used by the cache can be
+limited to a number of bytes. When the limit is exceeded, the least recently
+used models are evicted. The fields structures that the models built from a
+FieldsPool share are counted only once.
+
+"""
+import sys
+
+from collections import OrderedDict
+
+from bigml.bigmlconnection import BigMLConnection
+from bigml.modelfields import TERMS_ATTRS
+
+
+# attributes of the local models that can be shared through a FieldsPool
+POOLED_ATTRS = ["fields", "inverted_fields"] + TERMS_ATTRS
+
+
+def object_size(obj, seen=None):
+    """Approximate memory footprint in bytes of an object, including
+    the objects it references. Connection objects are not considered part of
+    the object. When given, `seen` is the set of ids of the objects that
+    have already been counted, and the ids of the new ones are added to it.
+
+    """
+    size = 0
+    if seen is None:
+        seen = set()
+    pending = [obj]
+    while pending:
+        item = pending.pop()
+        if id(item) in seen or isinstance(item, (BigMLConnection, type)):
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            pending.extend(item.keys())
+            pending.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            pending.extend(item)
+        elif hasattr(item, "__dict__"):
+            pending.append(vars(item))
+        elif hasattr(item, "__slots__"):
+            pending.extend(getattr(item, slot) for slot in item.__slots__)
+    return size
+
+
+def pooled_structures(local_model):
+    """Returns the structures of a local model that it can share with other
+    models through a FieldsPool.
+
+    """
+    local_vars = getattr(local_model, "__dict__", {})
+    structures = {id(local_vars[attr]): local_vars[attr]
+                  for attr in POOLED_ATTRS
+                  if isinstance(local_vars.get(attr), (dict, list))}
+    return list(structures.values())
+
+
+class ModelCache():
+    """LRU cache of local models keyed by resource ID, whose size is limited
+    by a memory budget expressed in bytes.
+
+    """
+    # the ids of the pooled structures are only valid in this process
+    RUNTIME_ATTRS = ("_pooled",)
+
+    def __init__(self, max_bytes=None):
+        """
+        :param max_bytes: maximum memory in bytes to be used by the cached
+                          models. If None, no limit is set and all models
+                          are kept.
+        """
+        self.max_bytes = max_bytes
+        self.models = OrderedDict()
+        self.sizes = {}
+        # pooled structures: id -> [size, IDs of the cached models using it,
+        # ids of the objects it references]. The structures are alive while
+        # a cached model uses them, so their ids are not reused. The ids are
+        # not valid in other processes, so they are not serialized.
+        self._pooled = {}
+        self.total_bytes = 0
+
+    def __contains__(self, resource_id):
+        return resource_id in self.models
+
+    def __len__(self):
+        return len(self.models)
+
+    def get(self, resource_id, build_fn):
+        """Returns the local model for `resource_id`, building it with
+        `build_fn(resource_id)` when it is not cached yet.
+
+        """
+        if resource_id in self.models:
+            self.models.move_to_end(resource_id)
+            return self.models[resource_id]
+        local_model = build_fn(resource_id)
+        self.add(resource_id, local_model)
+        return local_model
+
+    def add(self, resource_id, local_model):
+        """Stores a local model, evicting the least recently used ones
+        if the memory budget is exceeded. Models that are bigger than the
+        budget are not stored.
+
+        """
+        self.remove(resource_id)
+        size = 0
+        if self.max_bytes is not None:
+            # the structures already used by cached models are not counted
+            # again
+            structures = {}
+            pooled_ids = set()
+            for structure in pooled_structures(local_model):
+                entry = self._pooled.get(id(structure))
+                if entry is None:
+                    object_ids = set(pooled_ids)
+                    entry = [object_size(structure, seen=object_ids), set()]
+                    entry.append(object_ids - pooled_ids)
+                    structures[id(structure)] = entry
+                pooled_ids.update(entry[2])
+            size = object_size(local_model, seen=pooled_ids)
+            if size + sum(entry[0] for entry in structures.values()) > \
+                    self.max_bytes:
+                return
+            self._pooled.update(structures)
+            for structure in pooled_structures(local_model):
+                self._pooled[id(structure)][1].add(resource_id)
+        self.models[resource_id] = local_model
+        self.sizes[resource_id] = size
+        self._update_total_bytes()
+        while self.max_bytes is not None and \
+                self.total_bytes > self.max_bytes:
+            self.remove(next(iter(self.models)))
+
+    def remove(self, resource_id):
+        """Removes a local model from the cache, if present. The pooled
+        structures are released when no cached model uses them.
+
+        """
+        if self._pooled is None:
+            # loaded caches start with no pooled structures
+            self._pooled = {}
+        if resource_id in self.models:
+            del self.models[resource_id]
+            del self.sizes[resource_id]
+            for key, (_, users, _) in list(self._pooled.items()):
+                users.discard(resource_id)
+                if not users:
+                    del self._pooled[key]
+            self._update_total_bytes()
+
+    def _update_total_bytes(self):
+        """Adds the sizes of the cached models and their pooled structures """
+        self.total_bytes = sum(self.sizes.values()) + sum( \
+            entry[0] for entry in self._pooled.values())
+
+    def clear(self):
+        """Removes all the local models from the cache """
+        self.models = OrderedDict()
+        self.sizes = {}
+        self._pooled = {}
+        self.total_bytes = 0
@@ -27,11 +27,13 @@ import re
 import copy
 
 
-from bigml.util import invert_dictionary, dump, dumps, DEFAULT_LOCALE
+from bigml.util import invert_dictionary, dump, dumps, DEFAULT_LOCALE, \
+    get_data_format, get_data_columns, get_formatted_data
 from bigml.constants import DEFAULT_MISSING_TOKENS, FIELDS_PARENT, \
-    ENSEMBLE_PATH, DEFAULT_OPERATION_SETTINGS
+    ENSEMBLE_PATH, DEFAULT_OPERATION_SETTINGS, DATAFRAME, ARROW, INTERNAL
 from bigml.api_handlers.resourcehandler import get_resource_type
 from bigml.predicate import TM_FULL_TERM, TM_ALL
+from bigml.inputplan import InputPlan, NormalizedInput
 
 LOGGER = logging.getLogger('BigML')
 
@@ -138,22 +140,68 @@ def get_unique_terms(terms, term_forms, tag_cloud):
     return list(terms_set.items())
 
 
+TERMS_ATTRS = ["term_forms", "tag_clouds", "term_analysis", "items",
+               "item_analysis", "categories"]
+
+
+class FieldsPool():
+    """Fields structures shared by the local models built from the same
+    fields information, like the models in an ensemble. The fields are copied,
+    their names uniquified and inverted only once, and all the models keep a
+    reference to the same read-only structures.
+
+    """
+
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, fields, objective_id, categories=False, numerics=False):
+        """Returns the shared structures built for the fields, or None """
+        entry = self.entries.get( \
+            (id(fields), objective_id, categories, numerics))
+        # the original fields are kept in the entry, so that their id is not
+        # reused by another object
+        if entry is not None and entry[0] is fields:
+            return entry[1]
+        return None
+
+    def add(self, fields, objective_id, categories, numerics, local_model):
+        """Stores the structures built for the fields by a local model """
+        shared = {"fields": local_model.fields,
+                  "inverted_fields": local_model.inverted_fields}
+        for attr in TERMS_ATTRS:
+            if hasattr(local_model, attr):
+                shared[attr] = copy.copy(getattr(local_model, attr))
+        self.entries[(id(fields), objective_id, categories, numerics)] = \
+            (fields, shared)
+
+
 class ModelFields:
     """ A lightweight wrapper of the field information in the model, cluster
     or anomaly objects
 
     """
+    # attributes only built at runtime, that are reset when serializing
+    RUNTIME_ATTRS = ("_input_plan",)
+
     #pylint: disable=locally-disabled,no-member,access-member-before-definition
     def __init__(self, fields, objective_id=None, data_locale=None,
                  missing_tokens=None, categories=False,
-                 numerics=False, operation_settings=None, model_fields=None):
+                 numerics=False, operation_settings=None, model_fields=None,
+                 fields_pool=None):
         if isinstance(fields, dict):
-            tmp_fields = copy.deepcopy(fields)
+            shared = None if fields_pool is None else \
+                fields_pool.get(fields, objective_id, categories, numerics)
             try:
                 self.objective_id = objective_id
-                self.uniquify_varnames(tmp_fields)
-                self.inverted_fields = invert_dictionary(tmp_fields)
-                self.fields = tmp_fields
+                if shared is None:
+                    tmp_fields = copy.deepcopy(fields)
+                    self.uniquify_varnames(tmp_fields)
+                    self.inverted_fields = invert_dictionary(tmp_fields)
+                    self.fields = tmp_fields
+                else:
+                    self.inverted_fields = shared["inverted_fields"]
+                    self.fields = shared["fields"]
                 if not (hasattr(self, "input_fields") and self.input_fields):
                     self.input_fields = [field_id for field_id, field in \
                         sorted(list(self.fields.items()),
@@ -177,14 +225,23 @@ class ModelFields:
                     self.missing_tokens = DEFAULT_MISSING_TOKENS
                 # adding text and items information to handle terms
                 # expansion
-                self.term_forms = []
-                self.tag_clouds = {}
-                self.term_analysis = {}
-                self.items = {}
-                self.item_analysis = {}
-                if categories:
-                    self.categories = {}
-                self.add_terms(categories, numerics)
+                if shared is None:
+                    self.term_forms = []
+                    self.tag_clouds = {}
+                    self.term_analysis = {}
+                    self.items = {}
+                    self.item_analysis = {}
+                    if categories:
+                        self.categories = {}
+                    self.add_terms(categories, numerics)
+                    if fields_pool is not None:
+                        fields_pool.add(fields, objective_id, categories,
+                                        numerics, self)
+                else:
+                    # the containers are copied, as models can change them
+                    for attr in TERMS_ATTRS:
+                        if attr in shared:
+                            setattr(self, attr, copy.copy(shared[attr]))
 
                 if self.objective_id is not None and \
                         hasattr(self, "resource_id") and self.resource_id and \
@@ -354,6 +411,54 @@ class ModelFields:
                      " {field:value} format.")
         return ({}, []) if add_unused_fields else {}
 
+    def normalize_input_data(self, input_data, add_unused_fields=False):
+        """Filters the keys given in input_data checking against model fields
+        and casts the values to the fields types, stripping affixes. The
+        result is the one obtained by `filter_input_data` followed by
+        `util.cast`, but the normalization steps are precomputed
+        per model. If `add_unused_fields` is set to True, it also provides
+        information about the ones that are not used. The rows normalized
+        by `normalize_input_columns` are returned as they are.
+
+        """
+        if isinstance(input_data, NormalizedInput) and \
+                input_data.plan is self.input_plan():
+            return (input_data, input_data.unused_fields) \
+                if add_unused_fields else input_data
+        if not isinstance(input_data, dict):
+            input_data = dict(input_data)
+        return self.input_plan().normalize( \
+            input_data, add_unused_fields=add_unused_fields)
+
+    def normalize_input_columns(self, columns):
+        """Columnar version of `normalize_input_data`. Expects a dictionary
+        that contains the list of values for each input key and returns the
+        list of normalized inputs, one per row.
+
+        """
+        return self.input_plan().normalize_columns(columns)
+
+    def batch_input_rows(self, input_data_list):
+        """Returns the list of inputs of a batch prediction. The columns of
+        DataFrames and Arrow tables are normalized at once, so that their
+        rows are predicted with no further normalization. Lists of
+        dictionaries are copied.
+
+        """
+        if get_data_format(input_data_list) in [DATAFRAME, ARROW]:
+            return self.normalize_input_columns( \
+                get_data_columns(input_data_list))
+        return get_formatted_data(input_data_list, INTERNAL)
+
+    def input_plan(self):
+        """Returns the precomputed normalization steps for the input data,
+        building them the first time they are needed.
+
+        """
+        if getattr(self, "_input_plan", None) is None:
+            self._input_plan = InputPlan(self)
+        return self._input_plan
+
     def get_unique_terms(self, input_data):
         """Parses the input data to find the list of unique terms in the
            tag cloud
@@ -424,11 +529,12 @@ class ModelFields:
 
         """
         self_vars = vars(self)
-        dump(self_vars, output=output, cache_set=cache_set)
+        dump(self_vars, output=output, cache_set=cache_set,
+             runtime_attrs=self.RUNTIME_ATTRS)
 
     def dumps(self):
         """Uses msgpack to serialize the resource object to a string
 
         """
         self_vars = vars(self)
-        return dumps(self_vars)
+        return dumps(self_vars, runtime_attrs=self.RUNTIME_ATTRS)
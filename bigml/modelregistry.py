@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Registry of local models shared by several processes.
+
+The registry keeps local models in two tiers:
+
+- an in-process LRU tier (a ModelCache) whose memory can be limited to a
+  number of bytes.
+- a storage tier, where models are stored in the binary format of
+  `bigml.binarymodel`. Each stored model is a version identified by the hash
+  of its contents and the latest version of every resource is recorded
+  separately, so that models can be updated while other processes use them.
+
+The default storage (FileStore) keeps the files in a directory, writing them
+atomically. Loading memory-maps the files, so the processes that load the
+same model share the memory pages of its arrays instead of holding their own
+copies. Using a directory in a memory filesystem, like /dev/shm, hands models
+over between processes without disk access.
+
+Example usage:
+
+from bigml.modelregistry import ModelRegistry
+
+registry = ModelRegistry("./models", max_bytes=2 ** 30)
+local_ensemble = registry.get("ensemble/5143a51a37203f2cf7000972")
+local_ensemble.predict({"petal length": 3, "petal width": 1})
+
+"""
+import os
+import io
+import mmap
+import hashlib
+
+from bigml.api import get_api_connection, get_resource_type
+from bigml.binarymodel import dump_binary, loads_binary
+from bigml.local_model import MODEL_CLASSES
+from bigml.modelcache import ModelCache
+from bigml.util import asciify, check_dir, atomic_write
+
+BINARY_EXTENSION = ".bml"
+LATEST_FILE = "LATEST"
+HASH_LENGTH = 32
+# resource types whose local models accept the compact_tree argument
+COMPACT_TREE_TYPES = ["model", "ensemble"]
+
+
+def content_hash(contents):
+    """Returns the hash that identifies the version of a stored model """
+    return hashlib.sha256(contents).hexdigest()[:HASH_LENGTH]
+
+
+class FileStore():
+    """Storage of versioned binary local models in a directory. Any object
+    with the same methods can be used as storage in the ModelRegistry.
+
+    """
+
+    def __init__(self, directory):
+        """
+        :param directory: path to the directory where models are stored
+        """
+        self.directory = check_dir(directory)
+
+    def _resource_dir(self, resource_id):
+        """Directory where the versions of a resource are stored """
+        return os.path.join(self.directory, asciify(resource_id))
+
+    def _latest_file(self, resource_id):
+        """File that contains the latest version of a resource """
+        return os.path.join(self._resource_dir(resource_id), LATEST_FILE)
+
+    def _version_file(self, resource_id, version):
+        """File that contains a version of a resource """
+        return os.path.join(self._resource_dir(resource_id),
+                            "%s%s" % (version, BINARY_EXTENSION))
+
+    def stamp(self, resource_id):
+        """Returns a value that changes whenever the latest version of the
+        resource changes, or None if the resource is not stored. It is cheap
+        to compute, as it only reads the file metadata.
+
+        """
+        try:
+            stat = os.stat(self._latest_file(resource_id))
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def latest(self, resource_id):
+        """Returns the latest version of the resource, or None """
+        try:
+            with open(self._latest_file(resource_id)) as handler:
+                return handler.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def versions(self, resource_id):
+        """Returns the stored versions of the resource, newest first """
+        resource_dir = self._resource_dir(resource_id)
+        if not os.path.isdir(resource_dir):
+            return []
+        files = [os.path.join(resource_dir, filename) for filename
+                 in os.listdir(resource_dir)
+                 if filename.endswith(BINARY_EXTENSION)]
+        files.sort(key=os.path.getmtime, reverse=True)
+        return [os.path.basename(filename)[:-len(BINARY_EXTENSION)]
+                for filename in files]
+
+    def save(self, resource_id, version, contents):
+        """Stores the contents of a version and sets it as the latest """
+        check_dir(self._resource_dir(resource_id))
+        filename = self._version_file(resource_id, version)
+        if os.path.exists(filename):
+            # the version becomes the newest one again
+            os.utime(filename)
+        else:
+            atomic_write(filename, contents)
+        atomic_write(self._latest_file(resource_id), version.encode("utf-8"))
+
+    def buffer(self, resource_id, version):
+        """Returns the memory-mapped contents of a version """
+        with open(self._version_file(resource_id, version), "rb") as handler:
+            return mmap.mmap(handler.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def remove(self, resource_id, version=None):
+        """Removes a version of the resource or all of them """
+        versions = self.versions(resource_id) if version is None \
+            else [version]
+        for old_version in versions:
+            try:
+                os.remove(self._version_file(resource_id, old_version))
+            except FileNotFoundError:
+                pass
+        if version is None or version == self.latest(resource_id):
+            try:
+                os.remove(self._latest_file(resource_id))
+            except FileNotFoundError:
+                pass
+
+
+class ModelRegistry():
+    """Local models keyed by resource ID and version, kept in a bounded
+    in-process tier backed by a storage shared among processes.
+
+    """
+
+    def __init__(self, directory=None, max_bytes=None, api=None,
+                 store=None):
+        """
+        :param directory: path to the directory used by the default
+                          FileStore storage
+        :param max_bytes: maximum memory in bytes used by the models kept
+                          in the process. If None, all of them are kept.
+                          Arrays mapped from the storage are shared and
+                          don't count.
+        :param api: connection object used to build and load the models
+        :param store: storage object. Overrides `directory`.
+        """
+        if store is None:
+            if directory is None:
+                raise ValueError("A directory or a store object is needed"
+                                 " to create the models registry.")
+            store = FileStore(directory)
+        self.store = store
+        self.memory = ModelCache(max_bytes)
+        self.api = api
+        # storage stamp and version of the models in the memory tier
+        self.stamps = {}
+
+    def build(self, resource_id):
+        """Builds the local model for a resource using its class. Trees are
+        stored in the compact format, that keeps their nodes in arrays.
+
+        """
+        self.api = get_api_connection(self.api)
+        resource_type = get_resource_type(resource_id)
+        kwargs = {"compact_tree": True} \
+            if resource_type in COMPACT_TREE_TYPES else {}
+        return MODEL_CLASSES[resource_type](resource_id, api=self.api,
+                                            **kwargs)
+
+    def get(self, resource_id, build_fn=None):
+        """Returns the latest version of the local model for the resource.
+        It is looked for in memory, then in the storage and finally built
+        with `build_fn(resource_id)` (the class of the resource by default)
+        and stored.
+
+        """
+        stamp = self.store.stamp(resource_id)
+        if stamp is not None and resource_id in self.memory and \
+                self.stamps.get(resource_id, (None,))[0] == stamp:
+            return self.memory.get(resource_id, self.build)
+        version = self.store.latest(resource_id) if stamp is not None \
+            else None
+        if version is not None:
+            return self.load(resource_id, version, stamp=stamp)
+        local_model = (build_fn or self.build)(resource_id)
+        self.put(resource_id, local_model)
+        return local_model
+
+    def load(self, resource_id, version, stamp=None):
+        """Loads a version of the local model from the storage. Only the
+        latest version loaded is kept in memory.
+
+        """
+        local_model = loads_binary(self.store.buffer(resource_id, version),
+                                   api=self.api)
+        if version == self.store.latest(resource_id):
+            if stamp is None:
+                stamp = self.store.stamp(resource_id)
+            self.memory.add(resource_id, local_model)
+            self.stamps[resource_id] = (stamp, version)
+        return local_model
+
+    def put(self, resource_id, local_model):
+        """Stores the local model as the latest version of the resource.
+        Returns the version, which is the hash of its binary contents.
+
+        """
+        output = io.BytesIO()
+        dump_binary(local_model, output)
+        contents = output.getvalue()
+        version = content_hash(contents)
+        self.store.save(resource_id, version, contents)
+        self.memory.add(resource_id, local_model)
+        self.stamps[resource_id] = (self.store.stamp(resource_id), version)
+        return version
+
+    def version(self, resource_id):
+        """Returns the latest version stored for the resource """
+        return self.store.latest(resource_id)
+
+    def versions(self, resource_id):
+        """Returns the stored versions of the resource, newest first """
+        return self.store.versions(resource_id)
+
+    def prune(self, resource_id, keep=1):
+        """Removes the oldest stored versions of the resource, keeping the
+        latest one and up to `keep` versions in all.
+
+        """
+        latest = self.store.latest(resource_id)
+        old_versions = [version for version in
+                        self.store.versions(resource_id)
+                        if version != latest]
+        for version in old_versions[max(keep - 1, 0):]:
+            self.store.remove(resource_id, version)
+
+    def remove(self, resource_id):
+        """Removes the resource from memory and storage """
+        self.memory.remove(resource_id)
+        self.stamps.pop(resource_id, None)
+        self.store.remove(resource_id)
+
+    def clear(self):
+        """Removes all the models from memory. Storage is kept. """
+        self.memory.clear()
+        self.stamps = {}
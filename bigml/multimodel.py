@@ -103,7 +103,8 @@ class MultiModel():
     """
 
     def __init__(self, models, api=None, fields=None, class_names=None,
-                 cache_get=None, operation_settings=None):
+                 cache_get=None, operation_settings=None, fields_pool=None,
+                 compact_tree=False):
 
         self.models = []
         self.class_names = class_names
@@ -118,7 +119,9 @@ class MultiModel():
                         self.models.append(Model(
                             model, api=api, fields=fields,
                             cache_get=cache_get,
-                            operation_settings=operation_settings))
+                            operation_settings=operation_settings,
+                            fields_pool=fields_pool,
+                            compact_tree=compact_tree))
                     except NoRootDecisionTree:
                         pass
         else:
@@ -126,7 +129,9 @@ class MultiModel():
                 self.models.append(Model(
                     models, api=api, fields=fields,
                     cache_get=cache_get,
-                    operation_settings=operation_settings))
+                    operation_settings=operation_settings,
+                    fields_pool=fields_pool,
+                    compact_tree=compact_tree))
             except NoRootDecisionTree:
                 pass
 
@@ -245,6 +250,24 @@ class MultiModel():
 
         return MultiVoteList(votes)
 
+    def generate_probability_confidence_votes(
+            self, input_data, missing_strategy=LAST_PREDICTION):
+        """Generates the MultiVoteList objects that contain the probabilities
+        and the confidences predicted by each of the models, evaluating every
+        model only once.
+        """
+        probabilities = []
+        confidences = []
+        for model in self.models:
+            model.class_names = self.class_names
+            probability, confidence = model.predict_probability_confidence( \
+                input_data, missing_strategy=missing_strategy)
+            probabilities.append(probability)
+            confidences.append([category["confidence"]
+                                for category in confidence])
+
+        return MultiVoteList(probabilities), MultiVoteList(confidences)
+
     def batch_predict(self, input_data_list, output_file_path=None,
                       reuse=False,
                       missing_strategy=LAST_PREDICTION, headers=None,
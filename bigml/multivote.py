@@ -21,7 +21,6 @@ import logging
 import numbers
 import math
 
-
 from bigml.util import PRECISION
 
 
@@ -68,12 +67,37 @@ CONFIDENCE_W = COMBINATION_WEIGHTS[CONFIDENCE]
 DEFAULT_METHOD = 0
 BINS_LIMIT = 32
 
+
+def get_numpy():
+    """Returns the numpy module. It is imported the first time that votes
+    are combined instead of when loading this module.
+
+    """
+    #pylint: disable=locally-disabled,import-outside-toplevel
+    import numpy
+    return numpy
+
+
+def sequential_sum(values):
+    """Adds up an array of values in order, so that the result is the same
+    obtained by accumulating them one by one.
+
+    """
+    np = get_numpy()
+    values = np.asarray(values, dtype=float)
+    return float(np.cumsum(values)[-1]) if values.size else 0.0
+
+
 def weighted_sum(predictions, weight=None):
     """Returns a weighted sum of the predictions
 
     """
-    return sum([prediction["prediction"] * prediction[weight] for
-                prediction in predictions])
+    np = get_numpy()
+    return sequential_sum( \
+        np.array([prediction["prediction"] for prediction in predictions],
+                 dtype=float) *
+        np.array([prediction[weight] for prediction in predictions],
+                 dtype=float))
 
 
 def softmax(predictions):
@@ -151,22 +175,152 @@ def merge_bins(distribution, limit):
     length = len(distribution)
     if limit < 1 or length <= limit or length < 2:
         return distribution
-    index_to_merge = 2
-    shortest = float('inf')
-    for index in range(1, length):
-        distance = distribution[index][0] - distribution[index - 1][0]
-        if distance < shortest:
-            shortest = distance
-            index_to_merge = index
-    new_distribution = distribution[: index_to_merge - 1]
-    left = distribution[index_to_merge - 1]
-    right = distribution[index_to_merge]
-    new_bin = [(left[0] * left[1] + right[0] * right[1]) /
-               (left[1] + right[1]), left[1] + right[1]]
-    new_distribution.append(new_bin)
-    if index_to_merge < (length - 1):
-        new_distribution.extend(distribution[(index_to_merge + 1):])
-    return merge_bins(new_distribution, limit)
+    distribution = list(distribution)
+    while len(distribution) > limit:
+        index_to_merge = 2
+        shortest = float('inf')
+        for index in range(1, len(distribution)):
+            distance = distribution[index][0] - distribution[index - 1][0]
+            if distance < shortest:
+                shortest = distance
+                index_to_merge = index
+        left = distribution[index_to_merge - 1]
+        right = distribution[index_to_merge]
+        distribution[index_to_merge - 1: index_to_merge + 1] = [ \
+            [(left[0] * left[1] + right[0] * right[1]) /
+             (left[1] + right[1]), left[1] + right[1]]]
+    return distribution
+
+
+def float_value(value):
+    """Returns the value as stored in an array of floats, where None
+    becomes nan.
+
+    """
+    return float('nan') if value is None else value
+
+
+def distribution_summary(joined_distribution):
+    """Returns the distribution given as a map, sorted by value and with
+    its bins merged when there are too many of them, and its unit.
+
+    """
+    # when there's more instances, sort elements by their mean
+    distribution = [list(element) for element in
+                    sorted(list(joined_distribution.items()),
+                           key=lambda x: x[0])]
+    distribution_unit = ('bins' if len(distribution) > BINS_LIMIT
+                         else 'counts')
+    distribution = merge_bins(distribution, BINS_LIMIT)
+    return {'distribution': distribution,
+            'distribution_unit': distribution_unit}
+
+
+def top_category(categories, totals, orders):
+    """Returns the category with the largest total, breaking ties by
+    the lowest order and then by the largest category.
+
+    """
+    np = get_numpy()
+    candidates = np.flatnonzero(totals == totals.max())
+    best_order = orders[candidates].min()
+    return max(categories[candidate] for candidate in candidates
+               if orders[candidate] == best_order)
+
+
+def normalized_error_weights(errors, top_range):
+    """Returns the array of weights derived from the normalized errors of
+    the votes, and their normalization factor.
+
+    """
+    np = get_numpy()
+    error_values = [error for error in errors if error is not None]
+    max_error = max(error_values)
+    min_error = min(error_values)
+    error_range = 1.0 * (max_error - min_error)
+    if error_range > 0:
+        # Shifts and scales predictions errors to [0, top_range].
+        # Then builds e^-[scaled error] and returns the normalization
+        # factor to fit them between [0, 1]
+        weights = np.array([math.exp((min_error - error)
+                                     / error_range * top_range)
+                            for error in errors], dtype=float)
+        return weights, sequential_sum(weights)
+    return np.ones(len(errors)), len(error_values)
+
+
+def boosting_combination(categories, scores, orders, full=False):
+    """Returns the prediction of a boosted classification from the scores
+    of its categories (their sum of weighted gradients plus the offset).
+    Ties are broken by the given orders, the position of each category in
+    the objective field summary.
+
+    """
+    np = get_numpy()
+    # softmax of the per-class scores
+    scores = np.exp(scores)
+    probabilities = scores / sequential_sum(scores)
+    ranking = np.lexsort((orders, -probabilities)).tolist()
+    probabilities = probabilities.tolist()
+    prediction = categories[ranking[0]]
+    confidence = round(probabilities[ranking[0]], PRECISION)
+    if full:
+        return {"prediction": prediction,
+                "probability": confidence, \
+            "probabilities": [ \
+                {"category": categories[index],
+                 "probability": round(probabilities[index], PRECISION)}
+                for index in ranking]}
+    return prediction
+
+
+class VoteArrays():
+    """Columnar view of a list of votes. The votes are grouped by the
+    value of their `key` attribute (the predicted category by default) and
+    each group is assigned an index in order of first appearance, so that
+    per-group reductions are computed as array operations.
+
+    """
+
+    def __init__(self, predictions, key='prediction'):
+        np = get_numpy()
+        self.predictions = [prediction for prediction in predictions
+                            if prediction.get(key) is not None]
+        self.categories = []
+        positions = {}
+        first_votes = []
+        index = []
+        for position, prediction in enumerate(self.predictions):
+            category = prediction[key]
+            if category not in positions:
+                positions[category] = len(self.categories)
+                self.categories.append(category)
+                first_votes.append(position)
+            index.append(positions[category])
+        self.index = np.array(index, dtype=int)
+        self.first_votes = np.array(first_votes, dtype=int)
+
+    def column(self, key, dtype=float):
+        """Array of the values of `key` in the votes """
+        np = get_numpy()
+        return np.array([prediction[key] for prediction in self.predictions],
+                        dtype=dtype)
+
+    def group_sum(self, values):
+        """Adds up the values of the votes in each group. The values are
+        accumulated in the votes order.
+
+        """
+        np = get_numpy()
+        return np.bincount(self.index, weights=values,
+                           minlength=len(self.categories))
+
+    def winner(self, totals, orders):
+        """Returns the category with the largest total, breaking ties by
+        the lowest order and then by the largest category.
+
+        """
+        return top_category(self.categories, totals, orders)
 
 
 class MultiVote():
@@ -182,22 +336,11 @@ class MultiVote():
 
         """
         joined_distribution = {}
-        distribution_unit = 'counts'
         for prediction in instance.predictions:
             joined_distribution = merge_distributions(
                 joined_distribution,
                 dict((x[0], x[1]) for x in prediction['distribution']))
-            # when there's more instances, sort elements by their mean
-            distribution = [list(element) for element in
-                            sorted(list(joined_distribution.items()),
-                                   key=lambda x: x[0])]
-            if distribution_unit == 'counts':
-                distribution_unit = ('bins' if len(distribution) > BINS_LIMIT
-                                     else 'counts')
-            if distribution_unit != 'categories':
-                distribution = merge_bins(distribution, BINS_LIMIT)
-        return {'distribution': distribution,
-                'distribution_unit': distribution_unit}
+        return distribution_summary(joined_distribution)
 
     @classmethod
     def avg(cls, instance, full=False):
@@ -213,31 +356,21 @@ class MultiVote():
             raise Exception("Not enough data to use the selected "
                             "prediction method. Try creating your"
                             " model anew.")
+        np = get_numpy()
         total = len(instance.predictions)
-        result = 0.0
-        median_result = 0.0
-        confidence = 0.0
-        instances = 0
-        missing_confidence = 0
-        d_min = float('Inf')
-        d_max = float('-Inf')
-        for prediction in instance.predictions:
-            result += prediction['prediction']
-            if full:
-                if 'median' in prediction:
-                    median_result += prediction['median']
-                # some buggy models don't produce a valid confidence value
-                if prediction[CONFIDENCE_W] is not None and \
-                   prediction[CONFIDENCE_W] > 0:
-                    confidence += prediction[CONFIDENCE_W]
-                else:
-                    missing_confidence += 1
-                instances += prediction['count']
-                if 'min' in prediction and prediction['min'] < d_min:
-                    d_min = prediction['min']
-                if 'max' in prediction and prediction['max'] > d_max:
-                    d_max = prediction['max']
+        result = sequential_sum([prediction['prediction'] for prediction
+                                 in instance.predictions])
         if full:
+            # some buggy models don't produce a valid confidence value
+            confidences = np.array( \
+                [prediction[CONFIDENCE_W] or 0 for prediction
+                 in instance.predictions], dtype=float)
+            valid_confidences = confidences[confidences > 0]
+            missing_confidence = total - valid_confidences.size
+            confidence = sequential_sum(valid_confidences)
+            median_result = sequential_sum( \
+                [prediction['median'] for prediction in instance.predictions
+                 if 'median' in prediction])
             output = {'prediction': result / total if total > 0 else \
                 float('nan')}
             # some strange models have no confidence
@@ -246,18 +379,33 @@ class MultiVote():
                     confidence / (total - missing_confidence), PRECISION) \
                  if total > 0 else 0})
             output.update(cls.grouped_distribution(instance))
-            output.update({'count': instances})
+            output.update({'count': sum(prediction['count'] for prediction
+                                        in instance.predictions)})
             if median_result > 0:
                 output.update({
                     'median': median_result / total if \
                     total > 0 else float('nan')})
-            if d_min < float('Inf'):
-                output.update({'min': d_min})
-            if d_max > float('-Inf'):
-                output.update({'max': d_max})
+            output.update(cls.range_limits(instance))
             return output
         return result / total if total > 0 else float('nan')
 
+    @classmethod
+    def range_limits(cls, instance):
+        """Returns the minimum and maximum values reported by the
+        predictions, if any.
+
+        """
+        limits = {}
+        d_min = min([prediction['min'] for prediction in instance.predictions
+                     if 'min' in prediction], default=float('Inf'))
+        d_max = max([prediction['max'] for prediction in instance.predictions
+                     if 'max' in prediction], default=float('-Inf'))
+        if d_min < float('Inf'):
+            limits.update({'min': d_min})
+        if d_max > float('-Inf'):
+            limits.update({'max': d_max})
+        return limits
+
     @classmethod
     def error_weighted(cls, instance, full=False):
         """Returns the prediction combining votes using error to compute weight
@@ -272,54 +420,50 @@ class MultiVote():
             raise Exception("Not enough data to use the selected "
                             "prediction method. Try creating your"
                             " model anew.")
+        np = get_numpy()
         top_range = 10
-        result = 0.0
-        median_result = 0.0
-        instances = 0
-        d_min = float('Inf')
-        d_max = float('-Inf')
-        normalization_factor = cls.normalize_error(instance, top_range)
+        error_weights, normalization_factor = cls.error_weights( \
+            instance, top_range)
         if normalization_factor == 0:
             if full:
                 return {"prediction": float('nan')}
             return float('nan')
+        result = sequential_sum( \
+            np.array([prediction['prediction'] for prediction
+                      in instance.predictions], dtype=float) * error_weights)
         if full:
-            combined_error = 0.0
-        for prediction in instance.predictions:
-            result += prediction['prediction'] * prediction['_error_weight']
-            if full:
-                if 'median' in prediction:
-                    median_result += (prediction['median'] *
-                                      prediction['_error_weight'])
-                instances += prediction['count']
-                if 'min' in prediction and prediction['min'] < d_min:
-                    d_min = prediction['min']
-                if 'max' in prediction and prediction['max'] > d_max:
-                    d_max = prediction['max']
-                # some buggy models don't produce a valid confidence value
-                if prediction[CONFIDENCE_W] is not None:
-                    combined_error += (prediction[CONFIDENCE_W] *
-                                       prediction['_error_weight'])
-            del prediction['_error_weight']
-        if full:
+            with_median = np.array(['median' in prediction for prediction
+                                    in instance.predictions], dtype=bool)
+            median_result = sequential_sum( \
+                np.array([prediction['median'] for prediction
+                          in instance.predictions if 'median' in prediction],
+                         dtype=float) * error_weights[with_median])
+            # some buggy models don't produce a valid confidence value
+            with_confidence = np.array( \
+                [prediction[CONFIDENCE_W] is not None for prediction
+                 in instance.predictions], dtype=bool)
+            combined_error = sequential_sum( \
+                np.array([prediction[CONFIDENCE_W] for prediction
+                          in instance.predictions
+                          if prediction[CONFIDENCE_W] is not None],
+                         dtype=float) * error_weights[with_confidence])
             output = {'prediction': result / normalization_factor}
             output.update({'confidence':
                            round(combined_error / normalization_factor,
                                  PRECISION)})
             output.update(cls.grouped_distribution(instance))
-            output.update({'count': instances})
+            output.update({'count': sum(prediction['count'] for prediction
+                                        in instance.predictions)})
             if median_result > 0:
                 output.update({'median': median_result / normalization_factor})
-            if d_min < float('Inf'):
-                output.update({'min': d_min})
-            if d_max > float('-Inf'):
-                output.update({'max': d_max})
+            output.update(cls.range_limits(instance))
             return output
         return result / normalization_factor
 
     @classmethod
-    def normalize_error(cls, instance, top_range):
-        """Normalizes error to a [0, top_range] and builds probabilities
+    def error_weights(cls, instance, top_range):
+        """Returns the array of weights derived from the normalized error of
+        each prediction, and their normalization factor.
 
         """
         if instance.predictions and not all(CONFIDENCE_W in prediction
@@ -329,27 +473,18 @@ class MultiVote():
                             "prediction method. Try creating your"
                             " model anew.")
 
-        error_values = []
-        for prediction in instance.predictions:
-            if prediction[CONFIDENCE_W] is not None:
-                error_values.append(prediction[CONFIDENCE_W])
-        max_error = max(error_values)
-        min_error = min(error_values)
-        error_range = 1.0 * (max_error - min_error)
-        normalize_factor = 0
-        if error_range > 0:
-            # Shifts and scales predictions errors to [0, top_range].
-            # Then builds e^-[scaled error] and returns the normalization
-            # factor to fit them between [0, 1]
-            for prediction in instance.predictions:
-                delta = (min_error - prediction[CONFIDENCE_W])
-                prediction['_error_weight'] = math.exp(delta / error_range *
-                                                       top_range)
-                normalize_factor += prediction['_error_weight']
-        else:
-            for prediction in instance.predictions:
-                prediction['_error_weight'] = 1
-            normalize_factor = len(error_values)
+        return normalized_error_weights( \
+            [prediction[CONFIDENCE_W] for prediction in instance.predictions],
+            top_range)
+
+    @classmethod
+    def normalize_error(cls, instance, top_range):
+        """Normalizes error to a [0, top_range] and builds probabilities
+
+        """
+        weights, normalize_factor = cls.error_weights(instance, top_range)
+        for prediction, weight in zip(instance.predictions, weights.tolist()):
+            prediction['_error_weight'] = weight
         return normalize_factor
 
     def __init__(self, predictions, boosting_offsets=None):
@@ -488,16 +623,12 @@ class MultiVote():
             raise Exception("Not enough data to use the selected "
                             "prediction method. Try creating your"
                             " model anew.")
-        distribution = {}
-        total = 0
-        for prediction in self.predictions:
-            if prediction['prediction'] not in distribution:
-                distribution[prediction['prediction']] = 0.0
-            distribution[prediction['prediction']] += prediction[weight_label]
-            total += prediction['count']
+        votes = VoteArrays(self.predictions)
+        weights = votes.group_sum(votes.column(weight_label))
+        total = sum(prediction['count'] for prediction in votes.predictions)
+        distribution = list(zip(votes.categories, weights.tolist()))
         if total > 0:
-            distribution = [[key, value] for key, value in
-                            list(distribution.items())]
+            distribution = [[key, value] for key, value in distribution]
         else:
             distribution = []
         return distribution, total
@@ -514,32 +645,15 @@ class MultiVote():
             average of the confidences of the votes for the combined
             prediction) will also be given.
         """
-        mode = {}
-        instances = 0
-        if weight_label is None:
-            weight = 1
-        for prediction in self.predictions:
-            if weight_label is not None:
-                if weight_label not in list(COMBINATION_WEIGHTS.values()):
-                    raise Exception("Wrong weight_label value.")
-                if weight_label not in prediction:
-                    raise Exception("Not enough data to use the selected "
-                                    "prediction method. Try creating your"
-                                    " model anew.")
-                weight = prediction[weight_label]
-            category = prediction['prediction']
-            if full:
-                instances += prediction['count']
-            if category in mode:
-                mode[category] = {"count": mode[category]["count"] + weight,
-                                  "order": mode[category]["order"]}
-            else:
-                mode[category] = {"count": weight,
-                                  "order": prediction['order']}
-        prediction = sorted(list(mode.items()), key=lambda x: (x[1]['count'],
-                                                               -x[1]['order'],
-                                                               x[0]),
-                            reverse=True)[0][0]
+        if weight_label is not None and self.predictions:
+            if weight_label not in list(COMBINATION_WEIGHTS.values()):
+                raise Exception("Wrong weight_label value.")
+            if not all(weight_label in prediction
+                       for prediction in self.predictions):
+                raise Exception("Not enough data to use the selected "
+                                "prediction method. Try creating your"
+                                " model anew.")
+        prediction = self.categorical_winner(weight_label)
         if full:
             output = {'prediction': prediction}
             if 'confidence' in self.predictions[0]:
@@ -561,10 +675,24 @@ class MultiVote():
                         output['probability'] = prediction['probability']
             if 'distribution' in self.predictions[0]:
                 output.update(self.__class__.grouped_distribution(self))
-            output.update({'count': instances})
+            output.update({'count': sum(prediction['count'] for prediction
+                                        in self.predictions)})
             return output
         return prediction
 
+    def categorical_winner(self, weight_label=None):
+        """Returns the category with the largest total weight of votes,
+        breaking ties by the order of their first vote and then by the
+        largest category.
+
+        """
+        np = get_numpy()
+        votes = VoteArrays(self.predictions)
+        weights = np.ones(len(votes.predictions)) if weight_label is None \
+            else votes.column(weight_label)
+        orders = votes.column('order')[votes.first_votes]
+        return votes.winner(votes.group_sum(weights), orders)
+
     def weighted_confidence(self, combined_prediction, weight_label):
         """Compute the combined weighted confidence from a list of predictions
 
@@ -578,16 +706,16 @@ class MultiVote():
             raise ValueError("Not enough data to use the selected "
                              "prediction method. Lacks %s information." %
                              weight_label)
-        final_confidence = 0.0
-        total_weight = 0.0
-        weight = 1
-        for prediction in predictions:
-            if weight_label is not None:
-                weight = prediction[weight_label]
-            final_confidence += weight * prediction[CONFIDENCE_W]
-            total_weight += weight
-        final_confidence = (final_confidence / total_weight
-                            if total_weight > 0 else float('nan'))
+        np = get_numpy()
+        weights = np.ones(len(predictions)) if weight_label is None else \
+            np.array([prediction[weight_label] for prediction in predictions],
+                     dtype=float)
+        confidences = np.array([prediction[CONFIDENCE_W] for prediction
+                                in predictions], dtype=float)
+        total_weight = sequential_sum(weights)
+        final_confidence = (sequential_sum(weights * confidences) /
+                            total_weight if total_weight > 0
+                            else float('nan'))
         return combined_prediction, final_confidence
 
     def classification_boosting_combiner(self, options, full=False):
@@ -596,34 +724,17 @@ class MultiVote():
         use the order of the categories in the ensemble summary to decide.
 
         """
-        grouped_predictions = {}
-        for prediction in self.predictions:
-            if prediction.get(BOOSTING_CLASS) is not None:
-                objective_class = prediction.get(BOOSTING_CLASS)
-                if grouped_predictions.get(objective_class) is None:
-                    grouped_predictions[objective_class] = []
-                grouped_predictions[objective_class].append(prediction)
         categories = options.get("categories", [])
-        predictions = {key: { \
-            "probability": weighted_sum(value, weight="weight") + \
-                self.boosting_offsets.get(key, 0),
-            "order": categories.index(key)} for
-                       key, value in list(grouped_predictions.items())}
-        predictions = softmax(predictions)
-        predictions = sorted( \
-            list(predictions.items()), key=lambda x: \
-            (- x[1]["probability"], x[1]["order"]))
-        prediction, prediction_info = predictions[0]
-        confidence = round(prediction_info["probability"], PRECISION)
-        if full:
-            return {"prediction": prediction,
-                    "probability": confidence, \
-                "probabilities": [ \
-                    {"category": prediction,
-                     "probability": round(prediction_info["probability"],
-                                          PRECISION)}
-                    for prediction, prediction_info in predictions]}
-        return prediction
+        np = get_numpy()
+        votes = VoteArrays(self.predictions, key=BOOSTING_CLASS)
+        scores = votes.group_sum(votes.column("prediction") *
+                                 votes.column("weight")) + \
+            np.array([self.boosting_offsets.get(category, 0)
+                      for category in votes.categories], dtype=float)
+        orders = np.array([categories.index(category)
+                           for category in votes.categories], dtype=int)
+        return boosting_combination(votes.categories, scores, orders,
+                                    full=full)
 
     def append(self, prediction_info):
         """Adds a new prediction into a list of predictions
@@ -789,3 +900,437 @@ NUMERICAL_COMBINATION_METHODS = {
     PLURALITY: MultiVote.avg,
     CONFIDENCE: MultiVote.error_weighted,
     PROBABILITY: MultiVote.avg}
+
+
+class VoteTotals():
+    """Totals of the votes given to a list of inputs, kept in arrays with
+    one row per input. Votes are added as each group of models predicts
+    and only the sums that the combination method needs are stored, so
+    the votes themselves can be discarded. Combining the totals of an
+    input gives the result of combining a MultiVote with all its votes.
+
+    """
+
+    def __init__(self, rows, method=DEFAULT_METHOD, options=None,
+                 regression=False, boosting_offsets=None, categories=None):
+        """Init method. `rows` is the number of inputs and `categories` the
+        list of classes in classifications. The rest of arguments are the
+        ones used in the MultiVote constructor and combine method.
+
+        """
+        np = get_numpy()
+        self.method = COMBINER_MAP.get(method, COMBINER_MAP[DEFAULT_METHOD])
+        self.options = options
+        self.regression = regression
+        self.boosting = boosting_offsets is not None
+        self.boosting_offsets = boosting_offsets
+        # keys shared by all the votes, that set the attributes of the result
+        self.keys = None
+        self.lengths = np.zeros(rows, dtype=int)
+        self.totals = {}
+        # arrays with a column per category and their initial values
+        self.category_totals = {}
+        self.categories = []
+        self.positions = {}
+        # counts and distributions of the nodes, grouped by predicted
+        # category only when the votes for a category are singled out
+        self.counts = [{} for _ in range(rows)]
+        self.distributions = [{} for _ in range(rows)]
+        self.limits = [{} for _ in range(rows)]
+        self.values = None
+        # rows with regression votes that are not numbers, which
+        # MultiVote combines as categories
+        self.non_numeric = set()
+        if self.boosting and regression:
+            self.add_vote = self._add_gradient
+            self.totals["gradient"] = np.zeros(rows)
+        elif self.boosting:
+            self.add_vote = self._add_class_gradient
+            self.category_totals = {"score": 0.0, "first": -1}
+        elif regression:
+            self.add_vote = self._add_numeric
+            for key in ["prediction", "confidence", "missing_confidence",
+                        "median"]:
+                self.totals[key] = np.zeros(rows)
+            if self.method == CONFIDENCE:
+                # error weights depend on the range of the errors of all
+                # the votes, so the values of each vote are kept
+                self.values = [[] for _ in range(rows)]
+        elif self.method == PROBABILITY:
+            self.add_vote = self._add_probabilities
+            self.category_totals = {"probability": 0.0, "last": 0.0,
+                                    "first": -1, "seen": -1}
+            self.entries = np.zeros(rows, dtype=int)
+        else:
+            self.add_vote = self._add_categorical
+            self.category_totals = {"votes": 0.0, "confidence": 0.0,
+                                    "squared_confidence": 0.0,
+                                    "probability": 0.0, "first": -1}
+        for key, value in self.category_totals.items():
+            self.totals[key] = np.full((rows, 0), value, dtype=type(value))
+        for category in categories or []:
+            self.category_index(category)
+
+    def category_index(self, category):
+        """Returns the column of the category in the totals arrays, adding
+        it when needed.
+
+        """
+        position = self.positions.get(category)
+        if position is None:
+            np = get_numpy()
+            position = len(self.categories)
+            self.positions[category] = position
+            self.categories.append(category)
+            for key, value in self.category_totals.items():
+                self.totals[key] = np.hstack(( \
+                    self.totals[key],
+                    np.full((len(self.lengths), 1), value,
+                            dtype=type(value))))
+        return position
+
+    def add(self, row, predictions):
+        """Adds the votes of a group of models to the totals of the input
+        in the given row.
+
+        """
+        for prediction in predictions:
+            if self.keys is None:
+                self.keys = set(prediction.keys())
+            else:
+                self.keys.intersection_update(prediction.keys())
+            self.add_vote(row, prediction, self.lengths[row])
+            self.lengths[row] += 1
+
+    def _add_node(self, row, prediction, group=None):
+        """Adds the count and distribution of the predicted node """
+        counts = self.counts[row]
+        counts[group] = counts.get(group, 0) + prediction['count']
+        if prediction.get('distribution') is not None:
+            distributions = self.distributions[row]
+            if group not in distributions:
+                distributions[group] = {}
+            merge_distributions(distributions[group],
+                                dict((x[0], x[1]) for x in
+                                     prediction['distribution']))
+
+    def _add_limits(self, row, prediction):
+        """Adds the minimum and maximum values of a regression vote """
+        limits = self.limits[row]
+        for limit, function in [("min", min), ("max", max)]:
+            if limit in prediction:
+                limits[limit] = prediction[limit] if limit not in limits \
+                    else function(limits[limit], prediction[limit])
+
+    def _add_gradient(self, row, prediction, _):
+        """Adds the weighted gradient of a boosted regression vote """
+        weight = prediction[COMBINATION_WEIGHTS[BOOSTING]] or 0
+        self.totals["gradient"][row] += \
+            float_value(prediction["prediction"]) * weight
+
+    def _add_class_gradient(self, row, prediction, position):
+        """Adds the weighted gradient of a boosted classification vote to
+        the score of its class.
+
+        """
+        category = prediction.get(BOOSTING_CLASS)
+        if category is None:
+            return
+        weight = prediction[COMBINATION_WEIGHTS[BOOSTING]] or 0
+        index = self.category_index(category)
+        self.totals["score"][row, index] += \
+            float_value(prediction["prediction"]) * weight
+        if self.totals["first"][row, index] < 0:
+            self.totals["first"][row, index] = position
+
+    def _add_numeric(self, row, prediction, _):
+        """Adds a regression vote """
+        if not isinstance(prediction["prediction"], numbers.Number):
+            self.non_numeric.add(row)
+        totals = self.totals
+        totals["prediction"][row] += float_value(prediction["prediction"])
+        # some buggy models don't produce a valid confidence value
+        confidence = prediction[CONFIDENCE_W] or 0
+        if confidence > 0:
+            totals["confidence"][row] += confidence
+        else:
+            totals["missing_confidence"][row] += 1
+        if 'median' in prediction:
+            totals["median"][row] += float_value(prediction['median'])
+        if self.values is not None:
+            self.values[row].append((prediction["prediction"], confidence,
+                                     'median' in prediction,
+                                     prediction.get('median')))
+        self._add_node(row, prediction)
+        self._add_limits(row, prediction)
+
+    def _add_categorical(self, row, prediction, position):
+        """Adds a classification vote to the totals of its category """
+        category = prediction['prediction']
+        if category is None:
+            # votes with no prediction are not counted for any category
+            self._add_node(row, prediction)
+            return
+        index = self.category_index(category)
+        totals = self.totals
+        totals["votes"][row, index] += 1
+        if CONFIDENCE_W in prediction:
+            confidence = float_value(prediction[CONFIDENCE_W])
+            totals["confidence"][row, index] += confidence
+            totals["squared_confidence"][row, index] += \
+                confidence * confidence
+        if prediction.get('probability') is not None:
+            totals["probability"][row, index] = prediction['probability']
+        if totals["first"][row, index] < 0:
+            totals["first"][row, index] = position
+        self._add_node(row, prediction,
+                       group=category if self.method == THRESHOLD else None)
+
+    def _add_probabilities(self, row, prediction, position):
+        """Adds the probabilities of the categories in the distribution of
+        the predicted node, as `MultiVote.probability_weight` does.
+
+        """
+        if 'distribution' not in prediction or 'count' not in prediction:
+            raise Exception("Not enough data to use the selected "
+                            "prediction method. Try creating your"
+                            " model anew.")
+        total = prediction['count']
+        if total < 1 or not isinstance(total, int):
+            raise Exception("Probability weighting is not available "
+                            "because distribution seems to have %s "
+                            "as number of instances in a node" % total)
+        totals = self.totals
+        counts = self.counts[row]
+        for category, instances in prediction['distribution']:
+            index = self.category_index(category)
+            probability = round(float(instances) / total, PRECISION)
+            totals["probability"][row, index] += probability
+            totals["last"][row, index] = probability
+            if totals["first"][row, index] < 0:
+                totals["first"][row, index] = position
+                totals["seen"][row, index] = self.entries[row]
+            self.entries[row] += 1
+            counts[None] = counts.get(None, 0) + instances
+
+    def combine(self, row, full=False):
+        """Combines the votes of the input in the given row, as
+        `MultiVote.combine` does.
+
+        """
+        if self.lengths[row] == 0:
+            raise Exception("No predictions to be combined.")
+        # and all predictions should have the weight-related keys
+        if any(key not in self.keys for key in
+               WEIGHT_KEYS.get(self.method) or []):
+            raise Exception("Not enough data to use the selected "
+                            "prediction method. Try creating your"
+                            " model anew.")
+        if self.boosting and self.regression:
+            # sum all gradients weighted by their "weight" plus the
+            # boosting offset
+            return float(self.totals["gradient"][row]) + \
+                self.boosting_offsets
+        if self.boosting:
+            return self._boosting_combination(row, full=full)
+        if self.regression and self.method == CONFIDENCE:
+            return self._error_weighted(row, full=full)
+        if self.regression:
+            return self._average(row, full=full)
+        if self.method == PROBABILITY:
+            return self._probability_weighted(row, full=full)
+        return self._categorical(row, full=full)
+
+    def _range_limits(self, row):
+        """Minimum and maximum values reported by the votes, if any """
+        limits = {}
+        d_min = self.limits[row].get("min", float('Inf'))
+        d_max = self.limits[row].get("max", float('-Inf'))
+        if d_min < float('Inf'):
+            limits.update({'min': d_min})
+        if d_max > float('-Inf'):
+            limits.update({'max': d_max})
+        return limits
+
+    def _node_totals(self, row, groups=None):
+        """Count and distribution of the predicted nodes in the given
+        groups of votes.
+
+        """
+        if groups is None:
+            groups = [None]
+        output = {}
+        if 'distribution' in self.keys:
+            joined_distribution = {}
+            for group in groups:
+                merge_distributions(joined_distribution,
+                                    self.distributions[row].get(group, {}))
+            output.update(distribution_summary(joined_distribution))
+        output.update({'count': sum(self.counts[row].get(group, 0)
+                                    for group in groups)})
+        return output
+
+    def _boosting_combination(self, row, full=False):
+        """Combines the scores of the classes of a boosted classification """
+        np = get_numpy()
+        first = self.totals["first"][row]
+        indexes = np.flatnonzero(first >= 0)
+        # classes are sorted by their first vote
+        indexes = indexes[np.argsort(first[indexes], kind="stable")]
+        categories = [self.categories[index] for index in indexes.tolist()]
+        scores = self.totals["score"][row][indexes] + \
+            np.array([self.boosting_offsets.get(category, 0)
+                      for category in categories], dtype=float)
+        summary_categories = self.options.get("categories", [])
+        orders = np.array([summary_categories.index(category)
+                           for category in categories], dtype=int)
+        return boosting_combination(categories, scores, orders, full=full)
+
+    def _average(self, row, full=False):
+        """Average of the regression votes, as in `MultiVote.avg` """
+        total = int(self.lengths[row])
+        result = float(self.totals["prediction"][row])
+        if not full:
+            return result / total
+        missing_confidence = int(self.totals["missing_confidence"][row])
+        output = {'prediction': result / total}
+        # some strange models have no confidence
+        output.update(
+            {'confidence': round( \
+                float(self.totals["confidence"][row]) /
+                (total - missing_confidence), PRECISION)})
+        output.update(self._node_totals(row))
+        median_result = float(self.totals["median"][row])
+        if median_result > 0:
+            output.update({'median': median_result / total})
+        output.update(self._range_limits(row))
+        return output
+
+    def _error_weighted(self, row, full=False):
+        """Error weighted combination of the regression votes, as in
+        `MultiVote.error_weighted`
+
+        """
+        np = get_numpy()
+        predictions, confidences, with_median, medians = \
+            zip(*self.values[row])
+        weights, normalization_factor = normalized_error_weights( \
+            confidences, 10)
+        if normalization_factor == 0:
+            if full:
+                return {"prediction": float('nan')}
+            return float('nan')
+        result = sequential_sum(np.array(predictions, dtype=float) * weights)
+        if not full:
+            return result / normalization_factor
+        with_median = np.array(with_median, dtype=bool)
+        median_result = sequential_sum( \
+            np.array(medians, dtype=float)[with_median] *
+            weights[with_median])
+        combined_error = sequential_sum(np.array(confidences, dtype=float) *
+                                        weights)
+        output = {'prediction': result / normalization_factor}
+        output.update({'confidence':
+                       round(combined_error / normalization_factor,
+                             PRECISION)})
+        output.update(self._node_totals(row))
+        if median_result > 0:
+            output.update({'median': median_result / normalization_factor})
+        output.update(self._range_limits(row))
+        return output
+
+    def _single_out_category(self, row, indexes):
+        """Returns the columns of the categories whose votes are combined
+        when a threshold is set, as in `MultiVote.single_out_category`
+
+        """
+        options = self.options
+        if options is None or any(option not in options for option in
+                                  ["threshold", "category"]):
+            raise Exception("No category and threshold information was"
+                            " found. Add threshold and category info."
+                            " E.g. {\"threshold\": 6, \"category\":"
+                            " \"Iris-virginica\"}.")
+        length = int(self.lengths[row])
+        if options["threshold"] > length:
+            raise Exception("You cannot set a threshold value larger than "
+                            "%s. The ensemble has not enough models to use"
+                            " this threshold value." % length)
+        if options["threshold"] < 1:
+            raise Exception("The threshold must be a positive value")
+        position = self.positions.get(options["category"])
+        if position is not None and \
+                self.totals["votes"][row, position] >= options["threshold"]:
+            return indexes[indexes == position]
+        return indexes[indexes != position]
+
+    def _categorical(self, row, full=False):
+        """Plurality, confidence weighted or threshold combination of the
+        classification votes, as in `MultiVote.combine_categorical`
+
+        """
+        np = get_numpy()
+        totals = self.totals
+        first = totals["first"][row]
+        indexes = np.flatnonzero(first >= 0)
+        if self.method == THRESHOLD:
+            indexes = self._single_out_category(row, indexes)
+        weights = totals["confidence"][row] if self.method == CONFIDENCE \
+            else totals["votes"][row]
+        categories = [self.categories[index] for index in indexes.tolist()]
+        prediction = top_category(categories, weights[indexes],
+                                  first[indexes])
+        if not full:
+            return prediction
+        index = self.positions[prediction]
+        output = {'prediction': prediction}
+        if CONFIDENCE_W in self.keys:
+            if self.method == CONFIDENCE:
+                total_weight = totals["confidence"][row, index]
+                final_confidence = totals["squared_confidence"][row, index]
+            else:
+                total_weight = totals["votes"][row, index]
+                final_confidence = totals["confidence"][row, index]
+            final_confidence = (float(final_confidence / total_weight)
+                                if total_weight > 0 else float('nan'))
+            output.update({'confidence':
+                           round(final_confidence, PRECISION)})
+        if 'probability' in self.keys:
+            output['probability'] = float(totals["probability"][row, index])
+        output.update(self._node_totals( \
+            row, groups=categories if self.method == THRESHOLD else None))
+        return output
+
+    def _probability_weighted(self, row, full=False):
+        """Probability weighted combination of the classification votes, as
+        in `MultiVote.combine_categorical` applied to the
+        `MultiVote.probability_weight` votes
+
+        """
+        np = get_numpy()
+        totals = self.totals
+        first = totals["first"][row]
+        indexes = np.flatnonzero(first >= 0)
+        categories = [self.categories[index] for index in indexes.tolist()]
+        prediction = top_category(categories,
+                                  totals["probability"][row][indexes],
+                                  first[indexes])
+        if not full:
+            return prediction
+        count = self.counts[row].get(None, 0)
+        distribution = []
+        if count > 0:
+            # categories are sorted by their first appearance
+            indexes = indexes[np.argsort(totals["seen"][row][indexes],
+                                         kind="stable")]
+            distribution = [[self.categories[index], probability]
+                            for index, probability in zip( \
+                                indexes.tolist(),
+                                totals["probability"][row][indexes].tolist())]
+        combined_confidence = ws_confidence(prediction, distribution,
+                                            ws_n=count)
+        return {'prediction': prediction,
+                'confidence': round(combined_confidence, PRECISION),
+                'probability': float( \
+                    totals["last"][row, self.positions[prediction]]),
+                'count': count}
@@ -19,16 +19,26 @@
 import logging
 
 from bigml.util import PRECISION
+from bigml.multivote import get_numpy, sequential_sum
 
 LOGGER = logging.getLogger('BigML')
 
 
+def votes_array(predictions):
+    """Stores a list of votes as an array of floats: one row per vote with
+    the values of each class, or one value per vote for regressions.
+
+    """
+    return get_numpy().asarray(predictions, dtype=float)
+
+
 class MultiVoteList():
     """A multiple vote prediction in compact format
 
     Uses a number of predictions to generate a combined prediction.
     The input should be an ordered list of probability, counts or confidences
-    for each of the classes in the objective field.
+    for each of the classes in the objective field. The votes are kept in
+    an array, one row per vote.
 
     """
 
@@ -38,8 +48,9 @@ class MultiVoteList():
             [0.2, 0.34, 0.48] which might correspond to confidences of
             three different classes in the objective field.
         """
-        if isinstance(predictions, list):
-            self.predictions = predictions
+        if isinstance(predictions, list) or \
+                isinstance(predictions, get_numpy().ndarray):
+            self.predictions = votes_array(predictions)
         else:
             raise ValueError("Expected a list of values to create a"
                              "MultiVoteList. Found %s instead" % predictions)
@@ -50,13 +61,18 @@ class MultiVoteList():
         """
         if isinstance(predictions_list, MultiVoteList):
             predictions_list = predictions_list.predictions
-        self.predictions.extend(predictions_list)
+        predictions_list = votes_array(predictions_list)
+        if len(self.predictions) == 0:
+            self.predictions = predictions_list
+        elif len(predictions_list) > 0:
+            self.predictions = get_numpy().concatenate( \
+                (self.predictions, predictions_list))
 
     def append(self, prediction):
         """Extending the append method in lists
 
         """
-        self.predictions.append(prediction)
+        self.extend([prediction])
 
     def combine_to_distribution(self, normalize=True):
         """Receives a list of lists. Each element is the list of probabilities
@@ -66,17 +82,11 @@ class MultiVoteList():
         probability obtained by adding these predictions into a single one
         by adding their probabilities and normalizing.
         """
-        total = 0.0
-        output = [0.0] * len(self.predictions[0])
-
-        for distribution in self.predictions:
-            for i, vote_value in enumerate(distribution):
-                output[i] += vote_value
-                total += vote_value
-        if not normalize:
+        # votes are added up in order, as if accumulated one by one
+        output = get_numpy().cumsum(self.predictions, axis=0)[-1]
+        if normalize:
+            total = sequential_sum(self.predictions.ravel())
+        else:
             total = len(self.predictions)
 
-        for i, value in enumerate(output):
-            output[i] = round(value / total, PRECISION)
-
-        return output
+        return [round(value / total, PRECISION) for value in output.tolist()]
@@ -44,8 +44,8 @@ import math
 
 from bigml.api import FINISHED
 from bigml.api import get_status, get_api_connection, get_pca_id
-from bigml.util import cast, use_cache, load, NUMERIC, get_data_format, \
-    get_formatted_data, format_data, get_data_transformations
+from bigml.util import use_cache, load, NUMERIC, get_data_format, \
+    add_data_columns, get_data_transformations
 from bigml.basemodel import get_resource_dict
 from bigml.modelfields import ModelFields
 from bigml.constants import OUT_NEW_FIELDS, OUT_NEW_HEADERS, INTERNAL
@@ -191,13 +191,10 @@ class PCA(ModelFields):
 
         """
 
-        norm_input_data = self.filter_input_data( \
+        norm_input_data = self.normalize_input_data( \
             input_data,
             add_unused_fields=False)
 
-        # Strips affixes for numeric values and casts to the final field type
-        cast(norm_input_data, self.fields)
-
         # Computes text and categorical field expansion into an input array of
         # terms and frequencies
         unique_terms = self.get_unique_terms(norm_input_data)
@@ -342,11 +339,12 @@ class PCA(ModelFields):
         to "output_fields" list, by default).
 
         :param input_data_list: List of input data to be predicted
-        :type input_data_list: list or Panda's dataframe
+        :type input_data_list: list, Panda's dataframe or Arrow table
         :param dict outputs: properties that define the headers and fields to
                              be added to the input data
         :return: the list of input data plus the predicted values
-        :rtype: list or Panda's dataframe depending on the input type in
+        :rtype: list, Panda's dataframe or Arrow table depending on the
+                input type in
                 input_data_list
         """
         if outputs is None:
@@ -359,14 +357,15 @@ class PCA(ModelFields):
         else:
             new_headers = new_headers[0: len(new_fields)]
         data_format = get_data_format(input_data_list)
-        inner_data_list = get_formatted_data(input_data_list, INTERNAL)
+        inner_data_list = self.batch_input_rows(input_data_list)
         for input_data in inner_data_list:
             kwargs.update({"full": True})
             prediction = self.projection(input_data, **kwargs)
             for index, key in enumerate(new_fields):
                 input_data[new_headers[index]] = prediction[key]
         if data_format != INTERNAL:
-            return format_data(inner_data_list, out_format=data_format)
+            return add_data_columns(input_data_list, inner_data_list,
+                                    new_headers)
         return inner_data_list
 
     def data_transformations(self):
@@ -27,13 +27,17 @@ etc.) that describe the input data processing to be used.
 import os
 import zipfile
 
+from concurrent.futures import ThreadPoolExecutor
+
 from datetime import datetime
 
 from bigml.api import get_api_connection, get_resource_id, get_resource_type
 from bigml.util import use_cache, load, check_dir, get_data_format, \
     format_data, save_json, fs_cache_get, fs_cache_set, \
-    dump, asciify
-from bigml.constants import STORAGE
+    dump, asciify, get_formatted_data
+from bigml.constants import STORAGE, DATAFRAME, ARROW, INTERNAL
+from bigml.profiling import stopwatch, EXPANSION, EVALUATION, \
+    OUTPUT_FORMATTING
 from bigml.dataset import Dataset
 from bigml.supervised import SupervisedModel
 from bigml.cluster import Cluster
@@ -47,6 +51,9 @@ try:
 except ImportError:
     NO_TOPIC = True
 
+# Default number of rows in the chunks used when streaming
+DEFAULT_CHUNK_SIZE = 1000
+
 
 if NO_TOPIC:
     LOCAL_CLASSES = {
@@ -87,6 +94,92 @@ def get_datasets_dict(dataset, dataset_dict=None):
     return get_datasets_dict(dataset.origin_dataset, dataset_dict)
 
 
+def split_chunk(input_data_list, chunk_size):
+    """Splits a list of dictionaries, DataFrame or Arrow Table in slices of
+    chunk_size rows at most
+
+    """
+    data_format = get_data_format(input_data_list)
+    rows = len(input_data_list)
+    if rows <= chunk_size:
+        yield input_data_list
+        return
+    for start in range(0, rows, chunk_size):
+        if data_format == DATAFRAME:
+            yield input_data_list.iloc[start: start + chunk_size]
+        elif data_format == ARROW:
+            yield input_data_list.slice(start, chunk_size)
+        else:
+            yield input_data_list[start: start + chunk_size]
+
+
+def iter_chunks(input_data, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Generates chunks of chunk_size rows at most from the input data,
+    which can be:
+     - a list of dictionaries, a DataFrame or an Arrow Table
+     - an iterable of dictionaries, like a csv.DictReader
+     - an iterable of chunks (lists of dictionaries, DataFrames or Arrow
+       Tables), like the reader returned by `pandas.read_csv` when a
+       `chunksize` is set
+
+    """
+    try:
+        get_data_format(input_data)
+        yield from split_chunk(input_data, chunk_size)
+        return
+    except ValueError:
+        pass
+    rows = []
+    for item in input_data:
+        if isinstance(item, dict):
+            rows.append(item)
+            if len(rows) == chunk_size:
+                yield rows
+                rows = []
+        else:
+            if rows:
+                yield rows
+                rows = []
+            yield from split_chunk(item, chunk_size)
+    if rows:
+        yield rows
+
+
+def get_parent_step(local_resource, step_indices, datasets):
+    """Returns the index of the step whose output is the input of the local
+    resource, or None if it uses the pipeline input data. Datasets that
+    are not steps of the pipeline are skipped.
+
+    """
+    if isinstance(local_resource, Dataset):
+        parent = local_resource.origin_dataset
+    else:
+        parent = datasets.get(getattr(local_resource, "parent_id", None))
+    while parent is not None:
+        if parent.resource_id in step_indices:
+            return step_indices[parent.resource_id]
+        parent = parent.origin_dataset
+    return None
+
+
+def merge_outputs(outputs_list, input_data_list=None):
+    """Merges row by row the dictionaries in a list of outputs. The values
+    in the input data are added for the keys that are not in any output.
+
+    """
+    merged_list = []
+    for index, output_data in enumerate(outputs_list[0]):
+        merged = dict(output_data)
+        for outputs in outputs_list[1:]:
+            merged.update(outputs[index])
+        if input_data_list is not None:
+            merged.update({key: value for key, value in
+                           input_data_list[index].items()
+                           if key not in merged})
+        merged_list.append(merged)
+    return merged_list
+
+
 def check_in_path(path, resource_list):
     """Checks whether a list of resources is stored in a folder """
     for resource_id in resource_list:
@@ -140,28 +233,58 @@ class Pipeline(DataTransformer):
 
         """
         result = self.data_transform(input_data_list)
+        watch = stopwatch(self)
         if out_format is not None:
             current_format = get_data_format(result)
             if current_format != out_format:
-                return format_data(result, out_format)
+                result = format_data(result, out_format)
+        if watch:
+            watch.lap(OUTPUT_FORMATTING)
         return result
 
+    def transform_stream(self, input_data, chunk_size=DEFAULT_CHUNK_SIZE,
+                         out_format=None):
+        """Generator that applies the Pipeline transformations and
+        predictions to the input data in chunks of `chunk_size` rows and
+        yields the result for every chunk as soon as it is computed.
+        The input data can be a list of dictionaries, a DataFrame, an Arrow
+        Table or any iterable of dictionaries or of chunks, like a
+        `csv.DictReader` or the reader returned by `pandas.read_csv` when
+        a `chunksize` is set, so that only one chunk is kept in memory.
+        `out_format` forces the output format of every chunk.
+
+        """
+        for chunk in iter_chunks(input_data, chunk_size=chunk_size):
+            yield self.transform(chunk, out_format=out_format)
+
     def data_transform(self, input_data_list):
         """Delegates transformation to each DataTransformer step"""
         current_format = get_data_format(input_data_list)
         if len(self.steps) == 0:
             return input_data_list
         inner_data_list = input_data_list
+        watch = stopwatch(self)
         for index, step in enumerate(self.steps[:-1]):
+            # intermediate results are kept in the format of the step that
+            # generates them, so that formats are only changed when needed
+            step_format = getattr(step, "data_format", None)
             try:
-                inner_data_list = step.transform(inner_data_list)
+                if step_format is None:
+                    inner_data_list = step.transform(inner_data_list)
+                else:
+                    inner_data_list = step.transform(
+                        inner_data_list, out_format=step_format)
             except Exception as exc:
                 raise ValueError(
                     "Failed to apply step number %s in pipeline %s: %s" %
                     (index, self.name, exc))
+        if watch:
+            watch.lap(EXPANSION)
         try:
             inner_data_list = self.steps[-1].transform(
                 inner_data_list, out_format=current_format)
+            if watch:
+                watch.lap(EVALUATION)
             if hasattr(self.steps[-1], "add_input") and \
                     self.steps[-1].add_input:
                 self.steps[-1].merge_input_data(
@@ -169,6 +292,8 @@ class Pipeline(DataTransformer):
                     out_format=current_format)
         except Exception as exc:
             raise ValueError("Failed to apply the last step: %s" % exc)
+        if watch:
+            watch.lap(OUTPUT_FORMATTING)
         return inner_data_list
 
 
@@ -194,7 +319,7 @@ class BMLPipeline(Pipeline):
     """
     def __init__(self, name, resource_list=None, description=None, api=None,
                  cache_get=None, init_settings=None, execution_settings=None,
-                 last_step=False):
+                 last_step=False, max_workers=None):
         """The pipeline needs
         :param name: A unique name that will be used when caching the
                      resources it needs to be executed.
@@ -230,6 +355,14 @@ class BMLPipeline(Pipeline):
                "model/222222222222222222": {
                   "operating_kind": "confidence"}}
         :type execution_settings: dict
+        :param last_step: Whether to use only the resources in the
+                          resource_list, without the datasets that
+                          generated them
+        :type last_step: bool
+        :param max_workers: Maximum number of threads used to run the
+                            independent steps concurrently. Steps run
+                            one after the other when set to 1.
+        :type max_workers: int
 
         """
 
@@ -255,6 +388,9 @@ class BMLPipeline(Pipeline):
         if self._api.storage is None:
             self._api.storage = self._get_pipeline_storage()
         self._cache_get = cache_get
+        self._max_workers = max_workers
+        self._step_parents = []
+        self._step_levels = []
         self.steps = []
         self.extend(self.__retrieve_steps(last_step))
 
@@ -304,17 +440,16 @@ class BMLPipeline(Pipeline):
                     local_resources[index].extend(dataset_chain)
                     local_resources[index].reverse()
 
-        try:
-            new_resources = local_resources[0][:]
-        except IndexError:
-            new_resources = []
-        for index, resources in enumerate(local_resources):
-            if index < 1:
-                continue
+        new_resources = []
+        resource_ids = set()
+        for resources in local_resources:
             for resource in resources:
-                if resource not in new_resources:
+                if resource.resource_id not in resource_ids:
+                    resource_ids.add(resource.resource_id)
                     new_resources.append(resource)
         local_resources = new_resources
+        step_indices = {}
+        step_parents = []
         for local_resource in local_resources:
             # non-flatline datasets will not add transformations
             if isinstance(local_resource, Dataset) and \
@@ -323,10 +458,79 @@ class BMLPipeline(Pipeline):
                 continue
             execution_settings = self.execution_settings.get(
                 local_resource.resource_id, {})
+            step_parents.append(get_parent_step(local_resource, step_indices,
+                                                datasets))
+            step_indices[local_resource.resource_id] = len(steps)
             steps.append(BMLDataTransformer(
                 local_resource, **execution_settings))
+        self._step_parents = step_parents
+        # steps are grouped in levels: the ones in a level only depend on
+        # steps in previous levels
+        depths = []
+        for parent in step_parents:
+            depths.append(0 if parent is None else depths[parent] + 1)
+        self._step_levels = [
+            [index for index, depth in enumerate(depths) if depth == level]
+            for level in range(max(depths, default=-1) + 1)]
         return steps
 
+    def _run_step(self, index, input_data_list):
+        """Applies one of the steps to the output of its parent """
+        try:
+            return self.steps[index].transform(input_data_list,
+                                               out_format=INTERNAL)
+        except Exception as exc:
+            raise ValueError(
+                "Failed to apply step number %s in pipeline %s: %s" %
+                (index, self.name, exc))
+
+    def _run_level(self, level, inputs):
+        """Applies the steps in a level, concurrently if possible """
+        if len(level) == 1 or self._max_workers == 1:
+            return [self._run_step(index, input_data_list) for
+                    index, input_data_list in zip(level, inputs)]
+        # the threads are released when the level is done, so that no
+        # executor outlives the call
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            return list(executor.map(self._run_step, level, inputs))
+
+    def data_transform(self, input_data_list):
+        """Applies the steps as a graph where each step transforms the output
+        of the step that generated its input dataset. Steps that depend on
+        the same one, like several models built on the same dataset, are
+        independent and run concurrently. The fields generated in all the
+        branches are merged and, when models are used, added to the
+        input data.
+
+        """
+        if len(self._step_parents) != len(self.steps):
+            # steps added with `extend` are applied sequentially
+            return super().data_transform(input_data_list)
+        if len(self.steps) == 0:
+            return input_data_list
+        current_format = get_data_format(input_data_list)
+        watch = stopwatch(self)
+        inner_data_list = get_formatted_data(input_data_list, INTERNAL)
+        outputs = {}
+        for level in self._step_levels:
+            inputs = [inner_data_list if self._step_parents[index] is None
+                      else outputs[self._step_parents[index]]
+                      for index in level]
+            outputs.update(zip(level, self._run_level(level, inputs)))
+        if watch:
+            watch.lap(EVALUATION)
+        leaves = [index for index in range(len(self.steps))
+                  if index not in self._step_parents]
+        add_input = any(getattr(self.steps[index], "add_input", False)
+                        for index in leaves)
+        result = merge_outputs([outputs[index] for index in leaves],
+                               inner_data_list if add_input else None)
+        if current_format != INTERNAL:
+            result = format_data(result, current_format)
+        if watch:
+            watch.lap(OUTPUT_FORMATTING)
+        return result
+
     def _get_pipeline_storage(self):
         """ Creating a separate folder inside the given storage folder to
         contain the pipeline related models based on the pipeline name.
@@ -136,10 +136,10 @@ class BMLDataTransformer(DataTransformer):
         data_format = get_data_format(input_data_list)
         input_data_list = self._formatted_input(input_data_list)
         output_data_list = self._formatted_input(output_data_list)
-        for index, input_data in enumerate(input_data_list):
-            for key, value in input_data.items():
-                if key not in output_data_list[index]:
-                    output_data_list[index].update({key: value})
+        for input_data, output_data in zip(input_data_list,
+                                           output_data_list):
+            output_data.update({key: value for key, value in
+                                input_data.items() if key not in output_data})
         if self.data_format != out_format:
             return format_data(output_data_list, data_format)
         return output_data_list
@@ -201,7 +201,7 @@ def get_node(tree):
     """Extracts the properties of the node
 
     """
-    if isinstance(tree[0], bool) and tree[0]: # predicate is True
+    if tree[0] is True: # predicate is True
         return tree[1:]
     return tree[PREDICATE_INFO_LENGTH:]
 
@@ -210,6 +210,6 @@ def get_predicate(tree):
     """Extracts the predicate for the node
 
     """
-    if isinstance(tree[0], bool) and tree[0]:
+    if tree[0] is True:
         return True
     return tree[0: PREDICATE_INFO_LENGTH]
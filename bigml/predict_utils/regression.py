@@ -20,9 +20,6 @@
 import numbers
 import math
 
-
-from scipy import stats
-
 from bigml.predict_utils.common import last_prediction_predict, \
     proportional_predict, extract_distribution
 from bigml.predicate_utils.utils import pack_predicate
@@ -115,6 +112,9 @@ def regression_error(distribution_variance, population, r_z=1.96):
 
     """
     if population > 0:
+        # scipy is only imported when needed, as it is slow to load
+        #pylint: disable=locally-disabled,import-outside-toplevel
+        from scipy import stats
         chi_distribution = stats.chi2(population)
         ppf = chi_distribution.ppf(1 - math.erf(r_z / math.sqrt(2)))
         if ppf != 0:
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Opt-in profiling of the stages of local predictions.
+
+Local models report the time spent in every stage of their predictions
+(input normalization, casting, feature expansion, model evaluation, vote
+combination and output formatting) to the registered callbacks. Callbacks
+are called as `callback(stage, seconds, attributes)`, where `attributes` is
+a dictionary that contains the name of the class of the local model. When no
+callback is registered, models skip the timing altogether.
+
+The Profiler callback aggregates the timings as histograms, and the
+`profile` context manager registers one while the context is active:
+
+from bigml.profiling import profile
+from bigml.model import Model
+
+local_model = Model("model/5143a51a37203f2cf7000972")
+with profile() as profiler:
+    local_model.predict({"petal length": 3, "petal width": 1})
+print(profiler.stats())
+
+Timings can also be sent to other metric systems. Using OpenTelemetry:
+
+from bigml.profiling import add_callback
+
+histogram = meter.create_histogram("bigml.prediction.stage", unit="s")
+add_callback(lambda stage, seconds, attributes: histogram.record( \
+    seconds, dict(attributes, stage=stage)))
+
+"""
+import time
+import bisect
+import threading
+
+from contextlib import contextmanager
+
+
+INPUT_NORMALIZATION = "input_normalization"
+CASTING = "casting"
+EXPANSION = "expansion"
+EVALUATION = "evaluation"
+VOTE_COMBINATION = "vote_combination"
+OUTPUT_FORMATTING = "output_formatting"
+STAGES = [INPUT_NORMALIZATION, CASTING, EXPANSION, EVALUATION,
+          VOTE_COMBINATION, OUTPUT_FORMATTING]
+
+# upper bounds in seconds of the histogram buckets: from 1 microsecond to
+# about 16 seconds, doubling in every bucket
+BUCKET_BOUNDS = [1e-6 * 2 ** exponent for exponent in range(25)]
+PERCENTILES = [50, 90, 99]
+
+# registered callbacks. The list is replaced, not changed, when callbacks are
+# added or removed, so it can be read without locking.
+_CALLBACKS = []
+_LOCK = threading.Lock()
+
+
+def add_callback(callback):
+    """Registers a function to be called with the timing of every stage """
+    global _CALLBACKS
+    with _LOCK:
+        _CALLBACKS = _CALLBACKS + [callback]
+
+
+def remove_callback(callback):
+    """Removes a registered callback """
+    global _CALLBACKS
+    with _LOCK:
+        callbacks = list(_CALLBACKS)
+        if callback in callbacks:
+            callbacks.remove(callback)
+        _CALLBACKS = callbacks
+
+
+def stopwatch(local_model):
+    """Returns a Stopwatch to time the stages of the local model, or None
+    when no callback is registered. The name of the class of the local
+    model can be used instead of the model.
+
+    """
+    if not _CALLBACKS:
+        return None
+    return Stopwatch(local_model if isinstance(local_model, str) else
+                     type(local_model).__name__, _CALLBACKS)
+
+
+class Stopwatch():
+    """Times consecutive stages and reports them to the callbacks """
+
+    __slots__ = ["attributes", "callbacks", "last"]
+
+    def __init__(self, name, callbacks):
+        """
+        :param name: name of the class of the local model
+        :param callbacks: list of callbacks to report to
+        """
+        self.attributes = {"model": name}
+        self.callbacks = callbacks
+        self.last = time.perf_counter()
+
+    def lap(self, stage):
+        """Reports the time since the previous lap (or the creation of the
+        stopwatch) as the time spent in the given stage.
+
+        """
+        now = time.perf_counter()
+        for callback in self.callbacks:
+            callback(stage, now - self.last, self.attributes)
+        # the time used by the callbacks is left out of the next stage
+        self.last = time.perf_counter()
+
+
+class Histogram():
+    """Distribution of the timings of a stage """
+
+    def __init__(self, bounds=None):
+        """
+        :param bounds: list of upper bounds of the buckets. The last bucket
+                       has no upper bound.
+        """
+        self.bounds = BUCKET_BOUNDS if bounds is None else bounds
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def add(self, value):
+        """Adds a value to the histogram """
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+    def percentile(self, percent):
+        """Estimates the percentile as the upper bound of the bucket where
+        it is found, limited by the maximum value.
+
+        """
+        if self.count == 0:
+            return None
+        rank = percent / 100.0 * self.count
+        accumulated = 0
+        for index, count in enumerate(self.counts):
+            accumulated += count
+            if accumulated >= rank and count > 0:
+                if index < len(self.bounds):
+                    return min(self.bounds[index], self.maximum)
+                break
+        return self.maximum
+
+    def to_dict(self):
+        """Summary of the histogram: count, total, mean, minimum and maximum,
+        the estimated percentiles and the non-empty buckets as
+        [upper bound, count] pairs (None being the unbounded bucket).
+
+        """
+        summary = {"count": self.count, "total": self.total,
+                   "mean": self.total / self.count if self.count else None,
+                   "min": self.minimum, "max": self.maximum}
+        for percent in PERCENTILES:
+            summary["p%s" % percent] = self.percentile(percent)
+        summary["buckets"] = [ \
+            [self.bounds[index] if index < len(self.bounds) else None, count]
+            for index, count in enumerate(self.counts) if count > 0]
+        return summary
+
+
+class Profiler():
+    """Callback that keeps a histogram of the timings of every stage of
+    every class of local model.
+
+    """
+
+    def __init__(self, bounds=None):
+        """
+        :param bounds: list of upper bounds of the histogram buckets
+        """
+        self.bounds = bounds
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, stage, seconds, attributes):
+        key = "%s.%s" % (attributes.get("model"), stage)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = Histogram(self.bounds)
+                self.histograms[key] = histogram
+            histogram.add(seconds)
+
+    def stats(self):
+        """Returns the summary of the histograms keyed by
+        `<class name>.<stage>`
+
+        """
+        with self.lock:
+            return {key: histogram.to_dict() for key, histogram
+                    in sorted(self.histograms.items())}
+
+    def reset(self):
+        """Removes all the recorded timings """
+        with self.lock:
+            self.histograms = {}
+
+
+@contextmanager
+def profile(profiler=None):
+    """Context manager that records the timings of the stages of the local
+    predictions made in the context. Yields the Profiler used.
+
+    """
+    if profiler is None:
+        profiler = Profiler()
+    add_callback(profiler)
+    try:
+        yield profiler
+    finally:
+        remove_callback(profiler)
@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Compressed and content-addressed storage of the resources retrieved from
+BigML.
+
+By default, the resources are stored in the storage directory as JSON files
+named after their IDs. When a different storage format is set in the
+connection, like `msgpack.gz`, resources are stored as:
+
+- a main file `<resource_id>.<format>`, that contains the resource without
+  its fields structures.
+- one file per fields structure in `objects/`, named after the hash of its
+  contents. Resources that share the same fields (like the models of an
+  ensemble, or models built from the same dataset) share the file, which is
+  only stored once.
+- an `index.jsonl` file that lists the stored resources. A line is
+  appended every time a resource is stored, and the file is rewritten with
+  the last entry of every resource when it doubles its size.
+
+Resources can be read without their fields structures. When a storage format
+other than JSON is used, the uncompressed contents of the files are kept in
+memory by every store as long as the files don't change. Connections keep
+their store, so that the memory is shared by all the resources retrieved with
+them. Parsed objects are not kept: local models can modify the structures
+they receive, and decoding msgpack contents is faster than deep-copying the
+parsed objects.
+
+"""
+import os
+import gzip
+import json
+import time
+import hashlib
+import threading
+
+from collections import OrderedDict
+
+import msgpack
+
+from bigml.util import atomic_write, check_dir
+
+try:
+    import zstandard
+    ZSTD_READY = True
+except ImportError:
+    ZSTD_READY = False
+
+JSON = "json"
+MSGPACK = "msgpack"
+GZIP = "gz"
+ZSTD = "zst"
+STORAGE_FORMATS = [JSON, "%s.%s" % (JSON, GZIP), MSGPACK,
+                   "%s.%s" % (MSGPACK, GZIP)]
+if ZSTD_READY:
+    STORAGE_FORMATS.extend(["%s.%s" % (JSON, ZSTD),
+                            "%s.%s" % (MSGPACK, ZSTD)])
+OBJECTS_DIR = "objects"
+INDEX_FILE = "index.jsonl"
+FIELDS_KEY = "fields"
+REFERENCES_KEY = "fields_references"
+# default maximum size in bytes of the uncompressed files kept in memory
+# when the storage format is not JSON
+MEMO_BYTES = 2 ** 28
+# minimum size in bytes of the index file before it is compacted
+INDEX_COMPACT_BYTES = 2 ** 16
+
+
+def check_storage_format(storage_format):
+    """Checks that the storage format is available """
+    if storage_format is not None and \
+            storage_format not in STORAGE_FORMATS:
+        raise ValueError("The storage format should be one of: %s" %
+                         ", ".join(STORAGE_FORMATS))
+    return storage_format
+
+
+def encode(obj, storage_format):
+    """Serializes and compresses an object in the given format """
+    serializer, _, compression = storage_format.partition(".")
+    contents = json.dumps(obj).encode("utf-8") if serializer == JSON \
+        else msgpack.packb(obj)
+    if compression == GZIP:
+        # the timestamp is fixed so that equal contents give equal files
+        contents = gzip.compress(contents, mtime=0)
+    elif compression == ZSTD:
+        contents = zstandard.ZstdCompressor().compress(contents)
+    return contents
+
+
+def decompress(contents, storage_format):
+    """Uncompresses the contents of a file in the given format """
+    compression = storage_format.partition(".")[2]
+    if compression == GZIP:
+        return gzip.decompress(contents)
+    if compression == ZSTD:
+        return zstandard.ZstdDecompressor().decompress(contents)
+    return contents
+
+
+def decode(contents, storage_format):
+    """Parses the uncompressed contents of a file in the given format """
+    if storage_format.partition(".")[0] == JSON:
+        return json.loads(contents)
+    return msgpack.unpackb(contents, strict_map_key=False)
+
+
+def fields_paths(resource):
+    """Returns the paths to the fields structures in the resource: the fields
+    attribute of the resource object and the ones in its first level
+    attributes (like model.fields).
+
+    """
+    paths = []
+    obj = resource.get("object")
+    if not isinstance(obj, dict):
+        return paths
+    if isinstance(obj.get(FIELDS_KEY), dict) and obj[FIELDS_KEY]:
+        paths.append(["object", FIELDS_KEY])
+    for key, value in obj.items():
+        if isinstance(value, dict) and \
+                isinstance(value.get(FIELDS_KEY), dict) and \
+                value[FIELDS_KEY]:
+            paths.append(["object", key, FIELDS_KEY])
+    return paths
+
+
+def read_index_entries(handler, entries):
+    """Adds to the entries dictionary the ones read from the index file,
+    keyed by resource ID. Later entries replace the previous ones.
+
+    """
+    for line in handler:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        entries[entry["resource"]] = entry
+    return entries
+
+
+def get_path(resource, path):
+    """Returns the value found in the resource following the path """
+    for key in path:
+        resource = resource[key]
+    return resource
+
+
+def set_path(resource, path, value):
+    """Sets the value found in the resource following the path """
+    get_path(resource, path[:-1])[path[-1]] = value
+
+
+class ResourceStore():
+    """Resources stored in a directory using a compressed format """
+
+    def __init__(self, directory, storage_format=JSON, max_memo_bytes=None):
+        """
+        :param directory: path to the storage directory
+        :param storage_format: format used to store new resources. The
+                               ones available are listed in STORAGE_FORMATS.
+        :param max_memo_bytes: maximum size in bytes of the uncompressed
+                               contents of the files kept in memory. 0 keeps
+                               none. By default, MEMO_BYTES for compressed
+                               and msgpack formats and 0 for JSON.
+        """
+        self.directory = directory
+        self.storage_format = check_storage_format(storage_format) or JSON
+        if max_memo_bytes is None:
+            max_memo_bytes = 0 if self.storage_format == JSON else MEMO_BYTES
+        self.max_memo_bytes = max_memo_bytes
+        # size of the index file when it was last compacted
+        self.index_bytes = 0
+        # uncompressed contents of the files, least recently used first
+        self.memo = OrderedDict()
+        self.memo_bytes = 0
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        """The lock and the contents in memory are not copied """
+        state = dict(self.__dict__)
+        for key in ["memo", "memo_bytes", "lock"]:
+            del state[key]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.memo = OrderedDict()
+        self.memo_bytes = 0
+        self.lock = threading.Lock()
+
+    def resource_file(self, resource_id, storage_format=None):
+        """Path to the file that stores the resource in the given format. The
+        JSON format uses the resource ID as file name, with no extension.
+
+        """
+        if storage_format is None:
+            storage_format = self.storage_format
+        file_name = resource_id.replace("/", "_")
+        if storage_format != JSON:
+            file_name = "%s.%s" % (file_name, storage_format)
+        return os.path.join(self.directory, file_name)
+
+    def object_file(self, object_hash, storage_format=None):
+        """Path to the file that stores a content-addressed object """
+        if storage_format is None:
+            storage_format = self.storage_format
+        return os.path.join(self.directory, OBJECTS_DIR, object_hash[:2],
+                            "%s.%s" % (object_hash, storage_format))
+
+    def save(self, resource):
+        """Stores the resource in the storage format and returns the path to
+        its main file.
+
+        """
+        resource_id = resource["resource"]
+        references = []
+        main = dict(resource)
+        paths = fields_paths(resource) if self.storage_format != JSON \
+            else []
+        for path in paths:
+            contents = encode(get_path(resource, path), self.storage_format)
+            object_hash = hashlib.sha256(contents).hexdigest()
+            filename = self.object_file(object_hash)
+            if not os.path.exists(filename):
+                check_dir(os.path.dirname(filename))
+                atomic_write(filename, contents)
+            references.append([path, object_hash])
+            # the structures holding the fields are copied, so that the
+            # original resource is not changed
+            main_obj = main
+            for key in path[:-1]:
+                main_obj[key] = dict(main_obj[key])
+                main_obj = main_obj[key]
+            del main_obj[path[-1]]
+        if references:
+            main[REFERENCES_KEY] = references
+        filename = atomic_write(self.resource_file(resource_id),
+                                encode(main, self.storage_format))
+        self.add_to_index(resource_id, filename, references)
+        return filename
+
+    def add_to_index(self, resource_id, filename, references):
+        """Appends the stored resource to the index file, that is compacted
+        when its size doubles.
+
+        """
+        entry = json.dumps({"resource": resource_id,
+                            "file": os.path.basename(filename),
+                            "format": self.storage_format,
+                            "objects": [ref[1] for ref in references],
+                            "size": os.path.getsize(filename),
+                            "updated": time.time()})
+        index_file = os.path.join(self.directory, INDEX_FILE)
+        # lines are written in a single call to a file opened to append, so
+        # that concurrent writers don't mix them
+        with open(index_file, "a") as handler:
+            handler.write("%s\n" % entry)
+        if os.path.getsize(index_file) > max(2 * self.index_bytes,
+                                             INDEX_COMPACT_BYTES):
+            self.compact_index()
+
+    def compact_index(self):
+        """Rewrites the index file keeping only the last entry of every
+        resource.
+
+        """
+        index_file = os.path.join(self.directory, INDEX_FILE)
+        with self.lock:
+            with open(index_file) as handler:
+                entries = read_index_entries(handler, {})
+                contents = "".join(["%s\n" % json.dumps(entry) for entry
+                                    in entries.values()])
+                atomic_write(index_file, contents.encode("utf-8"))
+                # lines appended by other writers to the replaced file
+                late_lines = handler.read()
+            if late_lines:
+                with open(index_file, "a") as handler:
+                    handler.write(late_lines)
+            self.index_bytes = os.path.getsize(index_file)
+
+    def index(self):
+        """Returns a dictionary with the information about the stored
+        resources, keyed by resource ID.
+
+        """
+        entries = {}
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE)) as handler:
+                read_index_entries(handler, entries)
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def read_file(self, filename, storage_format):
+        """Returns the decoded contents of a file. The uncompressed contents
+        are kept in memory while the file modification time and size are not
+        changed.
+
+        """
+        stat = os.stat(filename)
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            memo_key, contents = self.memo.get(filename, (None, None))
+            if memo_key == key:
+                self.memo.move_to_end(filename)
+        if memo_key != key:
+            with open(filename, "rb") as handler:
+                contents = decompress(handler.read(), storage_format)
+            with self.lock:
+                if filename in self.memo:
+                    self.memo_bytes -= len(self.memo.pop(filename)[1])
+                if len(contents) <= self.max_memo_bytes:
+                    self.memo[filename] = (key, contents)
+                    self.memo_bytes += len(contents)
+                while self.memo_bytes > self.max_memo_bytes:
+                    self.memo_bytes -= len( \
+                        self.memo.popitem(last=False)[1][1])
+        # the parsed structures are new for every call, as local models
+        # can modify them
+        return decode(contents, storage_format)
+
+    def find(self, resource_id):
+        """Returns the file and format of the stored resource, looking first
+        for the storage format of the store.
+
+        """
+        formats = [self.storage_format] + \
+            [storage_format for storage_format in STORAGE_FORMATS
+             if storage_format != self.storage_format]
+        for storage_format in formats:
+            filename = self.resource_file(resource_id, storage_format)
+            if os.path.exists(filename):
+                return filename, storage_format
+        return None, None
+
+    def read(self, resource_id, fields=True):
+        """Returns the stored resource or None if it is not found. If
+        `fields` is False, the fields structures are not read and the
+        resource contains the hashes of their contents in the
+        `fields_references` attribute instead.
+
+        """
+        filename, storage_format = self.find(resource_id)
+        if filename is None:
+            return None
+        resource = self.read_file(filename, storage_format)
+        if fields and REFERENCES_KEY in resource:
+            for path, object_hash in resource.pop(REFERENCES_KEY):
+                set_path(resource, path, self.read_object(object_hash,
+                                                          storage_format))
+        return resource
+
+    def read_object(self, object_hash, storage_format=None):
+        """Returns a stored content-addressed object given its hash """
+        if storage_format is None:
+            storage_format = self.storage_format
+        return self.read_file(self.object_file(object_hash, storage_format),
+                              storage_format)
@@ -48,21 +48,18 @@ import os
 from bigml.api import get_resource_id, get_resource_type, \
     get_api_connection, get_ensemble_id
 from bigml.basemodel import BaseModel
-from bigml.model import Model
-from bigml.ensemble import Ensemble
-from bigml.logistic import LogisticRegression
-from bigml.deepnet import Deepnet
-from bigml.linear import LinearRegression
 from bigml.constants import OUT_NEW_FIELDS, OUT_NEW_HEADERS, INTERNAL
-from bigml.util import get_data_format, get_formatted_data, format_data
+from bigml.util import get_data_format, \
+    add_data_columns, LazyClasses
 
 
-COMPONENT_CLASSES = {
-    "model": Model,
-    "ensemble": Ensemble,
-    "logisticregression": LogisticRegression,
-    "deepnet": Deepnet,
-    "linearregression": LinearRegression}
+# the modules of the local model classes are imported only when used
+COMPONENT_CLASSES = LazyClasses({
+    "model": "bigml.model.Model",
+    "ensemble": "bigml.ensemble.Ensemble",
+    "logisticregression": "bigml.logistic.LogisticRegression",
+    "deepnet": "bigml.deepnet.Deepnet",
+    "linearregression": "bigml.linear.LinearRegression"})
 
 DFT_OUTPUTS = ["prediction", "probability"]
 
@@ -144,6 +141,19 @@ class SupervisedModel(BaseModel):
         self.name = self.local_model.name
         self.description = self.local_model.description
 
+    # the attributes of the local model are copied, so the ones built at
+    # runtime are the ones declared by its class
+    #pylint: disable=locally-disabled,invalid-name
+    @property
+    def RUNTIME_ATTRS(self):
+        """Runtime attributes of the local model """
+        return getattr(self.local_model, "RUNTIME_ATTRS", ())
+
+    @property
+    def PACKED_ATTRS(self):
+        """Runtime attributes kept by the packed format """
+        return getattr(self.local_model, "PACKED_ATTRS", ())
+
     def predict(self, *args, **kwargs):
         """Delegating method to local model object"""
         return self.local_model.predict(*args, **kwargs)
@@ -187,15 +197,23 @@ class SupervisedModel(BaseModel):
         to "output_fields" list, by default).
 
         :param input_data_list: List of input data to be predicted
-        :type input_data_list: list or Panda's dataframe
+        :type input_data_list: list, Panda's dataframe or Arrow table
         :param dict outputs: properties that define the headers and fields to
                              be added to the input data
         :param boolean all_fields: whether all the fields in the input data
                                    should be part of the response
         :return: the list of input data plus the predicted values
-        :rtype: list or Panda's dataframe depending on the input type in
+        :rtype: list, Panda's dataframe or Arrow table depending on the
+                input type in
                 input_data_list
         """
+        if get_resource_type(self.local_model.resource_id) in \
+                ["ensemble", "deepnet"]:
+            # ensembles score the batch one group of models at a time and
+            # deepnets send the inputs to the model in mini-batches
+            return self.local_model.batch_predict( \
+                input_data_list, outputs=outputs, all_fields=all_fields,
+                **kwargs)
         if outputs is None:
             outputs = {}
         new_fields = outputs.get(OUT_NEW_FIELDS, DFT_OUTPUTS)
@@ -205,13 +223,15 @@ class SupervisedModel(BaseModel):
         else:
             new_headers = new_headers[0: len(new_fields)]
         data_format = get_data_format(input_data_list)
-        inner_data_list = get_formatted_data(input_data_list, INTERNAL)
+        # DataFrames and Arrow tables are normalized column by column and
+        # their input fields are added back from the original table
+        inner_data_list = self.local_model.batch_input_rows(input_data_list)
         predictions_list = []
         kwargs.update({"full": True})
         for input_data in inner_data_list:
             prediction = self.predict(input_data, **kwargs)
             prediction_data = {}
-            if all_fields:
+            if all_fields and data_format == INTERNAL:
                 prediction_data.update(input_data)
             for index, key in enumerate(new_fields):
                 try:
@@ -220,7 +240,8 @@ class SupervisedModel(BaseModel):
                     pass
             predictions_list.append(prediction_data)
         if data_format != INTERNAL:
-            return format_data(predictions_list, out_format=data_format)
+            return add_data_columns(input_data_list, predictions_list,
+                                    new_headers, all_fields=all_fields)
         return predictions_list
 
     #pylint: disable=locally-disabled,arguments-differ
@@ -0,0 +1,926 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Offline benchmarks for the local prediction hot paths.
+
+The benchmarks use the fixtures bundled with the bindings (the iris models
+in `data`, the `bigml/iris_ensemble` storage and the `bigml/tests/my_ensemble`
+predictor functions) and synthetic models with deep trees or many fields.
+Every kind of local model has a case: models, ensembles, fusions,
+linear and logistic regressions, deepnets, clusters, anomaly detectors,
+PCAs, time series, associations and topic models. The topic model case is
+only added when the `topics` extra (pystemmer) is installed, and deepnets
+are predicted with sensenet only when it is installed. No connection to
+BigML is needed. The benchmarks are run from the root directory of the
+repository.
+
+For every local model, the time used in construction, single-row
+predictions, batch predictions and dump/load is measured. The results are
+printed as JSON and can be compared to the results of another run, so that
+performance regressions are detected. Absolute times depend on the machine,
+so the baseline must be produced on the same machine, e.g. running the
+benchmarks in a checkout of the reference version:
+
+    python -m bigml.tests.benchmark --output baseline.json
+    python -m bigml.tests.benchmark --baseline baseline.json
+
+Before every measuring round, a fixed pure Python calibration loop is
+timed, and the measures are compared after dividing them by the calibration
+time, so that changes in the load or the CPU frequency of the machine during
+or between both runs are compensated.
+The exit code is 1 when any measure is slower than the baseline beyond the
+tolerance.
+
+"""
+import os
+import sys
+import re
+import csv
+import json
+import time
+import shutil
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+
+from bigml.api import BigML
+from bigml.model import Model
+from bigml.ensemble import Ensemble
+from bigml.fusion import Fusion
+from bigml.linear import LinearRegression
+from bigml.logistic import LogisticRegression
+from bigml.supervised import SupervisedModel
+from bigml.ensemblepredictor import EnsemblePredictor
+from bigml.cluster import Cluster
+from bigml.anomaly import Anomaly
+from bigml.deepnet import Deepnet
+from bigml.pca import PCA
+from bigml.timeseries import TimeSeries
+from bigml.association import Association
+from bigml.local_model import TOPIC_ENABLED
+from bigml.binarymodel import dumps_packed, loads_packed
+from bigml.version import __version__
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BIGML_DIR = os.path.dirname(TESTS_DIR)
+DATA_DIR = os.path.join(os.path.dirname(BIGML_DIR), "data")
+
+IRIS_ENSEMBLE_DIR = os.path.join(BIGML_DIR, "iris_ensemble")
+IRIS_ENSEMBLE_ID = "ensemble/5f580eb0e84f942429000c22"
+IRIS_MODEL_IDS = ["model/5f580eb2440ca135f602213e",
+                  "model/5f580eb2440ca135f6022140",
+                  "model/5f580eb2440ca135f6022142"]
+IRIS_FUSION_ID = "fusion/5f580eb0e84f942429000c99"
+# the predict functions are imported as modules, so the path to their
+# directory is relative to the root of the repository
+MY_ENSEMBLE_DIR = os.path.join("bigml", "tests", "my_ensemble")
+
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 0.3
+# rows used in single-row and batch predictions
+PREDICT_ROWS = 200
+# minimum total time of a measure, to avoid timer resolution issues
+MIN_MEASURE_TIME = 0.05
+# iterations of the calibration loop and times it is run before a round
+CALIBRATION_SIZE = 20000
+CALIBRATION_ROUNDS = 3
+
+CATEGORIES = ["Iris-setosa", "Iris-versicolor", "Iris-virginica"]
+
+
+def read_rows(filename, exclude=None):
+    """Reads the rows of a CSV file in the data directory as dictionaries,
+    removing the excluded columns.
+
+    """
+    with open(os.path.join(DATA_DIR, filename)) as handler:
+        rows = list(csv.DictReader(handler))
+    for row in rows:
+        for column in exclude or []:
+            row.pop(column, None)
+    return rows
+
+
+def numeric_field(name, column_number):
+    """Field structure for a synthetic numeric field with values in [0, 10)
+    """
+    return {"name": name, "column_number": column_number,
+            "datatype": "double", "optype": "numeric", "preferred": True,
+            "summary": {"minimum": 0, "maximum": 10, "mean": 5,
+                        "median": 5, "standard_deviation": 2.9,
+                        "missing_count": 0, "population": 1000,
+                        "bins": [[index + 0.5, 100] for index in range(10)]}}
+
+
+def categorical_field(name, column_number, categories):
+    """Field structure for a synthetic categorical field """
+    return {"name": name, "column_number": column_number,
+            "datatype": "string", "optype": "categorical",
+            "preferred": True,
+            "summary": {"categories": [[category, 100] for category
+                                       in categories],
+                        "missing_count": 0}}
+
+
+def synthetic_fields(inputs, regression):
+    """Fields structure with the given number of numeric input fields and
+    a numeric or categorical objective field. Returns the fields and the
+    objective field ID.
+
+    """
+    fields = {}
+    for index in range(inputs):
+        fields["%06x" % index] = numeric_field("x%s" % index, index)
+    objective_id = "%06x" % inputs
+    fields[objective_id] = numeric_field("y", inputs) if regression \
+        else categorical_field("y", inputs, CATEGORIES)
+    return fields, objective_id
+
+
+def synthetic_node(rnd, field_ids, depth, regression, counter,
+                   boosting=False):
+    """Random tree node, whose children are split up to the given depth.
+    Nodes of boosted trees predict a gradient.
+
+    """
+    count = rnd.randint(10, 1000)
+    if boosting:
+        summary = {}
+        output = round(rnd.uniform(-1, 1), 5)
+    elif regression:
+        bins = sorted([[round(rnd.uniform(0, 10), 5), rnd.randint(1, 50)]
+                       for _ in range(rnd.randint(1, 32))])
+        summary = {"bins": bins}
+        output = round(rnd.uniform(0, 10), 5)
+    else:
+        categories = [[category, rnd.randint(1, 100)]
+                      for category in CATEGORIES]
+        summary = {"categories": categories}
+        output = max(categories, key=lambda category: category[1])[0]
+    node = {"id": counter[0], "count": count, "output": output,
+            "confidence": round(rnd.random(), 5),
+            "objective_summary": summary}
+    if boosting:
+        node.update({"g_sum": round(rnd.uniform(-10, 10), 5),
+                     "h_sum": round(rnd.uniform(1, 10), 5)})
+    counter[0] += 1
+    if depth > 0:
+        field_id = rnd.choice(field_ids)
+        value = round(rnd.uniform(0, 10), 2)
+        node["children"] = []
+        for operator in ["<=", ">"]:
+            child = synthetic_node(rnd, field_ids, depth - 1, regression,
+                                   counter, boosting=boosting)
+            child["predicate"] = {"field": field_id, "operator": operator,
+                                  "value": value}
+            node["children"].append(child)
+    return node
+
+
+def synthetic_model(resource_id, inputs=10, depth=12, regression=True,
+                    seed=0, boosting=None):
+    """Model resource with a complete tree of the given depth. The
+    `boosting` attributes turn it into a tree of a boosted ensemble.
+
+    """
+    rnd = random.Random(seed)
+    fields, objective_id = synthetic_fields(inputs, regression)
+    field_ids = sorted(field_id for field_id in fields
+                       if field_id != objective_id)
+    root = synthetic_node(rnd, field_ids, depth, regression, [0],
+                          boosting=boosting is not None)
+    root["predicate"] = True
+    model = {"resource": resource_id, "code": 200, "error": None,
+              "object": {"resource": resource_id, "name": "synthetic",
+                         "description": "", "locale": "en_US",
+                         "status": {"code": 5},
+                         "objective_field": objective_id,
+                         "objective_fields": [objective_id],
+                         "input_fields": field_ids,
+                         "model": {"root": root, "fields": fields,
+                                   "model_fields": fields,
+                                   "distribution": {"training": \
+                                       root["objective_summary"]},
+                                   "missing_tokens": [],
+                                   "importance": []}}}
+    if boosting is not None:
+        model["object"].update({"boosted_ensemble": True,
+                                "boosting": boosting})
+    return model
+
+
+def synthetic_ensemble(storage, ensemble_id, models, offsets=None):
+    """Stores an ensemble of the given models in the storage directory.
+    Ensembles of boosted trees need the initial `offsets`: a number for
+    regressions and a list of [category, offset] pairs for
+    classifications.
+
+    """
+    first = models[0]["object"]
+    ensemble = {"resource": ensemble_id, "code": 200, "error": None,
+                "object": {"resource": ensemble_id, "name": "synthetic",
+                           "description": "", "locale": "en_US",
+                           "status": {"code": 5},
+                           "objective_field": first["objective_field"],
+                           "input_fields": first["input_fields"],
+                           "models": [model["resource"] for model in models],
+                           "distributions": [ \
+                               {"training": model["object"]["model"][
+                                   "distribution"]["training"]}
+                               for model in models],
+                           "ensemble": {"fields": first["model"]["fields"]},
+                           "boosting": None}}
+    if offsets is not None:
+        ensemble["object"].update({ \
+            "type": 1, "boosting": {"iterations": len(models)},
+            "initial_offsets" if isinstance(offsets, list) \
+                else "initial_offset": offsets})
+    for resource in [ensemble] + models:
+        with open(os.path.join(storage, resource["resource"].replace( \
+                "/", "_")), "w") as handler:
+            json.dump(resource, handler)
+
+
+def synthetic_linear(resource_id, inputs=200, seed=0):
+    """Linear regression resource with many numeric fields """
+    rnd = random.Random(seed)
+    fields, objective_id = synthetic_fields(inputs, True)
+    field_ids = sorted(field_id for field_id in fields
+                       if field_id != objective_id)
+    return {"resource": resource_id, "code": 200, "error": None,
+            "object": {"resource": resource_id, "name": "synthetic",
+                       "description": "", "status": {"code": 5},
+                       "objective_field": objective_id,
+                       "objective_fields": [objective_id],
+                       "input_fields": field_ids,
+                       "linear_regression": { \
+                           "fields": fields, "bias": True,
+                           "coefficients": [[rnd.uniform(-1, 1)]
+                                            for _ in range(inputs + 1)],
+                           "field_codings": {},
+                           "number_of_parameters": inputs + 1,
+                           "stats": { \
+                               "xtx_inverse": [ \
+                                   [1.0 if row == column else 0.01
+                                    for column in range(inputs + 1)]
+                                   for row in range(inputs + 1)],
+                               "mean_squared_error": 0.2,
+                               "number_of_samples": 10 * inputs}}}}
+
+
+def synthetic_logistic(resource_id, inputs=200, seed=0):
+    """Logistic regression resource with many numeric fields """
+    rnd = random.Random(seed)
+    fields, objective_id = synthetic_fields(inputs, False)
+    field_ids = sorted(field_id for field_id in fields
+                       if field_id != objective_id)
+    return {"resource": resource_id, "code": 200, "error": None,
+            "object": {"resource": resource_id, "name": "synthetic",
+                       "description": "", "status": {"code": 5},
+                       "objective_field": objective_id,
+                       "objective_fields": [objective_id],
+                       "input_fields": field_ids,
+                       "logistic_regression": { \
+                           "fields": fields, "bias": True,
+                           "coefficients": [ \
+                               [category, [[rnd.uniform(-1, 1)]
+                                           for _ in range(inputs + 1)]]
+                               for category in CATEGORIES],
+                           "field_codings": {}, "missing_numerics": False,
+                           "normalize": False, "balance_fields": False}}}
+
+
+def synthetic_cluster(resource_id, inputs=20, k=16, seed=0):
+    """Cluster resource with k centroids over numeric fields """
+    rnd = random.Random(seed)
+    fields = {"%06x" % index: numeric_field("x%s" % index, index)
+              for index in range(inputs)}
+    field_ids = sorted(fields)
+    clusters = [{"id": "%06x" % index, "name": "Cluster %s" % index,
+                 "count": rnd.randint(10, 100),
+                 "center": {field_id: round(rnd.uniform(0, 10), 5)
+                            for field_id in field_ids},
+                 "distance": {"population": 100,
+                              "sum_squares": rnd.uniform(10, 100)}}
+                for index in range(k)]
+    return {"resource": resource_id, "code": 200, "error": None,
+            "object": {"resource": resource_id, "name": "synthetic",
+                       "description": "", "status": {"code": 5},
+                       "input_fields": field_ids, "k": k,
+                       "scales": {field_id: 1.0 for field_id in field_ids},
+                       "summary_fields": [],
+                       "clusters": { \
+                           "fields": fields, "clusters": clusters,
+                           "global": {"center": {field_id: 5
+                                                 for field_id in field_ids},
+                                      "count": 1000,
+                                      "distance": {"population": 1000,
+                                                   "sum_squares": 1000}}}}}
+
+
+def synthetic_anomaly_node(rnd, field_ids, depth):
+    """Random isolation tree node, split up to the given depth """
+    node = {"population": rnd.randint(1, 256)}
+    # some branches are isolated early, so that depths differ
+    if depth > 0 and rnd.random() < 0.8:
+        field_id = rnd.choice(field_ids)
+        value = round(rnd.uniform(0, 10), 2)
+        node["children"] = []
+        for operator in ["<", ">="]:
+            child = synthetic_anomaly_node(rnd, field_ids, depth - 1)
+            child["predicates"] = [{"op": operator, "field": field_id,
+                                    "value": value}]
+            node["children"].append(child)
+    return node
+
+
+def synthetic_anomaly(resource_id, inputs=10, trees=64, depth=7, seed=0):
+    """Anomaly detector resource with random isolation trees """
+    rnd = random.Random(seed)
+    fields = {"%06x" % index: numeric_field("x%s" % index, index)
+              for index in range(inputs)}
+    field_ids = sorted(fields)
+    forest = []
+    for _ in range(trees):
+        root = synthetic_anomaly_node(rnd, field_ids, depth)
+        root["predicates"] = [True]
+        forest.append({"root": root})
+    return {"resource": resource_id, "code": 200, "error": None,
+            "object": {"resource": resource_id, "name": "synthetic",
+                       "description": "", "status": {"code": 5},
+                       "input_fields": field_ids, "sample_size": 256,
+                       "model": {"fields": fields, "mean_depth": depth,
+                                 "trees": forest, "top_anomalies": []}}}
+
+
+def synthetic_deepnet(resource_id, inputs=20, hidden=(64, 64), seed=0):
+    """Deepnet resource whose network has dense hidden layers """
+    rnd = random.Random(seed)
+    fields, objective_id = synthetic_fields(inputs, False)
+    field_ids = sorted(field_id for field_id in fields
+                       if field_id != objective_id)
+    layers = []
+    widths = [inputs] + list(hidden) + [len(CATEGORIES)]
+    for index, (width_in, width_out) in enumerate(zip(widths, widths[1:])):
+        layers.append({"weights": [[rnd.uniform(-1, 1)
+                                    for _ in range(width_in)]
+                                   for _ in range(width_out)],
+                       "offset": [rnd.uniform(-0.1, 0.1)
+                                  for _ in range(width_out)],
+                       "mean": None, "stdev": None, "scale": None,
+                       "activation_function": "softmax" \
+                           if index == len(widths) - 2 else "relu",
+                       "residuals": False})
+    return {"resource": resource_id, "code": 200, "error": None,
+            "object": {"resource": resource_id, "name": "synthetic",
+                       "description": "", "status": {"code": 5},
+                       "objective_field": objective_id,
+                       "objective_fields": [objective_id],
+                       "input_fields": field_ids,
+                       "deepnet": { \
+                           "fields": fields, "missing_numerics": False,
+                           "network": { \
+                               "layers": layers, "trees": None,
+                               "networks": [], "optimizer": {},
+                               "preprocess": [ \
+                                   {"index": index, "type": "numeric",
+                                    "mean": 5, "stdev": 2.9}
+                                   for index in range(inputs)]}}}}
+
+
+def synthetic_pca(resource_id, inputs=50, seed=0):
+    """PCA resource with standardized numeric fields """
+    rnd = random.Random(seed)
+    fields = {"%06x" % index: numeric_field("x%s" % index, index)
+              for index in range(inputs)}
+    field_ids = sorted(fields)
+    variance = sorted([rnd.random() for _ in range(inputs)], reverse=True)
+    total = sum(variance)
+    variance = [value / total for value in variance]
+    cumulative = [sum(variance[:index + 1]) for index in range(inputs)]
+    return {"resource": resource_id, "code": 200, "error": None,
+            "object": {"resource": resource_id, "name": "synthetic",
+                       "description": "", "status": {"code": 5},
+                       "input_fields": field_ids,
+                       "dataset_field_types": {"categorical": 0,
+                                               "numeric": inputs,
+                                               "text": 0, "items": 0,
+                                               "datetime": 0,
+                                               "total": inputs},
+                       "pca": {"fields": fields, "standardized": True,
+                               "components": inputs,
+                               "eigenvectors": [[rnd.uniform(-1, 1)
+                                                 for _ in range(inputs)]
+                                                for _ in range(inputs)],
+                               "variance": variance,
+                               "cumulative_variance": cumulative,
+                               "text_stats": {}}}}
+
+
+def synthetic_time_series(resource_id, objectives=3, period=4, seed=0):
+    """Time series resource with all the ETS submodels for every numeric
+    objective field.
+
+    """
+    rnd = random.Random(seed)
+    fields = {"%06x" % index: numeric_field("y%s" % index, index)
+              for index in range(objectives)}
+    field_ids = sorted(fields)
+    ets_models = {}
+    for field_id in field_ids:
+        submodels = [{"name": "naive", "value": [rnd.uniform(0, 10)]},
+                     {"name": "mean", "value": [rnd.uniform(0, 10)]},
+                     {"name": "drift", "value": rnd.uniform(0, 10),
+                      "slope": rnd.uniform(-1, 1)}]
+        for trend in ["N", "A", "Ad", "M", "Md"]:
+            for seasonality in ["N", "A", "M"]:
+                final_state = {"l": rnd.uniform(0, 10),
+                               "b": rnd.uniform(0.9, 1.1) \
+                                   if trend.startswith("M") \
+                                   else rnd.uniform(-1, 1)}
+                if seasonality != "N":
+                    final_state["s"] = [rnd.uniform(0.9, 1.1) \
+                        if seasonality == "M" else rnd.uniform(-1, 1)
+                                        for _ in range(period)]
+                submodels.append({"name": "A,%s,%s" % (trend, seasonality),
+                                  "aic": rnd.uniform(100, 200),
+                                  "final_state": final_state,
+                                  "phi": rnd.uniform(0.8, 0.98)})
+        ets_models[field_id] = submodels
+    return {"resource": resource_id, "code": 200, "error": None,
+            "object": {"resource": resource_id, "name": "synthetic",
+                       "description": "", "status": {"code": 5},
+                       "objective_field": field_ids[0],
+                       "objective_fields": field_ids,
+                       "input_fields": field_ids, "forecast": {},
+                       "time_series": {"fields": fields,
+                                       "ets_models": ets_models,
+                                       "period": period,
+                                       "all_numeric_objectives": True,
+                                       "error": 1, "trend": 1,
+                                       "seasonality": 1,
+                                       "damped_trend": True,
+                                       "time_range": {},
+                                       "field_parameters": {}}}}
+
+
+def synthetic_association(resource_id, inputs=20, bins=5, rules=500,
+                          seed=0):
+    """Association resource with rules between the bins of numeric
+    fields. The antecedents use the first half of the fields and the
+    consequents the rest, so that rows with values for the first half
+    get association sets.
+
+    """
+    rnd = random.Random(seed)
+    fields = {"%06x" % index: numeric_field("x%s" % index, index)
+              for index in range(inputs)}
+    field_ids = sorted(fields)
+    width = 10.0 / bins
+    items = [{"name": "x%s=%s" % (index, start), "field_id": field_id,
+              "count": rnd.randint(10, 200),
+              "bin_start": start * width if start > 0 else None,
+              "bin_end": (start + 1) * width if start < bins - 1 else None}
+             for index, field_id in enumerate(field_ids)
+             for start in range(bins)]
+    rule_list = []
+    for index in range(rules):
+        lhs = rnd.sample(range(len(items) // 2), rnd.randint(1, 3))
+        rhs = rnd.randrange(len(items) // 2, len(items))
+        rule_list.append({"id": "%06x" % index, "lhs": sorted(lhs),
+                          "rhs": [rhs],
+                          "confidence": rnd.random(),
+                          "leverage": rnd.uniform(-0.25, 0.25),
+                          "lift": rnd.uniform(0, 5),
+                          "p_value": rnd.random(),
+                          "lhs_cover": [rnd.random(), 100],
+                          "rhs_cover": [rnd.random(), 100],
+                          "support": [rnd.random(), 50]})
+    return {"resource": resource_id, "code": 200, "error": None,
+            "object": {"resource": resource_id, "name": "synthetic",
+                       "description": "", "status": {"code": 5},
+                       "input_fields": field_ids,
+                       "associations": {"fields": fields, "items": items,
+                                        "rules": rule_list,
+                                        "complement": False,
+                                        "search_strategy": "leverage",
+                                        "max_k": rules}}}
+
+
+def synthetic_topic_model(resource_id, terms=500, topics=10, seed=0):
+    """Topic model resource for a text field """
+    rnd = random.Random(seed)
+    termset = ["term%s" % index for index in range(terms)]
+    fields = {"000000": {"name": "text", "column_number": 0,
+                         "datatype": "string", "optype": "text",
+                         "preferred": True,
+                         "term_analysis": {"case_sensitive": False,
+                                           "language": "en",
+                                           "stem_words": True,
+                                           "token_mode": "all",
+                                           "use_stopwords": False},
+                         "summary": {"missing_count": 0,
+                                     "tag_cloud": [[term, 10]
+                                                   for term in termset],
+                                     "term_forms": {}}}}
+    return {"resource": resource_id, "code": 200, "error": None,
+            "object": {"resource": resource_id, "name": "synthetic",
+                       "description": "", "status": {"code": 5},
+                       "input_fields": ["000000"],
+                       "topic_model": { \
+                           "fields": fields, "language": "en",
+                           "topics": [{"id": "%06x" % index,
+                                       "name": "Topic %s" % index}
+                                      for index in range(topics)],
+                           "termset": termset, "hashed_seed": seed,
+                           "case_sensitive": False, "bigrams": False,
+                           "term_topic_assignments": [ \
+                               [rnd.randint(0, 50) for _ in range(topics)]
+                               for _ in range(terms)],
+                           "alpha": 0.08, "beta": 0.1}}}
+
+
+def synthetic_rows(inputs, number=PREDICT_ROWS, seed=1):
+    """Input data rows for the synthetic models, keyed by field name """
+    rnd = random.Random(seed)
+    return [{"x%s" % index: round(rnd.uniform(0, 10), 2)
+             for index in range(inputs)} for _ in range(number)]
+
+
+def forecast_rows(objectives, number=PREDICT_ROWS, seed=1):
+    """Input data rows for the synthetic time series """
+    rnd = random.Random(seed)
+    return [{"y%s" % index: {"horizon": rnd.randint(1, 50)}
+             for index in range(objectives)} for _ in range(number)]
+
+
+def text_rows(terms, number=PREDICT_ROWS, seed=1):
+    """Input data rows for the synthetic topic model """
+    rnd = random.Random(seed)
+    return [{"text": " ".join("term%s" % rnd.randrange(terms)
+                              for _ in range(50))} for _ in range(number)]
+
+
+def iris_fusion(storage):
+    """Stores a fusion of iris models and the iris ensemble """
+    for filename in os.listdir(IRIS_ENSEMBLE_DIR):
+        shutil.copy(os.path.join(IRIS_ENSEMBLE_DIR, filename), storage)
+    with open(os.path.join(storage, IRIS_MODEL_IDS[0].replace("/", "_"))) \
+            as handler:
+        model = json.load(handler)["object"]
+    fusion = {"resource": IRIS_FUSION_ID, "code": 200, "error": None,
+              "object": {"resource": IRIS_FUSION_ID, "name": "iris fusion",
+                         "description": "", "status": {"code": 5},
+                         "models": [{"id": resource_id, "weight": weight}
+                                    for resource_id, weight in zip( \
+                                        IRIS_MODEL_IDS + [IRIS_ENSEMBLE_ID],
+                                        [1, 2, 3, 1])],
+                         "fusion": {"fields": model["model"]["fields"]},
+                         "objective_field": model["objective_field"],
+                         "input_fields": model["input_fields"],
+                         "missing_numerics": True}}
+    with open(os.path.join(storage, IRIS_FUSION_ID.replace("/", "_")),
+              "w") as handler:
+        json.dump(fusion, handler)
+
+
+class BenchmarkCase():
+    """Local model to be benchmarked: how to build it, the rows used as
+    input data and the operations it supports.
+
+    """
+
+    def __init__(self, name, build_fn, rows, cache=True, packed=True):
+        """
+        :param name: name of the benchmark
+        :param build_fn: function that builds the local model
+        :param rows: list of input data dictionaries
+        :param cache: whether the local model can be dumped to a cache and
+                      loaded from it
+        :param packed: whether the local model can be packed with
+                       `dumps_packed`
+        """
+        self.name = name
+        self.build_fn = build_fn
+        self.rows = rows[:PREDICT_ROWS]
+        self.cache = cache
+        self.packed = packed
+
+
+def build_cases(storage):
+    """Returns the benchmark cases. Synthetic resources are stored in the
+    given directory.
+
+    """
+    iris_api = BigML("user", "key", storage=IRIS_ENSEMBLE_DIR)
+    api = BigML("user", "key", storage=storage)
+    # models read from files change the storage of their connection
+    files_api = BigML("user", "key", storage=DATA_DIR)
+    predictor_api = BigML("user", "key", storage=MY_ENSEMBLE_DIR)
+    iris_rows = read_rows("iris.csv", exclude=["species"])
+    grades_rows = read_rows("grades.csv", exclude=["Final"])
+    iris_fusion(storage)
+
+    deep = synthetic_model("model/%024x" % 1, depth=14, seed=1)
+    wide = synthetic_model("model/%024x" % 2, inputs=300, depth=8,
+                           regression=False, seed=2)
+    ensemble_models = [synthetic_model("model/%024x" % (10 + index),
+                                       depth=10, regression=False,
+                                       seed=10 + index)
+                       for index in range(10)]
+    ensemble_id = "ensemble/%024x" % 3
+    synthetic_ensemble(storage, ensemble_id, ensemble_models)
+    linear = synthetic_linear("linearregression/%024x" % 4)
+    logistic = synthetic_logistic("logisticregression/%024x" % 5)
+    cluster = synthetic_cluster("cluster/%024x" % 6)
+    anomaly = synthetic_anomaly("anomaly/%024x" % 7)
+    deepnet = synthetic_deepnet("deepnet/%024x" % 8)
+    pca = synthetic_pca("pca/%024x" % 9)
+    time_series = synthetic_time_series("timeseries/%024x" % 20)
+    association = synthetic_association("association/%024x" % 21)
+
+    cases = []
+    for filename in ["iris_model.json", "model/iris.json",
+                     "model/regression.json", "model/w_iris.json",
+                     "model/w_regression.json"]:
+        path = os.path.join(DATA_DIR, filename)
+        cases.append(BenchmarkCase( \
+            "model_%s" % os.path.splitext(os.path.basename(filename))[0],
+            lambda path=path: Model(path, api=files_api), iris_rows))
+    cases.extend([
+        BenchmarkCase("model_deep", lambda: Model(deep, api=api),
+                      synthetic_rows(10)),
+        BenchmarkCase("model_deep_compact",
+                      lambda: Model(deep, api=api, compact_tree=True),
+                      synthetic_rows(10)),
+        BenchmarkCase("model_wide", lambda: Model(wide, api=api),
+                      synthetic_rows(300)),
+        BenchmarkCase("supervised_deep",
+                      lambda: SupervisedModel(deep, api=api),
+                      synthetic_rows(10), cache=False),
+        BenchmarkCase("ensemble_iris",
+                      lambda: Ensemble(IRIS_ENSEMBLE_ID, api=iris_api),
+                      iris_rows),
+        BenchmarkCase("ensemble_iris_max_models",
+                      lambda: Ensemble(IRIS_ENSEMBLE_ID, api=iris_api,
+                                       max_models=2),
+                      iris_rows, cache=False, packed=False),
+        BenchmarkCase("ensemble_deep",
+                      lambda: Ensemble(ensemble_id, api=api),
+                      synthetic_rows(10)),
+        BenchmarkCase("ensemble_deep_compact",
+                      lambda: Ensemble(ensemble_id, api=api,
+                                       compact_tree=True),
+                      synthetic_rows(10)),
+        BenchmarkCase("ensemble_predictor",
+                      lambda: EnsemblePredictor( \
+                          os.path.join(MY_ENSEMBLE_DIR, "ensemble.json"),
+                          MY_ENSEMBLE_DIR, api=predictor_api),
+                      grades_rows, cache=False, packed=False),
+        BenchmarkCase("fusion_iris",
+                      lambda: Fusion(IRIS_FUSION_ID, api=api), iris_rows),
+        BenchmarkCase("linear_wide",
+                      lambda: LinearRegression(linear, api=api),
+                      synthetic_rows(200)),
+        BenchmarkCase("logistic_wide",
+                      lambda: LogisticRegression(logistic, api=api),
+                      synthetic_rows(200)),
+        BenchmarkCase("cluster_synthetic",
+                      lambda: Cluster(cluster, api=api),
+                      synthetic_rows(20)),
+        BenchmarkCase("anomaly_synthetic",
+                      lambda: Anomaly(anomaly, api=api),
+                      synthetic_rows(10)),
+        BenchmarkCase("deepnet_synthetic",
+                      lambda: Deepnet(deepnet, api=api),
+                      synthetic_rows(20)),
+        BenchmarkCase("pca_synthetic", lambda: PCA(pca, api=api),
+                      synthetic_rows(50)),
+        BenchmarkCase("timeseries_synthetic",
+                      lambda: TimeSeries(time_series, api=api),
+                      forecast_rows(3)),
+        BenchmarkCase("association_synthetic",
+                      lambda: Association(association, api=api),
+                      synthetic_rows(10))])
+    if TOPIC_ENABLED:
+        # the module can only be imported when pystemmer is installed
+        from bigml.topicmodel import TopicModel
+        topic_model = synthetic_topic_model("topicmodel/%024x" % 22)
+        cases.append(BenchmarkCase( \
+            "topicmodel_synthetic",
+            lambda: TopicModel(topic_model, api=api), text_rows(500)))
+    return cases
+
+
+def measure(function, repeat, number=1):
+    """Calls the function `number` times in each of `repeat` rounds and
+    returns the time per call of every round and the time of the
+    calibration loop measured just before it.
+
+    """
+    times = []
+    calibrations = []
+    for _ in range(repeat):
+        calibrations.append(calibration_time())
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+    return times, calibrations
+
+
+def calibration_loop():
+    """Fixed pure Python workload (dictionary, string and float operations)
+    whose time is used to normalize the measures.
+
+    """
+    counts = {}
+    total = 0.0
+    for index in range(CALIBRATION_SIZE):
+        key = str(index % 97)
+        counts[key] = counts.get(key, 0) + 1
+        total += index * 0.5
+    return total
+
+
+def calibration_time():
+    """Minimum time of the calibration loop in seconds """
+    times = []
+    for _ in range(CALIBRATION_ROUNDS):
+        start = time.perf_counter()
+        calibration_loop()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def calibrate(function):
+    """Number of calls needed for a round to last MIN_MEASURE_TIME """
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    if elapsed <= 0:
+        return 1000
+    return max(1, min(1000, int(MIN_MEASURE_TIME / elapsed)))
+
+
+def stats(measures, unit=1):
+    """Summary of the measured times divided by the number of units (like
+    rows) processed in every call. The `normalized` value is the median of
+    the times divided by the time of their calibration loop.
+
+    """
+    times, calibrations = measures
+    times = [value / unit for value in times]
+    return {"median": statistics.median(times), "min": min(times),
+            "normalized": statistics.median( \
+                [value / calibration for value, calibration
+                 in zip(times, calibrations)]),
+            "rounds": len(times)}
+
+
+def run_case(case, repeat):
+    """Measures the operations of a benchmark case """
+    results = {}
+    number = calibrate(case.build_fn)
+    results["build"] = stats(measure(case.build_fn, repeat, number))
+    local_model = case.build_fn()
+
+    def predict_rows():
+        for row in case.rows:
+            local_model.predict(row)
+    predict_rows()
+    results["predict"] = stats(measure(predict_rows, repeat),
+                               len(case.rows))
+
+    if hasattr(local_model, "batch_predict"):
+        def batch_predict():
+            local_model.batch_predict([dict(row) for row in case.rows])
+        batch_predict()
+        results["batch_predict"] = stats(measure(batch_predict, repeat),
+                                         len(case.rows))
+
+    if case.cache:
+        cache = {}
+        local_model.dump(cache_set=cache.__setitem__)
+        resource_id = local_model.resource_id
+
+        def dump():
+            local_model.dump(cache_set=cache.__setitem__)
+
+        def load():
+            local_model.__class__(resource_id, cache_get=cache.get)
+        number = calibrate(load)
+        results["dump"] = stats(measure(dump, repeat, calibrate(dump)))
+        results["load"] = stats(measure(load, repeat, number))
+
+    if case.packed:
+        contents = dumps_packed(local_model)
+
+        def dumps():
+            dumps_packed(local_model)
+
+        def loads():
+            loads_packed(contents)
+        results["dumps_packed"] = stats(measure(dumps, repeat,
+                                                calibrate(dumps)))
+        results["loads_packed"] = stats(measure(loads, repeat,
+                                                calibrate(loads)))
+    return results
+
+
+def run(name_filter=None, repeat=DEFAULT_REPEAT):
+    """Runs the benchmarks whose name matches the filter regular expression
+    and returns the results.
+
+    """
+    storage = tempfile.mkdtemp()
+    try:
+        results = {}
+        for case in build_cases(storage):
+            if name_filter and not re.search(name_filter, case.name):
+                continue
+            for operation, values in run_case(case, repeat).items():
+                results["%s.%s" % (case.name, operation)] = values
+    finally:
+        shutil.rmtree(storage, ignore_errors=True)
+    return {"bindings_version": __version__,
+            "python_version": platform.python_version(),
+            "platform": platform.platform(),
+            "unit": "seconds per call or per row",
+            "results": results}
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Compares the normalized times of the results (divided by the time
+    of the calibration loop) to the ones in the baseline. Returns the list
+    of regressions: measures whose normalized time exceeds the baseline by
+    more than the tolerance (as a fraction).
+
+    """
+    regressions = []
+    for key, values in sorted(results["results"].items()):
+        reference = baseline["results"].get(key)
+        if reference is None or reference.get("normalized", 0) <= 0:
+            continue
+        ratio = values["normalized"] / reference["normalized"]
+        if ratio > 1 + tolerance:
+            regressions.append({"benchmark": key,
+                                "baseline": reference["normalized"],
+                                "current": values["normalized"],
+                                "ratio": round(ratio, 3)})
+    return regressions
+
+
+def main(args=None):
+    """Command line entry point """
+    parser = argparse.ArgumentParser( \
+        description="Offline benchmarks for local predictions.")
+    parser.add_argument("--filter", help="Regular expression that selects"
+                        " the benchmarks to run by name.")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="Number of measuring rounds.")
+    parser.add_argument("--output", help="File to store the results in.")
+    parser.add_argument("--baseline",
+                        help="File with the results of a previous run in"
+                        " the same machine to compare to.")
+    parser.add_argument("--tolerance", type=float,
+                        default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown over the baseline, as a"
+                        " fraction.")
+    options = parser.parse_args(args)
+    results = run(options.filter, options.repeat)
+    contents = json.dumps(results, indent=2, sort_keys=True)
+    if options.output:
+        with open(options.output, "w") as handler:
+            handler.write(contents)
+    else:
+        print(contents)
+    if options.baseline:
+        with open(options.baseline) as handler:
+            baseline = json.load(handler)
+        regressions = compare(results, baseline, options.tolerance)
+        for regression in regressions:
+            sys.stderr.write("Slower than baseline: %(benchmark)s"
+                             " %(baseline).3g -> %(current).3g"
+                             " (x%(ratio)s)\n" % regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+#pylint: disable=locally-disabled,line-too-long,attribute-defined-outside-init
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+""" Testing the native Flatline compiler (offline)
+
+"""
+import os
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from bigml.flatlinecompiler import compile_lisp, supported
+from bigml.exceptions import UnsupportedFlatline
+
+
+FLATLINE_JS = os.path.join(os.path.dirname(os.path.dirname( \
+    os.path.abspath(__file__))), "flatline", "flatline-node.js")
+
+FIELDS = {
+    "000000": {"column_number": 0, "optype": "numeric", "datatype": "double",
+               "id": "000000", "name": "a",
+               "summary": {"minimum": -2, "maximum": 10, "mean": 3,
+                           "standard_deviation": 2, "median": 2.5,
+                           "population": 6, "missing_count": 1, "sum": 18,
+                           "sum_squares": 100, "variance": 4}},
+    "000001": {"column_number": 1, "optype": "numeric", "datatype": "int32",
+               "id": "000001", "name": "b",
+               "summary": {"minimum": 0, "maximum": 5, "mean": 2,
+                           "standard_deviation": 1}},
+    "000002": {"column_number": 2, "optype": "categorical",
+               "datatype": "string", "id": "000002", "name": "c",
+               "summary": {"categories": [["x", 3], ["y", 2]]}}}
+
+ROWS = [[1, 2, "x"], [None, 0, "y"], [4.5, None, None], [-2, 3, "x"],
+        [0, 0, "z"], [10, 5, "y"], [0.1, 0.3, "x"], [-3.7, 2, "y"],
+        [2.5, -1, None], [None, None, "x"]]
+
+SUPPORTED = [
+    '(+ (f "a") (f "b"))',
+    '(+ (f "a") 1 2)',
+    '(- (f "a"))',
+    '(- 10 (f "a") 1)',
+    '(/ (f "a") (f "b"))',
+    '(/ (f "b"))',
+    '(* (f "a") 2)',
+    '(+)',
+    '(*)',
+    '(/ 2)',
+    '(> (f "a") (f "b"))',
+    '(= (f "c") "x")',
+    '(!= (f "c") "x")',
+    '(= (f "a") 1 1)',
+    '(< 1 (f "a") 5)',
+    '(<= (f "b") (f "a") 5)',
+    '(>= (f "a") 0)',
+    '(if (> (f "a") 1) "hi" "lo")',
+    '(if (> (f "a") 1) 1)',
+    '(if (> (f "a") 1) (f "c") "lo")',
+    '(if (missing? "c") "none" (f "c"))',
+    '(cond (> (f "a") 3) "big" (> (f "a") 0) "pos" "neg")',
+    '(cond (> (f "a") 3) "big")',
+    '(cond (> (f "a") 3) 1 (missing? "b") 2 (< (f "b") 1) 3)',
+    '(and (> (f "a") 0) (> (f "b") 0))',
+    '(and (> (f "a") 100) (> (f "b") 0))',
+    '(and (> (f "b") 0) (> (f "a") 100))',
+    '(or (> (f "a") 0) (> (f "b") 0))',
+    '(or (> (f "b") 10) (> (f "a") 0))',
+    '(not (> (f "a") 0))',
+    '(not (missing? "a"))',
+    '(missing? "a")',
+    '(missing? "c")',
+    '(missing "b")',
+    '(!= (f "a") 1)',
+    '(= (f "a") (f "a"))',
+    '(if (missing? "a") 0 (f "a"))',
+    '(if (> (f "b") 1) (f "a") 0)',
+    '(sqrt (f "a"))',
+    '(ln (f "a"))',
+    '(log (f "a"))',
+    '(log10 (f "a"))',
+    '(log2 (f "a"))',
+    '(exp (f "a"))',
+    '(pow (f "a") 2)',
+    '(pow (f "a") 0.5)',
+    '(pow 2 (f "b"))',
+    '(square (f "a"))',
+    '(abs (f "a"))',
+    '(floor (f "a"))',
+    '(ceil (f "a"))',
+    '(round (f "a"))',
+    '(round -2.5)',
+    '(max (f "a") (f "b"))',
+    '(min (f "a") (f "b") 1)',
+    '(mod (f "a") 3)',
+    '(mod (f "a") (f "b"))',
+    '(div (f "a") 2)',
+    '(div (f "a") (f "b"))',
+    '(sin (f "a"))',
+    '(cos (f "a"))',
+    '(tan (f "a"))',
+    '(asin (f "a"))',
+    '(acos (/ (f "a") 10))',
+    '(atan (f "a"))',
+    '(sinh (f "a"))',
+    '(cosh (f "a"))',
+    '(tanh (f "a"))',
+    '(to-degrees (f "a"))',
+    '(to-radians (f "a"))',
+    '(integer (f "a"))',
+    '(real (f "b"))',
+    '(f 0)',
+    '(f 2)',
+    '(f "000001")',
+    '(field "a" -1)',
+    '(field "a" 1)',
+    '(f "c" -2)',
+    '(normalize "a")',
+    '(normalize "a" -1 1)',
+    '(normalize "b")',
+    '(z-score "a")',
+    '(mean "a")',
+    '(maximum "a")',
+    '(minimum "a")',
+    '(median "a")',
+    '(standard-deviation "a")',
+    '(variance "a")',
+    '(population "a")',
+    '(missing-count "a")',
+    '(sum "a")',
+    '(sum-squares "a")',
+    '(window "a" -1 1)',
+    '(window "b" 0 2)',
+    '(avg-window "a" -1 0)',
+    '(sum-window "a" -1 1)',
+    '(window-mean "b" -2 0)',
+    '(window-sum "a" -1 1)',
+    '(window-max "a" -1 1)',
+    '(window-min "a" -2 0)',
+    '(diff-window "a" -1 0)',
+    '(diff-window "b" -2 1)',
+    '(row-number)',
+    '(fields "a" "c")',
+    '(+ 1.5 (f "b"))',
+    '(= 1 1.0)',
+    '(* (f "a") (f "b") (f "a"))',
+    '(/ (* (f "a") 3) (+ (f "b") 0.1))',
+    '(+ (f "a") (if (> (f "b") 2) 10 -10))',
+    ('(if (and (> (f "a") 0) (or (= (f "c") "x") (missing? "b")))'
+     ' (* 2 (f "a")) (- (f "a")))')]
+
+UNSUPPORTED = [
+    '(and)',
+    '(or)',
+    '(* 1 "x")',
+    '(= (f "c") 1)',
+    '(< (f "c") "y")',
+    '(if true (f "b") "x")',
+    '(in (f "c") ["x" "y"])',
+    '(f "zz")',
+    '(+ (f "c") 1)']
+
+
+def node_results(expressions):
+    """Applies the expressions to the rows with the Node.js interpreter """
+    script = ("const flatline = require(%s).bigml.dixie.flatline;"
+              "const input = JSON.parse(require('fs').readFileSync(0));"
+              "console.log(JSON.stringify(input.exprs.map(sexp =>"
+              " flatline.eval_and_apply_sexp(sexp, {fields: input.fields},"
+              " input.rows))));") % json.dumps(FLATLINE_JS)
+    process = subprocess.run(
+        ["node", "-e", script], capture_output=True, text=True, check=True,
+        input=json.dumps({"fields": FIELDS, "rows": ROWS,
+                          "exprs": expressions}))
+    return json.loads(process.stdout)
+
+
+def approx_rows(rows):
+    """Compares the float values up to the rounding of the math libraries """
+    return [[pytest.approx(value, rel=1e-12) if isinstance(value, float)
+             else value for value in row] for row in rows]
+
+
+class TestFlatlineCompiler:
+    """Testing the native evaluation of Flatline expressions """
+
+    def setup_method(self, method):
+        """
+            Debug information
+        """
+        self.bigml = {}
+        self.bigml["method"] = method.__name__
+        print("\n-------------------\nTests in: %s\n" % __name__)
+
+    def teardown_method(self):
+        """
+            Debug information
+        """
+        print("\nEnd of tests in: %s\n-------------------\n" % __name__)
+        self.bigml = {}
+
+    def test_scenario1(self):
+        """
+        Scenario 1: Successfully evaluating expressions natively:
+            Given a fields structure and a list of rows
+            When I compile "<expression>" natively and apply it to the rows
+            Then the generated values are "<values>"
+        """
+        examples = [
+            ['(+ (f "a") (f "b"))',
+             [[3], [None], [None], [1], [0], [15], [0.4], [-1.7], [1.5],
+              [None]]],
+            ['(if (missing? "c") "none" (f "c"))',
+             [["x"], ["y"], ["none"], ["x"], ["z"], ["y"], ["x"], ["y"],
+              ["none"], ["x"]]],
+            ['(normalize "b")',
+             [[0.4], [0], [None], [0.6], [0], [1], [0.06], [0.4], [-0.2],
+              [None]]],
+            ['(window "b" 0 1)',
+             [[2, 0], [0, None], [None, 3], [3, 0], [0, 5], [5, 0.3],
+              [0.3, 2], [2, -1], [-1, None], [None, None]]]]
+        for sexp, values in examples:
+            print("Expression: %s" % sexp)
+            assert compile_lisp(sexp, FIELDS).apply(ROWS) == \
+                approx_rows(values)
+
+    def test_scenario2(self):
+        """
+        Scenario 2: Successfully detecting the expressions that need Node.js:
+            Given a fields structure
+            When I compile "<expression>" natively
+            Then an UnsupportedFlatline exception is raised
+        """
+        for sexp in UNSUPPORTED:
+            assert not supported(sexp, FIELDS)
+            with pytest.raises(UnsupportedFlatline):
+                compile_lisp(sexp, FIELDS)
+
+    @pytest.mark.skipif(shutil.which("node") is None,
+                        reason="Node.js is not available")
+    def test_scenario3(self):
+        """
+        Scenario 3: Successfully comparing native and Node.js evaluations:
+            Given a fields structure and a list of rows
+            When I apply "<expression>" natively and with Node.js
+            Then the generated values are the same
+        """
+        for sexp, expected in zip(SUPPORTED, node_results(SUPPORTED)):
+            print("Expression: %s" % sexp)
+            assert compile_lisp(sexp, FIELDS).apply(ROWS) == \
+                approx_rows(expected)
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+#pylint: disable=locally-disabled,line-too-long,attribute-defined-outside-init
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+""" Testing the input normalization plans of local models (offline)
+
+"""
+import msgpack
+import pandas as pd
+import pyarrow as pa
+
+from bigml.model import Model
+from bigml.util import cast, format_data
+from bigml.constants import INTERNAL
+from bigml.tests.benchmark import read_rows
+
+
+MODEL_FILES = ["data/model/iris.json", "data/iris_model.json"]
+
+
+def iris_rows():
+    """Iris rows with missing values, numbers as strings and unused fields """
+    rows = read_rows("iris.csv", exclude=["species"])
+    rows[0]["petal length"] = None
+    rows[1]["petal width"] = ""
+    rows[2]["sepal length"] = "NA"
+    rows[3]["unknown"] = 3
+    rows[4]["petal length"] = "1.4"
+    return rows
+
+
+class TestInputPlan:
+    """Testing the precomputed input normalization """
+
+    def setup_method(self, method):
+        """
+            Debug information
+        """
+        self.bigml = {}
+        self.bigml["method"] = method.__name__
+        print("\n-------------------\nTests in: %s\n" % __name__)
+
+    def teardown_method(self):
+        """
+            Debug information
+        """
+        print("\nEnd of tests in: %s\n-------------------\n" % __name__)
+        self.bigml = {}
+
+    def test_scenario1(self):
+        """
+        Scenario 1: Successfully normalizing input data with an input plan:
+            Given a local model from a "<model>" file
+            When I normalize the input data with its input plan
+            Then the result is the filtered and casted input data
+        """
+        rows = iris_rows()
+        for path in MODEL_FILES:
+            print("Local model: %s" % path)
+            local_model = Model(path)
+            plan = local_model.input_plan()
+            for row in rows:
+                filtered, unused_fields = local_model.filter_input_data( \
+                    row, add_unused_fields=True)
+                cast(filtered, local_model.fields)
+                normalized, plan_unused_fields = plan.normalize( \
+                    dict(row), add_unused_fields=True)
+                assert normalized == filtered
+                assert sorted(plan_unused_fields) == sorted(unused_fields)
+
+    def test_scenario2(self):
+        """
+        Scenario 2: Successfully normalizing the columns of a batch:
+            Given a local model from a "<model>" file
+            When I normalize the columns of a DataFrame and an Arrow table
+            Then each row is normalized as the plan normalizes it
+            And the batch predictions are the ones of the list of rows
+        """
+        rows = iris_rows()
+        for path in MODEL_FILES:
+            print("Local model: %s" % path)
+            local_model = Model(path)
+            plan = local_model.input_plan()
+            for table in [pd.DataFrame(rows), pa.Table.from_pylist(rows)]:
+                normalized_rows = local_model.batch_input_rows(table)
+                # Arrow infers the columns from the first row
+                table_rows = format_data(table, INTERNAL)
+                assert len(normalized_rows) == len(table_rows)
+                for row, normalized in zip(table_rows, normalized_rows):
+                    expected, unused_fields = plan.normalize( \
+                        dict(row), add_unused_fields=True)
+                    assert normalized == expected
+                    assert sorted(normalized.unused_fields) == \
+                        sorted(unused_fields)
+                    assert local_model.predict(normalized, full=True) == \
+                        local_model.predict(row, full=True)
+
+    def test_scenario3(self):
+        """
+        Scenario 3: Successfully serializing a model with an input plan:
+            Given a local model from a "<model>" file that has predicted
+            When I serialize it
+            Then the input plan is not stored
+            And the loaded model predicts the same
+        """
+        rows = iris_rows()
+        for path in MODEL_FILES:
+            print("Local model: %s" % path)
+            local_model = Model(path)
+            predictions = [local_model.predict(row) for row in rows]
+            contents = local_model.dumps()
+            assert msgpack.loads(contents)["_input_plan"] is None
+            cache = {}
+            local_model.dump(cache_set=cache.__setitem__)
+            loaded_model = Model(local_model.resource_id,
+                                 cache_get=cache.get)
+            assert [loaded_model.predict(row) for row in rows] == \
+                predictions
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+#pylint: disable=locally-disabled,line-too-long,attribute-defined-outside-init
+#pylint: disable=locally-disabled,protected-access
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+""" Testing the bounded cache of local models (offline)
+
+"""
+from bigml.api import BigML
+from bigml.ensemble import Ensemble
+from bigml.modelcache import ModelCache, object_size
+from bigml.tests.benchmark import read_rows, IRIS_ENSEMBLE_DIR, \
+    IRIS_ENSEMBLE_ID
+
+
+def iris_api():
+    """Connection that reads the iris ensemble from its storage """
+    return BigML("user", "key", storage=IRIS_ENSEMBLE_DIR)
+
+
+def iris_models():
+    """Local models of the iris ensemble, that share their fields """
+    ensemble = Ensemble(IRIS_ENSEMBLE_ID, api=iris_api(), max_models=1)
+    return [local_model for multi_model in ensemble._multi_models()
+            for local_model in multi_model.models]
+
+
+class TestModelCache:
+    """Testing the models cache """
+
+    def setup_method(self, method):
+        """
+            Debug information
+        """
+        self.bigml = {}
+        self.bigml["method"] = method.__name__
+        print("\n-------------------\nTests in: %s\n" % __name__)
+
+    def teardown_method(self):
+        """
+            Debug information
+        """
+        print("\nEnd of tests in: %s\n-------------------\n" % __name__)
+        self.bigml = {}
+
+    def test_scenario1(self):
+        """
+        Scenario 1: Successfully evicting local models from the cache:
+            Given the local models of an ensemble
+            When I add them to a cache whose budget fits two of them
+            Then the least recently used models are evicted
+            And the models bigger than the budget are not stored
+        """
+        local_models = iris_models()
+        sizes = [object_size(local_model) for local_model in local_models]
+        cache = ModelCache(max_bytes=sizes[0] + sizes[1])
+        for local_model in local_models:
+            cache.get(local_model.resource_id,
+                      lambda _, local_model=local_model: local_model)
+        assert cache.total_bytes <= cache.max_bytes
+        assert local_models[-1].resource_id in cache
+        assert local_models[0].resource_id not in cache
+        # getting a cached model makes it the most recently used
+        resource_ids = list(cache.models.keys())
+        cache.get(resource_ids[0], None)
+        cache.add(local_models[0].resource_id, local_models[0])
+        assert resource_ids[0] in cache
+        for resource_id in list(cache.models.keys()):
+            cache.remove(resource_id)
+        assert cache.total_bytes == 0
+        small_cache = ModelCache(max_bytes=min(sizes) // 2)
+        small_cache.add(local_models[0].resource_id, local_models[0])
+        assert len(small_cache) == 0
+
+    def test_scenario2(self):
+        """
+        Scenario 2: Successfully counting the shared fields once:
+            Given the local models of an ensemble, that share their fields
+            When I add them to a cache
+            Then the cache size is smaller than the sum of the model sizes
+            And the shared fields are released with the last model
+        """
+        local_models = iris_models()
+        assert local_models[0].fields is local_models[1].fields
+        sizes = [object_size(local_model) for local_model in local_models]
+        cache = ModelCache(max_bytes=sum(sizes))
+        for local_model in local_models:
+            cache.add(local_model.resource_id, local_model)
+        assert len(cache) == len(local_models)
+        assert cache.total_bytes < sum(sizes)
+        for local_model in local_models[0: -1]:
+            cache.remove(local_model.resource_id)
+        assert cache.total_bytes <= sizes[-1]
+        cache.remove(local_models[-1].resource_id)
+        assert cache.total_bytes == 0
+
+    def test_scenario3(self):
+        """
+        Scenario 3: Successfully predicting with a bounded models cache:
+            Given a local ensemble that keeps its models in a cache
+            When the cache fits only some of them
+            Then the predictions are the ones of the unbounded ensemble
+        """
+        rows = read_rows("iris.csv", exclude=["species"])[0: 30]
+        ensemble = Ensemble(IRIS_ENSEMBLE_ID, api=iris_api())
+        cached_ensemble = Ensemble(IRIS_ENSEMBLE_ID, api=iris_api(),
+                                   max_models=1, max_bytes=60000)
+        assert [cached_ensemble.predict(row, full=True) for row in rows] == \
+            [ensemble.predict(row, full=True) for row in rows]
+        assert 0 < len(cached_ensemble.models_cache) < 5
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+#pylint: disable=locally-disabled,line-too-long,attribute-defined-outside-init
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+""" Testing the compact trees of local models (offline)
+
+"""
+import msgpack
+
+from bigml.api import BigML
+from bigml.model import Model
+from bigml.compacttree import CompactNode, Column
+from bigml.tests.benchmark import synthetic_model, synthetic_rows, \
+    read_rows
+
+
+def iris_rows():
+    """Iris rows with missing values, numbers as strings and unused fields """
+    rows = read_rows("iris.csv", exclude=["species"])
+    rows[0]["petal length"] = None
+    rows[1]["petal width"] = ""
+    rows[2]["sepal length"] = "NA"
+    rows[3]["unknown"] = 3
+    rows[4]["petal length"] = "1.4"
+    return rows
+
+
+def examples():
+    """Models and the rows used to predict with them """
+    return [
+        [synthetic_model("model/%024x" % 1, depth=10, seed=1),
+         synthetic_rows(10)],
+        [synthetic_model("model/%024x" % 2, inputs=20, depth=8,
+                         regression=False, seed=2),
+         synthetic_rows(20)],
+        ["data/model/iris.json", iris_rows()],
+        ["data/model/w_regression.json",
+         read_rows("iris.csv", exclude=["species"])]]
+
+
+class TestCompactTree:
+    """Testing the compact trees """
+
+    def setup_method(self, method):
+        """
+            Debug information
+        """
+        self.bigml = {}
+        self.bigml["method"] = method.__name__
+        print("\n-------------------\nTests in: %s\n" % __name__)
+
+    def teardown_method(self):
+        """
+            Debug information
+        """
+        print("\nEnd of tests in: %s\n-------------------\n" % __name__)
+        self.bigml = {}
+
+    def test_scenario1(self, tmp_path):
+        """
+        Scenario 1: Successfully predicting with a compact tree:
+            Given a "<model>" with a deep tree
+            When I create a local model that keeps it in a CompactTree
+            Then its tree is the nested list tree
+            And the predictions are the same
+        """
+        api = BigML("user", "key", storage=str(tmp_path))
+        for model, rows in examples():
+            local_model = Model(model, api=api)
+            compact_model = Model(model, api=api, compact_tree=True)
+            print("Local model: %s" % local_model.resource_id)
+            assert isinstance(compact_model.tree, CompactNode)
+            assert compact_model.tree.to_list() == local_model.tree
+            for row in rows[0: 50]:
+                assert compact_model.predict(row, full=True) == \
+                    local_model.predict(row, full=True)
+
+    def test_scenario2(self, tmp_path):
+        """
+        Scenario 2: Successfully dumping and loading a compact tree:
+            Given a local model that keeps its tree in a CompactTree
+            When I dump it and load it from the cache
+            Then the tree is stored as the buffers of its arrays
+            And the loaded model predicts the same
+        """
+        api = BigML("user", "key", storage=str(tmp_path))
+        for model, rows in examples():
+            compact_model = Model(model, api=api, compact_tree=True)
+            print("Local model: %s" % compact_model.resource_id)
+            cache = {}
+            compact_model.dump(cache_set=cache.__setitem__)
+            stored = msgpack.loads(cache[compact_model.resource_id])
+            assert isinstance(stored["tree"], dict)
+            assert isinstance(stored["tree"]["first_child"]["buffer"],
+                              bytes)
+            loaded_model = Model(compact_model.resource_id,
+                                 cache_get=cache.get)
+            assert isinstance(loaded_model.tree, CompactNode)
+            assert loaded_model.tree.to_list() == \
+                compact_model.tree.to_list()
+            for row in rows[0: 50]:
+                assert loaded_model.predict(row, full=True) == \
+                    compact_model.predict(row, full=True)
+
+    def test_scenario3(self):
+        """
+        Scenario 3: Successfully storing the values of a column:
+            Given a list of "<values>"
+            When I store them in a Column and serialize it
+            Then the values keep their types
+        """
+        examples = [
+            [[1, 2, -3, 2 ** 62]],
+            [[1.5, None, 3, 2.0]],
+            [["a", None, 1, 1.0, True, [1, 2], [1, 2]]],
+            [[]]]
+        for values, in examples:
+            column = Column(values)
+            print("Values: %s, kind: %s" % (values, column.kind))
+            restored = Column.from_dict(msgpack.loads(msgpack.dumps( \
+                column.to_dict())))
+            for stored in [column, restored]:
+                result = stored.slice(0, len(values))
+                assert result == values
+                assert [type(value) for value in result] == \
+                    [type(value) for value in values]
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+#pylint: disable=locally-disabled,line-too-long,attribute-defined-outside-init
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+""" Testing the binary format of local models (offline)
+
+"""
+import os
+
+import msgpack
+import pytest
+
+from bigml.api import BigML
+from bigml.model import Model
+from bigml.compacttree import CompactNode
+from bigml.binarymodel import dump_binary, load_binary, loads_binary, \
+    dumps_packed, loads_packed, is_packed, OBJECT_EXT
+from bigml.tests.benchmark import build_cases, synthetic_model, \
+    synthetic_rows
+
+
+ROWS_NUMBER = 20
+
+
+class Unsupported():
+    """Objects of a class that is not allowed in the binary format """
+
+    def __init__(self):
+        self.value = 1
+
+
+class TestBinaryModel:
+    """Testing the binary format """
+
+    def setup_method(self, method):
+        """
+            Debug information
+        """
+        self.bigml = {}
+        self.bigml["method"] = method.__name__
+        print("\n-------------------\nTests in: %s\n" % __name__)
+
+    def teardown_method(self):
+        """
+            Debug information
+        """
+        print("\nEnd of tests in: %s\n-------------------\n" % __name__)
+        self.bigml = {}
+
+    def test_scenario1(self, tmp_path):
+        """
+        Scenario 1: Successfully storing local models in the binary format:
+            Given I create a local "<model>"
+            When I store it in the binary format and load it
+            Then the predictions of the loaded model are the same
+        """
+        for case in build_cases(str(tmp_path)):
+            if not case.packed:
+                continue
+            print("Local model: %s" % case.name)
+            local_model = case.build_fn()
+            rows = case.rows[0: ROWS_NUMBER]
+            predictions = [local_model.predict(row) for row in rows]
+            path = os.path.join(str(tmp_path), "%s.bml" % case.name)
+            dump_binary(local_model, path)
+            binary_model = load_binary(path)
+            assert [binary_model.predict(row) for row in rows] == \
+                predictions
+
+    def test_scenario2(self, tmp_path):
+        """
+        Scenario 2: Successfully mapping the trees of local models:
+            Given a local model that keeps its tree as nested lists
+            When I store it in the binary format and load it
+            Then its tree is a CompactTree whose arrays are read-only
+            And the tree is kept as nested lists when compact_trees is False
+        """
+        api = BigML("user", "key", storage=str(tmp_path))
+        local_model = Model(synthetic_model("model/%024x" % 1, depth=8,
+                                            seed=1), api=api)
+        rows = synthetic_rows(10)
+        path = os.path.join(str(tmp_path), "model.bml")
+        dump_binary(local_model, path)
+        binary_model = load_binary(path)
+        assert isinstance(local_model.tree, list)
+        assert isinstance(binary_model.tree, CompactNode)
+        assert binary_model.compact_tree
+        assert not binary_model.tree.tree.first_child.flags.writeable
+        assert binary_model.tree.to_list() == local_model.tree
+        for row in rows:
+            assert binary_model.predict(row, full=True) == \
+                local_model.predict(row, full=True)
+        dump_binary(local_model, path, compact_trees=False)
+        with open(path, "rb") as handler:
+            binary_model = loads_binary(handler.read())
+        assert binary_model.tree == local_model.tree
+
+    def test_scenario3(self):
+        """
+        Scenario 3: Successfully rejecting classes that are not allowed:
+            Given an object whose class is not in the allowed classes
+            When I store it
+            Then a TypeError is raised
+            And contents that refer to a class that is not allowed
+            When I load them
+            Then a ValueError is raised
+        """
+        with pytest.raises(TypeError):
+            dump_binary(Unsupported(), os.devnull)
+        with pytest.raises(TypeError):
+            dumps_packed(Unsupported())
+        contents = msgpack.packb(msgpack.ExtType( \
+            OBJECT_EXT, msgpack.packb(["os._wrap_close", {}])))
+        assert is_packed(contents)
+        with pytest.raises(ValueError):
+            loads_packed(contents)
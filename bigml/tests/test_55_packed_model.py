@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#pylint: disable=locally-disabled,line-too-long,attribute-defined-outside-init
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+""" Testing the packed format of local models (offline)
+
+"""
+from bigml.api import BigML
+from bigml.ensemble import Ensemble
+from bigml.compacttree import CompactNode
+from bigml.binarymodel import dumps_packed, loads_packed, is_packed
+from bigml.tests.benchmark import build_cases, read_rows, \
+    IRIS_ENSEMBLE_DIR, IRIS_ENSEMBLE_ID
+
+
+ROWS_NUMBER = 20
+
+
+class TestPackedModel:
+    """Testing the packed format """
+
+    def setup_method(self, method):
+        """
+            Debug information
+        """
+        self.bigml = {}
+        self.bigml["method"] = method.__name__
+        print("\n-------------------\nTests in: %s\n" % __name__)
+
+    def teardown_method(self):
+        """
+            Debug information
+        """
+        print("\nEnd of tests in: %s\n-------------------\n" % __name__)
+        self.bigml = {}
+
+    def test_scenario1(self, tmp_path):
+        """
+        Scenario 1: Successfully packing local models:
+            Given I create a local "<model>"
+            When I pack it in a single blob and load it
+            Then the predictions of the loaded model are the same
+        """
+        for case in build_cases(str(tmp_path)):
+            if not case.packed:
+                continue
+            print("Local model: %s" % case.name)
+            local_model = case.build_fn()
+            rows = case.rows[0: ROWS_NUMBER]
+            predictions = [local_model.predict(row) for row in rows]
+            contents = dumps_packed(local_model)
+            assert is_packed(contents)
+            packed_model = loads_packed(contents)
+            assert [packed_model.predict(row) for row in rows] == \
+                predictions
+
+    def test_scenario2(self):
+        """
+        Scenario 2: Successfully storing a packed ensemble in a cache:
+            Given a local ensemble
+            When I dump it packed in a cache
+            Then the ensemble and its models are stored under its ID
+            And the ensemble loaded from the cache predicts the same
+        """
+        api = BigML("user", "key", storage=IRIS_ENSEMBLE_DIR)
+        rows = read_rows("iris.csv", exclude=["species"])[0: ROWS_NUMBER]
+        ensemble = Ensemble(IRIS_ENSEMBLE_ID, api=api)
+        cache = {}
+        ensemble.dump(cache_set=cache.__setitem__, packed=True)
+        assert list(cache.keys()) == [ensemble.resource_id]
+        assert is_packed(cache[ensemble.resource_id])
+        assert ensemble.dumps(packed=True) == cache[ensemble.resource_id]
+        packed_ensemble = Ensemble(ensemble.resource_id, cache_get=cache.get)
+        assert all(isinstance(model.tree, CompactNode) for model
+                   in packed_ensemble.multi_model.models)
+        assert [packed_ensemble.predict(row, full=True) for row in rows] == \
+            [ensemble.predict(row, full=True) for row in rows]
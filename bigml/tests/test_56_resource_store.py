@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+#pylint: disable=locally-disabled,line-too-long,attribute-defined-outside-init
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+""" Testing the compressed storage of resources (offline)
+
+"""
+import os
+import json
+
+from bigml.api import BigML
+from bigml.ensemble import Ensemble
+from bigml.resourcestore import ResourceStore, OBJECTS_DIR, \
+    REFERENCES_KEY, INDEX_FILE
+from bigml.tests.benchmark import IRIS_ENSEMBLE_DIR, IRIS_ENSEMBLE_ID, \
+    read_rows
+
+
+def iris_resources():
+    """Returns the resources of the iris ensemble and its models """
+    resources = []
+    for filename in sorted(os.listdir(IRIS_ENSEMBLE_DIR)):
+        with open(os.path.join(IRIS_ENSEMBLE_DIR, filename)) as handler:
+            resources.append(json.load(handler))
+    return resources
+
+
+def stored_objects(directory):
+    """Lists the content-addressed objects in the storage directory """
+    return [filename for _, _, filenames in
+            os.walk(os.path.join(directory, OBJECTS_DIR))
+            for filename in filenames]
+
+
+class TestResourceStore:
+    """Testing the storage formats of resources """
+
+    def setup_method(self, method):
+        """
+            Debug information
+        """
+        self.bigml = {}
+        self.bigml["method"] = method.__name__
+        print("\n-------------------\nTests in: %s\n" % __name__)
+
+    def teardown_method(self):
+        """
+            Debug information
+        """
+        print("\nEnd of tests in: %s\n-------------------\n" % __name__)
+        self.bigml = {}
+
+    def test_scenario1(self, tmp_path):
+        """
+        Scenario 1: Successfully storing resources in a compressed format:
+            Given the resources of an ensemble and its models
+            When I store them in the "<format>" format
+            Then the shared fields are stored once
+            And the resources read are the original ones
+        """
+        resources = iris_resources()
+        for storage_format in ["json", "msgpack", "msgpack.gz", "json.gz"]:
+            print("Storage format: %s" % storage_format)
+            directory = os.path.join(str(tmp_path), storage_format)
+            os.makedirs(directory)
+            store = ResourceStore(directory, storage_format)
+            for resource in resources:
+                store.save(resource)
+            # the models share their fields and the ensemble has none
+            assert len(stored_objects(directory)) == \
+                (0 if storage_format == "json" else 1)
+            assert sorted(store.index().keys()) == \
+                sorted(resource["resource"] for resource in resources)
+            for resource in resources:
+                assert store.read(resource["resource"]) == resource
+
+    def test_scenario2(self, tmp_path):
+        """
+        Scenario 2: Successfully reading resources without their fields:
+            Given the resources of an ensemble stored as "msgpack.gz"
+            When I read a model without its fields
+            Then the fields are replaced by their references
+            And the contents of the files are kept in memory when allowed
+            And the contents of JSON files are not kept by default
+        """
+        store = ResourceStore(str(tmp_path), "msgpack.gz")
+        resources = iris_resources()
+        for resource in resources:
+            store.save(resource)
+        model = [resource for resource in resources
+                 if resource["resource"].startswith("model/")][0]
+        resource = store.read(model["resource"], fields=False)
+        assert "fields" not in resource["object"]["model"]
+        assert len(resource[REFERENCES_KEY]) == 1
+        assert store.memo_bytes > 0
+        no_memo_store = ResourceStore(str(tmp_path), "msgpack.gz",
+                                      max_memo_bytes=0)
+        assert no_memo_store.read(model["resource"]) == model
+        assert no_memo_store.memo_bytes == 0
+        json_store = ResourceStore(IRIS_ENSEMBLE_DIR)
+        assert json_store.read(model["resource"]) == model
+        assert json_store.memo_bytes == 0
+
+    def test_scenario3(self, tmp_path):
+        """
+        Scenario 3: Successfully predicting with stored resources:
+            Given the resources of an ensemble stored as "msgpack.gz"
+            When I create a local ensemble from them
+            Then its predictions are the ones of the ensemble stored as JSON
+        """
+        store = ResourceStore(str(tmp_path), "msgpack.gz")
+        for resource in iris_resources():
+            store.save(resource)
+        rows = read_rows("iris.csv", exclude=["species"])[0: 20]
+        ensemble = Ensemble(IRIS_ENSEMBLE_ID, api=BigML( \
+            "user", "key", storage=IRIS_ENSEMBLE_DIR))
+        stored_ensemble = Ensemble(IRIS_ENSEMBLE_ID, api=BigML( \
+            "user", "key", storage=str(tmp_path),
+            storage_format="msgpack.gz"))
+        assert [stored_ensemble.predict(row, full=True) for row in rows] == \
+            [ensemble.predict(row, full=True) for row in rows]
+
+    def test_scenario4(self, tmp_path):
+        """
+        Scenario 4: Successfully compacting the index of stored resources:
+            Given a store where resources are stored many times
+            When the index file doubles its size
+            Then it keeps only the last entry of every resource
+        """
+        store = ResourceStore(str(tmp_path), "msgpack")
+        resource_ids = ["model/%024x" % index for index in range(3)]
+        saves = 1000
+        last_names = {}
+        for index in range(saves):
+            resource_id = resource_ids[index % 3]
+            last_names[resource_id] = "model %s" % index
+            store.save({"resource": resource_id,
+                        "object": {"name": last_names[resource_id]}})
+        with open(os.path.join(str(tmp_path), INDEX_FILE)) as handler:
+            lines = handler.readlines()
+        assert len(lines) < saves
+        assert sorted(store.index().keys()) == resource_ids
+        for resource_id, name in last_names.items():
+            assert store.read(resource_id)["object"]["name"] == name
+        assert not [filename for filename in os.listdir(str(tmp_path))
+                    if filename.startswith(".tmp")]
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+#pylint: disable=locally-disabled,line-too-long,attribute-defined-outside-init
+#
+# Copyright 2025 BigML
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+""" Testing batch predictions of ensembles split in groups of models
+(offline)
+
+"""
+from bigml.api import BigML
+from bigml.ensemble import Ensemble
+from bigml.tests.benchmark import IRIS_ENSEMBLE_DIR, IRIS_ENSEMBLE_ID, \
+    CATEGORIES, read_rows, synthetic_model, synthetic_ensemble, \
+    synthetic_rows
+
+
+SETTINGS = [{}, {"method": 0}, {"method": 1}, {"method": 2},
+            {"median": True}, {"method": 1, "median": True},
+            {"operating_kind": "probability"},
+            {"operating_kind": "confidence"}]
+
+
+def predictions(ensemble, rows, setting):
+    """Full predictions of the rows or the error raised """
+    try:
+        return [ensemble.predict(row, full=True, **setting)
+                for row in rows]
+    except Exception as exc:
+        return type(exc).__name__, str(exc)
+
+
+def batch_predictions(ensemble, rows, setting):
+    """Full batch predictions of the rows or the error raised """
+    try:
+        return ensemble._batch_predictions(rows, **setting)
+    except Exception as exc:
+        return type(exc).__name__, str(exc)
+
+
+def compare_batch(ensemble_id, api, rows, settings):
+    """Checks that the batch predictions of an ensemble split in groups
+    of models match the predictions of the whole ensemble.
+
+    """
+    whole = Ensemble(ensemble_id, api=api)
+    split = Ensemble(ensemble_id, api=api, max_models=3)
+    assert len(split.models_splits) > 1
+    for setting in settings:
+        print("Setting: %s" % setting)
+        # nan values differ on comparison, so their representations are
+        # compared instead
+        assert repr(batch_predictions(split, rows, setting)) == \
+            repr(predictions(whole, rows, setting))
+
+
+class TestSplitBatchPredictions:
+    """Testing split-major batch predictions """
+
+    def setup_method(self, method):
+        """
+            Debug information
+        """
+        self.bigml = {}
+        self.bigml["method"] = method.__name__
+        print("\n-------------------\nTests in: %s\n" % __name__)
+
+    def teardown_method(self):
+        """
+            Debug information
+        """
+        print("\nEnd of tests in: %s\n-------------------\n" % __name__)
+        self.bigml = {}
+
+    def test_scenario1(self):
+        """
+        Scenario 1: Successfully creating batch predictions from a
+        classification ensemble split in groups of models:
+            Given a local ensemble built with max_models
+            When I create batch predictions using "<setting>"
+            Then they are the predictions of the whole ensemble
+        """
+        api = BigML("user", "key", storage=IRIS_ENSEMBLE_DIR)
+        rows = read_rows("iris.csv", exclude=["species"])[::5]
+        settings = SETTINGS + [
+            {"operating_kind": "votes"},
+            {"operating_point": {"kind": "probability", "threshold": 0.6,
+                                 "positive_class": "Iris-setosa"}},
+            {"method": 3, "options": {"threshold": 2,
+                                      "category": "Iris-setosa"}}]
+        compare_batch(IRIS_ENSEMBLE_ID, api, rows, settings)
+
+    def test_scenario2(self, tmp_path):
+        """
+        Scenario 2: Successfully creating batch predictions from regression
+        and boosted ensembles split in groups of models:
+            Given a local "<kind>" ensemble built with max_models
+            When I create batch predictions using "<setting>"
+            Then they are the predictions of the whole ensemble
+        """
+        storage = str(tmp_path)
+        api = BigML("user", "key", storage=storage)
+        rows = synthetic_rows(10, number=20)
+        ensembles = {}
+        models = [synthetic_model("model/%024x" % (100 + index), depth=6,
+                                  seed=100 + index)
+                  for index in range(8)]
+        ensembles["regression"] = "ensemble/%024x" % 100
+        synthetic_ensemble(storage, ensembles["regression"], models)
+        models = [synthetic_model("model/%024x" % (200 + index), depth=6,
+                                  seed=200 + index,
+                                  boosting={"weight": 0.1 * (index + 1),
+                                            "lambda": 1})
+                  for index in range(8)]
+        ensembles["boosted regression"] = "ensemble/%024x" % 200
+        synthetic_ensemble(storage, ensembles["boosted regression"], models,
+                           offsets=5.5)
+        models = [synthetic_model( \
+            "model/%024x" % (300 + index), depth=6, regression=False,
+            seed=300 + index,
+            boosting={"weight": 0.5,
+                      "objective_class": CATEGORIES[index % len(CATEGORIES)],
+                      "lambda": 1})
+                  for index in range(3 * len(CATEGORIES))]
+        ensembles["boosted classification"] = "ensemble/%024x" % 300
+        synthetic_ensemble(storage, ensembles["boosted classification"],
+                           models,
+                           offsets=[[category, 0.1 * index] for index, category
+                                    in enumerate(CATEGORIES)])
+        for kind, ensemble_id in ensembles.items():
+            print("Ensemble kind: %s" % kind)
+            compare_batch(ensemble_id, api, rows, SETTINGS)
@@ -42,6 +42,7 @@ import logging
 import re
 import sys
 import io
+import json
 import pprint
 
 from bigml.api import FINISHED
@@ -80,10 +81,26 @@ def compute_forecasts(submodels, horizon):
         forecasts.append( \
             {"model": name,
              "point_forecast": [round(value, DECIMALS) for value in
-                                SUBMODELS[trend](*args)]})
+                                SUBMODELS[trend](*args).tolist()]})
     return forecasts
 
 
+def truncate_forecasts(forecasts, horizon):
+    """Keeps only the first `horizon` points of each of the forecasts
+    computed for a longer horizon.
+    """
+    return [{"model": forecast["model"],
+             "point_forecast": forecast["point_forecast"][0: horizon]}
+            for forecast in forecasts]
+
+
+def filter_key(filter_info):
+    """Hashable key that identifies the submodels filter information
+
+    """
+    return json.dumps(filter_info, sort_keys=True)
+
+
 def filter_submodels(submodels, filter_info):
     """Filters the submodels available for the field in the time-series
     model according to the criteria provided in the prediction input data
@@ -134,12 +151,14 @@ class TimeSeries(ModelFields):
     that can be used to generate predictions locally.
 
     """
+    RUNTIME_ATTRS = ModelFields.RUNTIME_ATTRS + ("_submodels_cache",)
 
     def __init__(self, time_series, api=None, cache_get=None):
 
         if use_cache(cache_get):
             # using a cache to store the model attributes
             self.__dict__ = load(get_time_series_id(time_series), cache_get)
+            self._submodels_cache = {}
             return
 
         self.resource_id = None
@@ -159,6 +178,7 @@ class TimeSeries(ModelFields):
         self.time_range = {}
         self.field_parameters = {}
         self._forecast = {}
+        self._submodels_cache = {}
         api = get_api_connection(api)
 
         self.resource_id, time_series = get_resource_dict( \
@@ -243,23 +263,76 @@ class TimeSeries(ModelFields):
         norm_input_data = self.filter_objectives( \
             input_data)
 
-        # filter submodels: filtering the submodels in the time-series
-        # model to be used in the prediction
-        filtered_submodels = {}
-        for field_id, field_input in list(norm_input_data.items()):
-            filter_info = field_input.get("ets_models", {})
-            if not filter_info:
-                filter_info = DEFAULT_SUBMODEL
-            filtered_submodels[field_id] = filter_submodels( \
-                self.ets_models[field_id], filter_info)
-
         forecasts = {}
-        for field_id, submodels in list(filtered_submodels.items()):
+        for field_id, field_input in list(norm_input_data.items()):
+            # filter submodels: filtering the submodels in the time-series
+            # model to be used in the prediction
+            submodels = self.field_submodels(
+                field_id, field_input.get("ets_models", {}))
             forecasts[field_id] = compute_forecasts(submodels, \
-                norm_input_data[field_id]["horizon"])
+                field_input["horizon"])
 
         return forecasts
 
+    def field_submodels(self, field_id, filter_info=None):
+        """Returns the submodels of the field that match the filter
+        information. The filtered lists are memoized per field and filter.
+
+        """
+        if not filter_info:
+            filter_info = DEFAULT_SUBMODEL
+        key = (field_id, filter_key(filter_info))
+        if self._submodels_cache is None:
+            self._submodels_cache = {}
+        if key not in self._submodels_cache:
+            self._submodels_cache[key] = filter_submodels( \
+                self.ets_models[field_id], filter_info)
+        return self._submodels_cache[key]
+
+    def batch_forecast(self, input_data_list):
+        """Returns the list of forecasts for a list of input data. Each
+        submodel is evaluated only once, for the longest horizon requested
+        for its field and filter, and the rest of horizons are sliced
+        from it.
+
+        input_data_list: List of input data to be forecasted
+
+        """
+        requests = []
+        horizons = {}
+        for input_data in input_data_list:
+            if not input_data:
+                requests.append(None)
+                continue
+            field_requests = []
+            for field_id, field_input in list( \
+                    self.filter_objectives(input_data).items()):
+                filter_info = field_input.get("ets_models") or \
+                    DEFAULT_SUBMODEL
+                key = (field_id, filter_key(filter_info))
+                horizon = field_input["horizon"]
+                horizons[key] = max(horizons.get(key, 0), horizon)
+                field_requests.append((key, filter_info, horizon))
+            requests.append(field_requests)
+
+        full_forecasts = {}
+        forecasts_list = []
+        for field_requests in requests:
+            if field_requests is None:
+                forecasts_list.append(self.forecast())
+                continue
+            forecasts = {}
+            for key, filter_info, horizon in field_requests:
+                field_id = key[0]
+                if key not in full_forecasts:
+                    full_forecasts[key] = compute_forecasts( \
+                        self.field_submodels(field_id, filter_info),
+                        horizons[key])
+                forecasts[field_id] = truncate_forecasts( \
+                    full_forecasts[key], horizon)
+            forecasts_list.append(forecasts)
+        return forecasts_list
+
     def predict(self, input_data, full=False):
         """Method to homogeneize the local models interface for all BigML
         models. It returns the forecast method result.
@@ -50,7 +50,7 @@ from bigml.api import get_status, get_api_connection, get_topic_model_id
 from bigml.basemodel import get_resource_dict
 from bigml.modelfields import ModelFields
 from bigml.util import use_cache, load, dump, dumps, get_data_format, \
-    get_formatted_data, format_data, get_data_transformations
+    add_data_columns, get_data_transformations
 from bigml.constants import OUT_NEW_FIELDS, OUT_NEW_HEADERS, INTERNAL
 
 
@@ -98,6 +98,8 @@ class TopicModel(ModelFields):
     to generate topic distributions for input documents locally.
 
     """
+    RUNTIME_ATTRS = ModelFields.RUNTIME_ATTRS + ("stemmer",)
+
     #pylint: disable=locally-disabled,c-extension-no-member,invalid-name
     def __init__(self, topic_model, api=None, cache_get=None):
 
@@ -219,6 +221,9 @@ class TopicModel(ModelFields):
         """Returns the stem of the given term, if the stemmer is defined
 
         """
+        if self.stemmer is None and self.lang in CODE_TO_NAME:
+            # the stemmer is not stored in dumps and binary models
+            self.stemmer = Stemmer.Stemmer(CODE_TO_NAME[self.lang])
         if not self.stemmer:
             return term
         return self.stemmer.stemWord(term)
@@ -421,11 +426,12 @@ class TopicModel(ModelFields):
         to "output_fields" list, by default).
 
         :param input_data_list: List of input data to be predicted
-        :type input_data_list: list or Panda's dataframe
+        :type input_data_list: list, Panda's dataframe or Arrow table
         :param dict outputs: properties that define the headers and fields to
                              be added to the input data
         :return: the list of input data plus the predicted values
-        :rtype: list or Panda's dataframe depending on the input type in
+        :rtype: list, Panda's dataframe or Arrow table depending on the
+                input type in
                 input_data_list
 
         """
@@ -439,7 +445,7 @@ class TopicModel(ModelFields):
         else:
             new_headers = new_headers[0: len(new_fields)]
         data_format = get_data_format(input_data_list)
-        inner_data_list = get_formatted_data(input_data_list, INTERNAL)
+        inner_data_list = self.batch_input_rows(input_data_list)
         for index, input_data in enumerate(inner_data_list):
             prediction = self.distribution(input_data, **kwargs)
             prediction_dict = distribution_to_dict(prediction)
@@ -447,7 +453,8 @@ class TopicModel(ModelFields):
                 inner_data_list[index][new_headers[ikey]] = prediction_dict[
                     key]
         if data_format != INTERNAL:
-            return format_data(inner_data_list, out_format=data_format)
+            return add_data_columns(input_data_list, inner_data_list,
+                                    new_headers)
         return inner_data_list
 
     def data_transformations(self):
@@ -464,7 +471,8 @@ class TopicModel(ModelFields):
         """
         self_vars = vars(self).copy()
         del self_vars["stemmer"]
-        dump(self_vars, output=output, cache_set=cache_set)
+        dump(self_vars, output=output, cache_set=cache_set,
+             runtime_attrs=self.RUNTIME_ATTRS)
 
     def dumps(self):
         """Uses msgpack to serialize the resource object to a string
@@ -472,4 +480,4 @@ class TopicModel(ModelFields):
         """
         self_vars = vars(self).copy()
         del self_vars["stemmer"]
-        dumps(self_vars)
+        dumps(self_vars, runtime_attrs=self.RUNTIME_ATTRS)
@@ -25,41 +25,50 @@ https://www.otexts.org/fpp/7/6
 import inspect
 import sys
 
+import numpy as np
+
 
 OPERATORS = {"A": lambda x, s: x + s,
              "M": lambda x, s: x * s,
              "N": lambda x, s: x}
 
 
+def horizon_steps(horizon):
+    """Array of the prediction steps (0 to horizon - 1)
+
+    """
+    return np.arange(horizon)
+
+
 def season_contribution(s_list, step):
     """Chooses the seasonal contribution from the list in the period
 
     s_list: The list of contributions per season
-    step: The actual prediction step
+    step: The actual prediction step (or an array of steps)
 
     """
     if isinstance(s_list, list):
         period = len(s_list)
-        index = abs(- period + 1 + step % period)
-        return s_list[index]
+        index = np.abs(- period + 1 + step % period)
+        return np.asarray(s_list)[index]
     return 0
 
 
+def damped_phi(phi, horizon):
+    """Array of the cumulated damping factors for each step
+    phi_h = phi + phi^2 + ... + phi^(h + 1)
+
+    """
+    return np.cumsum(np.power(float(phi), horizon_steps(horizon) + 1))
+
+
 def trivial_forecast(submodel, horizon):
     """Computing the forecast for the trivial models
 
     """
-    points = []
-    submodel_points = submodel["value"]
-    period = len(submodel_points)
-    if period > 1:
-        # when a period is used, the points in the model are repeated
-        for h in range(horizon):
-            points.append(submodel_points[h % period])
-    else:
-        for _ in range(horizon):
-            points.append(submodel_points[0])
-    return points
+    submodel_points = np.asarray(submodel["value"])
+    # when a period is used, the points in the model are repeated
+    return submodel_points[horizon_steps(horizon) % len(submodel_points)]
 
 
 def naive_forecast(submodel, horizon):
@@ -79,10 +88,8 @@ def drift_forecast(submodel, horizon):
     """Computing the forecast for the drift model
 
     """
-    points = []
-    for h in range(horizon):
-        points.append(submodel["value"] + submodel["slope"] * (h + 1))
-    return points
+    return submodel["value"] + submodel["slope"] * \
+        (horizon_steps(horizon) + 1)
 
 
 def N_forecast(submodel, horizon, seasonality):
@@ -91,15 +98,13 @@ def N_forecast(submodel, horizon, seasonality):
     ŷ_t+h|t = l_t + s_f(s, h) (if seasonality = "A")
     ŷ_t+h|t = l_t * s_f(s, h) (if seasonality = "M")
     """
-    points = []
     final_state = submodel.get("final_state", {})
     l = final_state.get("l", 0)
     s = final_state.get("s", 0)
-    for h in range(horizon):
-        # each season has a different contribution
-        s_i = season_contribution(s, h)
-        points.append(OPERATORS[seasonality](l, s_i))
-    return points
+    steps = horizon_steps(horizon)
+    # each season has a different contribution
+    s_i = season_contribution(s, steps)
+    return OPERATORS[seasonality](np.full(horizon, l), s_i)
 
 
 def A_forecast(submodel, horizon, seasonality):
@@ -108,16 +113,14 @@ def A_forecast(submodel, horizon, seasonality):
     ŷ_t+h|t = l_t + h * b_t + s_f(s, h) (if seasonality = "A")
     ŷ_t+h|t = (l_t + h * b_t) * s_f(s,h) (if seasonality = "M")
     """
-    points = []
     final_state = submodel.get("final_state", {})
     l = final_state.get("l", 0)
     b = final_state.get("b", 0)
     s = final_state.get("s", 0)
-    for h in range(horizon):
-        # each season has a different contribution
-        s_i = season_contribution(s, h)
-        points.append(OPERATORS[seasonality](l + b * (h + 1), s_i))
-    return points
+    steps = horizon_steps(horizon)
+    # each season has a different contribution
+    s_i = season_contribution(s, steps)
+    return OPERATORS[seasonality](l + b * (steps + 1), s_i)
 
 
 def Ad_forecast(submodel, horizon, seasonality):
@@ -129,19 +132,14 @@ def Ad_forecast(submodel, horizon, seasonality):
          phi_1 = phi + phi^2
          phi_h = phi + phi^2 + ... + phi^(h + 1) (for h > 0)
     """
-    points = []
     final_state = submodel.get("final_state", {})
     l = final_state.get("l", 0)
     b = final_state.get("b", 0)
     phi = submodel.get("phi", 0)
     s = final_state.get("s", 0)
-    phi_h = phi
-    for h in range(horizon):
-        # each season has a different contribution
-        s_i = season_contribution(s, h)
-        points.append(OPERATORS[seasonality](l + phi_h * b, s_i))
-        phi_h = phi_h + pow(phi, h + 2)
-    return points
+    # each season has a different contribution
+    s_i = season_contribution(s, horizon_steps(horizon))
+    return OPERATORS[seasonality](l + damped_phi(phi, horizon) * b, s_i)
 
 
 def M_forecast(submodel, horizon, seasonality):
@@ -150,16 +148,14 @@ def M_forecast(submodel, horizon, seasonality):
     ŷ_t+h|t = l_t * b_t^h + s_f(m, h) (if seasonality = "A")
     ŷ_t+h|t = (l_t * b_t^h) * s_f(m, h) (if seasonality = "M")
     """
-    points = []
     final_state = submodel.get("final_state", {})
     l = final_state.get("l", 0)
     b = final_state.get("b", 0)
     s = final_state.get("s", 0)
-    for h in range(horizon):
-        # each season has a different contribution
-        s_i = season_contribution(s, h)
-        points.append(OPERATORS[seasonality](l * pow(b, h + 1), s_i))
-    return points
+    steps = horizon_steps(horizon)
+    # each season has a different contribution
+    s_i = season_contribution(s, steps)
+    return OPERATORS[seasonality](l * np.power(float(b), steps + 1), s_i)
 
 
 def Md_forecast(submodel, horizon, seasonality):
@@ -171,19 +167,15 @@ def Md_forecast(submodel, horizon, seasonality):
          phi_1 = phi + phi ^ 2
          phi_h = phi + phi^2 + ... + phi^h (for h > 1)
     """
-    points = []
     final_state = submodel.get("final_state", {})
     l = final_state.get("l", 0)
     b = final_state.get("b", 0)
     s = final_state.get("s", 0)
     phi = submodel.get("phi", 0)
-    phi_h = phi
-    for h in range(horizon):
-        # each season has a different contribution
-        s_i = season_contribution(s, h)
-        points.append(OPERATORS[seasonality](l * pow(b, phi_h), s_i))
-        phi_h = phi_h + pow(phi, h + 2)
-    return points
+    # each season has a different contribution
+    s_i = season_contribution(s, horizon_steps(horizon))
+    return OPERATORS[seasonality](
+        l * np.power(float(b), damped_phi(phi, horizon)), s_i)
 
 
 SUBMODELS = {
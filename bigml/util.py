@@ -29,7 +29,10 @@ import random
 import ast
 import datetime
 import logging
+import importlib
+import importlib.util
 
+from collections.abc import Mapping
 from urllib.parse import urlparse
 from unidecode import unidecode
 
@@ -37,11 +40,9 @@ import msgpack
 
 import bigml.constants as c
 
-try:
-    from pandas import DataFrame
-    PANDAS_READY = True
-except ImportError:
-    PANDAS_READY = False
+# pandas and pyarrow are only imported when their objects are used
+PANDAS_READY = importlib.util.find_spec("pandas") is not None
+ARROW_READY = importlib.util.find_spec("pyarrow") is not None
 
 DEFAULT_LOCALE = 'en_US.UTF-8'
 WINDOWS_DEFAULT_LOCALE = 'English'
@@ -114,7 +115,6 @@ DFT_STORAGE_FILE = os.path.join(DFT_STORAGE, "BigML_%s.json")
 
 DECIMAL_DIGITS = 5
 
-
 def python_map_type(value):
     """Maps a BigML type to equivalent Python types.
 
@@ -322,6 +322,34 @@ def res_filename(storage_dir, resource_id, extension=None):
     return filename
 
 
+def atomic_write(filename, contents):
+    """Writes the contents to a temporary file in the same directory that
+    replaces the given file once complete, so that readers never find partial
+    contents.
+
+    """
+    directory = os.path.dirname(filename) or "."
+    while True:
+        tmp_filename = os.path.join(directory,
+                                    ".tmp_%s" % os.urandom(8).hex())
+        try:
+            # the process umask applies to the mode, so the file gets the
+            # permissions of any regular file created by the process
+            handle = os.open(tmp_filename, os.O_CREAT | os.O_EXCL |
+                             os.O_WRONLY | getattr(os, "O_BINARY", 0), 0o666)
+            break
+        except FileExistsError:
+            continue
+    try:
+        with os.fdopen(handle, "wb") as tmp_file:
+            tmp_file.write(contents)
+        os.replace(tmp_filename, filename)
+    except Exception:
+        os.remove(tmp_filename)
+        raise
+    return filename
+
+
 def fs_cache_get(storage_dir, minimized=True):
     """Returns a function that retrieves a minimized resource from the file
     system
@@ -344,9 +372,8 @@ def fs_cache_set(storage_dir, minimized=True):
 
     def cache_set(resource_id, msg):
         filename = res_filename(storage_dir, asciify(resource_id), extension)
-        with open(filename, "wb") as handler:
-            handler.write(msg)
-            return filename
+        # readers in other processes never find a partially written file
+        return atomic_write(filename, msg)
 
     return cache_set
 
@@ -526,10 +553,11 @@ def get_status(resource):
 
 def maybe_save(resource_id, path,
                code=None, location=None,
-               resource=None, error=None):
+               resource=None, error=None, storage_format=None):
     """Builds the resource dict response and saves it if a path is provided.
 
-    The resource is saved in a local repo json file in the given path.
+    The resource is saved in a local repo json file in the given path, or
+    using the storage format, if set.
     Only final resources are stored. Final resources should be FINISHED or
     FAILED
 
@@ -537,9 +565,14 @@ def maybe_save(resource_id, path,
     resource = resource_structure(code, resource_id, location, resource, error)
     if resource_id is not None and path is not None and \
             is_status_final(resource):
-        resource_file_name = "%s%s%s" % (path, os.sep,
-                                         resource_id.replace('/', '_'))
-        save_json(resource, resource_file_name)
+        if storage_format is not None and storage_format != "json":
+            #pylint: disable=locally-disabled,import-outside-toplevel
+            from bigml.resourcestore import ResourceStore
+            ResourceStore(path, storage_format).save(resource)
+        else:
+            resource_file_name = "%s%s%s" % (path, os.sep,
+                                             resource_id.replace('/', '_'))
+            save_json(resource, resource_file_name)
     return resource
 
 
@@ -647,6 +680,35 @@ def flatten(inner_array):
     return new_array
 
 
+def import_class(class_path):
+    """Returns the class given its dotted path (module.Class), importing its
+    module if needed.
+
+    """
+    module_name, class_name = class_path.rsplit(".", 1)
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+class LazyClasses(Mapping):
+    """Read-only mapping of keys to classes given by their dotted paths.
+    The module of each class is only imported when the class is first
+    requested, so that importing the mapping is fast.
+
+    """
+
+    def __init__(self, class_paths):
+        self.class_paths = dict(class_paths)
+
+    def __getitem__(self, key):
+        return import_class(self.class_paths[key])
+
+    def __iter__(self):
+        return iter(self.class_paths)
+
+    def __len__(self):
+        return len(self.class_paths)
+
+
 def use_cache(cache_get):
     """Checks whether the user has provided a cache get function to retrieve
        local models.
@@ -655,11 +717,23 @@ def use_cache(cache_get):
     return cache_get is not None and hasattr(cache_get, '__call__')
 
 
-def dump(local_attrs, output=None, cache_set=None):
+def serializable_attrs(local_attrs, runtime_attrs=(), packed_attrs=()):
+    """Returns the attributes to be serialized, where the ones only built at
+    runtime (`runtime_attrs`), like the precomputed input normalization steps
+    or the caches, are reset to None. The ones in `packed_attrs` are kept.
+
+    """
+    return {key: None if key in runtime_attrs and key not in packed_attrs
+            else value for key, value in local_attrs.items()}
+
+
+def dump(local_attrs, output=None, cache_set=None, runtime_attrs=()):
     """Uses msgpack to serialize the local resource object
-    If cache_set is filled with a cache set method, the method is called
+    If cache_set is filled with a cache set method, the method is called.
+    The attributes in `runtime_attrs` are reset.
 
     """
+    local_attrs = serializable_attrs(local_attrs, runtime_attrs)
     if use_cache(cache_set):
         dump_string = msgpack.dumps(local_attrs)
         cache_set(local_attrs["resource_id"], dump_string)
@@ -667,12 +741,13 @@ def dump(local_attrs, output=None, cache_set=None):
         msgpack.pack(local_attrs, output)
 
 
-def dumps(local_attrs):
-    """Uses msgpack to serialize the anomaly object to a string
+def dumps(local_attrs, runtime_attrs=()):
+    """Uses msgpack to serialize the anomaly object to a string. The
+    attributes in `runtime_attrs` are reset.
 
     """
 
-    return msgpack.dumps(local_attrs)
+    return msgpack.dumps(serializable_attrs(local_attrs, runtime_attrs))
 
 
 def load(resource_id, cache_get):
@@ -711,32 +786,120 @@ def is_image(filename):
         in c.IMAGE_EXTENSIONS
 
 
+def is_instance_of(obj, module_name, class_name):
+    """Checks whether the object is an instance of a class in an optional
+    library. Objects like DataFrames or Arrow Tables can only exist once their
+    library has been imported, so the check does not import it.
+
+    """
+    module = sys.modules.get(module_name)
+    return module is not None and \
+        isinstance(obj, getattr(module, class_name))
+
+
 def get_data_format(input_data_list):
-    """Returns the format used in input_data_list: DataFrame or
+    """Returns the format used in input_data_list: DataFrame, Arrow Table or
     list of dicts.
 
     """
-    if PANDAS_READY and isinstance(input_data_list, DataFrame):
+    if is_instance_of(input_data_list, "pandas", "DataFrame"):
         return c.DATAFRAME
+    if is_instance_of(input_data_list, "pyarrow", "Table"):
+        return c.ARROW
     if isinstance(input_data_list, list) and (len(input_data_list) == 0 or
             isinstance(input_data_list[0], dict)):
         return c.INTERNAL
     raise ValueError("Data is expected to be provided as a list of "
-                     "dictionaries or Pandas' DataFrame.")
+                     "dictionaries, Pandas' DataFrame or Arrow Table.")
+
+
+def get_data_columns(input_data_list):
+    """Returns the columns in a DataFrame or Arrow Table as a dictionary of
+    lists of values. Missing values (nan, NaN, null, etc.) are changed to
+    None.
+
+    """
+    columns = {}
+    if get_data_format(input_data_list) == c.ARROW:
+        #pylint: disable=locally-disabled,import-outside-toplevel
+        import pyarrow
+        for name, column in zip(input_data_list.column_names,
+                                input_data_list.columns):
+            values = column.to_pylist()
+            if pyarrow.types.is_floating(column.type):
+                nan_mask = column.is_nan().to_pylist()
+                values = [None if is_nan else value for value, is_nan
+                          in zip(values, nan_mask)]
+            columns[name] = values
+        return columns
+    for name, column in input_data_list.items():
+        values = column.tolist()
+        missing_mask = column.isna().to_numpy()
+        if missing_mask.any():
+            for index in missing_mask.nonzero()[0].tolist():
+                values[index] = None
+        columns[name] = values
+    return columns
+
+
+def add_data_columns(input_data_list, output_data_list, headers,
+                     all_fields=True):
+    """Adds the values stored under the given headers in the list of output
+    dictionaries as new columns of the input DataFrame or Arrow Table.
+    If all_fields is False, only the new columns are returned.
+
+    """
+    new_columns = {}
+    for header in headers:
+        values = [output_data.get(header) for output_data in output_data_list]
+        if any(header in output_data for output_data in output_data_list):
+            new_columns[header] = values
+    if get_data_format(input_data_list) == c.ARROW:
+        #pylint: disable=locally-disabled,import-outside-toplevel
+        import pyarrow
+        if not all_fields:
+            return pyarrow.table({header: pyarrow.array(values) for
+                                  header, values in new_columns.items()})
+        table = input_data_list
+        for header, values in new_columns.items():
+            if header in table.column_names:
+                table = table.set_column( \
+                    table.column_names.index(header), header,
+                    pyarrow.array(values))
+            else:
+                table = table.append_column(header, pyarrow.array(values))
+        return table
+    #pylint: disable=locally-disabled,import-outside-toplevel
+    from pandas import DataFrame
+    frame = input_data_list.reset_index(drop=True) if all_fields else \
+        DataFrame(index=range(len(output_data_list)))
+    for header, values in new_columns.items():
+        frame[header] = values
+    return frame
 
 
-#pylint: disable=locally-disabled,comparison-with-itself
 def format_data(input_data_list, out_format=None):
     """Transforms the input data format to the one expected """
     if out_format == c.DATAFRAME:
+        if get_data_format(input_data_list) == c.ARROW:
+            return input_data_list.to_pandas()
+        #pylint: disable=locally-disabled,import-outside-toplevel
+        from pandas import DataFrame
         input_data_list = DataFrame.from_dict(input_data_list)
+    elif out_format == c.ARROW:
+        #pylint: disable=locally-disabled,import-outside-toplevel
+        import pyarrow
+        if get_data_format(input_data_list) == c.DATAFRAME:
+            return pyarrow.Table.from_pandas(input_data_list,
+                                             preserve_index=False)
+        input_data_list = pyarrow.Table.from_pylist(input_data_list)
     elif out_format == c.INTERNAL:
-        input_data_list = input_data_list.to_dict('records')
-        # pandas nan, NaN, etc. outputs need to be changed to None
-        for row in input_data_list:
-            for key, value in row.items():
-                if value != value:
-                    row[key] = None
+        # rows are built from the columns, where pandas nan, NaN, etc. and
+        # arrow nulls have already been changed to None
+        columns = get_data_columns(input_data_list)
+        names = list(columns.keys())
+        input_data_list = [dict(zip(names, row)) for row
+                           in zip(*columns.values())]
     return input_data_list
 
 
@@ -745,6 +908,9 @@ def get_formatted_data(input_data_list, out_format=None):
     current_format = get_data_format(input_data_list)
     if current_format != out_format:
         inner_data_list = format_data(input_data_list, out_format)
+    elif current_format == c.ARROW:
+        # Arrow tables are immutable
+        inner_data_list = input_data_list
     else:
         inner_data_list = input_data_list.copy()
     return inner_data_list